@@ -0,0 +1,537 @@
+#!/usr/bin/env python3
+"""
+End-to-end throughput benchmark for the extraction pipeline
+
+Generates synthetic corpora with corpus_generator and runs them through the
+same worker pools as the CLI (create_executor: the page-range scheduler for
+thread workers, the template-loading process pool for process workers), with
+exports and the result cache turned off. Scenarios cover single-page,
+middle-page and fixed-page templates on 1, 10 and 100 page documents.
+
+For every scenario, executor and worker count it reports:
+
+    - files/sec and pages/sec over the whole run
+    - p50/p95/p99 per-file latency, from submitting a file to receiving its
+      result, with the CLI's two files in flight per worker
+    - peak RSS of the benchmark and its worker processes, sampled during the run
+    - speedup and efficiency against the smallest worker count
+    - the stage metrics of the run (see metrics.py)
+    - the files whose extracted tables differ from their _expected.json
+
+Results are saved as JSON together with the commit and the machine they ran
+on. The benchmark exits with status 1 when any file was extracted wrongly, so
+a faster but incorrect change never passes. --compare checks the results
+against an earlier results file and also exits with status 1 when pages/sec
+dropped or p95 latency grew by more than --threshold, so a change to extract_invoice_tables or the CLI pool can be measured before
+it ships.
+
+Usage:
+    python benchmark.py [--scenarios single-1p,middle-10p,middle-100p,fixed-10p] [--workers 1,2,4] [--executor thread,process] [--scale 1.0] [--repeat 1] [--output <results.json>] [--compare <baseline.json>] [--threshold 0.1] [--corpus-dir <dir>] [--seed 42]
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import logging
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+import concurrent.futures
+from datetime import datetime
+
+from corpus_generator import LAYOUTS, generate_corpus, save_template
+from execution_policy import plan_execution
+from extraction_engine import SECTIONS, compile_template, extract_invoice_tables, load_template_from_database
+from logging_setup import LOG_LEVELS, configure_logging
+from metrics import get_metrics, stage_summary
+from pdf_extractor_cli import build_file_result, create_executor, merge_worker_telemetry
+
+try:
+    # Optional: includes the RSS of process-pool workers
+    import psutil
+except ImportError:
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+# Scenario name -> (template page mode, pages per document, documents at --scale 1)
+SCENARIOS = {
+    "single-1p": ("single", 1, 40),
+    "middle-10p": ("middle", 10, 8),
+    "middle-100p": ("middle", 100, 2),
+    "fixed-10p": ("fixed", 10, 8),
+}
+
+ROWS_PER_PAGE = 25
+TEMPLATES_DB = "benchmark_templates.db"
+RSS_SAMPLE_INTERVAL = 0.05
+
+
+def percentile(values, q):
+    """q-th percentile (0-100) of values, interpolating between the closest ranks"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def _rss_of(pid):
+    """Resident set size of a process in bytes, or None when it cannot be read"""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class RssSampler:
+    """Track the peak RSS of this process and its children from a background thread
+
+    Children are only included when psutil is installed; without it, and
+    without /proc, peak_bytes stays None.
+    """
+
+    def __init__(self, interval=RSS_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.peak_bytes = None
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+        self._process = psutil.Process() if psutil is not None else None
+
+    def __enter__(self):
+        self._sample()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop_event.set()
+        self._thread.join()
+        self._sample()
+        return False
+
+    def _current(self):
+        if self._process is None:
+            return _rss_of(os.getpid())
+        total = self._process.memory_info().rss
+        for child in self._process.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except psutil.Error:
+                pass  # the child exited meanwhile
+        return total
+
+    def _sample(self):
+        rss = self._current()
+        if rss is not None:
+            self.peak_bytes = rss if self.peak_bytes is None else max(self.peak_bytes, rss)
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self._sample()
+
+
+# --- Corpora -----------------------------------------------------------------
+
+def fixed_page_template(template, page_count):
+    """Turn a generated first/middle/last template into a fixed-page template with one entry per page"""
+    first, middle, last = template["page_regions"]
+    first_lines, middle_lines, last_lines = template["page_column_lines"]
+    config = dict(template["config"], use_middle_page=False, fixed_page_count=True)
+    return dict(
+        template,
+        description=f"{template['description']}, fixed {page_count} pages",
+        config=config,
+        page_count=page_count,
+        page_regions=[first] + [middle] * (page_count - 2) + [last],
+        page_column_lines=[first_lines] + [middle_lines] * (page_count - 2) + [last_lines],
+    )
+
+
+def prepare_scenario(name, corpus_dir, scale=1.0, seed=42, layout="standard"):
+    """Generate (or reuse) a scenario's corpus and save its template
+
+    Returns:
+        dict: name, mode, files (paths), pages (per file), template_id,
+        db_path and corpus_digest
+    """
+    mode, page_count, base_count = SCENARIOS[name]
+    count = max(1, int(round(base_count * scale)))
+    # Scenarios with the same documents (middle and fixed page modes) share a corpus
+    scenario_dir = os.path.join(corpus_dir, f"{page_count}p-{layout}-{count}f-s{seed}")
+    manifest_path = os.path.join(scenario_dir, "manifest.json")
+    rows = page_count * ROWS_PER_PAGE
+
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        logger.info("Reusing corpus %s", scenario_dir)
+    else:
+        logger.info("Generating %s documents of %s pages in %s", count, page_count, scenario_dir)
+        manifest = generate_corpus(
+            scenario_dir, count, seed, (page_count, page_count), (rows, rows), layout,
+        )
+
+    with open(os.path.join(scenario_dir, "template.json"), encoding="utf-8") as f:
+        template = json.load(f)
+    if mode == "fixed":
+        template = fixed_page_template(template, page_count)
+    template["name"] = f"benchmark-{name}-{layout}"
+    db_path = os.path.join(corpus_dir, TEMPLATES_DB)
+    template_id = save_template(template, db_path)
+
+    entries = manifest["files"]
+    return {
+        "name": name,
+        "mode": mode,
+        "files": [os.path.join(scenario_dir, entry["pdf"]) for entry in entries],
+        "pages": [entry["pages"] for entry in entries],
+        "template_id": template_id,
+        "db_path": db_path,
+        # Equal digests mean two result files measured the same documents
+        "corpus_digest": hashlib.sha256("".join(entry["sha256"] for entry in entries).encode()).hexdigest()[:16],
+    }
+
+
+# --- Correctness -------------------------------------------------------------
+
+def expected_path(pdf_path):
+    """Path of the expected tables corpus_generator wrote next to a PDF"""
+    return os.path.splitext(pdf_path)[0] + "_expected.json"
+
+
+def extracted_records(results):
+    """Extracted tables in the layout of an _expected.json file (string column keys, no pdf_page)"""
+    return {
+        section: [
+            [{str(column): value for column, value in row.items()}
+             for row in df.drop(columns=["pdf_page"], errors="ignore").to_dict(orient="records")]
+            for df in results.get(f"{section}_tables", [])
+        ]
+        for section in SECTIONS
+    }
+
+
+def check_results(pdf_path, results):
+    """Compare a file's extraction results with its _expected.json
+
+    Returns:
+        list: Sections whose tables differ from the expected ones (empty when all match)
+    """
+    with open(expected_path(pdf_path), encoding="utf-8") as f:
+        expected = json.load(f)
+    extracted = extracted_records(results or {})
+    return [section for section in SECTIONS if extracted[section] != expected.get(section, [])]
+
+
+# --- Runs --------------------------------------------------------------------
+
+def run_once(scenario, template, workers, executor_type, chunk_size=None, per_page=True):
+    """Extract every file of a scenario once with the CLI's worker pool and return the measurements
+
+    Starting the pool (for processes: spawning the workers and loading the
+    template in each) counts towards the run, as it does for a CLI batch.
+    The extracted tables are checked against the corpus's expected tables
+    after the clock stops; files that differ are listed under "mismatches".
+    """
+    files = scenario["files"]
+    pages_by_file = dict(zip(files, scenario["pages"]))
+    policy = plan_execution(workers, executor_type).apply()
+    get_metrics().reset()
+
+    latencies = []
+    statuses = {}
+    extracted = {}  # pdf_path -> results, checked once the run is timed
+
+    def finalize(pdf_path, results, page_count):
+        extracted[pdf_path] = results
+        return build_file_result(pdf_path, results, None)
+
+    with RssSampler() as rss:
+        start = time.perf_counter()
+        executor, __ = create_executor(
+            policy, template, None, chunk_size, per_page, db_path=scenario["db_path"]
+        )
+        submit = lambda pdf_path: executor.submit(pdf_path, finalize)
+        pending = list(reversed(files))
+        in_flight = {}  # future -> (pdf_path, submitted)
+        with executor:
+            while pending or in_flight:
+                # Same window as the CLI: every worker busy with one file queued behind it
+                while pending and len(in_flight) < policy.workers * 2:
+                    pdf_path = pending.pop()
+                    in_flight[submit(pdf_path)] = (pdf_path, time.perf_counter())
+                done, __ = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    pdf_path, submitted = in_flight.pop(future)
+                    try:
+                        result = future.result()
+                        merge_worker_telemetry(result)
+                        status = result["status"]
+                    except Exception as e:
+                        logger.error("Error processing %s: %s", os.path.basename(pdf_path), e)
+                        status = "error"
+                    latencies.append(time.perf_counter() - submitted)
+                    statuses[status] = statuses.get(status, 0) + 1
+        wall = time.perf_counter() - start
+
+    mismatches = {}
+    for pdf_path in files:
+        sections = check_results(pdf_path, extracted.get(pdf_path))
+        if sections:
+            mismatches[os.path.basename(pdf_path)] = sections
+            logger.error("Wrong %s tables extracted from %s", ", ".join(sections), os.path.basename(pdf_path))
+
+    snapshot = get_metrics().snapshot()
+    pages = sum(pages_by_file.values())
+    return {
+        "workers": policy.workers,
+        "executor": executor_type,
+        "policy": policy.describe(),
+        "files": len(files),
+        "pages": pages,
+        "wall_seconds": round(wall, 4),
+        "files_per_sec": round(len(files) / wall, 3),
+        "pages_per_sec": round(pages / wall, 3),
+        "latency_seconds": {
+            "p50": round(percentile(latencies, 50), 4),
+            "p95": round(percentile(latencies, 95), 4),
+            "p99": round(percentile(latencies, 99), 4),
+            "mean": round(sum(latencies) / len(latencies), 4),
+            "max": round(max(latencies), 4),
+        },
+        "peak_rss_mb": round(rss.peak_bytes / 2 ** 20, 1) if rss.peak_bytes else None,
+        "statuses": statuses,
+        "mismatches": mismatches,
+        "metrics": {
+            "counters": snapshot["counters"],
+            "stage_seconds": {name: h["sum"] for name, h in snapshot["histograms"].items() if h["count"]},
+        },
+        "stages": stage_summary(snapshot),
+    }
+
+
+def run_scenario(scenario, worker_counts, executor_types, repeat=1, chunk_size=None, per_page=True):
+    """Run a scenario for every executor type and worker count
+
+    Each point is run repeat times; the run with the median pages/sec is
+    reported, with the pages/sec of every repetition under "repeats" and the
+    mismatched files of every repetition under "mismatches".
+    """
+    template_data = load_template_from_database(scenario["template_id"], scenario["db_path"])
+    template = compile_template(template_data)
+
+    # Warm-up: imports, the template and the first document's pages outside any measurement
+    extract_invoice_tables(scenario["files"][0], template_data=template, per_page=per_page)
+
+    points = []
+    for executor_type in executor_types:
+        measured = set()
+        baseline = None
+        for workers in worker_counts:
+            # Worker counts above the CPU count would run as fewer workers
+            workers = plan_execution(workers, executor_type).workers
+            if workers in measured:
+                continue
+            measured.add(workers)
+            runs = []
+            for __ in range(repeat):
+                runs.append(run_once(scenario, template, workers, executor_type, chunk_size, per_page))
+            runs.sort(key=lambda run: run["pages_per_sec"])
+            point = runs[len(runs) // 2]
+            point["repeats"] = [run["pages_per_sec"] for run in runs]
+            for run in runs:
+                for filename, sections in run["mismatches"].items():
+                    merged = point["mismatches"].setdefault(filename, [])
+                    merged.extend(section for section in sections if section not in merged)
+            baseline = baseline or point
+            point["speedup"] = round(point["pages_per_sec"] / baseline["pages_per_sec"], 3)
+            point["efficiency"] = round(point["speedup"] * baseline["workers"] / point["workers"], 3)
+            points.append(point)
+            logger.info(
+                "  %-7s x%-3s %8.1f pages/s %7.2f files/s  p50 %.3fs p95 %.3fs p99 %.3fs  rss %s MB  speedup %.2f",
+                executor_type, point["workers"], point["pages_per_sec"], point["files_per_sec"],
+                point["latency_seconds"]["p50"], point["latency_seconds"]["p95"], point["latency_seconds"]["p99"],
+                point["peak_rss_mb"], point["speedup"],
+            )
+    return points
+
+
+def git_commit():
+    """Short commit hash of the working tree (with '-dirty' for local changes), or None outside git"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=here, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no", "--", "*.py"],
+            cwd=here, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f"{commit}-dirty" if dirty else commit
+
+
+# --- Comparison --------------------------------------------------------------
+
+def compare_results(baseline, current, threshold=0.1):
+    """Compare two results files point by point
+
+    Returns:
+        list: One dict per point present in both, with the relative change of
+        pages/sec and p95 latency, the number of mismatched files and whether
+        it is a regression (slower, or any file extracted wrongly)
+    """
+    def points(results):
+        return {
+            (scenario, point["executor"], point["workers"]): point
+            for scenario, data in results["scenarios"].items()
+            for point in data["points"]
+        }
+
+    old_points = points(baseline)
+    rows = []
+    for key, new in sorted(points(current).items()):
+        old = old_points.get(key)
+        if old is None:
+            continue
+        throughput = new["pages_per_sec"] / old["pages_per_sec"] - 1
+        latency = new["latency_seconds"]["p95"] / old["latency_seconds"]["p95"] - 1
+        mismatched = len(new.get("mismatches", {}))
+        rows.append({
+            "scenario": key[0],
+            "executor": key[1],
+            "workers": key[2],
+            "pages_per_sec": (old["pages_per_sec"], new["pages_per_sec"]),
+            "pages_per_sec_change": round(throughput, 4),
+            "p95_change": round(latency, 4),
+            "mismatched_files": mismatched,
+            "regression": throughput < -threshold or latency > threshold or mismatched > 0,
+        })
+    for scenario, data in current["scenarios"].items():
+        old = baseline["scenarios"].get(scenario)
+        if old and old.get("corpus_digest") != data.get("corpus_digest"):
+            logger.warning("%s was measured on a different corpus than the baseline", scenario)
+    return rows
+
+
+def _parse_list(value, cast=str):
+    return [cast(item) for item in value.split(",") if item.strip()]
+
+
+def _default_worker_counts():
+    cpus = os.cpu_count() or 1
+    counts = [1]
+    while counts[-1] * 2 <= cpus:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != cpus:
+        counts.append(cpus)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the extraction pipeline on synthetic invoice corpora')
+    parser.add_argument('--scenarios', type=lambda v: _parse_list(v), default=list(SCENARIOS),
+                        help=f'Comma-separated scenarios (default: {",".join(SCENARIOS)})')
+    parser.add_argument('--workers', type=lambda v: _parse_list(v, int), default=_default_worker_counts(),
+                        help='Comma-separated worker counts (default: 1, 2, 4, ... up to the CPU count)')
+    parser.add_argument('--executor', type=lambda v: _parse_list(v), default=["thread"],
+                        help='Comma-separated executor types: thread, process (default: thread)')
+    parser.add_argument('--scale', type=float, default=1.0, help='Multiplier for the number of documents per scenario')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per point; the median one is reported (default: 1)')
+    parser.add_argument('--chunk', type=int, help='Pages per scheduled task (thread) or per chunk (process)')
+    parser.add_argument('--per-region', action='store_true', help='Read every region with its own read_pdf call')
+    parser.add_argument('--layout', choices=sorted(LAYOUTS), default='standard', help='Item table layout (default: standard)')
+    parser.add_argument('--seed', type=int, default=42, help='Corpus seed (default: 42)')
+    parser.add_argument('--corpus-dir', default=os.path.join(tempfile.gettempdir(), 'pdf_harvest_benchmark'),
+                        help='Where corpora are generated and reused (default: <tmp>/pdf_harvest_benchmark)')
+    parser.add_argument('--output', help='Results file (default: benchmark_<commit>_<timestamp>.json)')
+    parser.add_argument('--compare', help='Earlier results file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='Relative pages/sec drop or p95 growth reported as a regression (default: 0.1)')
+    parser.add_argument('--log-level', type=str.upper, choices=LOG_LEVELS, default='WARNING',
+                        help='Level of the pipeline logs; the benchmark report is always shown (default: WARNING)')
+    args = parser.parse_args()
+
+    # Per-file log lines would be part of the measurement, so the pipeline only logs warnings by default
+    configure_logging(args.log_level)
+    logger.setLevel(logging.INFO)
+
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    bad_executors = [name for name in args.executor if name not in ("thread", "process")]
+    if unknown or bad_executors:
+        parser.error(f"Unknown scenarios or executors: {', '.join(unknown + bad_executors)}")
+    worker_counts = sorted(set(max(1, count) for count in args.workers))
+
+    commit = git_commit()
+    results = {
+        "metadata": {
+            "timestamp": datetime.now().isoformat(),
+            "commit": commit,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "seed": args.seed,
+            "scale": args.scale,
+            "layout": args.layout,
+            "repeat": args.repeat,
+            "per_page": not args.per_region,
+            "chunk_size": args.chunk,
+            "rss_includes_children": psutil is not None,
+        },
+        "scenarios": {},
+    }
+
+    for name in args.scenarios:
+        scenario = prepare_scenario(name, args.corpus_dir, args.scale, args.seed, args.layout)
+        logger.info(
+            "%s: %s files, %s pages (%s template)",
+            name, len(scenario["files"]), sum(scenario["pages"]), scenario["mode"]
+        )
+        points = run_scenario(
+            scenario, worker_counts, args.executor, args.repeat, args.chunk, not args.per_region
+        )
+        results["scenarios"][name] = {
+            "mode": scenario["mode"],
+            "pages_per_file": SCENARIOS[name][1],
+            "files": len(scenario["files"]),
+            "corpus_digest": scenario["corpus_digest"],
+            "points": points,
+        }
+
+    output = args.output or f"benchmark_{commit or 'nogit'}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    logger.info("Results saved to %s", output)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        rows = compare_results(baseline, results, args.threshold)
+        logger.info("Compared with %s (%s):", args.compare, baseline["metadata"].get("commit"))
+        for row in rows:
+            old, new = row["pages_per_sec"]
+            logger.info(
+                "  %-12s %-7s x%-3s %8.1f -> %8.1f pages/s (%+.1f%%), p95 %+.1f%%, %s mismatched%s",
+                row["scenario"], row["executor"], row["workers"], old, new,
+                row["pages_per_sec_change"] * 100, row["p95_change"] * 100, row["mismatched_files"],
+                "  REGRESSION" if row["regression"] else "",
+            )
+        if any(row["regression"] for row in rows):
+            sys.exit(1)
+
+    mismatched = sum(len(point["mismatches"]) for data in results["scenarios"].values() for point in data["points"])
+    if mismatched:
+        logger.error("%s file extractions did not match the expected tables", mismatched)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,9 @@
+import logging
 import sys
 import os
-import re
 import json
 import sqlite3
 from datetime import datetime
-import fitz  # PyMuPDF
-import pypdf_table_extraction
 from PySide6.QtWidgets import (
     QApplication,
     QMainWindow,
@@ -32,11 +30,23 @@ from PySide6.QtWidgets import (
     QStyle,
     QProxyStyle,
 )
-from PySide6.QtCore import Qt, Signal, QObject, QRect, QTimer
+from PySide6.QtCore import Qt, Signal, QObject, QRect, QTimer, QThread
 from PySide6.QtGui import QColor, QFont, QIcon
 import pandas as pd
 import time
+import threading
+import concurrent.futures
 from validation_screen import ValidationScreen
+import extraction_engine
+import result_sink
+from result_cache import ResultCache
+from page_scheduler import PageRangeScheduler
+from db_connections import close_thread_connections
+from execution_policy import plan_execution
+from metrics import get_metrics, stage_summary
+import tracing
+
+logger = logging.getLogger(__name__)
 
 
 class NoFrameStyle(QProxyStyle):
@@ -46,20 +56,189 @@ class NoFrameStyle(QProxyStyle):
         return super().styleHint(hint, option, widget, returnData)
         
 
+def summarize_file_results(results, page_count, template_type):
+    """Build the per-file summary shown in the bulk results table"""
+    summary = {
+        "page_count": page_count,
+        "template_type": template_type,
+        "header_rows": 0,
+        "item_rows": 0,
+        "summary_rows": 0,
+    }
+
+    if not results:
+        summary["status_text"] = "Failed"
+        summary["status_type"] = "failed"
+        return summary
+
+    summary["cached"] = bool(results.get("cached"))
+    for key, section in (("header_rows", "header_tables"), ("item_rows", "items_tables"), ("summary_rows", "summary_tables")):
+        summary[key] = sum(len(df) for df in results.get(section, []) if df is not None and not df.empty)
+
+    extraction_status = results.get("extraction_status", {})
+    overall_status = extraction_status.get("overall", "failed")
+
+    if overall_status == "success":
+        summary["status_text"] = "Success"
+        summary["status_type"] = "success"
+    elif overall_status == "partial":
+        partial_sections = [
+            name for name in ("header", "items", "summary")
+            if extraction_status.get(name) in ["success", "partial"]
+        ]
+        summary["status_text"] = f"Partial: {', '.join(section.title() for section in partial_sections)}"
+        summary["status_type"] = "partial"
+    else:
+        # Try to determine why it failed
+        if page_count == 0:
+            summary["status_text"] = "Failed: Could not read PDF"
+        elif not any([summary["header_rows"], summary["item_rows"], summary["summary_rows"]]):
+            summary["status_text"] = "Failed: No data extracted"
+        else:
+            summary["status_text"] = "Failed: Extraction errors"
+        summary["status_type"] = "failed"
+
+    return summary
+
+
+def count_exported_rows(section_content):
+    """Count the rows of one section in the export format"""
+    if isinstance(section_content, list):
+        return len(section_content)
+
+    total = 0
+    if isinstance(section_content, dict):
+        for table_data in section_content.values():
+            if isinstance(table_data, list):
+                total += len(table_data)
+            elif isinstance(table_data, dict):
+                for page_data in table_data.values():
+                    if isinstance(page_data, list):
+                        total += len(page_data)
+    return total
+
+
+class BulkExtractionWorker(QObject):
+    """Runs a batch of extractions on a thread pool, off the GUI thread
+
+    The worker lives in a QThread. Files are split into page ranges that a
+    PageRangeScheduler runs on a shared pool of extraction threads; each
+    finished file's tables are written to the result sink on the pool thread and only its summary is reported with file_processed. Progress
+    is throttled to PROGRESS_INTERVAL seconds, and stop() cancels queued files
+    and interrupts running ones between pages.
+    """
+    file_processed = Signal(int, str, object)  # index, pdf_path, summary
+    progress = Signal(int, int)  # completed, total
+    failed = Signal(str)  # error message when the batch could not run; finished follows
+    finished = Signal(bool)  # True if the batch was stopped
+
+    PROGRESS_INTERVAL = 0.25  # seconds between progress signals
+
+    def __init__(self, pdf_files, template_id, sink, cache=None, max_workers=None):
+        super().__init__()
+        self.pdf_files = list(pdf_files)
+        self.template_id = template_id
+        self.sink = sink
+        self.cache = cache
+        # At most 4 workers by default so the GUI stays responsive
+        self.policy = plan_execution(max_workers or min(4, os.cpu_count() or 1), "thread")
+        self.max_workers = self.policy.workers
+        self.template = None
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        """Request cancellation; safe to call from any thread"""
+        self._stop_event.set()
+
+    def run(self):
+        """Process every file and emit the results; finished is always emitted"""
+        try:
+            self.policy.apply()
+            # Compiled once per batch and shared by every pool thread
+            self.template = extraction_engine.get_compiled_template(self.template_id)
+            if self.template is None:
+                raise LookupError(f"Template {self.template_id} not found; it may have been deleted or renamed")
+            self._run_batch()
+        except Exception as e:
+            logger.error("Batch extraction failed: %s", e, exc_info=True)
+            self.failed.emit(str(e))
+        finally:
+            close_thread_connections()
+            self.finished.emit(self._stop_event.is_set())
+
+    def _run_batch(self):
+        """Extract every file on a PageRangeScheduler and emit each file's summary"""
+        total = len(self.pdf_files)
+        completed = 0
+        last_progress = 0.0
+
+        # Page ranges of all files share the pool, so a long document does not hold up the end of the batch
+        with PageRangeScheduler(
+            self.template, self.max_workers, cache=self.cache, should_stop=self._stop_event.is_set
+        ) as scheduler:
+            futures = {
+                scheduler.submit(pdf_path, self._store_results): (index, pdf_path)
+                for index, pdf_path in enumerate(self.pdf_files)
+            }
+            for future in concurrent.futures.as_completed(futures):
+                if self._stop_event.is_set():
+                    for pending in futures:
+                        pending.cancel()
+
+                index, pdf_path = futures[future]
+                try:
+                    summary = future.result()
+                except (extraction_engine.ExtractionCancelled, concurrent.futures.CancelledError):
+                    continue
+                except Exception as e:
+                    logger.error("Error processing file %s: %s", pdf_path, e)
+                    summary = summarize_file_results(None, 0, self._template_type())
+                    summary["status_text"] = f"Error: {str(e)}"
+
+                self.file_processed.emit(index, pdf_path, summary)
+
+                completed += 1
+                now = time.monotonic()
+                if now - last_progress >= self.PROGRESS_INTERVAL or completed == total:
+                    last_progress = now
+                    self.progress.emit(completed, total)
+
+    def _store_results(self, pdf_path, results, page_count):
+        """Stream a finished file's tables to the sink and return its summary (runs on a pool thread)"""
+        summary = summarize_file_results(results, page_count, self._template_type())
+        with get_metrics().time("export_write_seconds"), tracing.span("export", "export", file=os.path.basename(pdf_path)):
+            self.sink.write(pdf_path, results, summary)
+        return summary
+
+    def _template_type(self):
+        return self.template.template_type if self.template else "single"
+
+
+
 class BulkProcessor(QWidget):
     # Define signals
     back_requested = Signal()  # Signal for navigating back to main dashboard
     go_back = Signal()  # Signal for navigating back to main dashboard
+
+    # Storage for extracted tables: "jsonl", "parquet" or "sqlite"
+    RESULT_SINK_FORMAT = "jsonl"
     
     def __init__(self, parent=None):
         super().__init__(parent)
         self.parent = parent
         self.pdf_files = []
-        self.processed_data = {}
+        # Extracted tables are streamed to a result sink; only the per-file
+        # summaries shown in the results table are kept in memory
+        self.result_sink = None
+        self.file_summaries = {}
+        # Files already extracted with the same template are served from here
+        self.result_cache = ResultCache()
         
         # Initialize stop flag for processing
         self.should_stop = False
         self.start_time = None
+        self.worker = None
+        self.worker_thread = None
         
         # Define AI theme colors
         self.theme = {
@@ -456,6 +635,7 @@ class BulkProcessor(QWidget):
         
         process_btn = QPushButton("Process Files", self)
         process_btn.clicked.connect(self.process_files)
+        self.process_button = process_btn
         process_btn.setStyleSheet(f"""
             QPushButton {{
                 background-color: {self.theme['primary']};
@@ -685,6 +865,7 @@ class BulkProcessor(QWidget):
         self.results_table.setSelectionBehavior(QTableWidget.SelectRows)
         self.results_table.setSelectionMode(QTableWidget.SingleSelection)
         self.results_table.setMinimumHeight(300)
+        self.results_table.cellDoubleClicked.connect(self.show_file_details)
         
         # Set table size policy to expand properly
         self.results_table.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
@@ -822,7 +1003,7 @@ class BulkProcessor(QWidget):
     def load_templates(self):
         """Load templates from the database"""
         try:
-            print("\nLoading templates for bulk processing...")
+            logger.debug("Loading templates for bulk processing...")
             conn = sqlite3.connect("invoice_templates.db")
             cursor = conn.cursor()
             
@@ -831,7 +1012,7 @@ class BulkProcessor(QWidget):
                 "SELECT name FROM sqlite_master WHERE type='table' AND name='templates'"
             )
             if not cursor.fetchone():
-                print("Templates table does not exist in the database")
+                logger.debug("Templates table does not exist in the database")
                 conn.close()
                 QMessageBox.warning(
                     self,
@@ -844,7 +1025,7 @@ class BulkProcessor(QWidget):
             cursor.execute("PRAGMA table_info(templates)")
             columns = cursor.fetchall()
             column_names = [col[1] for col in columns]
-            print(f"Available template columns: {column_names}")
+            logger.debug("Available template columns: %s", column_names)
             
             # Build query dynamically based on available columns
             select_columns = ["id"]
@@ -864,12 +1045,12 @@ class BulkProcessor(QWidget):
                 select_columns.append("1")
             
             query = f"SELECT {', '.join(select_columns)} FROM templates"
-            print(f"Query: {query}")
+            logger.debug("Query: %s", query)
             
             # Execute the query
             cursor.execute(query)
             templates = cursor.fetchall()
-            print(f"Found {len(templates)} templates")
+            logger.debug("Found %s templates", len(templates))
             
             # Print template details for debugging
             for template in templates:
@@ -877,15 +1058,13 @@ class BulkProcessor(QWidget):
                 template_name = template[1] if len(template) > 1 else "Unnamed"
                 template_type = template[2] if len(template) > 2 else "single"
                 page_count = template[3] if len(template) > 3 else 1
-                print(
-                    f"  Template: {template_id}, {template_name}, {template_type}, {page_count} pages"
-                )
+                logger.debug("Template: %s, %s, %s, %s pages", template_id, template_name, template_type, page_count)
             
             # Clear and reload the combo box
             self.template_combo.clear()
             
             if not templates:
-                print("No templates found in database")
+                logger.warning("No templates found in database")
                 self.template_combo.addItem("No templates available", None)
                 self.multi_page_label.setText("Multi-page support: No templates found")
                 self.multi_page_label.setStyleSheet("color: orange;")
@@ -904,9 +1083,7 @@ class BulkProcessor(QWidget):
                         display_text = f"{template_name} ({template_type.title()})"
 
                     self.template_combo.addItem(display_text, template_id)
-                    print(
-                        f"Added template to dropdown: {display_text}, ID: {template_id}"
-                    )
+                    logger.debug("Added template to dropdown: %s, ID: %s", display_text, template_id)
 
                 # Update multi-page indicator
                 if has_multi_page:
@@ -921,26 +1098,23 @@ class BulkProcessor(QWidget):
                     self.multi_page_label.setStyleSheet("color: orange;")
             
             conn.close()
-            print("Finished loading templates")
+            logger.debug("Finished loading templates")
             
         except sqlite3.Error as e:
             error_msg = f"Database error while loading templates: {str(e)}"
-            print(error_msg)
+            logger.error("%s", error_msg)
             QMessageBox.critical(self, "Database Error", error_msg)
             self.multi_page_label.setText("Multi-page support: Database error")
             self.multi_page_label.setStyleSheet("color: red;")
         except Exception as e:
             error_msg = f"Failed to load templates: {str(e)}"
-            print(error_msg)
-            import traceback
-
-            traceback.print_exc()
+            logger.error("%s", error_msg, exc_info=True)
             QMessageBox.critical(self, "Error", error_msg)
             self.multi_page_label.setText("Multi-page support: Error loading templates")
             self.multi_page_label.setStyleSheet("color: red;")
     
     def process_files(self):
-        """Process selected PDF files with the selected template"""
+        """Process selected PDF files with the selected template on a background worker"""
         # Validate files and template selection
         if not self.pdf_files:
             QMessageBox.warning(self, "Warning", "Please add PDF files first")
@@ -951,6 +1125,15 @@ class BulkProcessor(QWidget):
             QMessageBox.warning(self, "Warning", "Please select a template")
             return
 
+        if self.is_processing():
+            return
+
+        try:
+            self.open_result_sink()
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Could not open result storage: {str(e)}")
+            return
+
         # Reset counters and displays
         self.status_label.setText("Processing files...")
         self.results_table.setRowCount(0)
@@ -960,297 +1143,214 @@ class BulkProcessor(QWidget):
         self.total_rows_count.setText("0")
         self.progress_bar.setMaximum(len(self.pdf_files))
         self.progress_bar.setValue(0)
+        self.batch_counts = {"processed": 0, "success": 0, "failed": 0, "rows": 0, "total": len(self.pdf_files)}
+        self.batch_error = None
         
         # Reset stop flag and show stop button
         self.should_stop = False
         self.stop_button.setVisible(True)
+        self.process_button.setEnabled(False)
         
-        # Start the timer
+        # Start the timer; stage metrics and the trace (PDF_HARVEST_TRACE) cover one batch
+        get_metrics().reset()
+        if os.environ.get(tracing.TRACE_ENV):
+            tracing.start_tracing()
         self.start_time = time.time()
         self.processing_time_timer = QTimer(self)
         self.processing_time_timer.timeout.connect(self.update_processing_time)
         self.processing_time_timer.start(1000)  # Update every second
 
-        try:
-            # Initialize counters for summary statistics
-            processed_count = 0
-            success_count = 0
-            failed_count = 0
-            total_rows = 0
-            
-            # Process each PDF file
-            for index, pdf_path in enumerate(self.pdf_files):
-                # Check if processing should stop
-                if self.should_stop:
-                    self.status_label.setText("Processing stopped by user")
-                    break
-                    
-                print(
-                    f"\nProcessing file {index + 1}/{len(self.pdf_files)}: {pdf_path}"
-                )
-                self.status_label.setText(f"Processing: {os.path.basename(pdf_path)}")
-
-                try:
-                    # Get actual PDF page count first
-                    with fitz.open(pdf_path) as pdf:
-                        actual_page_count = len(pdf)
-
-                    # Extract tables from the PDF
-                    results = self.extract_invoice_tables(pdf_path, template_id)
-
-                    processed_count += 1
-                    self.processed_count.setText(str(processed_count))
-                    
-                    if results:
-                        # Get template_type from the selected template name
-                        template_display_text = self.template_combo.currentText()
-                        template_type = "single"  # Default
-                        if "Multi" in template_display_text:
-                            template_type = "multi"
-                        
-                        # Get the overall extraction status
-                        extraction_status = results.get("extraction_status", {})
-                        overall_status = extraction_status.get("overall", "failed")
-                        
-                        # Store the results with correct page count and template type
-                        self.processed_data[pdf_path] = {
-                            "pdf_page_count": actual_page_count,  # Use actual page count from PDF
-                            "template_type": template_type,  # Add template type
-                            "header": results.get("header_tables", []),
-                            "items": results.get("items_tables", []),
-                            "summary": results.get("summary_tables", []),
-                            "extraction_status": extraction_status  # Add extraction status
-                        }
+        # Run the batch on a worker pool driven from a background thread
+        self.worker_thread = QThread(self)
+        self.worker = BulkExtractionWorker(self.pdf_files, template_id, self.result_sink, self.result_cache)
+        self.worker.moveToThread(self.worker_thread)
+        self.worker_thread.started.connect(self.worker.run)
+        self.worker.file_processed.connect(self.on_file_processed)
+        self.worker.progress.connect(self.on_progress)
+        self.worker.failed.connect(self.on_processing_failed)
+        self.worker.finished.connect(self.on_processing_finished)
+        self.worker.finished.connect(self.worker_thread.quit)
+        self.worker.finished.connect(self.worker.deleteLater)
+        self.worker_thread.finished.connect(self.worker_thread.deleteLater)
+        self.worker_thread.start()
+
+    def open_result_sink(self):
+        """Start a new result sink for a batch, closing the previous one"""
+        self.close_result_sink()
+        self.result_sink = result_sink.open_result_sink(self.RESULT_SINK_FORMAT)
+
+    def close_result_sink(self):
+        """Close the current result sink and forget the batch's summaries"""
+        if self.result_sink is not None:
+            self.result_sink.close()
+            self.result_sink = None
+        self.file_summaries.clear()
+
+    def has_results(self):
+        """Check whether the last batch stored any extracted tables"""
+        return self.result_sink is not None and len(self.result_sink) > 0
+
+    def is_processing(self):
+        """Check whether a batch is currently running"""
+        return getattr(self, "worker", None) is not None
+
+    def on_progress(self, completed, total):
+        """Update the progress bar from the worker's throttled progress signal"""
+        self.progress_bar.setMaximum(total)
+        self.progress_bar.setValue(completed)
+        self.status_label.setText(f"Processing files... {completed}/{total}")
+
+    def on_file_processed(self, index, pdf_path, summary):
+        """Record one finished file's summary and add it to the results table"""
+        counts = self.batch_counts
+        counts["processed"] += 1
+        self.processed_count.setText(str(counts["processed"]))
+        self.file_summaries[pdf_path] = summary
+
+        if summary["status_type"] in ("success", "partial"):
+            counts["success"] += 1
+            self.success_count.setText(str(counts["success"]))
+        else:
+            counts["failed"] += 1
+            self.failed_count.setText(str(counts["failed"]))
+
+        counts["rows"] += summary["header_rows"] + summary["item_rows"] + summary["summary_rows"]
+        self.total_rows_count.setText(str(counts["rows"]))
+
+        row = self.results_table.rowCount()
+        self.results_table.insertRow(row)
+        name_item = QTableWidgetItem(os.path.basename(pdf_path))
+        name_item.setData(Qt.UserRole, pdf_path)
+        self.results_table.setItem(row, 0, name_item)
+
+        status_item = QTableWidgetItem(summary["status_text"])
+        status_item.setData(Qt.UserRole, summary["status_type"])
+        status_colors = {
+            "success": self.theme['secondary'],
+            "partial": self.theme['warning'],
+            "failed": self.theme['danger'],
+        }
+        status_item.setForeground(QColor(status_colors.get(summary["status_type"], self.theme['danger'])))
+        status_item.setFont(QFont("Segoe UI", 9, QFont.Bold))
+        self.results_table.setItem(row, 1, status_item)
+
+        self.results_table.setItem(row, 2, QTableWidgetItem(str(summary["page_count"])))
+        self.results_table.setItem(row, 3, QTableWidgetItem(str(summary["header_rows"])))
+        self.results_table.setItem(row, 4, QTableWidgetItem(str(summary["item_rows"])))
+        self.results_table.setItem(row, 5, QTableWidgetItem(str(summary["summary_rows"])))
+
+    def on_processing_failed(self, message):
+        """Remember why the batch could not run; reported by on_processing_finished"""
+        self.batch_error = message
+
+    def on_processing_finished(self, stopped):
+        """Finish a batch: stop the timer, restore the controls and report the outcome"""
+        self.worker = None
+        self.worker_thread = None
+
+        # Final update of processing time
+        self.update_processing_time(is_final=True)
+        self.processing_time_timer.stop()
+        for line in stage_summary(get_metrics().snapshot()):
+            logger.info("Stage time: %s", line)
+        recorder = tracing.stop_tracing()
+        if recorder is not None:
+            try:
+                tracing.write_trace(os.environ[tracing.TRACE_ENV], recorder)
+            except OSError as e:
+                logger.warning("Could not write trace: %s", e)
 
-                        # Add to results table with correct counts
-                        row = self.results_table.rowCount()
-                        self.results_table.insertRow(row)
-
-                        # File name
-                        file_item = QTableWidgetItem(os.path.basename(pdf_path))
-                        self.results_table.setItem(row, 0, file_item)
-
-                        # Determine success status based on extraction_status
-                        header_count = sum(
-                            len(df)
-                            for df in results.get("header_tables", [])
-                            if df is not None and not df.empty
-                        )
-                        item_count = sum(
-                            len(df)
-                            for df in results.get("items_tables", [])
-                            if df is not None and not df.empty
-                        )
-                        summary_count = sum(
-                            len(df)
-                            for df in results.get("summary_tables", [])
-                            if df is not None and not df.empty
-                        )
-                        
-                        # Set status based on overall extraction status
-                        if overall_status == "success":
-                            status_text = "Success"
-                            status_type = "success"
-                            # Update success counter
-                            success_count += 1
-                            self.success_count.setText(str(success_count))
-                        elif overall_status == "partial":
-                            # Create a more detailed status message
-                            partial_sections = []
-                            if extraction_status.get("header") in ["success", "partial"]:
-                                partial_sections.append("Header")
-                            if extraction_status.get("items") in ["success", "partial"]:
-                                partial_sections.append("Items")
-                            if extraction_status.get("summary") in ["success", "partial"]:
-                                partial_sections.append("Summary")
-                            
-                            status_text = f"Partial: {', '.join(partial_sections)}"
-                            status_type = "partial"
-                            # Update success counter but also track as partial
-                            success_count += 1
-                            self.success_count.setText(str(success_count))
-                        else:
-                            # Try to determine why it failed
-                            if actual_page_count == 0:
-                                status_text = "Failed: Could not read PDF"
-                            elif not any([header_count, item_count, summary_count]):
-                                status_text = "Failed: No data extracted"
-                            else:
-                                status_text = "Failed: Extraction errors"
-                            
-                            status_type = "failed"
-                            # Update failed counter
-                            failed_count += 1
-                            self.failed_count.setText(str(failed_count))
-
-                        status_item = QTableWidgetItem(status_text)
-                        status_item.setData(Qt.UserRole, status_type)
-                        self.results_table.setItem(row, 1, status_item)
-                        
-                        # PDF Pages - Use actual page count
-                        self.results_table.setItem(
-                            row, 2, QTableWidgetItem(str(actual_page_count))
-                        )
-
-                        # Header Rows - sum of rows in all header tables
-                        self.results_table.setItem(
-                            row, 3, QTableWidgetItem(str(header_count))
-                        )
-
-                        # Item Rows - sum of rows in all item tables
-                        self.results_table.setItem(
-                            row, 4, QTableWidgetItem(str(item_count))
-                        )
-
-                        # Summary Rows - sum of rows in all summary tables
-                        self.results_table.setItem(
-                            row, 5, QTableWidgetItem(str(summary_count))
-                        )
-                        
-                        # Update total rows counter
-                        file_total_rows = header_count + item_count + summary_count
-                        total_rows += file_total_rows
-                        self.total_rows_count.setText(str(total_rows))
-                    else:
-                        # Add error to results table
-                        row = self.results_table.rowCount()
-                        self.results_table.insertRow(row)
-                        self.results_table.setItem(
-                            row, 0, QTableWidgetItem(os.path.basename(pdf_path))
-                        )
-                        
-                        status_item = QTableWidgetItem("Failed")
-                        status_item.setData(Qt.UserRole, "failed")
-                        self.results_table.setItem(row, 1, status_item)
-                        
-                        # Update failed counter
-                        failed_count += 1
-                        self.failed_count.setText(str(failed_count))
-                        
-                        self.results_table.setItem(
-                            row, 2, QTableWidgetItem(str(actual_page_count))
-                        )  # Still show actual page count
-                        self.results_table.setItem(row, 3, QTableWidgetItem("0"))
-                        self.results_table.setItem(row, 4, QTableWidgetItem("0"))
-                        self.results_table.setItem(row, 5, QTableWidgetItem("0"))
+        # Hide stop button when done
+        self.stop_button.setVisible(False)
+        self.process_button.setEnabled(True)
 
-                except Exception as e:
-                    print(f"Error processing file {pdf_path}: {str(e)}")
-                    import traceback
+        total_time = self.processing_time_label.text().replace('Total Time: ', '')
+        if self.batch_error:
+            self.status_label.setText("Processing failed")
+            self.status_label.setStyleSheet(f"""
+                padding: 4px 8px;
+                border-radius: 4px;
+                background-color: {self.theme['danger'] + '20'};
+                color: {self.theme['danger']};
+                font-weight: bold;
+            """)
+            QMessageBox.critical(self, "Processing Failed", f"The batch could not be processed: {self.batch_error}")
+            return
+        if stopped:
+            self.status_label.setText("Processing stopped by user")
+            return
 
-                    traceback.print_exc()
-                    
-                    # Try to get page count even if processing failed
-                    try:
-                        with fitz.open(pdf_path) as pdf:
-                            actual_page_count = len(pdf)
-                    except:
-                        actual_page_count = 0
-
-                    # Add error to results table
-                    row = self.results_table.rowCount()
-                    self.results_table.insertRow(row)
-                    self.results_table.setItem(
-                        row, 0, QTableWidgetItem(os.path.basename(pdf_path))
-                    )
-                    
-                    status_item = QTableWidgetItem(f"Error: {str(e)}")
-                    status_item.setData(Qt.UserRole, "failed")
-                    self.results_table.setItem(row, 1, status_item)
-                    
-                    # Update processed and failed counters
-                    processed_count += 1
-                    self.processed_count.setText(str(processed_count))
-                    failed_count += 1
-                    self.failed_count.setText(str(failed_count))
-                    
-                    self.results_table.setItem(
-                        row, 2, QTableWidgetItem(str(actual_page_count))
-                    )
-                    self.results_table.setItem(row, 3, QTableWidgetItem("0"))
-                    self.results_table.setItem(row, 4, QTableWidgetItem("0"))
-                    self.results_table.setItem(row, 5, QTableWidgetItem("0"))
+        total_files = self.batch_counts["total"]
+        success_count = self.batch_counts["success"]
+        failed_count = self.batch_counts["failed"]
+        if success_count == total_files:
+            self.status_label.setText("Processing complete: All files processed successfully!")
+            self.status_label.setStyleSheet(f"""
+                padding: 4px 8px;
+                border-radius: 4px;
+                background-color: {self.theme['secondary'] + '20'};
+                color: {self.theme['secondary']};
+                font-weight: bold;
+            """)
+            QMessageBox.information(self, "Success", f"All {total_files} files have been processed successfully.\nTotal time: {total_time}")
+        elif success_count > 0:
+            self.status_label.setText(f"Processing complete: {success_count}/{total_files} files processed successfully")
+            self.status_label.setStyleSheet(f"""
+                padding: 4px 8px;
+                border-radius: 4px;
+                background-color: {self.theme['warning'] + '20'};
+                color: {self.theme['warning']};
+                font-weight: bold;
+            """)
+            QMessageBox.warning(self, "Partial Success", f"{success_count} out of {total_files} files processed successfully.\n{failed_count} files failed.\nTotal time: {total_time}")
+        else:
+            self.status_label.setText("Processing complete: All files failed")
+            self.status_label.setStyleSheet(f"""
+                padding: 4px 8px;
+                border-radius: 4px;
+                background-color: {self.theme['danger'] + '20'};
+                color: {self.theme['danger']};
+                font-weight: bold;
+            """)
+            QMessageBox.critical(self, "Processing Failed", f"All {total_files} files failed to process. Please check logs for details.\nTotal time: {total_time}")
+    
+    def show_file_details(self, row, column):
+        """Load one file's tables from the result sink and show what was extracted"""
+        name_item = self.results_table.item(row, 0)
+        if name_item is None or self.result_sink is None:
+            return
 
-                    # Update progress
-                self.progress_bar.setValue(index + 1)
-                QApplication.processEvents()  # Keep UI responsive
-                
-            # Final update of processing time
-            self.update_processing_time(is_final=True)
-            
-            # Hide stop button when done
-            self.stop_button.setVisible(False)
-            
-            # Stop the processing timer
-            self.processing_time_timer.stop()
+        pdf_path = name_item.data(Qt.UserRole)
+        summary = self.file_summaries.get(pdf_path, {})
+        data = self.result_sink.read(pdf_path)
+        if data is None:
+            QMessageBox.information(
+                self, os.path.basename(pdf_path),
+                f"No tables were extracted.\nStatus: {summary.get('status_text', 'Unknown')}"
+            )
+            return
 
-            # Then update the color formatting for status items
-            for row in range(self.results_table.rowCount()):
-                status_item = self.results_table.item(row, 1)
-                if status_item:
-                    status_type = status_item.data(Qt.UserRole)
-                    if status_type == "success":
-                        status_item.setForeground(QColor(self.theme['secondary']))
-                        status_item.setFont(QFont("Segoe UI", 9, QFont.Bold))
-                    elif status_type == "partial":
-                        status_item.setForeground(QColor(self.theme['warning']))
-                        status_item.setFont(QFont("Segoe UI", 9, QFont.Bold))
-                    elif status_type == "failed":
-                        status_item.setForeground(QColor(self.theme['danger']))
-                        status_item.setFont(QFont("Segoe UI", 9, QFont.Bold))
-
-            # Then modify the processing completion message and status labels to provide clearer information
-            # Update status
-            total_files = len(self.pdf_files)
-            if success_count == total_files:
-                self.status_label.setText("Processing complete: All files processed successfully!")
-                self.status_label.setStyleSheet(f"""
-                    padding: 4px 8px;
-                    border-radius: 4px;
-                    background-color: {self.theme['secondary'] + '20'};
-                    color: {self.theme['secondary']};
-                    font-weight: bold;
-                """)
-                QMessageBox.information(self, "Success", f"All {total_files} files have been processed successfully.\nTotal time: {self.processing_time_label.text().replace('Total Time: ', '')}")
-            elif success_count > 0:
-                self.status_label.setText(f"Processing complete: {success_count}/{total_files} files processed successfully")
-                self.status_label.setStyleSheet(f"""
-                    padding: 4px 8px;
-                    border-radius: 4px;
-                    background-color: {self.theme['warning'] + '20'};
-                    color: {self.theme['warning']};
-                    font-weight: bold;
-                """)
-                QMessageBox.warning(self, "Partial Success", f"{success_count} out of {total_files} files processed successfully.\n{failed_count} files failed.\nTotal time: {self.processing_time_label.text().replace('Total Time: ', '')}")
-            else:
-                self.status_label.setText("Processing complete: All files failed")
-                self.status_label.setStyleSheet(f"""
-                    padding: 4px 8px;
-                    border-radius: 4px;
-                    background-color: {self.theme['danger'] + '20'};
-                    color: {self.theme['danger']};
-                    font-weight: bold;
-                """)
-                QMessageBox.critical(self, "Processing Failed", f"All {total_files} files failed to process. Please check logs for details.\nTotal time: {self.processing_time_label.text().replace('Total Time: ', '')}")
-                    
-        except Exception as e:
-            # Final update of processing time
-            self.update_processing_time(is_final=True)
-            
-            # Hide stop button when done
-            self.stop_button.setVisible(False)
-            
-            # Stop the processing timer
-            if hasattr(self, 'processing_time_timer'):
-                self.processing_time_timer.stop()
-                
-            print(f"Error in process_files: {str(e)}")
-            import traceback
+        lines = [
+            f"<b>Status:</b> {summary.get('status_text', 'Unknown')}",
+            f"<b>Pages:</b> {data.get('pdf_page_count', 0)} ({data.get('template_type', 'single')} template)",
+        ]
+        for section in ("header", "items", "summary"):
+            tables = data.get(section, [])
+            status = data.get("extraction_status", {}).get(section, "unknown")
+            lines.append(f"<br><b>{section.title()}</b> ({status}): {len(tables)} table(s)")
+            for i, df in enumerate(tables):
+                lines.append(f"• Table {i + 1}: {len(df)} rows × {len(df.columns)} columns")
+
+        missing = data.get("no_tables_found", [])
+        if missing:
+            lines.append(f"<br><b>Regions without tables:</b> {len(missing)}")
+
+        details_box = QMessageBox(self)
+        details_box.setWindowTitle(os.path.basename(pdf_path))
+        details_box.setTextFormat(Qt.RichText)
+        details_box.setText("<br>".join(lines))
+        details_box.exec()
 
-            traceback.print_exc()
-            QMessageBox.critical(self, "Error", f"An error occurred: {str(e)}\nTotal time: {self.processing_time_label.text().replace('Total Time: ', '')}")
-            self.status_label.setText("Error occurred during processing")
-    
     def add_files(self):
         """Add PDF files to the list"""
         files, _ = QFileDialog.getOpenFileNames(
@@ -1264,14 +1364,17 @@ class BulkProcessor(QWidget):
     
     def clear_files(self):
         """Clear the file list"""
+        if self.is_processing():
+            QMessageBox.warning(self, "Warning", "Please stop processing first")
+            return
         self.pdf_files.clear()
         self.file_list.clear()
         self.results_table.setRowCount(0)
-        self.processed_data.clear()
+        self.close_result_sink()
     
     def export_data(self, section):
         """Export processed data in JSON format"""
-        if not self.processed_data:
+        if not self.has_results():
             QMessageBox.warning(
                 self, "Warning", "No processed data available to export"
             )
@@ -1293,147 +1396,156 @@ class BulkProcessor(QWidget):
             """)
             QApplication.processEvents()  # Ensure UI updates
             
-            # Prepare data for export
-            export_data = {}
-
-            for pdf_path, data in self.processed_data.items():
-                pdf_filename = os.path.basename(pdf_path)
-                template_type = data.get("template_type", "single")
-                pdf_page_count = data.get("pdf_page_count", 1)
-
-                # Create an entry for this PDF file
-                file_data = {
-                    "metadata": {
-                        "filename": pdf_filename,
-                        "page_count": pdf_page_count,
-                        "template_type": template_type,
-                        "export_date": datetime.now().isoformat(),
-                        "template_name": self.template_combo.currentText(),
-                    }
-                }
-
-                # Process section data based on the template type
-                print(f"\nExporting {section} data for {pdf_filename}")
+            # Files are loaded from the result sink and written to the export
+            # one at a time, so the export never holds the whole batch
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            filename = f"{export_dir}/{section}_data_{timestamp}.json"
+            total_exported_files = 0
+            total_exported_rows = 0
+            # Written to a temporary file and moved into place, so a failed export
+            # never leaves a truncated JSON file behind
+            temp_filename = f"{filename}.tmp"
+            try:
+                with open(temp_filename, "w", encoding="utf-8") as export_file:
+                    export_file.write("{")
+
+                    for pdf_path, data in self.result_sink.iter_records():
+                        pdf_filename = os.path.basename(pdf_path)
+                        template_type = data.get("template_type", "single")
+                        pdf_page_count = data.get("pdf_page_count", 1)
+
+                        # Create an entry for this PDF file
+                        file_data = {
+                            "metadata": {
+                                "filename": pdf_filename,
+                                "page_count": pdf_page_count,
+                                "template_type": template_type,
+                                "export_date": datetime.now().isoformat(),
+                                "template_name": self.template_combo.currentText(),
+                            }
+                        }
+
+                        # Process section data based on the template type
+                        logger.debug("Exporting %s data for %s", section, pdf_filename)
                 
-                # Check if section exists in data
-                if section not in data:
-                    print(f"  No {section} data found for this file")
-                    file_data[section] = []
-                    continue
+                        # Check if section exists in data
+                        if section not in data:
+                            logger.warning("No %s data found for this file", section)
+                            file_data[section] = []
+                            continue
                     
-                section_data = data[section]
+                        section_data = data[section]
                 
-                # Handle None or empty case
-                if section_data is None:
-                    print(f"  {section} data is None")
-                    file_data[section] = []
-                    continue
+                        # Handle None or empty case
+                        if section_data is None:
+                            logger.debug("%s data is None", section)
+                            file_data[section] = []
+                            continue
 
-                # Handle case where data is a list of dataframes (multiple tables)
-                if isinstance(section_data, list):
-                    print(f"  Processing list of {len(section_data)} table(s)")
-                        # Create a combined dictionary with table indexes
-                    tables_dict = {}
-                    valid_tables = 0
+                        # Handle case where data is a list of dataframes (multiple tables)
+                        if isinstance(section_data, list):
+                            logger.debug("Processing list of %s table(s)", len(section_data))
+                                # Create a combined dictionary with table indexes
+                            tables_dict = {}
+                            valid_tables = 0
                     
-                    for i, df in enumerate(section_data):
-                        try:
-                            if df is None:
-                                print(f"  Table {i} is None, skipping")
-                                continue
+                            for i, df in enumerate(section_data):
+                                try:
+                                    if df is None:
+                                        logger.debug("Table %s is None, skipping", i)
+                                        continue
                                 
-                            # Convert string to DataFrame if needed
-                            if isinstance(df, str):
-                                print(f"  Table {i} is a string, converting to DataFrame")
-                                df = pd.DataFrame([{"text": df}])
-
-                            if df.empty:
-                                print(f"  Table {i} is empty, skipping")
-                                continue
+                                    # Convert string to DataFrame if needed
+                                    if isinstance(df, str):
+                                        logger.debug("Table %s is a string, converting to DataFrame", i)
+                                        df = pd.DataFrame([{"text": df}])
+
+                                    if df.empty:
+                                        logger.debug("Table %s is empty, skipping", i)
+                                        continue
                                 
-                            valid_tables += 1
-                            # Check if dataframe has page information
-                            if "pdf_page" in df.columns:
-                                print(f"  Table {i} has page information, grouping by page")
-                                # Group by page
-                                page_data = {}
-                                for page_num, page_df in df.groupby("pdf_page"):
-                                    page_num_int = int(page_num)
-                                    page_df = page_df.drop(columns=["pdf_page"])
-                                    page_data[f"page_{page_num_int}"] = page_df.to_dict(orient="records")
-                                    print(f"    Page {page_num_int}: {len(page_df)} rows")
-                                tables_dict[f"table_{i}"] = page_data
-                            else:
-                                # Single page data
-                                print(f"  Table {i}: {len(df)} rows (no page info)")
-                                tables_dict[f"table_{i}"] = df.to_dict(orient="records")
-                        except Exception as e:
-                            print(f"  Error processing table {i}: {str(e)}")
-                            import traceback
-                            traceback.print_exc()
-
-                    print(f"  Processed {valid_tables} valid tables")
-                    file_data[section] = tables_dict
+                                    valid_tables += 1
+                                    # Check if dataframe has page information
+                                    if "pdf_page" in df.columns:
+                                        logger.debug("Table %s has page information, grouping by page", i)
+                                        # Group by page
+                                        page_data = {}
+                                        for page_num, page_df in df.groupby("pdf_page"):
+                                            page_num_int = int(page_num)
+                                            page_df = page_df.drop(columns=["pdf_page"])
+                                            page_data[f"page_{page_num_int}"] = page_df.to_dict(orient="records")
+                                            logger.debug("Page %s: %s rows", page_num_int, len(page_df))
+                                        tables_dict[f"table_{i}"] = page_data
+                                    else:
+                                        # Single page data
+                                        logger.debug("Table %s: %s rows (no page info)", i, len(df))
+                                        tables_dict[f"table_{i}"] = df.to_dict(orient="records")
+                                except Exception as e:
+                                    logger.error("Error processing table %s: %s", i, e, exc_info=True)
 
-                else:
-                    # Regular case - single dataframe or string
-                    try:
-                        if isinstance(section_data, str):
-                            print(f"  {section} data is a string, converting to DataFrame")
-                            section_data = pd.DataFrame([{"text": section_data}])
-                        
-                        if not hasattr(section_data, 'empty'):
-                            print(f"  {section} data is not a DataFrame, converting")
-                            # Try to convert to DataFrame if possible
+                            logger.debug("Processed %s valid tables", valid_tables)
+                            file_data[section] = tables_dict
+
+                        else:
+                            # Regular case - single dataframe or string
                             try:
-                                section_data = pd.DataFrame(section_data)
-                            except:
-                                print(f"  Cannot convert {section} data to DataFrame")
-                                file_data[section] = [{"error": "Data format error"}]
-                                continue
-
-                        if section_data.empty:
-                            print(f"  {section} DataFrame is empty")
-                            file_data[section] = []
-                            continue
+                                if isinstance(section_data, str):
+                                    logger.debug("%s data is a string, converting to DataFrame", section)
+                                    section_data = pd.DataFrame([{"text": section_data}])
+                        
+                                if not hasattr(section_data, 'empty'):
+                                    logger.debug("%s data is not a DataFrame, converting", section)
+                                    # Try to convert to DataFrame if possible
+                                    try:
+                                        section_data = pd.DataFrame(section_data)
+                                    except:
+                                        logger.warning("Cannot convert %s data to DataFrame", section)
+                                        file_data[section] = [{"error": "Data format error"}]
+                                        continue
+
+                                if section_data.empty:
+                                    logger.debug("%s DataFrame is empty", section)
+                                    file_data[section] = []
+                                    continue
                             
-                        rows = len(section_data)
-                        cols = len(section_data.columns)
-                        print(f"  {section} DataFrame has {rows} rows and {cols} columns")
-
-                        # Check if multi-page processing is needed
-                        if "pdf_page" in section_data.columns and template_type == "multi":
-                            print(f"  Multi-page processing for {section}")
-                            # Group by page
-                            page_data = {}
-                            for page_num, page_df in section_data.groupby("pdf_page"):
-                                page_num_int = int(page_num)
-                                page_df = page_df.drop(columns=["pdf_page"])
-                                page_data[f"page_{page_num_int}"] = page_df.to_dict(orient="records")
-                                print(f"    Page {page_num_int}: {len(page_df)} rows")
-                            file_data[section] = page_data
-                        else:
-                            # Single page data
-                            if "pdf_page" in section_data.columns:
-                                print(f"  Removing pdf_page column")
-                                section_data = section_data.drop(columns=["pdf_page"])
-                            print(f"  Exporting as single-page data: {len(section_data)} rows")
-                            file_data[section] = section_data.to_dict(orient="records")
-                    except Exception as e:
-                        print(f"  Error processing {section} data: {str(e)}")
-                        import traceback
-                        traceback.print_exc()
-                        file_data[section] = [{"error": str(e)}]
-
-                # Add the file data to the export
-                export_data[pdf_filename] = file_data
-            
-            # Save to JSON file
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"{export_dir}/{section}_data_{timestamp}.json"
-            
-            with open(filename, "w", encoding="utf-8") as f:
-                json.dump(export_data, f, indent=2, ensure_ascii=False)
+                                rows = len(section_data)
+                                cols = len(section_data.columns)
+                                logger.debug("%s DataFrame has %s rows and %s columns", section, rows, cols)
+
+                                # Check if multi-page processing is needed
+                                if "pdf_page" in section_data.columns and template_type == "multi":
+                                    logger.debug("Multi-page processing for %s", section)
+                                    # Group by page
+                                    page_data = {}
+                                    for page_num, page_df in section_data.groupby("pdf_page"):
+                                        page_num_int = int(page_num)
+                                        page_df = page_df.drop(columns=["pdf_page"])
+                                        page_data[f"page_{page_num_int}"] = page_df.to_dict(orient="records")
+                                        logger.debug("Page %s: %s rows", page_num_int, len(page_df))
+                                    file_data[section] = page_data
+                                else:
+                                    # Single page data
+                                    if "pdf_page" in section_data.columns:
+                                        logger.debug("Removing pdf_page column")
+                                        section_data = section_data.drop(columns=["pdf_page"])
+                                    logger.debug("Exporting as single-page data: %s rows", len(section_data))
+                                    file_data[section] = section_data.to_dict(orient="records")
+                            except Exception as e:
+                                logger.error("Error processing %s data: %s", section, e, exc_info=True)
+                                file_data[section] = [{"error": str(e)}]
+
+                        # Add the file data to the export
+                        entry = json.dumps({pdf_filename: file_data}, indent=2, ensure_ascii=False)
+                        export_file.write(("," if total_exported_files else "") + entry[1:-2])
+                        total_exported_files += 1
+                        total_exported_rows += count_exported_rows(file_data.get(section, {}))
+
+                    export_file.write("\n}\n")
+                os.replace(temp_filename, filename)
+            except BaseException:
+                if os.path.exists(temp_filename):
+                    os.remove(temp_filename)
+                raise
             
             # Reset status label to normal
             self.status_label.setText(f"Exported {section} data successfully")
@@ -1450,23 +1562,6 @@ class BulkProcessor(QWidget):
             success_box.setWindowTitle("Export Successful")
             success_box.setIcon(QMessageBox.Information)
             
-            # Calculate total rows exported
-            total_exported_rows = 0
-            total_exported_files = len(export_data)
-            
-            for file_data in export_data.values():
-                section_content = file_data.get(section, {})
-                if isinstance(section_content, list):
-                    total_exported_rows += len(section_content)
-                elif isinstance(section_content, dict):
-                    for table_data in section_content.values():
-                        if isinstance(table_data, list):
-                            total_exported_rows += len(table_data)
-                        elif isinstance(table_data, dict):
-                            for page_data in table_data.values():
-                                if isinstance(page_data, list):
-                                    total_exported_rows += len(page_data)
-            
             success_box.setText(f"Data exported successfully to")
             success_box.setInformativeText(
                 f"<b>File:</b> {filename}<br><br>"
@@ -1496,23 +1591,24 @@ class BulkProcessor(QWidget):
                 font-weight: bold;
             """)
             
+            logger.error("Failed to export data: %s", e, exc_info=True)
             QMessageBox.critical(self, "Error", f"Failed to export data: {str(e)}")
-            import traceback
-
-            traceback.print_exc()
     
     def navigate_back(self):
         """Return to the main screen"""
         self.go_back.emit()  # Emit the signal for parent to handle
-        print("Emitted go_back signal")
+        logger.debug("Emitted go_back signal")
     
     def reset_screen(self):
         """Reset the screen to its initial state"""
+        if self.is_processing():
+            QMessageBox.warning(self, "Warning", "Please stop processing first")
+            return
         # Clear all data
         self.pdf_files.clear()
         self.file_list.clear()
         self.results_table.setRowCount(0)
-        self.processed_data.clear()
+        self.close_result_sink()
         
         # Reset progress bar
         self.progress_bar.setValue(0)
@@ -1545,1054 +1641,21 @@ class BulkProcessor(QWidget):
     
     def clean_dataframe(self, df, section, config):
         """Clean DataFrame using regex patterns to identify table boundaries and filter unwanted rows"""
-        if df is None or df.empty:
-            return df
-        
-        # Get regex patterns from config
-        regex_patterns = config.get("regex_patterns", {}).get(section, {})
-        start_pattern = regex_patterns.get("start", None)
-        end_pattern = regex_patterns.get("end", None)
-        skip_pattern = regex_patterns.get("skip", None)
-        
-        print(f"Cleaning {section} DataFrame with patterns:")
-        print(f"  Start pattern: {start_pattern}")
-        print(f"  End pattern: {end_pattern}")
-        print(f"  Skip pattern: {skip_pattern}")
-        
-        # Convert DataFrame to string for easier regex matching
-        str_df = df.astype(str)
-        
-        # Apply boundary detection if patterns are provided
-        if start_pattern or end_pattern:
-            start_idx = None
-            end_idx = None
-            
-            # Find start index based on pattern
-            if start_pattern:
-                for idx, row in str_df.iterrows():
-                    row_text = " ".join(row.values)
-                    if re.search(start_pattern, row_text, re.IGNORECASE):
-                        start_idx = idx
-                        print(
-                            f"  Found start row at index {start_idx}: {row_text[:50]}..."
-                        )
-                        break
-                
-                # If start pattern is specified but not found, return empty DataFrame
-                if start_idx is None:
-                    print(f"  Start pattern '{start_pattern}' not found in the data")
-                    return pd.DataFrame()
-            else:
-                # If no start pattern, start from the beginning
-                start_idx = 0
-            
-            # Find end index based on pattern
-            if end_pattern:
-                for idx, row in str_df.loc[start_idx:].iterrows():
-                    row_text = " ".join(row.values)
-                    if re.search(end_pattern, row_text, re.IGNORECASE):
-                        end_idx = idx
-                        print(f"  Found end row at index {end_idx}: {row_text[:50]}...")
-                        break
-                
-                # If end pattern is specified but not found, use the last row
-                if end_idx is None:
-                    end_idx = df.index[-1]
-                    print(
-                        f"  End pattern '{end_pattern}' not found, using last row at index {end_idx}"
-                    )
-            else:
-                # If no end pattern, end at the last row
-                end_idx = df.index[-1]
-            
-            # Slice DataFrame to keep only rows between boundaries (inclusive)
-            df = df.loc[start_idx:end_idx]
-            print(f"  Applied boundary detection: {len(df)} rows remaining")
-        
-        # Filter out rows matching skip pattern
-        if skip_pattern:
-            before_count = len(df)
-            df = df[
-                ~str_df.apply(
-                    lambda row: bool(
-                        re.search(skip_pattern, " ".join(row.values), re.IGNORECASE)
-                    ),
-                    axis=1,
-                )
-            ]
-            skipped = before_count - len(df)
-            print(f"  Skipped {skipped} rows matching pattern")
-        
-        # Basic cleaning - remove empty rows/columns and whitespace
-        df = df.replace(r"^\s*$", pd.NA, regex=True)
-        df = df.dropna(how="all")
-        df = df.dropna(axis=1, how="all")
-        
-        # Clean string values
-        for col in df.columns:
-            if df[col].dtype == object:  # Only clean string columns
-                df[col] = df[col].apply(
-                    lambda x: x.strip() if isinstance(x, str) else x
-                )
-        
-        print(f"  Final DataFrame size: {len(df)} rows, {len(df.columns)} columns")
-        return df
+        return extraction_engine.clean_dataframe(df, section, config)
 
     def extract_invoice_tables(self, pdf_path, template_id):
-        try:
-            print("\n" + "=" * 80)
-            print(f"STEP 1: DATABASE CONNECTION AND TEMPLATE RETRIEVAL")
-            print("=" * 80)
-
-            # Connect to database
-            print("Connecting to database: 'invoice_templates.db'")
-            conn = sqlite3.connect("invoice_templates.db")
-            cursor = conn.cursor()
-
-            # Fetch template data
-            cursor.execute(
-                """
-                SELECT id, name, description, template_type, regions, column_lines, config, creation_date,
-                       page_count, page_regions, page_column_lines, page_configs
-                FROM templates WHERE id = ?
-            """,
-                (template_id,),
-            )
-            template = cursor.fetchone()
-
-            if not template:
-                raise Exception(f"Template with ID {template_id} not found")
-
-            # Extract template data
-            template_data = {
-                "id": template[0],
-                "name": template[1],
-                "description": template[2],
-                "template_type": template[3],
-                "regions": json.loads(template[4]),
-                "column_lines": json.loads(template[5]),
-                "config": json.loads(template[6]),
-                "creation_date": template[7],
-                "page_count": template[8] if template[8] else 1,
-            }
-
-            # Load multi-page data if available
-            if template[9]:  # page_regions
-                template_data["page_regions"] = json.loads(template[9])
-
-            if template[10]:  # page_column_lines
-                template_data["page_column_lines"] = json.loads(template[10])
-
-            if template[11]:  # page_configs
-                template_data["page_configs"] = json.loads(template[11])
-
-            # Close database connection
-            conn.close()
-
-            print("\n" + "=" * 80)
-            print(f"STEP 2: PDF DOCUMENT LOADING")
-            print("=" * 80)
-
-            # Load the PDF document
-            print(f"Loading PDF document: {pdf_path}")
-            pdf_document = fitz.open(pdf_path)
-            pdf_page_count = len(pdf_document)
-            print(f"✓ PDF document loaded successfully with {pdf_page_count} pages")
-
-            print("\n" + "=" * 80)
-            print(f"STEP 3: TABLE EXTRACTION")
-            print("=" * 80)
-
-            # Initialize results dictionary with extraction statuses
-            results = {
-                "header_tables": [],
-                "items_tables": [],
-                "summary_tables": [],
-                "extraction_status": {
-                    "header": "not_processed",
-                    "items": "not_processed",
-                    "summary": "not_processed",
-                    "overall": "not_processed"
-                }
-            }
-
-            # Get config parameters
-            config = template_data.get("config", {})
-
-            # Get middle page settings for multi-page templates
-            use_middle_page = False
-            fixed_page_count = False
-
-            if template_data["template_type"] == "multi":
-                # For multi-page templates, check if it uses middle page pattern or fixed pages
-                if "use_middle_page" in config:
-                    use_middle_page = config.get("use_middle_page", False)
-
-                if "fixed_page_count" in config:
-                    fixed_page_count = config.get("fixed_page_count", False)
-
-                print(f"Multi-page template settings:")
-                print(f"  Use middle page: {use_middle_page}")
-                print(f"  Fixed page count: {fixed_page_count}")
-
-            # Determine which pages to process
-            pages_to_process = []
-
-            if template_data["template_type"] == "single":
-                # For single-page templates, only process the first page
-                pages_to_process = [0]  # First page
-            else:
-                # For multi-page templates
-                if fixed_page_count:
-                    # Use all pages defined in the template
-                    template_page_count = template_data.get("page_count", 1)
-                    pages_to_process = list(
-                        range(min(template_page_count, pdf_page_count))
-                    )
-                elif use_middle_page:
-                    # Special handling for middle page templates
-                    if pdf_page_count == 1:
-                        # If only one page, apply both first and last page regions
-                        pages_to_process = [
-                            0
-                        ]  # Process the single page as both first and last
-                    else:
-                        # Process first, middle (if exists), and last pages
-                        pages_to_process = [0]  # First page
-
-                        if pdf_page_count > 2:
-                            # Add middle page(s) if more than 2 pages
-                            middle_pages = list(range(1, pdf_page_count - 1))
-                            pages_to_process.extend(middle_pages)
-
-                        pages_to_process.append(pdf_page_count - 1)  # Last page
-                else:
-                    # Standard multi-page: process all pages up to template defined count
-                    template_page_count = template_data.get("page_count", 1)
-                    pages_to_process = list(
-                        range(min(template_page_count, pdf_page_count))
-                    )
-
-            print(f"Pages to process: {[p+1 for p in pages_to_process]}")
-
-            # Process each selected page
-            for page_index in pages_to_process:
-                print(f"\nProcessing page {page_index + 1}/{pdf_page_count}")
-
-                try:
-                    # Get the current page
-                    page = pdf_document[page_index]
-
-                    # Get regions and column lines for current page
-                    current_regions = {}
-                    current_column_lines = {}
-
-                    if template_data["template_type"] == "multi":
-                        # Handle multi-page templates
-                        page_regions = template_data.get("page_regions", [])
-                        page_column_lines = template_data.get("page_column_lines", [])
-
-                        if fixed_page_count:
-                            # For fixed page templates, use the exact page index
-                            if page_index < len(page_regions):
-                                current_regions = page_regions[page_index]
-                                if page_index < len(page_column_lines):
-                                    current_column_lines = page_column_lines[page_index]
-                            else:
-                                print(
-                                    f"Warning: No template data for page {page_index + 1}"
-                                )
-                                continue
-
-                        elif use_middle_page:
-                            # For middle page templates, select regions based on position
-                            if pdf_page_count == 1:
-                                # For single page PDFs with middle page template,
-                                # combine first and last page regions
-                                if len(page_regions) >= 1:
-                                    # Add all regions from first page
-                                    first_page_regions = page_regions[0]
-                                    for section in ["header", "items", "summary"]:
-                                        if section in first_page_regions:
-                                            current_regions[section] = (
-                                                first_page_regions.get(section, [])
-                                            )
-
-                                if len(page_regions) >= 3:
-                                    # Add any additional regions from last page
-                                    last_page_regions = page_regions[2]
-                                    for section in ["header", "items", "summary"]:
-                                        if section in last_page_regions:
-                                            if section not in current_regions:
-                                                current_regions[section] = []
-                                            current_regions[section].extend(
-                                                last_page_regions.get(section, [])
-                                            )
-
-                                # Combine column lines similarly
-                                if len(page_column_lines) >= 1:
-                                    first_page_cols = page_column_lines[0]
-                                    for section in ["header", "items", "summary"]:
-                                        if section in first_page_cols:
-                                            current_column_lines[section] = (
-                                                first_page_cols.get(section, [])
-                                            )
-
-                                if len(page_column_lines) >= 3:
-                                    last_page_cols = page_column_lines[2]
-                                    for section in ["header", "items", "summary"]:
-                                        if section in last_page_cols:
-                                            if section not in current_column_lines:
-                                                current_column_lines[section] = []
-                                            current_column_lines[section].extend(
-                                                last_page_cols.get(section, [])
-                                            )
-                            else:
-                                # Multi-page PDF with middle page template
-                                if page_index == 0 and len(page_regions) >= 1:
-                                    # First page
-                                    current_regions = page_regions[0]
-                                    if len(page_column_lines) >= 1:
-                                        current_column_lines = page_column_lines[0]
-                                elif page_index == pdf_page_count - 1 and len(page_regions) >= 3:
-                                    # Last page
-                                    current_regions = page_regions[2]
-                                    if len(page_column_lines) >= 3:
-                                        current_column_lines = page_column_lines[2]
-                                elif len(page_regions) >= 2:
-                                    # Middle page(s)
-                                    current_regions = page_regions[1]
-                                    if len(page_column_lines) >= 2:
-                                        current_column_lines = page_column_lines[1]
-
-                        else:
-                            # Standard multi-page template
-                            if page_index < len(page_regions):
-                                current_regions = page_regions[page_index]
-                                if page_index < len(page_column_lines):
-                                    current_column_lines = page_column_lines[page_index]
-                            else:
-                                print(
-                                    f"Warning: No template data for page {page_index + 1}"
-                                )
-                                continue
-
-                    else:
-                        # For single page templates
-                        current_regions = template_data.get("regions", {})
-                        current_column_lines = template_data.get("column_lines", {})
-                        
-                        # Debug column lines for single page templates
-                        print(f"\nSingle-page template column lines:")
-                        for section, lines in current_column_lines.items():
-                            print(f"  {section}: {len(lines)} column lines")
-                            if lines and len(lines) > 0:
-                                print(f"    First column line format: {type(lines[0])}")
-                                print(f"    Sample: {lines[0]}")
-                        
-                        # Verify column_lines structure - it should be a dict with sections as keys
-                        if not isinstance(current_column_lines, dict):
-                            print(f"  WARNING: column_lines is not a dict: {type(current_column_lines)}")
-                            # Try to fix it - common issue is an array with a single entry
-                            if isinstance(current_column_lines, list) and len(current_column_lines) > 0:
-                                print(f"  Attempting to fix column_lines format (found list with {len(current_column_lines)} entries)")
-                                # Use the first item if it's a dict
-                                if isinstance(current_column_lines[0], dict):
-                                    current_column_lines = current_column_lines[0]
-                                    print(f"  Fixed column_lines to use first entry: {type(current_column_lines)}")
-
-                    # Debug the regions we're using
-                    print(f"Using regions format: {type(current_regions)}")
-                    if current_regions:
-                        for section, regions in current_regions.items():
-                            print(f"  {section}: {len(regions)} region(s)")
-                            if regions:
-                                print(f"    First region type: {type(regions[0])}")
-
-                    # Process each section (header, items, summary)
-                    for section in ["header", "items", "summary"]:
-                        if section in current_regions and current_regions[section]:
-                            section_regions = current_regions[section]
-                            section_column_lines = current_column_lines.get(section, [])
-                            
-                            print(
-                                f"\nExtracting {section} section from page {page_index + 1}"
-                            )
-                            print(f"  Found {len(section_regions)} region(s)")
-                            print(f"  Found {len(section_column_lines)} column line(s)")
-                            
-                            # Ensure section_column_lines is a list
-                            if not isinstance(section_column_lines, list):
-                                print(f"  WARNING: section_column_lines is not a list: {type(section_column_lines)}")
-                                if isinstance(section_column_lines, dict):
-                                    # Try to convert dict to list
-                                    section_column_lines = [section_column_lines]
-                                    print(f"  Converted dict to list with 1 item")
-                                else:
-                                    # Initialize as empty list as fallback
-                                    section_column_lines = []
-                                    print(f"  Reset to empty list as fallback")
-
-                            # Get table extraction parameters
-                            table_areas = []
-                            columns_list = []
-
-                            for region_idx, region in enumerate(section_regions):
-                                # Handle different region formats
-                                if isinstance(region, dict):
-                                    # Format from single page viewer: {x1, y1, x2, y2}
-                                    x1 = region.get("x1", 0)
-                                    y1 = region.get("y1", 0)
-                                    x2 = region.get("x2", 0)
-                                    y2 = region.get("y2", 0)
-                                elif isinstance(region, list) and len(region) >= 2:
-                                    # Format from multi-page viewer: [{x,y}, {x,y}]
-                                    x1 = region[0].get("x", 0)
-                                    y1 = region[0].get("y", 0)
-                                    x2 = region[1].get("x", 0)
-                                    y2 = region[1].get("y", 0)
-                                else:
-                                    print(f"  Warning: Unrecognized region format: {region}")
-                                    continue
-
-                                # Create table area string
-                                table_area = f"{x1},{y1},{x2},{y2}"
-                                table_areas.append(table_area)
-                                
-                                # Process column lines for this region
-                                region_columns = []
-                                
-                                # Debug all column lines for this section
-                                print(f"  Processing column lines for region {region_idx} in {section} section")
-                                print(f"  Column lines count: {len(section_column_lines)}")
-                                print(f"  Column lines type: {type(section_column_lines)}")
-                                
-                                # Fix for single page templates: check structure of column lines
-                                if len(section_column_lines) == 0 and template_data["template_type"] == "single":
-                                    print(f"  WARNING: No column lines found for {section} section in single page template")
-                                    print(f"  Template data column_lines structure: {type(template_data.get('column_lines', {}))}")
-                                    
-                                    # Try to directly access the column lines from the template data
-                                    all_column_lines = template_data.get("column_lines", {})
-                                    if isinstance(all_column_lines, dict) and section in all_column_lines:
-                                        direct_section_column_lines = all_column_lines.get(section, [])
-                                        if direct_section_column_lines:
-                                            print(f"  Found {len(direct_section_column_lines)} column lines directly in template data")
-                                            section_column_lines = direct_section_column_lines
-                                            print(f"  First entry type: {type(direct_section_column_lines[0])}")
-                                    
-                                    # Also check if column_lines might be an array itself (format inconsistency)
-                                    if isinstance(all_column_lines, list) and len(all_column_lines) > 0:
-                                        print(f"  Column lines is a list with {len(all_column_lines)} entries")
-                                        # Use the first entry for single page templates
-                                        if isinstance(all_column_lines[0], dict) and section in all_column_lines[0]:
-                                            first_page_column_lines = all_column_lines[0].get(section, [])
-                                            if first_page_column_lines:
-                                                print(f"  Found {len(first_page_column_lines)} column lines in first page entry")
-                                                section_column_lines = first_page_column_lines
-                                
-                                for line in section_column_lines:
-                                    # Handle different column line formats
-                                    if isinstance(line, list):
-                                        if len(line) >= 3 and line[2] == region_idx:
-                                            x_val = line[0].get("x", 0)
-                                            region_columns.append(x_val)
-                                            print(f"    Using column at x={x_val} (matched region_idx={region_idx})")
-                                        elif len(line) == 2:
-                                            # Format without region index: [{x,y}, {x,y}]
-                                            x_val = line[0].get("x", 0)
-                                            region_columns.append(x_val)
-                                            print(f"    Using column at x={x_val} (list format)")
-                                    elif isinstance(line, dict):
-                                        # Try different known formats
-                                        if "x" in line:
-                                            # Direct format: {x, y}
-                                            x_val = line.get("x", 0)
-                                            region_columns.append(x_val)
-                                            print(f"    Using column at x={x_val} (dict format with x key)")
-                                        elif "x1" in line:
-                                            # Rectangle format: {x1, y1, x2, y2}
-                                            x_val = line.get("x1", 0)
-                                            region_columns.append(x_val)
-                                            print(f"    Using column at x={x_val} (dict format with x1 key)")
-                                        elif "value" in line and isinstance(line["value"], (int, float)):
-                                            # Value format: {value: 123}
-                                            x_val = line["value"]
-                                            region_columns.append(x_val)
-                                            print(f"    Using column at x={x_val} (dict format with value key)")
-                                        elif "position" in line:
-                                            # Position format: {position: 123}
-                                            x_val = line["position"]
-                                            region_columns.append(x_val)
-                                            print(f"    Using column at x={x_val} (dict format with position key)")
-                                        else:
-                                            # Unknown dict format, try to extract any numeric value
-                                            print(f"    Unknown dict format: {line}")
-                                            for key, val in line.items():
-                                                if isinstance(val, (int, float)):
-                                                    print(f"    Using numeric value {val} from key '{key}'")
-                                                    region_columns.append(val)
-                                                    break
-                                    elif isinstance(line, (int, float)):
-                                        # Direct numeric value
-                                        region_columns.append(line)
-                                        print(f"    Using direct numeric value: x={line}")
-                                    else:
-                                        print(f"    Unsupported column line format: {type(line)}, value: {line}")
-                                        # Try to extract a numeric value if it's a string
-                                        if isinstance(line, str):
-                                            try:
-                                                numeric_val = float(line)
-                                                region_columns.append(numeric_val)
-                                                print(f"    Converted string to numeric value: x={numeric_val}")
-                                            except ValueError:
-                                                print(f"    Could not convert string to numeric value")
-
-                                # Format column lines
-                                col_str = (
-                                    ",".join([str(x) for x in sorted(region_columns)])
-                                    if region_columns
-                                    else ""
-                                )
-                                columns_list.append(col_str)
-
-                            # Handle special case for items section with multiple regions
-                            if section == "items" and len(table_areas) > 1:
-                                print(f"  Combining multiple item regions into one ({len(table_areas)} regions)")
-
-                                # Parse all coordinates
-                                area_coords = []
-                                for area in table_areas:
-                                    coords = [float(c) for c in area.split(",")]
-                                    area_coords.append(coords)
-
-                                # Find bounding box
-                                x_coords = [c[0] for c in area_coords] + [
-                                    c[2] for c in area_coords
-                                ]
-                                y_coords = [c[1] for c in area_coords] + [
-                                    c[3] for c in area_coords
-                                ]
-
-                                x1 = min(x_coords)
-                                y1 = min(y_coords)
-                                x2 = max(x_coords)
-                                y2 = max(y_coords)
-
-                                # Replace with combined area
-                                combined_area = f"{x1},{y1},{x2},{y2}"
-                                table_areas = [combined_area]
-                                print(f"  Combined area: {combined_area}")
-
-                                # Combine column lines with deduplication
-                                all_columns = set()  # Use set for deduplication
-                                for col_str in columns_list:
-                                    if col_str:
-                                        for col in col_str.split(","):
-                                            all_columns.add(float(col))
-                                
-                                # Convert back to list and sort
-                                all_columns_list = sorted(list(all_columns))
-                                
-                                # Remove columns that are too close to each other (within 5 pixels)
-                                if len(all_columns_list) > 1:
-                                    deduplicated_columns = [all_columns_list[0]]
-                                    for i in range(1, len(all_columns_list)):
-                                        if all_columns_list[i] - deduplicated_columns[-1] >= 5:  # 5 pixel threshold
-                                            deduplicated_columns.append(all_columns_list[i])
-                                    all_columns_list = deduplicated_columns
-                                
-                                # Format as string
-                                col_str = ",".join([str(x) for x in all_columns_list]) if all_columns_list else ""
-                                columns_list = [col_str]
-                                print(f"  Combined columns: {col_str}")
-
-                            # Set extraction parameters from config
-                            extraction_params = {}
-                            # Check if we have extraction_params in the config
-                            if "extraction_params" in config:
-                                extraction_params = config["extraction_params"]
-                                print(f"  Found extraction_params in config")
-                            else:
-                                print(
-                                    f"  WARNING: No extraction_params found in config, using direct config values"
-                                )
-
-                            # Get section-specific parameters
-                            section_params = {}
-                            if section in extraction_params:
-                                section_params = extraction_params.get(section, {})
-                                print(
-                                    f"  Found section-specific parameters for {section}"
-                                )
-
-                            # Extract row_tol with proper fallbacks
-                            row_tol = section_params.get("row_tol", None)
-                            if row_tol is not None:
-                                print(
-                                    f"  Using row_tol={row_tol} from extraction_params.{section}"
-                                )
-                            else:
-                                # If not in section_params, check direct section config
-                                section_config = config.get(section, {})
-                                row_tol = section_config.get("row_tol", None)
-                                if row_tol is not None:
-                                    print(
-                                        f"  Using row_tol={row_tol} from config.{section}"
-                                    )
-                                else:
-                                    # If not in direct section config, check global config
-                                    row_tol = config.get("row_tol", None)
-                                if row_tol is not None:
-                                    print(f"  Using global row_tol={row_tol}")
-                                else:
-                                    # STRICT MODE: Raise error instead of using default
-                                    error_msg = f"ERROR: No row_tol defined for {section} in database config"
-                                    print(f"  ❌ {error_msg}")
-                                    raise ValueError(error_msg)
-
-                            # Get other extraction parameters with fallbacks
-                            split_text = extraction_params.get(
-                                "split_text", config.get("split_text", True)
-                            )
-                            strip_text = extraction_params.get(
-                                "strip_text", config.get("strip_text", "\n")
-                            )
-                            flavor = extraction_params.get(
-                                "flavor", config.get("flavor", "stream")
-                            )
-                            print(f"  Extraction parameters for {section}:")
-                            print(f"    Table areas: {table_areas}")
-                            print(f"    Columns: {columns_list}")
-                            print(f"    Row tolerance: {row_tol} (from database)")
-
-                            # Extract tables for this section
-                            for i, (table_area, columns) in enumerate(zip(table_areas, columns_list)):
-                                try:
-                                    params = {
-                                        "pages": str(page_index + 1),
-                                        "table_areas": [table_area],
-                                        "columns": [columns] if columns else None,
-                                        "split_text": split_text,
-                                        "strip_text": strip_text,
-                                        "flavor": flavor,
-                                        "row_tol": row_tol,
-                                        "parallel": True
-                                    }
-
-                                    # Extract table using pypdf_table_extraction
-                                    table_result = pypdf_table_extraction.read_pdf(
-                                        pdf_path, **params
-                                    )
-
-                                    if (table_result and len(table_result) > 0 and hasattr(table_result[0], "df")):
-                                        table_df = table_result[0].df
-
-                                        if table_df is not None and not table_df.empty:
-                                            # Add page number to the dataframe
-                                            table_df["pdf_page"] = page_index + 1
-
-                                            # Basic cleaning
-                                            table_df = table_df.replace(
-                                                r"^\s*$", pd.NA, regex=True
-                                            )
-                                            table_df = table_df.dropna(how="all")
-                                            table_df = table_df.dropna(
-                                                axis=1, how="all"
-                                            )
-
-                                            # Find applicable regex patterns, if any
-                                            regex_patterns = None
-
-                                            # Check for section-specific regex patterns
-                                            if (
-                                                template_data["template_type"]
-                                                == "multi"
-                                                and "page_configs" in template_data
-                                            ):
-                                                # For multi-page templates, check page-specific config first
-                                                if page_index < len(
-                                                    template_data.get(
-                                                        "page_configs", []
-                                                    )
-                                                ):
-                                                    page_config = template_data[
-                                                        "page_configs"
-                                                    ][page_index]
-                                                    if (
-                                                        section in page_config
-                                                        and "regex_patterns"
-                                                        in page_config[section]
-                                                    ):
-                                                        regex_patterns = page_config[
-                                                            section
-                                                        ]["regex_patterns"]
-                                                        print(
-                                                            f"  Found page-specific regex patterns for {section}"
-                                                        )
-
-                                            # If no page-specific patterns, check section config
-                                            if (
-                                                regex_patterns is None
-                                                and section in config
-                                            ):
-                                                section_config = config[section]
-                                                if "regex_patterns" in section_config:
-                                                    regex_patterns = section_config[
-                                                        "regex_patterns"
-                                                    ]
-                                                    print(
-                                                        f"  Found section-specific regex patterns for {section}"
-                                                    )
-
-                                            # As a fallback, check global regex patterns
-                                            if (
-                                                regex_patterns is None
-                                                and "regex_patterns" in config
-                                            ):
-                                                if section in config["regex_patterns"]:
-                                                    regex_patterns = config[
-                                                        "regex_patterns"
-                                                    ][section]
-                                                    print(
-                                                        f"  Found global regex patterns for {section}"
-                                                    )
-
-                                            # Apply regex patterns only if defined and contain at least one valid pattern
-                                            if regex_patterns:
-                                                # Check if there's at least one non-None pattern
-                                                has_valid_pattern = False
-                                                for pattern_type in [
-                                                    "start",
-                                                    "end",
-                                                    "skip",
-                                                ]:
-                                                    if (
-                                                        pattern_type in regex_patterns
-                                                        and regex_patterns[pattern_type]
-                                                    ):
-                                                        has_valid_pattern = True
-                                                        break
-
-                                                if has_valid_pattern:
-                                                    print(
-                                                        f"  Applying regex patterns to {section} table"
-                                                    )
-                                                    
-                                                    # Save original row count for comparison
-                                                    orig_rows = len(table_df)
-                                                    
-                                                    # Apply patterns
-                                                    table_df, regex_status = self.apply_regex_to_dataframe(
-                                                        table_df, regex_patterns
-                                                    )
-                                                    
-                                                    # Report results with more detailed status information
-                                                    if table_df.empty:
-                                                        print(f"  ⚠️ All rows filtered out by regex patterns! Reason: {regex_status['reason']}")
-                                                    elif regex_status['status'] == 'success':
-                                                        filtered_rows = orig_rows - len(table_df)
-                                                        print(f"  ✅ Successfully filtered {filtered_rows} rows, kept {len(table_df)} rows")
-                                                    elif regex_status['status'] == 'partial':
-                                                        filtered_rows = orig_rows - len(table_df)
-                                                        print(f"  ⚠️ Partially successful: {regex_status['reason']}, kept {len(table_df)} rows")
-                                                    else:
-                                                        print(f"  ❌ Regex application issues: {regex_status['reason']}")
-
-                                                    # Store the regex status in the results for later use
-                                                    if not hasattr(table_df, 'regex_status'):
-                                                        table_df.regex_status = regex_status['status']
-
-                                            else:
-                                                print(f"  No regex patterns defined for {section}, using raw extraction")
-
-                                            # Store the table
-                                        if not table_df.empty:
-                                            if section == "header":
-                                                results["header_tables"].append(
-                                                    table_df
-                                                )
-                                                print(
-                                                    f"  ✓ Extracted header table with {len(table_df)} rows"
-                                                )
-                                                # Track extraction status
-                                                if hasattr(table_df, 'regex_status'):
-                                                    results["extraction_status"]["header"] = table_df.regex_status
-                                                elif not table_df.empty:
-                                                    results["extraction_status"]["header"] = "success" 
-                                                else:
-                                                    results["extraction_status"]["header"] = "failed"
-                                            elif section == "items":
-                                                results["items_tables"].append(
-                                                    table_df
-                                                )
-                                                print(
-                                                    f"  ✓ Extracted items table with {len(table_df)} rows"
-                                                )
-                                                # Track extraction status
-                                                if hasattr(table_df, 'regex_status'):
-                                                    results["extraction_status"]["items"] = table_df.regex_status
-                                                elif not table_df.empty:
-                                                    results["extraction_status"]["items"] = "success"
-                                                else:
-                                                    results["extraction_status"]["items"] = "failed"
-                                            else:  # summary
-                                                results["summary_tables"].append(
-                                                    table_df
-                                                )
-                                                print(
-                                                    f"  ✓ Extracted summary table with {len(table_df)} rows"
-                                                )
-                                            # Track extraction status
-                                            if hasattr(table_df, 'regex_status'):
-                                                results["extraction_status"]["summary"] = table_df.regex_status
-                                            elif not table_df.empty:
-                                                results["extraction_status"]["summary"] = "success"
-                                            else:
-                                                results["extraction_status"]["summary"] = "failed"
-                                        else:
-                                            print(f"  ℹ Table is empty after processing")
-                                except Exception as e:
-                                    print(f"  ✗ Error extracting table: {str(e)}")
-                                    import traceback
-
-                                    traceback.print_exc()
-
-                                else:
-                                    print(f"No {section} regions defined for page {page_index + 1}")
-
-                except Exception as e:
-                    print(f"Error processing page {page_index + 1}: {str(e)}")
-                    import traceback
-                    traceback.print_exc()
-
-            # Close the PDF document
-            pdf_document.close()
-
-            # At the end of processing all pages, update the overall extraction status
-            # Update the overall extraction status before returning results
-            if results["extraction_status"]["items"] == "success":
-                # If items were successfully extracted, that's most important
-                results["extraction_status"]["overall"] = "success"
-            elif results["extraction_status"]["items"] == "partial" or results["extraction_status"]["header"] == "success" or results["extraction_status"]["summary"] == "success":
-                # Partial success if we at least got some data
-                results["extraction_status"]["overall"] = "partial"
-            else:
-                # Failed if nothing was successfully extracted
-                results["extraction_status"]["overall"] = "failed"
-
-            print(f"\nExtraction summary:")
-            print(f"  Header: {results['extraction_status']['header']}")
-            print(f"  Items: {results['extraction_status']['items']}")
-            print(f"  Summary: {results['extraction_status']['summary']}")
-            print(f"  Overall: {results['extraction_status']['overall']}")
-
-            # Return the results
-            return results
-
-        except Exception as e:
-            print(f"Error in extract_invoice_tables: {str(e)}")
-            import traceback
-
-            traceback.print_exc()
-            if "pdf_document" in locals():
-                pdf_document.close()
-            return None
+        """Extract tables from a PDF with the given template using the extraction engine"""
+        return extraction_engine.extract_invoice_tables(pdf_path, template_id)
 
     def apply_regex_to_dataframe(self, df, regex_patterns):
         """Apply regex patterns to filter and extract relevant rows from DataFrame"""
-        if df is None or df.empty:
-            print("    ⚠️ DataFrame is None or empty, skipping regex processing")
-            return df, {"status": "failed", "reason": "Empty input data"}
-        
-        if not regex_patterns:
-            print("    ⚠️ No regex patterns provided, skipping regex processing")
-            return df, {"status": "partial", "reason": "No regex patterns"}
-
-        # Get patterns, checking if each one is defined
-        start_pattern = regex_patterns.get("start", None)
-        end_pattern = regex_patterns.get("end", None)
-        skip_pattern = regex_patterns.get("skip", None)
-
-        # Print original row count
-        orig_row_count = len(df)
-        print(f"    Starting with {orig_row_count} rows")
-        
-        # Check for empty strings and set them to None
-        if start_pattern == "":
-            print("    Start pattern is empty string, treating as None")
-            start_pattern = None
-        if end_pattern == "":
-            print("    End pattern is empty string, treating as None")
-            end_pattern = None
-        if skip_pattern == "":
-            print("    Skip pattern is empty string, treating as None")
-            skip_pattern = None
-
-        # Only proceed if at least one pattern is defined and not None
-        if not (start_pattern or end_pattern or skip_pattern):
-            print("    No valid regex patterns found, returning original DataFrame")
-            return df, {"status": "partial", "reason": "No valid regex patterns"}
-
-        print(f"    Applying regex patterns:")
-        if start_pattern:
-            print(f"    • Start pattern: '{start_pattern}'")
-        if end_pattern:
-            print(f"    • End pattern: '{end_pattern}'")
-        if skip_pattern:
-            print(f"    • Skip pattern: '{skip_pattern}'")
-        
-        # Sample the data to show what we're matching against
-        if not df.empty:
-            sample_rows = min(3, len(df))
-            print(f"    Sample data (first {sample_rows} rows):")
-            for i in range(sample_rows):
-                row_values = " ".join([str(val) for val in df.iloc[i].values])
-                print(f"      Row {i}: {row_values[:100]}...")
-
-        # Convert DataFrame to string for easier regex matching
-        try:
-            str_df = df.astype(str)
-            print("    Converted DataFrame to string for regex matching")
-        except Exception as e:
-            print(f"    ⚠️ Error converting DataFrame to string: {str(e)}")
-            return df, {"status": "partial", "reason": f"Error in conversion: {str(e)}"}
-
-        # Apply boundary detection if patterns are provided
-        if start_pattern or end_pattern:
-            start_idx = None
-            end_idx = None
-
-            # Find start index based on pattern - only if start_pattern is explicitly defined
-            if start_pattern:
-                try:
-                    print(f"    Searching for start pattern '{start_pattern}'...")
-                    for idx, row in str_df.iterrows():
-                        row_text = " ".join(row.values)
-                        if re.search(start_pattern, row_text, re.IGNORECASE):
-                            start_idx = idx
-                            print(f"    ✓ Found start pattern match at row {start_idx}")
-                            print(f"      Matched text: {row_text[:100]}...")
-                            break
-
-                    # If start pattern is specified but not found, return empty DataFrame
-                    if start_idx is None:
-                        print(f"    ⚠️ Start pattern '{start_pattern}' not found in any row")
-                        print(f"    Returning empty DataFrame as no start pattern match was found")
-                        return pd.DataFrame(), {"status": "failed", "reason": f"Start pattern '{start_pattern}' not found"}
-                except re.error as e:
-                    print(f"    ❌ Invalid start pattern '{start_pattern}': {str(e)}")
-                    # Skip this pattern but continue with the others
-                    start_pattern = None
-
-            # If start_pattern had an error or was None, start from the beginning
-            if start_pattern is None:
-                start_idx = 0
-                print(f"    No valid start pattern, starting from first row (index {start_idx})")
-
-            # Find end index based on pattern - only if end_pattern is explicitly defined
-            if end_pattern:
-                try:
-                    print(f"    Searching for end pattern '{end_pattern}' starting from row {start_idx}...")
-                    for idx, row in str_df.loc[start_idx:].iterrows():
-                        row_text = " ".join(row.values)
-                        if re.search(end_pattern, row_text, re.IGNORECASE):
-                            end_idx = idx
-                            print(f"    ✓ Found end pattern match at row {end_idx}")
-                            print(f"      Matched text: {row_text[:100]}...")
-                            break
-
-                    # If end pattern is specified but not found, use the last row
-                    if end_idx is None:
-                        end_idx = df.index[-1]
-                        print(f"    ⚠️ End pattern '{end_pattern}' not found, using last row at index {end_idx}")
-                except re.error as e:
-                    print(f"    ❌ Invalid end pattern '{end_pattern}': {str(e)}")
-                    # Skip this pattern but continue with the others
-                    end_pattern = None
-
-            # If end_pattern had an error or was None, use the last row
-            if end_pattern is None:
-                end_idx = df.index[-1]
-                print(f"    No valid end pattern, using last row (index {end_idx})")
-
-            try:
-                # Slice DataFrame to keep only rows between boundaries (inclusive)
-                before_slice = len(df)
-                df = df.loc[start_idx:end_idx]
-                after_slice = len(df)
-                rows_removed = before_slice - after_slice
-                
-                if rows_removed > 0:
-                    print(f"    ✓ Applied boundary slicing: removed {rows_removed} rows, kept {after_slice} rows")
-                else:
-                    print(f"    ℹ Boundary slicing had no effect: kept all {after_slice} rows")
-            except Exception as e:
-                print(f"    ❌ Error during boundary slicing: {str(e)}")
-                # If there's an error in slicing, return the original DataFrame
-                return df, {"status": "partial", "reason": f"Error in boundary slicing: {str(e)}"}
-
-        # Filter out rows matching skip pattern - only if skip_pattern is explicitly defined
-        if skip_pattern and not df.empty:
-            try:
-                print(f"    Applying skip pattern '{skip_pattern}'...")
-                before_count = len(df)
-                
-                # Create a string version of the current DataFrame
-                str_df = df.astype(str)
-                
-                # Apply the filter
-                df = df[~str_df.apply(lambda row: any(re.search(skip_pattern, str(val), re.IGNORECASE) for val in row), axis=1)]
-                
-                # Report results
-                after_count = len(df)
-                skipped_rows = before_count - after_count
-                
-                if skipped_rows > 0:
-                    print(f"    ✓ Skipped {skipped_rows} rows based on pattern")
-                    print(f"    Final DataFrame size: {after_count} rows")
-                else:
-                    print(f"    ℹ Skip pattern did not match any rows")
-                
-                # Check if we have any rows left
-                if df.empty:
-                    print(f"    ⚠️ All rows were filtered out by skip pattern!")
-                    return df, {"status": "failed", "reason": "All rows filtered out by skip pattern"}
-                    
-            except re.error as e:
-                print(f"    ❌ Invalid skip pattern '{skip_pattern}': {str(e)}")
-                # If there's an error with the skip pattern, continue with what we have
-                pass
-            except Exception as e:
-                print(f"    ❌ Error applying skip pattern: {str(e)}")
-                # Continue with what we have
-                pass
-        
-        # Check final state
-        final_status = "success"
-        reason = "Regex patterns applied successfully"
-        
-        # Empty result is a failure
-        if  df.empty:
-            final_status = "failed"
-            reason = "No data remained after applying patterns"
-        # If we have significantly fewer rows than we started with, consider it partial
-        elif len(df) < orig_row_count * 0.5 and orig_row_count > 10:
-            final_status = "partial"
-            reason = f"Only {len(df)} of {orig_row_count} rows remained after filtering"
-        # For very small datasets, just having data is good
-        elif len(df) < 5 and orig_row_count > 10:
-            final_status = "partial"
-            reason = f"Only {len(df)} rows extracted from {orig_row_count}"
-            
-        print(f"    ✓ Regex processing complete: {final_status} - {reason}")
-        print(f"    Final row count: {len(df)}")
-        
-        return df, {"status": final_status, "reason": reason}
+        return extraction_engine.apply_regex_to_dataframe(df, regex_patterns)
 
     def stop_processing(self):
-        """Stop the processing of files"""
+        """Stop the processing of files, including the files currently being extracted"""
         self.should_stop = True
+        if self.is_processing():
+            self.worker.stop()
         self.status_label.setText("Stopping processing...")
         
     def update_processing_time(self, is_final=False):
@@ -2622,7 +1685,7 @@ class BulkProcessor(QWidget):
     
     def open_validation_screen(self):
         """Open the validation screen with the processed data"""
-        if not self.processed_data:
+        if not self.has_results():
             QMessageBox.warning(self, "Warning", "No data to validate. Please process files first.")
             return
             
@@ -2632,7 +1695,7 @@ class BulkProcessor(QWidget):
         
         # Convert processed data to DataFrame
         data_frames = []
-        for pdf_path, data in self.processed_data.items():
+        for pdf_path, data in self.result_sink.iter_records():
             # Combine header, items, and summary data
             combined_data = {}
             
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Check that per-page and per-region extraction agree
+
+Per-page mode (the default) parses each page once for all of its regions,
+while per-region mode reads every region with its own read_pdf call. Both
+must return the same tables. This extracts every given PDF with every given
+template in both modes and exits with status 1 when any section differs, so
+a change to read_page_tables can be checked on the sample PDFs before it
+ships.
+
+Usage:
+    python check_extraction_modes.py [<pdf> ...] [--templates 9,10,11] [--db invoice_templates.db] [--log-level WARNING]
+"""
+
+import os
+import sys
+import logging
+import argparse
+
+from db_connections import get_connection
+from extraction_engine import (
+    DEFAULT_DB_PATH, SECTIONS, compile_template, extract_invoice_tables, load_template_from_database,
+)
+from logging_setup import LOG_LEVELS, configure_logging
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_PDFS = ("smiles.pdf",)
+
+
+def _same_tables(first, second):
+    return len(first) == len(second) and all(a.equals(b) for a, b in zip(first, second))
+
+
+def compare_modes(pdf_path, template):
+    """Extract a PDF in per-page and per-region mode
+
+    Returns:
+        list: Sections whose status or tables differ between the modes (empty when they agree)
+    """
+    per_page = extract_invoice_tables(pdf_path, template_data=template, per_page=True)
+    per_region = extract_invoice_tables(pdf_path, template_data=template, per_page=False)
+    return [
+        section for section in SECTIONS
+        if per_page["extraction_status"][section] != per_region["extraction_status"][section]
+        or not _same_tables(per_page[f"{section}_tables"], per_region[f"{section}_tables"])
+    ]
+
+
+def main():
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description='Check that per-page and per-region extraction give the same tables')
+    parser.add_argument('pdfs', nargs='*', default=[os.path.join(here, name) for name in SAMPLE_PDFS],
+                        help=f'PDFs to extract (default: {", ".join(SAMPLE_PDFS)})')
+    parser.add_argument('--templates', type=lambda v: [int(item) for item in v.split(",") if item.strip()],
+                        help='Comma-separated template IDs (default: every template in the database)')
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help=f'Templates database (default: {DEFAULT_DB_PATH})')
+    parser.add_argument('--log-level', type=str.upper, choices=LOG_LEVELS, default='WARNING',
+                        help='Level of the pipeline logs; the report is always shown (default: WARNING)')
+    args = parser.parse_args()
+
+    configure_logging(args.log_level)
+    logger.setLevel(logging.INFO)
+
+    template_ids = args.templates or [
+        row[0] for row in get_connection(args.db).execute("SELECT id FROM templates ORDER BY id").fetchall()
+    ]
+    differences = 0
+    for template_id in template_ids:
+        template_data = load_template_from_database(template_id, args.db)
+        if not template_data:
+            logger.error("Template not found: %s", template_id)
+            differences += 1
+            continue
+        template = compile_template(template_data)
+        for pdf_path in args.pdfs:
+            sections = compare_modes(pdf_path, template)
+            if sections:
+                differences += 1
+                logger.error(
+                    "%s with template %s: per-page and per-region %s tables differ",
+                    os.path.basename(pdf_path), template_id, ", ".join(sections),
+                )
+            else:
+                logger.info("%s with template %s: modes agree", os.path.basename(pdf_path), template_id)
+
+    if differences:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
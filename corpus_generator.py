@@ -0,0 +1,489 @@
+#!/usr/bin/env python3
+"""
+Synthetic invoice corpus generator
+
+Writes parameterized invoice PDFs with PyMuPDF together with everything
+needed to extract and check them offline:
+
+    - <name>.pdf: header block, an item table of N rows spread over M pages
+      (column titles repeated on every page), a summary block on the last
+      page and noise text outside the table regions
+    - <name>_expected.json: the tables the template should extract, in the
+      same layout as smiles_extracted.json (tables per section in page order,
+      rows as {"0": ..., "1": ...}; the engine's pdf_page column is not
+      included)
+    - template.json: the matching template in invoice_templates.db format,
+      also saved to a templates database (--db)
+    - manifest.json: the generation parameters and one entry per invoice
+
+All content comes from random.Random(seed), so the same arguments always
+produce the same corpus. Every invoice of a corpus shares one layout, so a
+single template (single-page, or first/middle/last pages for multi-page
+corpora) extracts all of them.
+
+Usage:
+    python corpus_generator.py --output <dir> [--count 100] [--seed 42] [--pages 1-5] [--rows 10-120] [--layout standard|compact|wide] [--header-fields 4] [--noise 6] [--db <dir>/invoice_templates.db] [--template-name <name>]
+"""
+
+import os
+import sys
+import json
+import random
+import hashlib
+import logging
+import argparse
+from datetime import date, timedelta
+
+import fitz  # PyMuPDF
+
+from logging_setup import configure_logging
+
+logger = logging.getLogger(__name__)
+
+# A4 portrait in points; PyMuPDF draws from the top-left, templates store PDF points from the bottom-left
+PAGE_WIDTH = 595
+PAGE_HEIGHT = 842
+MARGIN = 40
+FONT = "helv"
+FONT_SIZE = 8
+ROW_HEIGHT = 14
+CELL_PADDING = 3
+
+# Template extraction parameters; rows are ROW_HEIGHT apart, so a small tolerance keeps them separate
+ROW_TOL = 3
+
+HEADER_TOP = 90
+HEADER_LABEL_WIDTH = 110
+HEADER_WIDTH = 280
+ITEMS_GAP = 30  # between the header region and the first page's item region
+FOOTER_HEIGHT = 60
+SUMMARY_LEFT = 330
+SUMMARY_LABEL_WIDTH = 110
+SUMMARY_ROWS = ("Subtotal", "Tax", "Total")
+
+# Item table layouts: (column title, width in points, value kind); widths fill the page between the margins
+LAYOUTS = {
+    "standard": [
+        ("Code", 80, "code"), ("Description", 175, "text"), ("Qty", 45, "qty"),
+        ("Unit Price", 70, "price"), ("Tax %", 50, "tax"), ("Amount", 95, "amount"),
+    ],
+    "compact": [
+        ("Item", 255, "text"), ("Qty", 60, "qty"), ("Price", 90, "price"), ("Amount", 110, "amount"),
+    ],
+    "wide": [
+        ("Code", 65, "code"), ("Description", 140, "text"), ("HSN", 55, "hsn"), ("Qty", 40, "qty"),
+        ("Rate", 60, "price"), ("Disc %", 45, "discount"), ("Tax %", 45, "tax"), ("Amount", 65, "amount"),
+    ],
+}
+
+HEADER_LABELS = ("Invoice No.", "Invoice Date", "Customer", "Order Ref", "Due Date", "Customer ID", "Payment Terms")
+
+WORDS = (
+    "FILTER", "OIL", "GASKET", "BRAKE", "PAD", "WIPER", "BLADE", "FLUID", "COOLANT", "BELT", "SPARK", "PLUG",
+    "BEARING", "SEAL", "VALVE", "PUMP", "HOSE", "CLAMP", "BOLT", "NUT", "WASHER", "SENSOR", "RELAY", "FUSE",
+    "LAMP", "MIRROR", "HANDLE", "BRACKET", "SPRING", "CABLE", "SERVICE", "LABOUR", "INSPECTION", "ALIGNMENT",
+)
+
+CUSTOMERS = ("ACME TRADING", "NORTHWIND LTD", "BLUE RIVER MOTORS", "SUNRISE DISTRIBUTORS", "KESTREL AUTO")
+
+NOISE_LINES = (
+    "Thank you for your business", "Goods once sold will not be taken back", "Subject to local jurisdiction",
+    "E. & O.E.", "This is a computer generated invoice", "Please quote the invoice number with payment",
+    "Registered office: 12 Industrial Estate", "Customer care: 1800 000 000",
+)
+
+
+def _items_left():
+    return MARGIN
+
+
+def _items_right(layout):
+    return MARGIN + sum(width for __, width, __ in LAYOUTS[layout])
+
+
+def _column_starts(layout):
+    starts = []
+    x = _items_left()
+    for __, width, __ in LAYOUTS[layout]:
+        starts.append(x)
+        x += width
+    return starts
+
+
+def _summary_top():
+    return PAGE_HEIGHT - FOOTER_HEIGHT - len(SUMMARY_ROWS) * ROW_HEIGHT - 4
+
+
+def _header_bottom(header_fields):
+    return HEADER_TOP + header_fields * ROW_HEIGHT + 4
+
+
+def items_band(role, header_fields):
+    """Top and bottom (top-left origin) of the item region for a page role: first, middle, last or only
+
+    The first and last page bands match the single-page band: the engine extracts
+    a one-page PDF with the bounding box of both, which must not reach into the
+    header or summary.
+    """
+    if role == "middle":
+        return MARGIN + 20, PAGE_HEIGHT - FOOTER_HEIGHT
+    return _header_bottom(header_fields) + ITEMS_GAP, _summary_top() - 20
+
+
+def row_capacity(role, header_fields):
+    """Item rows that fit below the column titles of a page role"""
+    top, bottom = items_band(role, header_fields)
+    return int((bottom - top - 4) // ROW_HEIGHT) - 1
+
+
+def page_roles(page_count):
+    if page_count == 1:
+        return ["only"]
+    return ["first"] + ["middle"] * (page_count - 2) + ["last"]
+
+
+def max_rows(page_count, header_fields):
+    return sum(row_capacity(role, header_fields) for role in page_roles(page_count))
+
+
+def distribute_rows(row_count, page_count, header_fields):
+    """Spread rows over the pages as evenly as their capacity allows, at least one per page"""
+    capacities = [row_capacity(role, header_fields) for role in page_roles(page_count)]
+    counts = [1] * page_count
+    remaining = row_count - page_count
+    while remaining > 0:
+        open_pages = [i for i in range(page_count) if counts[i] < capacities[i]]
+        if not open_pages:
+            raise ValueError(f"{row_count} rows do not fit on {page_count} pages")
+        share = max(1, remaining // len(open_pages))
+        for i in open_pages:
+            add = min(share, capacities[i] - counts[i], remaining)
+            counts[i] += add
+            remaining -= add
+            if not remaining:
+                break
+    return counts
+
+
+# --- Content -----------------------------------------------------------------
+
+def _money(value):
+    return f"{value:.2f}"
+
+
+def make_item(rng, layout):
+    """Return one item row as a list of cell strings plus its (net, tax) amounts"""
+    qty = rng.randint(1, 60)
+    price = round(rng.uniform(5, 2500), 2)
+    tax = rng.choice((5, 12, 18, 28))
+    discount = rng.choice((0, 0, 0, 5, 10))
+    net = round(qty * price * (1 - discount / 100), 2)
+    tax_amount = round(net * tax / 100, 2)
+    values = {
+        "code": f"{rng.randrange(10 ** 9, 10 ** 10)}",
+        "text": " ".join(rng.choice(WORDS) for __ in range(rng.randint(1, 3))),
+        "hsn": f"{rng.randrange(10 ** 7, 10 ** 8)}",
+        "qty": str(qty),
+        "price": _money(price),
+        "tax": str(tax),
+        "discount": str(discount),
+        "amount": _money(net + tax_amount),
+    }
+    return [values[kind] for __, __, kind in LAYOUTS[layout]], net, tax_amount
+
+
+def make_header(rng, header_fields, number):
+    issued = date(2024, 1, 1) + timedelta(days=rng.randrange(365))
+    values = {
+        "Invoice No.": f"INV-{number:06d}",
+        "Invoice Date": issued.strftime("%d-%m-%Y"),
+        "Customer": rng.choice(CUSTOMERS),
+        "Order Ref": f"PO{rng.randrange(10 ** 5, 10 ** 6)}",
+        "Due Date": (issued + timedelta(days=rng.choice((15, 30, 45)))).strftime("%d-%m-%Y"),
+        "Customer ID": f"C{rng.randrange(1000, 9999)}",
+        "Payment Terms": rng.choice(("Net 15", "Net 30", "Net 45", "Immediate")),
+    }
+    return [[label, values[label]] for label in HEADER_LABELS[:header_fields]]
+
+
+def _rows_to_records(rows):
+    return [{str(i): cell for i, cell in enumerate(row)} for row in rows]
+
+
+# --- Drawing -----------------------------------------------------------------
+
+def _text(page, x, top, text):
+    # Baseline inside a ROW_HEIGHT row starting at top
+    page.insert_text((x + CELL_PADDING, top + ROW_HEIGHT - 4), text, fontname=FONT, fontsize=FONT_SIZE)
+
+
+def _draw_rows(page, top, starts, rows):
+    for row_index, row in enumerate(rows):
+        y = top + row_index * ROW_HEIGHT
+        for x, cell in zip(starts, row):
+            _text(page, x, y, cell)
+
+
+def _draw_noise(page, rng, role, header_fields, count):
+    """Scatter text outside every template region: beside the header, above the items and in the footer"""
+    # (left, highest row top, lowest row top) of each zone
+    footer = PAGE_HEIGHT - FOOTER_HEIGHT + 6
+    zones = [(MARGIN, footer, footer + 10)]
+    if role != "middle":
+        header_bottom = _header_bottom(header_fields)
+        zones.append((MARGIN + HEADER_WIDTH + 30, HEADER_TOP, header_bottom - ROW_HEIGHT))
+        zones.append((MARGIN, header_bottom + 2, header_bottom + ITEMS_GAP - ROW_HEIGHT - 2))
+    for __ in range(count):
+        x, highest, lowest = rng.choice(zones)
+        _text(page, x + rng.randint(0, 20), rng.randint(highest, lowest), rng.choice(NOISE_LINES))
+
+
+def generate_invoice(rng, number, page_count, row_count, layout="standard", header_fields=4, noise=6):
+    """Draw one invoice
+
+    Returns:
+        tuple: (PDF bytes, expected tables dict)
+    """
+    titles = [title for title, __, __ in LAYOUTS[layout]]
+    starts = _column_starts(layout)
+    header = make_header(rng, header_fields, number)
+    expected = {"header": [], "items": [], "summary": []}
+    subtotal = tax_total = 0.0
+
+    doc = fitz.open()
+    for page_index, (role, rows_on_page) in enumerate(
+        zip(page_roles(page_count), distribute_rows(row_count, page_count, header_fields))
+    ):
+        page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        _text(page, MARGIN, MARGIN, "TAX INVOICE" if page_index == 0 else "TAX INVOICE (continued)")
+
+        if role in ("first", "only"):
+            _draw_rows(page, HEADER_TOP, [MARGIN, MARGIN + HEADER_LABEL_WIDTH], header)
+            expected["header"].append(_rows_to_records(header))
+
+        items = []
+        for __ in range(rows_on_page):
+            row, net, tax_amount = make_item(rng, layout)
+            items.append(row)
+            subtotal += net
+            tax_total += tax_amount
+        top, __ = items_band(role, header_fields)
+        _draw_rows(page, top + 2, starts, [titles] + items)
+        expected["items"].append(_rows_to_records([titles] + items))
+
+        if role in ("last", "only"):
+            summary = [
+                ["Subtotal", _money(subtotal)],
+                ["Tax", _money(tax_total)],
+                ["Total", _money(subtotal + tax_total)],
+            ]
+            _draw_rows(page, _summary_top() + 2, [SUMMARY_LEFT, SUMMARY_LEFT + SUMMARY_LABEL_WIDTH], summary)
+            expected["summary"].append(_rows_to_records(summary))
+
+        _draw_noise(page, rng, role, header_fields, noise)
+        _text(page, PAGE_WIDTH - MARGIN - 60, PAGE_HEIGHT - 30, f"Page {page_index + 1} of {page_count}")
+
+    # No dates or random IDs, so equal content gives equal bytes
+    doc.set_metadata({"title": f"Invoice {number}", "producer": "PDF Harvest corpus generator"})
+    data = doc.tobytes(garbage=3, deflate=True, no_new_id=True)
+    doc.close()
+    return data, expected
+
+
+# --- Template ----------------------------------------------------------------
+
+def _region(x1, top, x2, bottom):
+    """Template region from top-left coordinates, stored in PDF points from the bottom-left"""
+    return {"x1": x1, "y1": PAGE_HEIGHT - top, "x2": x2, "y2": PAGE_HEIGHT - bottom}
+
+
+def _column_lines(xs, top, bottom, region_index=0):
+    return [[{"x": x, "y": PAGE_HEIGHT - top}, {"x": x, "y": PAGE_HEIGHT - bottom}, region_index] for x in xs]
+
+
+def _role_layout(role, layout, header_fields):
+    """(regions, column_lines) of one page role"""
+    regions, column_lines = {}, {}
+    if role in ("first", "only"):
+        top, bottom = HEADER_TOP, _header_bottom(header_fields)
+        regions["header"] = [_region(MARGIN, top, MARGIN + HEADER_WIDTH, bottom)]
+        column_lines["header"] = _column_lines([MARGIN + HEADER_LABEL_WIDTH], top, bottom)
+    top, bottom = items_band(role, header_fields)
+    regions["items"] = [_region(_items_left(), top, _items_right(layout), bottom)]
+    column_lines["items"] = _column_lines(_column_starts(layout)[1:], top, bottom)
+    if role in ("last", "only"):
+        top, bottom = _summary_top(), _summary_top() + len(SUMMARY_ROWS) * ROW_HEIGHT + 4
+        regions["summary"] = [_region(SUMMARY_LEFT, top, PAGE_WIDTH - MARGIN, bottom)]
+        column_lines["summary"] = _column_lines([SUMMARY_LEFT + SUMMARY_LABEL_WIDTH], top, bottom)
+    return regions, column_lines
+
+
+def build_template(name, layout="standard", header_fields=4, multi_page=False):
+    """Return the template for a corpus as the keyword arguments of InvoiceDatabase.save_template"""
+    params = {section: {"row_tol": ROW_TOL} for section in ("header", "items", "summary")}
+    config = dict(
+        params,
+        split_text=True,
+        strip_text="\n",
+        flavor="stream",
+        regex_patterns={section: {"start": "", "end": "", "skip": ""} for section in params},
+        multi_table_mode=False,
+        extraction_params=dict(params, split_text=True, strip_text="\n", flavor="stream"),
+    )
+    template = {
+        "name": name,
+        "description": f"Synthetic {layout} invoices ({header_fields} header fields)",
+        "config": config,
+    }
+    if not multi_page:
+        regions, column_lines = _role_layout("only", layout, header_fields)
+        template.update(regions=regions, column_lines=column_lines, template_type="single", page_count=1)
+        return template
+
+    # First, middle and last page roles; a one-page invoice is extracted with the first and last page regions
+    config.update(use_middle_page=True, fixed_page_count=False)
+    role_layouts = [_role_layout(role, layout, header_fields) for role in ("first", "middle", "last")]
+    template.update(
+        regions={},
+        column_lines={},
+        template_type="multi",
+        page_count=3,
+        page_regions=[regions for regions, __ in role_layouts],
+        page_column_lines=[column_lines for __, column_lines in role_layouts],
+    )
+    return template
+
+
+def save_template(template, db_path):
+    """Insert or update the template in a templates database and return its ID"""
+    from database import InvoiceDatabase
+
+    db = InvoiceDatabase(db_path)
+    try:
+        return db.save_template(**template)
+    finally:
+        db.close()
+
+
+# --- Corpus ------------------------------------------------------------------
+
+def parse_range(value):
+    """Parse 'N' or 'MIN-MAX' into an inclusive (min, max) tuple"""
+    low, __, high = str(value).partition("-")
+    low = int(low)
+    high = int(high) if high else low
+    if low < 1 or high < low:
+        raise ValueError(f"Invalid range: {value}")
+    return low, high
+
+
+def generate_corpus(output_dir, count=100, seed=42, pages=(1, 1), rows=(10, 30), layout="standard",
+                    header_fields=4, noise=6, db_path=None, template_name=None):
+    """Write a corpus of invoices, their expected tables and the template into output_dir
+
+    Args:
+        output_dir: Directory receiving the files
+        count: Number of invoices
+        seed: Seed of the corpus; each invoice gets its own generator derived from it
+        pages: (min, max) pages per invoice
+        rows: (min, max) item rows per invoice, limited to what the pages hold
+        layout: Item table layout (see LAYOUTS)
+        header_fields: Header rows (1 to len(HEADER_LABELS))
+        noise: Noise text lines per page
+        db_path: Templates database to save the template in (None: do not save)
+        template_name: Template name (default: synthetic-<layout>-<seed>)
+
+    Returns:
+        dict: The manifest
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown layout: {layout} (expected one of {', '.join(LAYOUTS)})")
+    if not 1 <= header_fields <= len(HEADER_LABELS):
+        raise ValueError(f"header_fields must be between 1 and {len(HEADER_LABELS)}")
+    os.makedirs(output_dir, exist_ok=True)
+
+    template_name = template_name or f"synthetic-{layout}-{seed}"
+    template = build_template(template_name, layout, header_fields, multi_page=pages[1] > 1)
+    with open(os.path.join(output_dir, "template.json"), "w", encoding="utf-8") as f:
+        json.dump(template, f, indent=2)
+
+    files = []
+    for index in range(count):
+        # Independent per-invoice generators: invoice i is the same whatever the corpus size
+        rng = random.Random(f"{seed}:{index}")
+        page_count = rng.randint(*pages)
+        row_count = min(max(rng.randint(*rows), page_count), max_rows(page_count, header_fields))
+        data, expected = generate_invoice(rng, index + 1, page_count, row_count, layout, header_fields, noise)
+
+        name = f"invoice_{index + 1:05d}"
+        with open(os.path.join(output_dir, f"{name}.pdf"), "wb") as f:
+            f.write(data)
+        with open(os.path.join(output_dir, f"{name}_expected.json"), "w", encoding="utf-8") as f:
+            json.dump(expected, f, indent=2)
+        files.append({
+            "pdf": f"{name}.pdf",
+            "expected": f"{name}_expected.json",
+            "pages": page_count,
+            "rows": row_count,
+            "sha256": hashlib.sha256(data).hexdigest(),
+        })
+
+    manifest = {
+        "seed": seed,
+        "count": count,
+        "pages": list(pages),
+        "rows": list(rows),
+        "layout": layout,
+        "header_fields": header_fields,
+        "noise": noise,
+        "template": template_name,
+        "total_pages": sum(entry["pages"] for entry in files),
+        "files": files,
+    }
+    if db_path:
+        template_id = save_template(template, db_path)
+        manifest["template_id"] = template_id
+        logger.info("Saved template '%s' (ID: %s) to %s", template_name, template_id, db_path)
+
+    with open(os.path.join(output_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    logger.info("Wrote %s invoices (%s pages) to %s", count, manifest["total_pages"], output_dir)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a deterministic synthetic invoice corpus with ground truth')
+    parser.add_argument('--output', required=True, help='Directory for the PDFs, expected tables and template')
+    parser.add_argument('--count', type=int, default=100, help='Number of invoices (default: 100)')
+    parser.add_argument('--seed', type=int, default=42, help='Seed; the same arguments always give the same corpus (default: 42)')
+    parser.add_argument('--pages', default='1', help='Pages per invoice, N or MIN-MAX (default: 1)')
+    parser.add_argument('--rows', default='10-30', help='Item rows per invoice, N or MIN-MAX (default: 10-30)')
+    parser.add_argument('--layout', choices=sorted(LAYOUTS), default='standard', help='Item table layout (default: standard)')
+    parser.add_argument('--header-fields', type=int, default=4, help=f'Header rows, 1-{len(HEADER_LABELS)} (default: 4)')
+    parser.add_argument('--noise', type=int, default=6, help='Noise text lines per page outside the tables (default: 6)')
+    parser.add_argument('--db', help='Templates database to save the template in (default: <output>/invoice_templates.db)')
+    parser.add_argument('--no-db', action='store_true', help='Only write template.json')
+    parser.add_argument('--template-name', help='Template name (default: synthetic-<layout>-<seed>)')
+    args = parser.parse_args()
+    configure_logging()
+
+    try:
+        pages = parse_range(args.pages)
+        rows = parse_range(args.rows)
+    except ValueError as e:
+        parser.error(str(e))
+
+    db_path = None if args.no_db else (args.db or os.path.join(args.output, "invoice_templates.db"))
+    try:
+        generate_corpus(
+            args.output, args.count, args.seed, pages, rows, args.layout,
+            args.header_fields, args.noise, db_path, args.template_name,
+        )
+    except ValueError as e:
+        logger.error("%s", e)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,14 @@
+import logging
 import sqlite3
 import json
 import os
+import time
 from pathlib import Path
 import datetime
+from db_connections import get_connection_manager
+from tracing import span
+
+logger = logging.getLogger(__name__)
 
 class InvoiceDatabase:
     def __init__(self, db_path="invoice_templates.db"):
@@ -11,106 +17,108 @@ class InvoiceDatabase:
             # Store the database path
             self.db_path = db_path
             
+            # Connections, the schema cache and backups are shared by every InvoiceDatabase in the process
+            self.manager = get_connection_manager(db_path)
+            
             # Ensure the database directory exists
             db_dir = os.path.dirname(db_path)
             if db_dir and not os.path.exists(db_dir):
                 os.makedirs(db_dir)
-                print(f"Created database directory: {db_dir}")
+                logger.debug("Created database directory: %s", db_dir)
             
             # Check if the database exists and if it might be corrupted
             if os.path.exists(db_path):
                 file_size = os.path.getsize(db_path)
-                print(f"Database file exists: {db_path}, size: {file_size} bytes")
+                logger.debug("Database file exists: %s, size: %s bytes", db_path, file_size)
                 
                 if file_size == 0:
-                    print("Warning: Database file exists but is empty, it may be corrupted")
+                    logger.warning("Database file exists but is empty, it may be corrupted")
                 
-                # Create a backup before opening if file exists and has content
+                # Back up the database when the last scheduled backup is out of date
                 if file_size > 0:
-                    backup_path = f"{db_path}.bak"
                     try:
-                        import shutil
-                        shutil.copy2(db_path, backup_path)
-                        print(f"Created database backup at: {backup_path}")
+                        backup_path = self.manager.backup_if_due()
+                        if backup_path:
+                            logger.debug("Created database backup at: %s", backup_path)
                     except Exception as backup_e:
-                        print(f"Warning: Could not create database backup: {str(backup_e)}")
+                        logger.warning("Could not create database backup: %s", str(backup_e))
             else:
-                print(f"Creating new database at: {db_path}")
+                logger.debug("Creating new database at: %s", db_path)
             
             # Try to connect to the database with timeout and error handling
             try:
-                self.conn = sqlite3.connect(db_path, timeout=30.0)  # 30 second timeout
-                self.conn.execute("PRAGMA journal_mode=WAL")  # Use Write-Ahead Logging for better concurrency
-                self.conn.execute("PRAGMA synchronous=NORMAL")  # Balance between safety and performance
+                # This thread's persistent connection (WAL mode, 30 second timeout)
+                self.conn = self.manager.connection()
                 self.cursor = self.conn.cursor()
-                print(f"Connected to database: {db_path}")
+                logger.debug("Connected to database: %s", db_path)
                 
                 # Test the connection by running a simple query
                 self.cursor.execute("SELECT sqlite_version()")
                 version = self.cursor.fetchone()
-                print(f"SQLite version: {version[0]}")
+                logger.debug("SQLite version: %s", version[0])
                 
                 # Create the tables
                 self.create_tables()
             except sqlite3.DatabaseError as db_error:
-                print(f"Database error during connection: {str(db_error)}")
+                logger.error("Database error during connection: %s", str(db_error))
                 
                 # Try to recover from backup if exists
                 backup_path = f"{db_path}.bak"
                 if os.path.exists(backup_path):
-                    print(f"Attempting recovery from backup: {backup_path}")
+                    logger.debug("Attempting recovery from backup: %s", backup_path)
                     try:
                         # Close any open connections
-                        if hasattr(self, 'conn') and self.conn:
-                            self.conn.close()
+                        self.manager.close_all()
+                        self.manager.refresh_schema()
                         
                         # Rename the corrupted database
                         corrupted_path = f"{db_path}.corrupted"
                         os.rename(db_path, corrupted_path)
-                        print(f"Renamed corrupted database to: {corrupted_path}")
+                        logger.debug("Renamed corrupted database to: %s", corrupted_path)
                         
                         # Restore from backup
                         import shutil
                         shutil.copy2(backup_path, db_path)
-                        print(f"Restored database from backup")
+                        logger.debug("Restored database from backup")
                         
                         # Try to connect again
-                        self.conn = sqlite3.connect(db_path)
+                        self.conn = self.manager.connection()
                         self.cursor = self.conn.cursor()
-                        print("Successfully recovered database from backup")
+                        logger.debug("Successfully recovered database from backup")
                     except Exception as recovery_e:
-                        print(f"Recovery failed: {str(recovery_e)}")
+                        logger.debug("Recovery failed: %s", str(recovery_e))
                         # Create a fresh database as last resort
+                        self.manager.close_all()
                         if os.path.exists(db_path):
                             os.remove(db_path)
-                        self.conn = sqlite3.connect(db_path)
+                        self.conn = self.manager.connection()
                         self.cursor = self.conn.cursor()
-                        print("Created fresh database after recovery failure")
+                        logger.debug("Created fresh database after recovery failure")
                 else:
                     # No backup exists, create a fresh database
-                    print("No backup found, creating fresh database")
+                    logger.warning("No backup found, creating fresh database")
+                    self.manager.close_all()
+                    self.manager.refresh_schema()
                     if os.path.exists(db_path):
                         os.remove(db_path)
-                    self.conn = sqlite3.connect(db_path)
+                    self.conn = self.manager.connection()
                     self.cursor = self.conn.cursor()
                     
                 # Create the tables for the new/recovered database
                 self.create_tables()
                 
         except Exception as e:
-            print(f"Error initializing database: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.error("Error initializing database: %s", e, exc_info=True)
             
             # Make sure we have a valid connection and cursor even after errors
             if not hasattr(self, 'conn') or self.conn is None:
                 try:
                     self.conn = sqlite3.connect(":memory:")  # Use in-memory DB as fallback
                     self.cursor = self.conn.cursor()
-                    print("Using in-memory database as fallback after error")
+                    logger.debug("Using in-memory database as fallback after error")
                     self.create_tables()
                 except Exception as fallback_e:
-                    print(f"Could not create fallback database: {str(fallback_e)}")
+                    logger.warning("Could not create fallback database: %s", str(fallback_e))
                     # Set to None to prevent further method calls from crashing
                     self.conn = None
                     self.cursor = None
@@ -137,48 +145,48 @@ class InvoiceDatabase:
         """)
         
         # Check if the required columns exist, and add them if they don't
-        self.cursor.execute("PRAGMA table_info(templates)")
-        columns = self.cursor.fetchall()
-        column_names = [col[1] for col in columns]
+        self.manager.refresh_schema()
+        column_names = self.manager.table_columns("templates")
         
         if 'page_count' not in column_names:
-            print("Adding missing 'page_count' column to templates table")
+            logger.debug("Adding missing 'page_count' column to templates table")
             try:
                 self.cursor.execute("ALTER TABLE templates ADD COLUMN page_count INTEGER DEFAULT 1")
             except sqlite3.Error as e:
-                print(f"Error adding page_count column: {str(e)}")
+                logger.error("Error adding page_count column: %s", e)
         
         if 'last_modified' not in column_names:
-            print("Adding missing 'last_modified' column to templates table")
+            logger.debug("Adding missing 'last_modified' column to templates table")
             try:
                 self.cursor.execute("ALTER TABLE templates ADD COLUMN last_modified TEXT")
                 # Update existing records to use creation_date as the last_modified value
                 self.cursor.execute("UPDATE templates SET last_modified = creation_date WHERE last_modified IS NULL")
             except sqlite3.Error as e:
-                print(f"Error adding last_modified column: {str(e)}")
+                logger.error("Error adding last_modified column: %s", e)
         
         if 'page_regions' not in column_names:
-            print("Adding missing 'page_regions' column to templates table")
+            logger.debug("Adding missing 'page_regions' column to templates table")
             try:
                 self.cursor.execute("ALTER TABLE templates ADD COLUMN page_regions TEXT")
             except sqlite3.Error as e:
-                print(f"Error adding page_regions column: {str(e)}")
+                logger.error("Error adding page_regions column: %s", e)
         
         if 'page_column_lines' not in column_names:
-            print("Adding missing 'page_column_lines' column to templates table")
+            logger.debug("Adding missing 'page_column_lines' column to templates table")
             try:
                 self.cursor.execute("ALTER TABLE templates ADD COLUMN page_column_lines TEXT")
             except sqlite3.Error as e:
-                print(f"Error adding page_column_lines column: {str(e)}")
+                logger.error("Error adding page_column_lines column: %s", e)
         
         if 'page_configs' not in column_names:
-            print("Adding missing 'page_configs' column to templates table")
+            logger.debug("Adding missing 'page_configs' column to templates table")
             try:
                 self.cursor.execute("ALTER TABLE templates ADD COLUMN page_configs TEXT")
             except sqlite3.Error as e:
-                print(f"Error adding page_configs column: {str(e)}")
+                logger.error("Error adding page_configs column: %s", e)
         
         self.conn.commit()
+        self.manager.refresh_schema()
     
     def save_template(self, name, description, regions, column_lines, config, template_type="single", page_count=1, page_regions=None, page_column_lines=None, page_configs=None):
         """Save a template to the database"""
@@ -204,31 +212,33 @@ class InvoiceDatabase:
                 raise ValueError(f"Invalid config data type: {type(config)}")
                 
             # Debug information
-            print(f"\nSaving template to database: {name}")
-            print(f"  Template type: {template_type}")
-            print(f"  Page count: {page_count}")
-            print(f"  Regions count: {sum(len(rects) for rects in regions.values())}")
-            print(f"  Column lines count: {sum(len(lines) for lines in column_lines.values())}")
-            print(f"  Config keys: {list(config.keys())}")
+            logger.debug("Saving template to database: %s", name)
+            logger.debug("Template type: %s", template_type)
+            logger.debug("Page count: %s", page_count)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Regions count: %s", sum(len(rects) for rects in regions.values()))
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Column lines count: %s", sum(len(lines) for lines in column_lines.values()))
+            logger.debug("Config keys: %s", list(config.keys()))
             
             # Convert to JSON strings with error handling
             try:
                 regions_json = json.dumps(regions)
-                print(f"  Regions JSON size: {len(regions_json)} bytes")
+                logger.debug("Regions JSON size: %s bytes", len(regions_json))
                 
                 # Check if the JSON is too large
                 if len(regions_json) > 5 * 1024 * 1024:  # 5 MB limit
                     raise ValueError(f"Regions data too large: {len(regions_json) / (1024*1024):.2f} MB")
                     
                 column_lines_json = json.dumps(column_lines)
-                print(f"  Column lines JSON size: {len(column_lines_json)} bytes")
+                logger.debug("Column lines JSON size: %s bytes", len(column_lines_json))
                 
                 # Check if the JSON is too large
                 if len(column_lines_json) > 1 * 1024 * 1024:  # 1 MB limit
                     raise ValueError(f"Column lines data too large: {len(column_lines_json) / (1024*1024):.2f} MB")
                 
                 config_json = json.dumps(config)
-                print(f"  Config JSON size: {len(config_json)} bytes")
+                logger.debug("Config JSON size: %s bytes", len(config_json))
                 
                 # Check if the JSON is too large
                 if len(config_json) > 1 * 1024 * 1024:  # 1 MB limit
@@ -242,7 +252,7 @@ class InvoiceDatabase:
             except TypeError as json_error:
                 # Handle JSON serialization errors for specific types
                 error_msg = f"JSON serialization error: {str(json_error)}"
-                print(error_msg)
+                logger.error("%s", error_msg)
                 raise ValueError(error_msg)
             
             # Get current date in ISO format
@@ -253,10 +263,8 @@ class InvoiceDatabase:
             self.cursor.execute("SELECT id FROM templates WHERE name = ?", (name,))
             existing_template = self.cursor.fetchone()
             
-            # Check which columns exist in the templates table
-            self.cursor.execute("PRAGMA table_info(templates)")
-            columns = self.cursor.fetchall()
-            column_names = [col[1] for col in columns]
+            # Check which columns exist in the templates table (cached schema)
+            column_names = self.manager.table_columns("templates")
             
             has_last_modified = 'last_modified' in column_names
             has_page_count = 'page_count' in column_names
@@ -265,7 +273,7 @@ class InvoiceDatabase:
             has_page_configs = 'page_configs' in column_names
             
             if existing_template:
-                print(f"  Updating existing template with ID: {existing_template[0]}")
+                logger.debug("Updating existing template with ID: %s", existing_template[0])
                 
                 # Build the SQL UPDATE statement dynamically based on available columns
                 update_fields = [
@@ -308,12 +316,12 @@ class InvoiceDatabase:
                 
                 # Build and execute the final UPDATE query
                 update_query = f"UPDATE templates SET {', '.join(update_fields)} WHERE name = ?"
-                print(f"  Executing update query: {update_query}")
+                logger.debug("Executing update query: %s", update_query)
                 self.cursor.execute(update_query, update_values)
                 
                 template_id = existing_template[0]
             else:
-                print(f"  Creating new template")
+                logger.debug("Creating new template")
                 
                 # Build the SQL INSERT statement dynamically based on available columns
                 insert_fields = [
@@ -358,31 +366,30 @@ class InvoiceDatabase:
                 # Build and execute the final INSERT query
                 placeholders = ", ".join(["?"] * len(insert_values))
                 insert_query = f"INSERT INTO templates ({', '.join(insert_fields)}) VALUES ({placeholders})"
-                print(f"  Executing insert query: {insert_query}")
+                logger.debug("Executing insert query: %s", insert_query)
                 self.cursor.execute(insert_query, insert_values)
                 
                 template_id = self.cursor.lastrowid
-                print(f"  New template created with ID: {template_id}")
+                logger.debug("New template created with ID: %s", template_id)
             
             # Commit the transaction
-            print("  Committing transaction to database")
+            logger.debug("Committing transaction to database")
             self.conn.commit()
-            print("  Template saved successfully")
+            logger.debug("Template saved successfully")
             return template_id
             
         except sqlite3.Error as sql_e:
-            print(f"SQLite error saving template: {str(sql_e)}")
-            print(f"Database path: {self.db_path}")
+            logger.error("SQLite error saving template: %s", str(sql_e))
+            logger.debug("Database path: %s", self.db_path)
             if os.path.exists(self.db_path):
-                print(f"Database file size: {os.path.getsize(self.db_path)} bytes")
-                print(f"Database file permissions: {oct(os.stat(self.db_path).st_mode)[-3:]}")
+                logger.debug("Database file size: %s bytes", os.path.getsize(self.db_path))
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Database file permissions: %s", oct(os.stat(self.db_path).st_mode)[-3:])
             self.conn.rollback()
             raise
         except Exception as e:
-            print(f"Error saving template: {str(e)}")
-            print(f"Error type: {type(e).__name__}")
-            import traceback
-            traceback.print_exc()
+            logger.error("Error saving template: %s", e)
+            logger.error("Error type: %s", type(e).__name__, exc_info=True)
             self.conn.rollback()
             raise
     
@@ -409,10 +416,8 @@ class InvoiceDatabase:
                 return None
             template_id = result[0]
         
-        # First check which columns exist in the templates table
-        self.cursor.execute("PRAGMA table_info(templates)")
-        columns = self.cursor.fetchall()
-        column_names = [col[1] for col in columns]
+        # First check which columns exist in the templates table (cached schema)
+        column_names = self.manager.table_columns("templates")
         
         # Build the select query based on available columns
         select_columns = ["id", "name", "description", "template_type", "regions", "column_lines", 
@@ -501,7 +506,7 @@ class InvoiceDatabase:
                     template["page_configs"] = json.loads(page_configs_json)
             
         except json.JSONDecodeError as e:
-            print(f"Error parsing template JSON data: {str(e)}")
+            logger.error("Error parsing template JSON data: %s", e)
             # Return partial template data even if JSON parsing fails
         
         return template
@@ -514,10 +519,8 @@ class InvoiceDatabase:
             list: List of template basic info (id, name, description, type)
         """
         try:
-            # First check if columns exist
-            self.cursor.execute("PRAGMA table_info(templates)")
-            columns = self.cursor.fetchall()
-            column_names = [col[1] for col in columns]
+            # First check if columns exist (cached schema)
+            column_names = self.manager.table_columns("templates")
             
             has_last_modified = 'last_modified' in column_names
             has_page_count = 'page_count' in column_names
@@ -561,9 +564,7 @@ class InvoiceDatabase:
             
             return templates
         except Exception as e:
-            print(f"Error in get_all_templates: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.error("Error in get_all_templates: %s", e, exc_info=True)
             # Return empty list if there's an error
             return []
     
@@ -598,31 +599,25 @@ class InvoiceDatabase:
             return False
     
     def close(self):
-        """Close the database connection"""
+        """Release this object's cursor and connection
+
+        The thread's connection itself belongs to the connection manager and
+        stays open for the other users of the database in this thread.
+        """
         try:
             # First close the cursor if it exists
             if hasattr(self, 'cursor') and self.cursor:
                 try:
                     self.cursor.close()
-                    print("Database cursor closed")
+                    logger.debug("Database cursor closed")
                 except Exception as cursor_e:
-                    print(f"Error closing database cursor: {str(cursor_e)}")
-            
-            # Then close the connection
-            if hasattr(self, 'conn') and self.conn:
-                try:
-                    self.conn.close()
-                    print("Database connection closed")
-                except Exception as conn_e:
-                    print(f"Error closing database connection: {str(conn_e)}")
+                    logger.error("Error closing database cursor: %s", str(cursor_e))
             
             # Clear references to prevent further use
             self.cursor = None
             self.conn = None
         except Exception as e:
-            print(f"Error in database close method: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.error("Error in database close method: %s", e, exc_info=True)
             
     def optimize_database(self):
         """
@@ -634,26 +629,26 @@ class InvoiceDatabase:
             bool: True if optimization succeeded, False otherwise
         """
         try:
-            print("Starting database optimization...")
+            logger.debug("Starting database optimization...")
             
             # Check database size before optimization
             if os.path.exists(self.db_path):
                 size_before = os.path.getsize(self.db_path)
-                print(f"Database size before optimization: {size_before/1024:.2f} KB")
+                logger.debug("Database size before optimization: %.2f KB", size_before/1024)
             
             # Enable auto vacuum for future operations
             self.conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
             
             # Update SQLite statistics for query optimization
-            print("Running ANALYZE...")
+            logger.debug("Running ANALYZE...")
             self.conn.execute("ANALYZE")
             
             # Defragment the database and reclaim unused space
-            print("Running VACUUM...")
+            logger.debug("Running VACUUM...")
             self.conn.execute("VACUUM")
             
             # Optimize database indices
-            print("Rebuilding indices...")
+            logger.debug("Rebuilding indices...")
             self.conn.execute("PRAGMA optimize")
             
             # Commit changes
@@ -662,15 +657,16 @@ class InvoiceDatabase:
             # Check database size after optimization
             if os.path.exists(self.db_path):
                 size_after = os.path.getsize(self.db_path)
-                print(f"Database size after optimization: {size_after/1024:.2f} KB")
-                print(f"Space saved: {(size_before - size_after)/1024:.2f} KB ({100 * (size_before - size_after) / size_before:.2f}%)")
+                logger.debug("Database size after optimization: %.2f KB", size_after/1024)
+                logger.debug(
+                    "Space saved: %.2f KB (%.2f%%)",
+                    (size_before - size_after)/1024, 100 * (size_before - size_after) / size_before
+                )
             
-            print("Database optimization completed successfully")
+            logger.debug("Database optimization completed successfully")
             return True
         except Exception as e:
-            print(f"Error optimizing database: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.error("Error optimizing database: %s", e, exc_info=True)
             return False
             
     def check_integrity(self, repair=True):
@@ -684,7 +680,7 @@ class InvoiceDatabase:
             tuple: (bool, str) - Success status and message with details
         """
         try:
-            print("Checking database integrity...")
+            logger.debug("Checking database integrity...")
             
             # Run quick integrity check
             self.cursor.execute("PRAGMA quick_check")
@@ -692,7 +688,7 @@ class InvoiceDatabase:
             integrity_status = result[0] if result else "unknown"
             
             if integrity_status == "ok":
-                print("Quick integrity check passed")
+                logger.debug("Quick integrity check passed")
                 
                 # Run more thorough integrity check
                 self.cursor.execute("PRAGMA integrity_check")
@@ -700,13 +696,13 @@ class InvoiceDatabase:
                 integrity_details = [row[0] for row in result]
                 
                 if len(integrity_details) == 1 and integrity_details[0] == "ok":
-                    print("Full integrity check passed")
+                    logger.debug("Full integrity check passed")
                     return True, "Database integrity verified: no issues found"
                 else:
                     error_msg = f"Integrity issues found: {', '.join(integrity_details[:5])}"
                     if len(integrity_details) > 5:
                         error_msg += f" and {len(integrity_details) - 5} more issues"
-                    print(error_msg)
+                    logger.error("%s", error_msg)
                     
                     if repair:
                         return self._repair_database(integrity_details)
@@ -714,7 +710,7 @@ class InvoiceDatabase:
                         return False, error_msg
             else:
                 error_msg = f"Quick integrity check failed: {integrity_status}"
-                print(error_msg)
+                logger.error("%s", error_msg)
                 
                 if repair:
                     return self._repair_database([integrity_status])
@@ -723,9 +719,7 @@ class InvoiceDatabase:
                     
         except Exception as e:
             error_msg = f"Error checking database integrity: {str(e)}"
-            print(error_msg)
-            import traceback
-            traceback.print_exc()
+            logger.error("%s", error_msg, exc_info=True)
             
             if repair:
                 return self._repair_database([str(e)])
@@ -747,16 +741,15 @@ class InvoiceDatabase:
             tuple: (bool, str) - Success status and message with details
         """
         try:
-            print(f"Attempting database repair for {len(issues)} issues...")
+            logger.debug("Attempting database repair for %s issues...", len(issues))
             
             # 1. Create a backup
             backup_path = f"{self.db_path}.repair_backup"
-            import shutil
-            shutil.copy2(self.db_path, backup_path)
-            print(f"Created repair backup at: {backup_path}")
+            self.manager.backup(backup_path)
+            logger.debug("Created repair backup at: %s", backup_path)
             
             # 2. Export data to in-memory database
-            print("Exporting data to temporary database...")
+            logger.debug("Exporting data to temporary database...")
             temp_conn = sqlite3.connect(":memory:")
             temp_cursor = temp_conn.cursor()
             
@@ -778,7 +771,7 @@ class InvoiceDatabase:
             try:
                 self.cursor.execute("SELECT id, name, description, template_type, regions, column_lines, config, creation_date FROM templates")
                 templates = self.cursor.fetchall()
-                print(f"Found {len(templates)} templates to export")
+                logger.debug("Found %s templates to export", len(templates))
                 
                 # Insert into temp database
                 for template in templates:
@@ -788,33 +781,35 @@ class InvoiceDatabase:
                             VALUES (?, ?, ?, ?, ?, ?, ?, ?)
                         """, template)
                     except Exception as insert_e:
-                        print(f"Error importing template {template[1]}: {str(insert_e)}")
+                        logger.error("Error importing template %s: %s", template[1], str(insert_e))
                         
                 temp_conn.commit()
                 exported_count = temp_cursor.execute("SELECT COUNT(*) FROM templates").fetchone()[0]
-                print(f"Successfully exported {exported_count} of {len(templates)} templates")
+                logger.debug("Successfully exported %s of %s templates", exported_count, len(templates))
                 
             except Exception as export_e:
-                print(f"Error exporting data: {str(export_e)}")
+                logger.error("Error exporting data: %s", str(export_e))
                 # Continue with repair even if export fails
             
             # 3. Close connections and recreate the database file
             self.close()
+            self.manager.close_all()
+            self.manager.refresh_schema()
             
             # Remove the corrupted database
             if os.path.exists(self.db_path):
                 os.remove(self.db_path)
-                print(f"Removed corrupted database: {self.db_path}")
+                logger.debug("Removed corrupted database: %s", self.db_path)
             
             # Create a fresh database
-            self.conn = sqlite3.connect(self.db_path)
+            self.conn = self.manager.connection()
             self.cursor = self.conn.cursor()
             self.create_tables()
-            print("Created fresh database")
+            logger.debug("Created fresh database")
             
             # 4. Import the data back
             if exported_count > 0:
-                print(f"Importing {exported_count} templates back to the database...")
+                logger.debug("Importing %s templates back to the database...", exported_count)
                 temp_cursor.execute("SELECT id, name, description, template_type, regions, column_lines, config, creation_date FROM templates")
                 templates = temp_cursor.fetchall()
                 
@@ -831,16 +826,16 @@ class InvoiceDatabase:
                         """, template)
                         import_count += 1
                     except Exception as import_e:
-                        print(f"Error importing template {template[1]}: {str(import_e)}")
+                        logger.error("Error importing template %s: %s", template[1], str(import_e))
                 
                 self.conn.commit()
-                print(f"Successfully imported {import_count} of {exported_count} templates")
+                logger.debug("Successfully imported %s of %s templates", import_count, exported_count)
             
             # Close the temporary connection
             temp_conn.close()
             
             # Run optimization after repair
-            print("Running optimization after repair...")
+            logger.debug("Running optimization after repair...")
             self.optimize_database()
             
             if exported_count > 0 and import_count == exported_count:
@@ -852,9 +847,7 @@ class InvoiceDatabase:
             
         except Exception as e:
             error_msg = f"Error during database repair: {str(e)}"
-            print(error_msg)
-            import traceback
-            traceback.print_exc()
+            logger.error("%s", error_msg, exc_info=True)
             return False, error_msg
             
     def perform_maintenance(self, create_backup=True, max_backups=5, check_integrity=True, optimize=True):
@@ -883,7 +876,7 @@ class InvoiceDatabase:
         }
         
         try:
-            print("Starting database maintenance...")
+            logger.debug("Starting database maintenance...")
             
             # Step 1: Create a backup if requested
             if create_backup and os.path.exists(self.db_path):
@@ -892,14 +885,14 @@ class InvoiceDatabase:
                     timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
                     backup_path = f"{self.db_path}.{timestamp}.bak"
                     
-                    import shutil
-                    shutil.copy2(self.db_path, backup_path)
+                    # Online backup: consistent and includes changes still in the WAL
+                    self.manager.backup(backup_path)
                     results["backup"] = {
                         "success": True,
                         "path": backup_path,
                         "size": os.path.getsize(backup_path)
                     }
-                    print(f"Created backup at: {backup_path} ({results['backup']['size']/1024:.2f} KB)")
+                    logger.debug("Created backup at: %s (%.2f KB)", backup_path, results['backup']['size']/1024)
                     
                     # Manage backups - keep only the most recent ones
                     if max_backups > 0:
@@ -921,9 +914,9 @@ class InvoiceDatabase:
                             for path, _ in backup_files[max_backups:]:
                                 try:
                                     os.remove(path)
-                                    print(f"Removed old backup: {path}")
+                                    logger.debug("Removed old backup: %s", path)
                                 except Exception as rm_e:
-                                    print(f"Failed to remove old backup {path}: {str(rm_e)}")
+                                    logger.error("Failed to remove old backup %s: %s", path, str(rm_e))
                                     results["errors"].append(f"Backup cleanup error: {str(rm_e)}")
                         
                         results["backup"]["managed"] = len(backup_files)
@@ -932,7 +925,7 @@ class InvoiceDatabase:
                         
                 except Exception as backup_e:
                     error_msg = f"Backup error: {str(backup_e)}"
-                    print(error_msg)
+                    logger.error("%s", error_msg)
                     results["backup"] = {"success": False, "error": error_msg}
                     results["errors"].append(error_msg)
                     results["success"] = False
@@ -949,7 +942,7 @@ class InvoiceDatabase:
                     
                     # If issues found and we have a backup, repair the database
                     if not integrity_success and results.get("backup", {}).get("success", False):
-                        print("Issues found during integrity check, attempting repair...")
+                        logger.debug("Issues found during integrity check, attempting repair...")
                         repair_success, repair_msg = self.check_integrity(repair=True)
                         results["integrity"]["repair"] = {
                             "success": repair_success,
@@ -963,7 +956,7 @@ class InvoiceDatabase:
                     
                 except Exception as integrity_e:
                     error_msg = f"Integrity check error: {str(integrity_e)}"
-                    print(error_msg)
+                    logger.error("%s", error_msg)
                     results["integrity"] = {"success": False, "error": error_msg}
                     results["errors"].append(error_msg)
                     results["success"] = False
@@ -980,33 +973,283 @@ class InvoiceDatabase:
                         
                 except Exception as optimize_e:
                     error_msg = f"Optimization error: {str(optimize_e)}"
-                    print(error_msg)
+                    logger.error("%s", error_msg)
                     results["optimize"] = {"success": False, "error": error_msg}
                     results["errors"].append(error_msg)
                     results["success"] = False
             
             # Summarize results
-            print("\nMaintenance summary:")
-            print(f"- Overall success: {results['success']}")
+            logger.debug("Maintenance summary:")
+            logger.debug("- Overall success: %s", results['success'])
             if results.get("backup"):
-                print(f"- Backup: {'✓' if results['backup'].get('success') else '✗'}")
+                logger.debug("- Backup: %s", '✓' if results['backup'].get('success') else '✗')
             if results.get("integrity"):
-                print(f"- Integrity: {'✓' if results['integrity'].get('success') else '✗'}")
+                logger.debug("- Integrity: %s", '✓' if results['integrity'].get('success') else '✗')
             if results.get("optimize"):
-                print(f"- Optimize: {'✓' if results['optimize'].get('success') else '✗'}")
+                logger.debug("- Optimize: %s", '✓' if results['optimize'].get('success') else '✗')
             if results["errors"]:
-                print(f"- Errors: {len(results['errors'])}")
+                logger.debug("- Errors: %s", len(results['errors']))
                 for i, error in enumerate(results["errors"]):
-                    print(f"  {i+1}. {error}")
+                    logger.debug("%s. %s", i+1, error)
             
             return results
             
         except Exception as e:
             error_msg = f"Maintenance error: {str(e)}"
-            print(error_msg)
-            import traceback
-            traceback.print_exc()
+            logger.error("%s", error_msg, exc_info=True)
             
             results["success"] = False
             results["errors"].append(error_msg)
-            return results 
\ No newline at end of file
+            return results 
+
+# Job item states
+JOB_ITEM_PENDING = "pending"
+JOB_ITEM_RUNNING = "running"
+JOB_ITEM_DONE = "done"
+JOB_ITEM_FAILED = "failed"
+
+# Seconds a claimed item stays leased to its worker unless the lease is renewed
+DEFAULT_LEASE_SECONDS = 60
+
+# Attempts before an item that keeps crashing its worker is given up on
+DEFAULT_MAX_ATTEMPTS = 3
+
+
+class JobQueue:
+    """Persistent, resumable batch jobs stored next to the templates
+
+    A job is a list of PDF files to extract with one template. Each file is a
+    job item that a worker claims atomically, which leases it to that worker
+    for lease_seconds. Finished items keep their result, so a job that was
+    interrupted continues with the items that never finished; items whose
+    worker died are claimed again once their lease runs out, up to
+    max_attempts times.
+    """
+
+    def __init__(self, db_path="invoice_templates.db", lease_seconds=DEFAULT_LEASE_SECONDS,
+                 max_attempts=DEFAULT_MAX_ATTEMPTS):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.manager = get_connection_manager(db_path)
+        self.create_tables()
+
+    @property
+    def conn(self):
+        # Every thread uses its own persistent connection
+        return self.manager.connection()
+
+    def create_tables(self):
+        conn = self.conn
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                template_id INTEGER NOT NULL,
+                source TEXT,
+                options TEXT,
+                status TEXT NOT NULL DEFAULT 'running',
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                finished_at TIMESTAMP
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS job_items (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id INTEGER NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
+                pdf_path TEXT NOT NULL,
+                state TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                lease_owner TEXT,
+                lease_expires REAL,
+                result TEXT,
+                error TEXT,
+                updated_at REAL,
+                UNIQUE (job_id, pdf_path)
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_job_items_state ON job_items (job_id, state)")
+        conn.commit()
+
+    def create_job(self, template_id, pdf_paths, source=None, options=None):
+        """Create a job with one pending item per PDF file
+
+        Returns:
+            int: ID of the new job
+        """
+        conn = self.conn
+        with conn:
+            cursor = conn.execute(
+                "INSERT INTO jobs (template_id, source, options) VALUES (?, ?, ?)",
+                (template_id, source, json.dumps(options or {})),
+            )
+            job_id = cursor.lastrowid
+            conn.executemany(
+                "INSERT OR IGNORE INTO job_items (job_id, pdf_path, updated_at) VALUES (?, ?, ?)",
+                [(job_id, pdf_path, time.time()) for pdf_path in pdf_paths],
+            )
+        logger.debug("Created job %s with %s files", job_id, len(pdf_paths))
+        return job_id
+
+    def get_job(self, job_id):
+        """Return a job as a dict (options decoded), or None if it does not exist"""
+        row = self.conn.execute(
+            "SELECT id, template_id, source, options, status, created_at, finished_at FROM jobs WHERE id = ?",
+            (job_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            "id": row[0],
+            "template_id": row[1],
+            "source": row[2],
+            "options": json.loads(row[3] or "{}"),
+            "status": row[4],
+            "created_at": row[5],
+            "finished_at": row[6],
+        }
+
+    def claim_items(self, job_id, worker_id, limit=1):
+        """Atomically lease up to limit unfinished items of a job to a worker
+
+        Pending items and items whose lease has expired are eligible. An
+        expired item that already used all its attempts is marked failed.
+
+        Returns:
+            list: (item_id, pdf_path) tuples
+        """
+        conn = self.conn
+        now = time.time()
+        # BEGIN IMMEDIATE takes the write lock up front, so two workers never claim the same item
+        with span("claim_items", "db", job_id=job_id):
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    """
+                    UPDATE job_items SET state = ?, error = ?, lease_owner = NULL, updated_at = ?
+                    WHERE job_id = ? AND state = ? AND lease_expires < ? AND attempts >= ?
+                    """,
+                    (JOB_ITEM_FAILED, "Worker stopped before finishing (attempts exhausted)", now,
+                     job_id, JOB_ITEM_RUNNING, now, self.max_attempts),
+                )
+                rows = conn.execute(
+                    """
+                    SELECT id, pdf_path FROM job_items
+                    WHERE job_id = ? AND (state = ? OR (state = ? AND lease_expires < ?))
+                    ORDER BY id LIMIT ?
+                    """,
+                    (job_id, JOB_ITEM_PENDING, JOB_ITEM_RUNNING, now, limit),
+                ).fetchall()
+                conn.executemany(
+                    """
+                    UPDATE job_items SET state = ?, lease_owner = ?, lease_expires = ?,
+                           attempts = attempts + 1, updated_at = ?
+                    WHERE id = ?
+                    """,
+                    [(JOB_ITEM_RUNNING, worker_id, now + self.lease_seconds, now, item_id) for item_id, __ in rows],
+                )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        return rows
+
+    def renew_leases(self, item_ids, worker_id):
+        """Extend the leases a worker holds on items it is still working on"""
+        if not item_ids:
+            return
+        conn = self.conn
+        with span("renew_leases", "db", items=len(item_ids)), conn:
+            conn.executemany(
+                "UPDATE job_items SET lease_expires = ? WHERE id = ? AND lease_owner = ? AND state = ?",
+                [(time.time() + self.lease_seconds, item_id, worker_id, JOB_ITEM_RUNNING) for item_id in item_ids],
+            )
+
+    def complete_item(self, item_id, worker_id, result):
+        """Store an item's result and mark it done
+
+        Returns:
+            bool: False if the worker no longer held the item's lease
+        """
+        conn = self.conn
+        with span("complete_item", "db", item_id=item_id), conn:
+            cursor = conn.execute(
+                """
+                UPDATE job_items SET state = ?, result = ?, error = NULL, lease_owner = NULL,
+                       lease_expires = NULL, updated_at = ?
+                WHERE id = ? AND lease_owner = ?
+                """,
+                (JOB_ITEM_DONE, json.dumps(result), time.time(), item_id, worker_id),
+            )
+        return cursor.rowcount == 1
+
+    def fail_item(self, item_id, worker_id, error):
+        """Record a failed attempt; the item is retried until it runs out of attempts"""
+        conn = self.conn
+        with span("fail_item", "db", item_id=item_id), conn:
+            conn.execute(
+                """
+                UPDATE job_items
+                SET state = CASE WHEN attempts >= ? THEN ? ELSE ? END,
+                    error = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ?
+                WHERE id = ? AND lease_owner = ?
+                """,
+                (self.max_attempts, JOB_ITEM_FAILED, JOB_ITEM_PENDING, str(error), time.time(), item_id, worker_id),
+            )
+
+    def release_items(self, job_id, worker_id):
+        """Return a worker's unfinished items to the queue, e.g. when it is stopped"""
+        conn = self.conn
+        with conn:
+            # The interrupted attempt does not count against the item
+            conn.execute(
+                """
+                UPDATE job_items SET state = ?, attempts = MAX(attempts - 1, 0), lease_owner = NULL,
+                       lease_expires = NULL, updated_at = ?
+                WHERE job_id = ? AND lease_owner = ? AND state = ?
+                """,
+                (JOB_ITEM_PENDING, time.time(), job_id, worker_id, JOB_ITEM_RUNNING),
+            )
+
+    def job_counts(self, job_id):
+        """Return {state: number of items} for a job"""
+        rows = self.conn.execute(
+            "SELECT state, COUNT(*) FROM job_items WHERE job_id = ? GROUP BY state", (job_id,)
+        ).fetchall()
+        counts = {JOB_ITEM_PENDING: 0, JOB_ITEM_RUNNING: 0, JOB_ITEM_DONE: 0, JOB_ITEM_FAILED: 0}
+        counts.update(dict(rows))
+        return counts
+
+    def job_results(self, job_id):
+        """Return the stored result of every finished item, and an error result for every failed one"""
+        results = []
+        for pdf_path, state, result, error in self.conn.execute(
+            "SELECT pdf_path, state, result, error FROM job_items WHERE job_id = ? AND state IN (?, ?) ORDER BY id",
+            (job_id, JOB_ITEM_DONE, JOB_ITEM_FAILED),
+        ):
+            if state == JOB_ITEM_DONE and result:
+                results.append(json.loads(result))
+            else:
+                results.append({
+                    "path": pdf_path,
+                    "filename": os.path.basename(pdf_path),
+                    "status": "failed",
+                    "error": error or "Unknown error",
+                })
+        return results
+
+    def finish_job(self, job_id):
+        """Mark a job finished once none of its items are pending or running
+
+        Returns:
+            bool: True if the job is finished
+        """
+        counts = self.job_counts(job_id)
+        if counts[JOB_ITEM_PENDING] or counts[JOB_ITEM_RUNNING]:
+            return False
+        conn = self.conn
+        with conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'finished', finished_at = CURRENT_TIMESTAMP WHERE id = ? AND status != 'finished'",
+                (job_id,),
+            )
+        return True
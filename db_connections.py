@@ -0,0 +1,141 @@
+"""
+Process-wide SQLite connection management
+
+Every database file gets one ConnectionManager per process. It hands out one
+persistent connection per thread (opened and configured on first use, with a
+large prepared-statement cache), caches each table's column list so callers do
+not run PRAGMA table_info on every query, and takes backups through the SQLite
+online backup API on a schedule instead of copying the file on every start.
+
+This module does not import PySide6 and is shared by the GUI, the extraction
+engine and the command-line tools. Threads that finish before the process does
+(pool workers, QThreads) call close_thread_connections() on their way out,
+so their connections do not outlive them.
+"""
+
+import os
+import time
+import sqlite3
+import threading
+
+# Seconds between scheduled backups
+DEFAULT_BACKUP_INTERVAL = 6 * 60 * 60
+
+# Prepared statements kept per connection (sqlite3's default is 128)
+STATEMENT_CACHE_SIZE = 512
+
+
+class ConnectionManager:
+    """Per-thread persistent connections, schema cache and scheduled backups for one database file"""
+
+    def __init__(self, db_path, timeout=30.0):
+        self.db_path = db_path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._connections = []  # every connection opened, so close_all can reach other threads' ones
+        self._schema = {}
+        self._lock = threading.Lock()
+
+    def connection(self):
+        """Return this thread's connection, opening it on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=self.timeout, cached_statements=STATEMENT_CACHE_SIZE,
+                                   check_same_thread=False)
+            if self.db_path != ":memory:":
+                conn.execute("PRAGMA journal_mode=WAL")  # Use Write-Ahead Logging for better concurrency
+                conn.execute("PRAGMA synchronous=NORMAL")  # Balance between safety and performance
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def table_columns(self, table):
+        """Return the column names of a table, read once and then cached"""
+        with self._lock:
+            columns = self._schema.get(table)
+        if columns is None:
+            columns = [row[1] for row in self.connection().execute(f"PRAGMA table_info({table})")]
+            with self._lock:
+                self._schema[table] = columns
+        return columns
+
+    def refresh_schema(self):
+        """Forget cached column lists; call after altering a table"""
+        with self._lock:
+            self._schema.clear()
+
+    def backup(self, backup_path):
+        """Copy the live database to backup_path with the online backup API
+
+        Unlike copying the file, this includes pages still in the WAL and is
+        consistent even while other connections are writing.
+        """
+        target = sqlite3.connect(backup_path)
+        try:
+            self.connection().backup(target)
+        finally:
+            target.close()
+        return backup_path
+
+    def backup_if_due(self, backup_path=None, interval=DEFAULT_BACKUP_INTERVAL):
+        """Back up the database when the last backup is older than interval seconds
+
+        Returns:
+            str or None: The backup path if a backup was taken
+        """
+        backup_path = backup_path or f"{self.db_path}.bak"
+        if not os.path.exists(self.db_path) or os.path.getsize(self.db_path) == 0:
+            return None
+        if os.path.exists(backup_path) and time.time() - os.path.getmtime(backup_path) < interval:
+            return None
+        return self.backup(backup_path)
+
+    def close_thread_connection(self):
+        """Close the calling thread's connection"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            self._local.conn = None
+            with self._lock:
+                if conn in self._connections:
+                    self._connections.remove(conn)
+            conn.close()
+
+    def close_all(self):
+        """Close every connection this manager opened"""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
+
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+def get_connection_manager(db_path):
+    """Return the process-wide ConnectionManager of a database file"""
+    key = db_path if db_path == ":memory:" else os.path.abspath(db_path)
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None:
+            manager = ConnectionManager(db_path)
+            _managers[key] = manager
+        return manager
+
+
+def get_connection(db_path):
+    """Return the calling thread's persistent connection to a database file"""
+    return get_connection_manager(db_path).connection()
+
+
+def close_thread_connections():
+    """Close the calling thread's connections to every database; worker threads call this before they exit"""
+    with _managers_lock:
+        managers = list(_managers.values())
+    for manager in managers:
+        manager.close_thread_connection()
@@ -0,0 +1,158 @@
+"""
+One PDF opened once for every extraction stage
+
+DocumentContext reads a PDF file into memory once and serves every stage of
+its extraction from that copy: the page count, page geometry and text layers
+come from a single PyMuPDF document opened on the buffer, and the table
+parser runs through read_pdf(), which lays out each page's text once and
+reuses it for every later call on that page instead of re-parsing the file.
+Nothing is opened until first use, and close() (or leaving a with block)
+releases the document, the parsed pages and the copy of the file.
+
+A context may be shared by the threads extracting different page ranges of
+one file; access to the PyMuPDF document is serialized.
+
+Files larger than MAX_IN_MEMORY_BYTES are not read into memory; the parser
+then opens them by path as before.
+"""
+
+import os
+import threading
+
+import fitz  # PyMuPDF
+
+from metrics import get_metrics
+from page_geometry import DEFAULT_ZOOM, PageTransform
+from page_text_cache import PageTextCache
+from pdf_source import is_pdf_buffer, load_pdf_source, open_pdf, parser_input, source_name
+
+# Larger files are parsed from their path instead of an in-memory copy
+MAX_IN_MEMORY_BYTES = 256 * 1024 * 1024
+
+# Parsed page layouts kept per document; extraction moves through the pages in order
+MAX_CACHED_LAYOUTS = 8
+
+
+class DocumentContext:
+    """A PDF (path or in-memory contents) shared by all stages of one file's extraction
+
+    Args:
+        source: Path, bytes, bytearray, memoryview or binary file-like object
+        max_cached_pages: Parsed page layouts kept for read_pdf
+    """
+
+    def __init__(self, source, max_cached_pages=MAX_CACHED_LAYOUTS):
+        self.name = source_name(source)
+        self.path = os.fspath(source) if isinstance(source, (str, os.PathLike)) else None
+        self._source = source
+        self._loaded = False
+        self._document = None
+        self._page_count = None
+        self._words = {}
+        self._transforms = {}
+        self._text_cache = None
+        self._max_cached_pages = max_cached_pages
+        self._lock = threading.RLock()
+
+    @property
+    def source(self):
+        """The PDF as bytes, or as its path when it is too large to hold in memory"""
+        with self._lock:
+            if not self._loaded:
+                source = self._source
+                if self.path is not None and os.path.getsize(self.path) <= MAX_IN_MEMORY_BYTES:
+                    with open(self.path, "rb") as f:
+                        source = f.read()
+                self._source = load_pdf_source(source)
+                self._loaded = True
+            return self._source
+
+    @property
+    def in_memory(self):
+        return is_pdf_buffer(self.source)
+
+    @property
+    def document(self):
+        """The PyMuPDF document, opened on first use
+
+        PyMuPDF documents are not thread-safe; code sharing the context
+        between threads uses the accessors below instead.
+        """
+        with self._lock:
+            if self._document is None:
+                source = self.source
+                with get_metrics().time("pdf_open_seconds"):
+                    self._document = open_pdf(source)
+            return self._document
+
+    @property
+    def page_count(self):
+        with self._lock:
+            if self._page_count is None:
+                self._page_count = len(self.document)
+            return self._page_count
+
+    def page_transform(self, page_index, zoom=DEFAULT_ZOOM):
+        """Screen/PDF coordinate transform of a page (see page_geometry.PageTransform)"""
+        key = (page_index, zoom)
+        with self._lock:
+            if key not in self._transforms:
+                self._transforms[key] = PageTransform(self.document[page_index], zoom)
+            return self._transforms[key]
+
+    def page_words(self, page_index):
+        """Text layer of a page as PyMuPDF words (x0, y0, x1, y1, word, block, line, word_no)"""
+        with self._lock:
+            if page_index not in self._words:
+                self._words[page_index] = self.document[page_index].get_text("words")
+            return self._words[page_index]
+
+    def page_text(self, page_index, option="dict"):
+        """Text layer of a page in one of PyMuPDF's get_text formats (not cached)"""
+        with self._lock:
+            return self.document[page_index].get_text(option)
+
+    def save_page(self, page_number, path):
+        """Write one page (1-based) to its own PDF file, as the table parser reads it"""
+        with self._lock, fitz.open() as page_pdf:
+            page_pdf.insert_pdf(self.document, from_page=page_number - 1, to_page=page_number - 1)
+            page_pdf.save(path)
+
+    @property
+    def text_cache(self):
+        """The document's parser handle: a PageTextCache that splits pages out of this document"""
+        with self._lock:
+            if self._text_cache is None:
+                self._text_cache = PageTextCache(self._max_cached_pages, document=self)
+            return self._text_cache
+
+    def read_pdf(self, **params):
+        """Extract tables like pypdf_table_extraction.read_pdf, parsing each page's text once"""
+        return self.text_cache.read_pdf(self.source, **params)
+
+    def parser_input(self):
+        """Input for pypdf_table_extraction.read_pdf: a fresh stream over the buffer, or the path"""
+        return parser_input(self.source)
+
+    def close(self):
+        """Release the PyMuPDF document, the parsed pages and the copy of the file"""
+        with self._lock:
+            if self._text_cache is not None:
+                self._text_cache.close()
+                self._text_cache = None
+            if self._document is not None:
+                self._document.close()
+                self._document = None
+            self._words.clear()
+            self._transforms.clear()
+            if self.path is not None:
+                # Reopening after close reads the file again
+                self._source = self.path
+                self._loaded = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
@@ -0,0 +1,135 @@
+"""
+Execution policy: every parallelism decision of a run in one place
+
+A run has at most one level of parallelism. plan_execution() sizes the outer
+worker pool (threads, page-range tasks or processes) against the CPU count and
+derives everything below it from that:
+
+    - read_pdf runs single-threaded (parallel=False) whenever an outer pool
+      exists, so a pool of workers never starts a pool of its own per region
+    - native math libraries (OpenBLAS, MKL, OpenMP, numexpr) get
+      cpu_count // workers threads each instead of one thread per CPU in
+      every worker
+
+apply() installs the policy for the current process. Process-pool workers
+call it again from their initializer, since thread caps are per process.
+The environment variables are only read when a library starts its pool, and
+numpy is already loaded by then, so the caps rely on threadpoolctl to resize
+the pools that are running.
+"""
+
+import os
+import sys
+import logging
+
+# Environment variables read by the native thread pools of numpy's BLAS, OpenMP and numexpr
+THREAD_LIMIT_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+)
+
+try:
+    # Limits thread pools of libraries that are already loaded (see requirements.txt)
+    from threadpoolctl import threadpool_limits
+except ImportError:
+    threadpool_limits = None
+
+logger = logging.getLogger(__name__)
+
+# Modules whose native thread pools start when they are imported
+NATIVE_POOL_MODULES = ("numpy", "pandas", "numexpr")
+
+_missing_threadpoolctl_reported = False
+
+
+class ExecutionPolicy:
+    """Parallelism settings of a run
+
+    Attributes:
+        workers: Size of the outer worker pool
+        executor_type: 'thread' or 'process'
+        native_threads: Threads each worker may use in native math libraries
+        inner_parallel: Whether library calls may start workers of their own
+    """
+
+    def __init__(self, workers=1, executor_type="thread", native_threads=None, inner_parallel=False):
+        self.workers = max(1, workers)
+        self.executor_type = executor_type
+        self.native_threads = native_threads
+        self.inner_parallel = inner_parallel
+
+    @property
+    def outer_pool(self):
+        """True when files or pages already run in parallel outside the library calls"""
+        return self.workers > 1 or self.executor_type == "process"
+
+    @property
+    def read_pdf_parallel(self):
+        """parallel= argument for pypdf_table_extraction.read_pdf"""
+        return self.inner_parallel and not self.outer_pool
+
+    def apply(self):
+        """Make this the current process's policy and cap native thread pools"""
+        global _current_policy
+        _current_policy = self
+        if self.native_threads:
+            for name in THREAD_LIMIT_ENV_VARS:
+                os.environ[name] = str(self.native_threads)
+            if threadpool_limits is not None:
+                threadpool_limits(limits=self.native_threads)
+            else:
+                _report_missing_threadpoolctl(self.native_threads)
+        return self
+
+    def describe(self):
+        return (f"{self.workers} {self.executor_type} workers, "
+                f"{self.native_threads or 'default'} native threads each, "
+                f"read_pdf parallel={'on' if self.read_pdf_parallel else 'off'}")
+
+
+def _report_missing_threadpoolctl(native_threads):
+    """Warn once that the caps cannot reach pools started before apply()"""
+    global _missing_threadpoolctl_reported
+    loaded = [name for name in NATIVE_POOL_MODULES if name in sys.modules]
+    if loaded and not _missing_threadpoolctl_reported:
+        _missing_threadpoolctl_reported = True
+        logger.warning(
+            "threadpoolctl is not installed: the cap of %s native threads per worker does not apply to %s, "
+            "which started its thread pools on import",
+            native_threads, ", ".join(loaded),
+        )
+
+
+def plan_execution(requested_workers=None, executor_type="thread", task_count=None, cpu_count=None):
+    """Decide the outer pool size and the per-worker thread caps
+
+    Args:
+        requested_workers: Workers asked for (default: one per CPU); never
+            more than the CPU count, since extraction is CPU bound
+        executor_type: 'thread' or 'process'
+        task_count: Number of files or tasks, when known; no more workers
+            than tasks are started
+        cpu_count: CPUs to plan for (default: os.cpu_count())
+
+    Returns:
+        ExecutionPolicy
+    """
+    cpus = cpu_count or os.cpu_count() or 1
+    workers = min(requested_workers or cpus, cpus)
+    if task_count is not None:
+        workers = min(workers, max(task_count, 1))
+    return ExecutionPolicy(
+        workers, executor_type, native_threads=max(1, cpus // workers), inner_parallel=workers == 1
+    )
+
+
+# Until a run installs its own policy, library calls stay single-threaded
+_current_policy = ExecutionPolicy()
+
+
+def get_execution_policy():
+    """Return the policy installed by the current run"""
+    return _current_policy
@@ -0,0 +1,1050 @@
+"""
+Headless extraction engine for PDF Harvest
+
+This module holds everything needed to run template-based table extraction
+without a GUI: template loading, page planning (single / fixed / middle-page),
+region and column-line normalization, the pypdf_table_extraction calls, regex
+filtering and extraction status rollup.
+
+It must never import PySide6 so that the command-line tools and batch nodes can
+use it without paying for the GUI stack. BulkProcessor, main.py and
+pdf_extractor_cli.py all delegate to the functions defined here.
+"""
+
+import logging
+import json
+import hashlib
+import threading
+
+import pandas as pd
+import pypdf_table_extraction
+
+from db_connections import get_connection
+from document_context import DocumentContext
+from execution_policy import get_execution_policy
+from metrics import get_metrics
+from tracing import span
+from pdf_source import open_pdf, parser_input
+from regex_filter import compile_pattern, compile_patterns, find_boundaries, row_texts, skip_mask
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = "invoice_templates.db"
+SECTIONS = ("header", "items", "summary")
+
+# Bump whenever a change to the engine can change extraction output; it is part
+# of the result cache key so stale cached results are never reused
+ENGINE_VERSION = "5"
+
+# Template fields that affect extraction output
+TEMPLATE_FINGERPRINT_FIELDS = (
+    "template_type", "regions", "column_lines", "config", "page_count",
+    "page_regions", "page_column_lines", "page_configs",
+)
+
+# Column lines closer than this (in PDF points) are merged when item regions are combined
+COLUMN_DEDUP_THRESHOLD = 5
+
+# Default number of pages handled per chunk by extract_invoice_tables
+DEFAULT_CHUNK_SIZE = 50
+
+
+class ExtractionCancelled(Exception):
+    """Raised inside an extraction when its should_stop callback returns True"""
+
+
+def _check_stop(should_stop):
+    """Raise ExtractionCancelled if the caller asked to stop"""
+    if should_stop is not None and should_stop():
+        raise ExtractionCancelled("Extraction cancelled")
+
+
+def load_template_from_database(template_id, db_path=DEFAULT_DB_PATH):
+    """Load a template from the database and decode its JSON fields
+
+    Args:
+        template_id: ID of the template to load
+        db_path: Path to the templates database
+
+    Returns:
+        dict: Template data, or None if the template does not exist
+    """
+    with get_metrics().time("template_load_seconds"), span("load_template", "db", template_id=template_id):
+        return _load_template(template_id, db_path)
+
+
+def _load_template(template_id, db_path):
+    """Query and decode one templates row (see load_template_from_database)"""
+    # Persistent per-thread connection; the query stays in its prepared-statement cache
+    cursor = get_connection(db_path).cursor()
+    cursor.execute(
+        """
+        SELECT id, name, description, template_type, regions, column_lines, config, creation_date,
+               page_count, page_regions, page_column_lines, page_configs, last_modified
+        FROM templates WHERE id = ?
+    """,
+        (template_id,),
+    )
+    template = cursor.fetchone()
+
+    if not template:
+        logger.warning("Template with ID %s not found", template_id)
+        return None
+
+    template_data = {
+        "id": template[0],
+        "name": template[1],
+        "description": template[2],
+        "template_type": template[3],
+        "regions": json.loads(template[4]),
+        "column_lines": json.loads(template[5]),
+        "config": json.loads(template[6]),
+        "creation_date": template[7],
+        "page_count": template[8] if template[8] else 1,
+        "last_modified": template[12] or template[7],
+    }
+
+    # Multi-page data is only present for multi-page templates
+    if template[9]:
+        template_data["page_regions"] = json.loads(template[9])
+    if template[10]:
+        template_data["page_column_lines"] = json.loads(template[10])
+    if template[11]:
+        template_data["page_configs"] = json.loads(template[11])
+
+    return template_data
+
+
+def get_page_mode(template_data):
+    """Return the page mode of a template: 'single', 'fixed', 'middle' or 'multi'"""
+    if template_data.get("template_type") != "multi":
+        return "single"
+
+    config = template_data.get("config", {})
+    if config.get("fixed_page_count", False):
+        return "fixed"
+    if config.get("use_middle_page", False):
+        return "middle"
+    return "multi"
+
+
+def plan_pages(template_data, pdf_page_count):
+    """Determine which (0-based) pages of a PDF should be processed for a template"""
+    mode = get_page_mode(template_data)
+
+    if mode == "single":
+        return [0] if pdf_page_count > 0 else []
+
+    if mode == "middle":
+        # First, every middle page and the last page; a one-page PDF is both first and last
+        return list(range(pdf_page_count))
+
+    # Fixed and standard multi-page templates process up to the template's page count
+    template_page_count = template_data.get("page_count", 1)
+    return list(range(min(template_page_count, pdf_page_count)))
+
+
+def _combine_page_entries(first, last):
+    """Merge the per-section lists of a first-page and last-page template entry"""
+    combined = {}
+    for entry in (first, last):
+        if not isinstance(entry, dict):
+            continue
+        for section in SECTIONS:
+            if section in entry:
+                combined.setdefault(section, [])
+                combined[section].extend(entry.get(section, []))
+    return combined
+
+
+def normalize_column_lines(column_lines):
+    """Return column lines as a dict keyed by section
+
+    Older single-page templates sometimes store column lines as a list whose
+    first entry is the section dict.
+    """
+    if isinstance(column_lines, dict):
+        return column_lines
+    if isinstance(column_lines, list) and column_lines and isinstance(column_lines[0], dict):
+        return column_lines[0]
+    return {}
+
+
+def get_page_layout(template_data, page_index, pdf_page_count):
+    """Return the (regions, column_lines) template entries to use for a PDF page
+
+    Returns:
+        tuple: (regions, column_lines) dicts keyed by section, or (None, None)
+        when the template has no data for the page
+    """
+    mode = get_page_mode(template_data)
+
+    if mode == "single":
+        return template_data.get("regions", {}), normalize_column_lines(template_data.get("column_lines", {}))
+
+    page_regions = template_data.get("page_regions", [])
+    page_column_lines = template_data.get("page_column_lines", [])
+
+    if mode == "middle":
+        if pdf_page_count == 1:
+            # A single-page PDF gets both the first and the last page regions
+            regions = _combine_page_entries(
+                page_regions[0] if len(page_regions) >= 1 else None,
+                page_regions[2] if len(page_regions) >= 3 else None,
+            )
+            column_lines = _combine_page_entries(
+                page_column_lines[0] if len(page_column_lines) >= 1 else None,
+                page_column_lines[2] if len(page_column_lines) >= 3 else None,
+            )
+            return regions, column_lines
+
+        if page_index == 0:
+            role_index = 0
+        elif page_index == pdf_page_count - 1 and len(page_regions) >= 3:
+            role_index = 2
+        else:
+            # Middle pages, and the last page of a template without last-page regions
+            role_index = 1
+
+        if role_index >= len(page_regions):
+            return {}, {}
+        column_lines = page_column_lines[role_index] if role_index < len(page_column_lines) else {}
+        return page_regions[role_index], column_lines
+
+    # Fixed and standard multi-page templates use the exact page index
+    if page_index >= len(page_regions):
+        return None, None
+    column_lines = page_column_lines[page_index] if page_index < len(page_column_lines) else {}
+    return page_regions[page_index], column_lines
+
+
+def region_to_coords(region):
+    """Convert a stored region into an (x1, y1, x2, y2) tuple in PDF points
+
+    Supports the single-page viewer format {x1, y1, x2, y2} and the
+    multi-page viewer format [{x, y}, {x, y}].
+    """
+    if isinstance(region, dict):
+        return (region.get("x1", 0), region.get("y1", 0), region.get("x2", 0), region.get("y2", 0))
+    if isinstance(region, list) and len(region) >= 2:
+        return (region[0].get("x", 0), region[0].get("y", 0), region[1].get("x", 0), region[1].get("y", 0))
+    return None
+
+
+def column_line_x(line, region_idx):
+    """Return the x position of a stored column line for a region, or None
+
+    Lines stored as [{x,y}, {x,y}, region_idx] only apply to their own region.
+    All other formats (two-point lists, {x}/{x1}/{value}/{position} dicts,
+    plain numbers and numeric strings) apply to every region.
+    """
+    if isinstance(line, list):
+        if len(line) >= 3:
+            return line[0].get("x", 0) if line[2] == region_idx else None
+        if len(line) == 2:
+            return line[0].get("x", 0)
+        return None
+
+    if isinstance(line, dict):
+        for key in ("x", "x1"):
+            if key in line:
+                return line.get(key, 0)
+        if "value" in line and isinstance(line["value"], (int, float)):
+            return line["value"]
+        if "position" in line:
+            return line["position"]
+        for val in line.values():
+            if isinstance(val, (int, float)):
+                return val
+        return None
+
+    if isinstance(line, (int, float)):
+        return line
+
+    if isinstance(line, str):
+        try:
+            return float(line)
+        except ValueError:
+            return None
+
+    return None
+
+
+def format_columns(column_positions):
+    """Format column x positions as the comma separated string read_pdf expects"""
+    return ",".join(str(x) for x in sorted(column_positions)) if column_positions else ""
+
+
+def format_table_area(x1, y1, x2, y2):
+    """Format region coordinates as a read_pdf table area string"""
+    return f"{x1},{y1},{x2},{y2}"
+
+
+def combine_item_areas(table_areas, columns_list):
+    """Merge several item regions into one bounding area with deduplicated columns"""
+    area_coords = [[float(c) for c in area.split(",")] for area in table_areas]
+    x_coords = [c[0] for c in area_coords] + [c[2] for c in area_coords]
+    y_coords = [c[1] for c in area_coords] + [c[3] for c in area_coords]
+    combined_area = format_table_area(min(x_coords), min(y_coords), max(x_coords), max(y_coords))
+
+    all_columns = set()
+    for col_str in columns_list:
+        if col_str:
+            all_columns.update(float(col) for col in col_str.split(","))
+    all_columns_list = sorted(all_columns)
+
+    # Remove columns that are too close to each other
+    if len(all_columns_list) > 1:
+        deduplicated = [all_columns_list[0]]
+        for x in all_columns_list[1:]:
+            if x - deduplicated[-1] >= COLUMN_DEDUP_THRESHOLD:
+                deduplicated.append(x)
+        all_columns_list = deduplicated
+
+    return [combined_area], [format_columns(all_columns_list)]
+
+
+def build_section_areas(section, section_regions, section_column_lines):
+    """Build the read_pdf table areas and column strings for one section of a page
+
+    Returns:
+        tuple: (table_areas, columns_list) with one entry per region
+    """
+    if isinstance(section_column_lines, dict):
+        section_column_lines = [section_column_lines]
+    elif not isinstance(section_column_lines, list):
+        section_column_lines = []
+
+    table_areas = []
+    columns_list = []
+    for region_idx, region in enumerate(section_regions):
+        coords = region_to_coords(region)
+        if coords is None:
+            logger.warning("Unrecognized region format: %s", region)
+            continue
+
+        table_areas.append(format_table_area(*coords))
+        region_columns = []
+        for line in section_column_lines:
+            x_val = column_line_x(line, region_idx)
+            if x_val is not None:
+                region_columns.append(x_val)
+        columns_list.append(format_columns(region_columns))
+
+    # Multiple item regions are extracted as one table
+    if section == "items" and len(table_areas) > 1:
+        table_areas, columns_list = combine_item_areas(table_areas, columns_list)
+
+    return table_areas, columns_list
+
+
+def resolve_extraction_params(config, section):
+    """Resolve row_tol, split_text, strip_text and flavor for a section
+
+    row_tol is looked up in extraction_params.<section>, then config.<section>,
+    then the global config. A missing row_tol is an error.
+    """
+    extraction_params = config.get("extraction_params", {})
+    section_params = extraction_params.get(section, {})
+
+    row_tol = section_params.get("row_tol", None)
+    if row_tol is None:
+        row_tol = config.get(section, {}).get("row_tol", None)
+    if row_tol is None:
+        row_tol = config.get("row_tol", None)
+    if row_tol is None:
+        raise ValueError(f"ERROR: No row_tol defined for {section} in database config")
+
+    return {
+        "row_tol": row_tol,
+        "split_text": extraction_params.get("split_text", config.get("split_text", True)),
+        "strip_text": extraction_params.get("strip_text", config.get("strip_text", "\n")),
+        "flavor": extraction_params.get("flavor", config.get("flavor", "stream")),
+    }
+
+
+def find_regex_patterns(template_data, page_index, section):
+    """Find the regex patterns for a section: page config, then section config, then global"""
+    config = template_data.get("config", {})
+
+    if template_data.get("template_type") == "multi" and "page_configs" in template_data:
+        page_configs = template_data.get("page_configs") or []
+        if page_index < len(page_configs):
+            page_config = page_configs[page_index] or {}
+            if section in page_config and "regex_patterns" in page_config[section]:
+                return page_config[section]["regex_patterns"]
+
+    if section in config and "regex_patterns" in config[section]:
+        return config[section]["regex_patterns"]
+
+    if "regex_patterns" in config and section in config["regex_patterns"]:
+        return config["regex_patterns"][section]
+
+    return None
+
+
+def basic_clean(df):
+    """Turn blank cells into NA and drop rows and columns that are entirely empty"""
+    df = df.replace(r"^\s*$", pd.NA, regex=True)
+    df = df.dropna(how="all")
+    return df.dropna(axis=1, how="all")
+
+
+def apply_regex_to_dataframe(df, regex_patterns):
+    """Apply start/end/skip regex patterns to filter rows of an extracted table
+
+    Patterns may be strings or compiled patterns (see compile_patterns). Start
+    and end are matched against each row's joined text, skip against each cell.
+
+    Returns:
+        tuple: (filtered DataFrame, {"status": ..., "reason": ...})
+    """
+    if df is None or df.empty:
+        return df, {"status": "failed", "reason": "Empty input data"}
+
+    if not regex_patterns:
+        return df, {"status": "partial", "reason": "No regex patterns"}
+
+    # Empty and invalid patterns are treated as not set
+    start_pattern = compile_pattern(regex_patterns.get("start"))
+    end_pattern = compile_pattern(regex_patterns.get("end"))
+    skip_pattern = compile_pattern(regex_patterns.get("skip"))
+
+    if not (start_pattern or end_pattern or skip_pattern):
+        return df, {"status": "partial", "reason": "No valid regex patterns"}
+
+    orig_row_count = len(df)
+
+    if start_pattern or end_pattern:
+        try:
+            boundaries = find_boundaries(row_texts(df), start_pattern, end_pattern)
+        except Exception as e:
+            return df, {"status": "partial", "reason": f"Error in boundary detection: {str(e)}"}
+
+        # A start pattern that never matches means the table is not present
+        if boundaries is None:
+            return pd.DataFrame(), {"status": "failed", "reason": f"Start pattern '{start_pattern.pattern}' not found"}
+
+        start_pos, end_pos = boundaries
+        df = df.iloc[start_pos:end_pos + 1]
+
+    if skip_pattern and not df.empty:
+        try:
+            df = df[~skip_mask(df, skip_pattern, per_cell=True)]
+
+            if df.empty:
+                return df, {"status": "failed", "reason": "All rows filtered out by skip pattern"}
+        except Exception as e:
+            logger.error("Error applying skip pattern: %s", e)
+
+    final_status = "success"
+    reason = "Regex patterns applied successfully"
+
+    if df.empty:
+        final_status = "failed"
+        reason = "No data remained after applying patterns"
+    elif len(df) < orig_row_count * 0.5 and orig_row_count > 10:
+        final_status = "partial"
+        reason = f"Only {len(df)} of {orig_row_count} rows remained after filtering"
+    elif len(df) < 5 and orig_row_count > 10:
+        final_status = "partial"
+        reason = f"Only {len(df)} rows extracted from {orig_row_count}"
+
+    return df, {"status": final_status, "reason": reason}
+
+
+def clean_dataframe(df, section, config):
+    """Clean a DataFrame using the config's regex patterns for a section"""
+    if df is None or df.empty:
+        return df
+
+    regex_patterns = config.get("regex_patterns", {}).get(section, {})
+    start_pattern = regex_patterns.get("start", None)
+    end_pattern = regex_patterns.get("end", None)
+    skip_pattern = regex_patterns.get("skip", None)
+
+    texts = row_texts(df)
+
+    if start_pattern or end_pattern:
+        boundaries = find_boundaries(texts, start_pattern, end_pattern)
+        if boundaries is None:
+            return pd.DataFrame()
+        start_pos, end_pos = boundaries
+        df = df.iloc[start_pos:end_pos + 1]
+        texts = texts.iloc[start_pos:end_pos + 1]
+
+    if skip_pattern:
+        df = df[~skip_mask(df, skip_pattern, texts=texts)]
+
+    df = basic_clean(df)
+    for col in df.columns:
+        if df[col].dtype == object:
+            df[col] = df[col].apply(lambda x: x.strip() if isinstance(x, str) else x)
+
+    return df
+
+
+def _read_pdf(pdf_path, **params):
+    """Run the table parser on a path, a bytes buffer or a DocumentContext (which parses each page once)"""
+    if isinstance(pdf_path, DocumentContext):
+        return pdf_path.read_pdf(**params)
+    return pypdf_table_extraction.read_pdf(parser_input(pdf_path), **params)
+
+
+def read_region_table(pdf_path, page_number, table_area, columns, params):
+    """Extract one table area from one page with pypdf_table_extraction
+
+    Args:
+        pdf_path: Path to the PDF file, its contents as bytes (see
+            pdf_source.load_pdf_source) or a DocumentContext
+        page_number: 1-based page number
+        table_area: Table area string "x1,y1,x2,y2" in PDF points
+        columns: Column string "x1,x2,..." or empty/None for automatic columns
+        params: Dict with row_tol, split_text, strip_text and flavor
+
+    Returns:
+        DataFrame or None when no table was detected
+    """
+    metrics = get_metrics()
+    metrics.inc("read_pdf_calls_total")
+    with metrics.time("region_parse_seconds"), span("read_pdf", "region", page=page_number, regions=1):
+        table_result = _read_pdf(
+            pdf_path,
+            pages=str(page_number),
+            table_areas=[table_area],
+            columns=[columns] if columns else None,
+            split_text=params.get("split_text", True),
+            strip_text=params.get("strip_text", "\n"),
+            flavor=params.get("flavor", "stream"),
+            row_tol=params.get("row_tol"),
+            parallel=get_execution_policy().read_pdf_parallel,
+        )
+
+    if table_result and len(table_result) > 0 and hasattr(table_result[0], "df"):
+        return table_result[0].df
+    return None
+
+
+def _params_key(params):
+    """Return a hashable key for read_pdf parameters that must be shared by one call"""
+    return (params.get("flavor", "stream"), params.get("row_tol"), params.get("split_text", True), params.get("strip_text", "\n"))
+
+
+def _normalize_bbox(coords):
+    """Return a bbox as (min x, min y, max x, max y), whatever corners it was given by"""
+    x1, y1, x2, y2 = (float(c) for c in coords)
+    return (min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2))
+
+
+def _area_bbox(table_area):
+    """Return the bbox the table parser stores for a table area string"""
+    return _normalize_bbox(table_area.split(","))
+
+
+def read_page_tables(pdf_path, page_number, table_areas, columns_list, params):
+    """Extract several table areas of one page from a single page parse
+
+    All areas must share the same extraction parameters since read_pdf only
+    accepts one row_tol/split_text/strip_text/flavor per call.
+
+    Returns:
+        list: One DataFrame (or None when no table was detected) per table area,
+        in the same order as table_areas
+    """
+    if not table_areas:
+        return []
+    if len(table_areas) == 1:
+        return [read_region_table(pdf_path, page_number, table_areas[0], columns_list[0], params)]
+
+    # The parser keys tables by their (min x, min y, max x, max y) bbox, so areas with
+    # the same bbox are one table; their later copies are read on their own below.
+    first_by_bbox = {}
+    for i, area in enumerate(table_areas):
+        first_by_bbox.setdefault(_area_bbox(area), i)
+    unique = list(first_by_bbox.values())
+
+    # It numbers tables by descending bbox[1] (a stable sort) and picks columns by
+    # that number, so hand it the areas already in that order.
+    order = sorted(unique, key=lambda i: _area_bbox(table_areas[i])[1], reverse=True)
+    sorted_areas = [table_areas[i] for i in order]
+    sorted_columns = [columns_list[i] or "" for i in order]
+
+    metrics = get_metrics()
+    metrics.inc("read_pdf_calls_total")
+    with metrics.time("region_parse_seconds"), span("read_pdf", "region", page=page_number, regions=len(sorted_areas)):
+        table_result = _read_pdf(
+            pdf_path,
+            pages=str(page_number),
+            table_areas=sorted_areas,
+            columns=sorted_columns if any(sorted_columns) else None,
+            split_text=params.get("split_text", True),
+            strip_text=params.get("strip_text", "\n"),
+            flavor=params.get("flavor", "stream"),
+            row_tol=params.get("row_tol"),
+            parallel=get_execution_policy().read_pdf_parallel,
+        )
+    tables = list(table_result) if table_result else []
+
+    if not tables:
+        # Only returned for pages without any text, where no area has a table either
+        return [None] * len(table_areas)
+
+    frames = {}
+    if all(getattr(table, "_bbox", None) is not None for table in tables):
+        # Match tables back to their areas by bbox
+        unmatched = list(order)
+        for table in tables:
+            bbox = _normalize_bbox(table._bbox)
+            for i in unmatched:
+                if all(abs(a - b) < 0.01 for a, b in zip(_area_bbox(table_areas[i]), bbox)):
+                    frames[i] = table.df
+                    unmatched.remove(i)
+                    break
+    elif len(tables) == len(order):
+        for position, table in enumerate(tables):
+            frames[order[position]] = table.df
+
+    # Areas the shared parse did not return a table for (or that repeat an earlier area) are read on their own
+    return [
+        frames[i] if i in frames else read_region_table(pdf_path, page_number, area, columns, params)
+        for i, (area, columns) in enumerate(zip(table_areas, columns_list))
+    ]
+
+
+def template_fingerprint(template_data):
+    """Hash the parts of a template that affect extraction output"""
+    fields = {field: template_data.get(field) for field in TEMPLATE_FINGERPRINT_FIELDS}
+    encoded = json.dumps(fields, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class CompiledTemplate:
+    """A template resolved once for a whole batch
+
+    Region rectangles and column strings are built for every page role,
+    extraction parameters are resolved per section and regex patterns are
+    compiled, so per-file extraction does no template parsing or DB access.
+    Use compile_template() or get_compiled_template() to get a cached instance.
+    """
+
+    def __init__(self, template_data):
+        self.template_data = template_data
+        self.id = template_data.get("id")
+        self.name = template_data.get("name")
+        self.template_type = template_data.get("template_type", "single")
+        self.last_modified = template_data.get("last_modified")
+        self.page_count = template_data.get("page_count", 1)
+        self.mode = get_page_mode(template_data)
+        self.fingerprint = template_fingerprint(template_data)
+
+        # Extraction parameters per section; a missing row_tol only fails pages that use the section
+        config = template_data.get("config", {})
+        self.section_params = {}
+        self.param_errors = {}
+        for section in SECTIONS:
+            try:
+                self.section_params[section] = resolve_extraction_params(config, section)
+            except ValueError as e:
+                self.param_errors[section] = e
+
+        # (section, table_area, columns) lists for every page role, None when the role has no template data
+        self.role_areas = {}
+        for role, (regions, column_lines) in self._role_layouts().items():
+            self.role_areas[role] = None if regions is None else self._build_areas(regions, column_lines)
+
+        # Compiled regex patterns: page-specific overrides first, then the section/global patterns
+        page_configs = (template_data.get("page_configs") or []) if self.template_type == "multi" else []
+        self.page_patterns = [
+            {section: compile_patterns(find_regex_patterns(template_data, page_index, section)) for section in SECTIONS}
+            for page_index in range(len(page_configs))
+        ]
+        self.default_patterns = {
+            section: compile_patterns(find_regex_patterns(template_data, len(page_configs), section))
+            for section in SECTIONS
+        }
+
+    def _role_layouts(self):
+        """Return the template layout for every page role of this template"""
+        template_data = self.template_data
+        if self.mode == "single":
+            return {"single": get_page_layout(template_data, 0, 1)}
+        if self.mode == "middle":
+            return {
+                "only": get_page_layout(template_data, 0, 1),
+                "first": get_page_layout(template_data, 0, 3),
+                "middle": get_page_layout(template_data, 1, 3),
+                "last": get_page_layout(template_data, 2, 3),
+            }
+        page_regions = template_data.get("page_regions", [])
+        return {
+            page_index: get_page_layout(template_data, page_index, len(page_regions))
+            for page_index in range(len(page_regions))
+        }
+
+    @staticmethod
+    def _build_areas(regions, column_lines):
+        areas = []
+        for section in SECTIONS:
+            section_regions = regions.get(section)
+            if not section_regions:
+                continue
+            table_areas, columns_list = build_section_areas(section, section_regions, column_lines.get(section, []))
+            areas.extend((section, table_area, columns) for table_area, columns in zip(table_areas, columns_list))
+        return areas
+
+    def page_role(self, page_index, pdf_page_count):
+        """Return the role key of a page: 'single', 'only'/'first'/'middle'/'last' or the page index"""
+        if self.mode == "single":
+            return "single"
+        if self.mode == "middle":
+            if pdf_page_count == 1:
+                return "only"
+            if page_index == 0:
+                return "first"
+            if page_index == pdf_page_count - 1:
+                return "last"
+            return "middle"
+        return page_index
+
+    def plan_pages(self, pdf_page_count):
+        """Determine which (0-based) pages of a PDF should be processed"""
+        return plan_pages(self.template_data, pdf_page_count)
+
+    def patterns_for(self, page_index, section):
+        """Return the compiled regex patterns for a section of a page, or None"""
+        if page_index < len(self.page_patterns):
+            return self.page_patterns[page_index][section]
+        return self.default_patterns[section]
+
+    def page_jobs(self, page_index, pdf_page_count):
+        """Return the (section, table_area, columns, params, patterns) jobs for a page
+
+        Returns None when the template has no data for the page.
+        """
+        areas = self.role_areas.get(self.page_role(page_index, pdf_page_count))
+        if areas is None:
+            return None
+
+        jobs = []
+        for section, table_area, columns in areas:
+            if section in self.param_errors:
+                raise self.param_errors[section]
+            jobs.append((section, table_area, columns, self.section_params[section], self.patterns_for(page_index, section)))
+        return jobs
+
+
+# Compiled templates keyed by (template id, last_modified)
+_compiled_templates = {}
+_compiled_templates_lock = threading.Lock()
+
+
+def compile_template(template_data):
+    """Return a CompiledTemplate for template data, reusing the cached one for the same version"""
+    if isinstance(template_data, CompiledTemplate):
+        return template_data
+
+    template_id = template_data.get("id")
+    key = (template_id, template_data.get("last_modified"))
+    if template_id is None:
+        return CompiledTemplate(template_data)
+
+    with _compiled_templates_lock:
+        compiled = _compiled_templates.get(key)
+    if compiled is not None:
+        return compiled
+
+    compiled = CompiledTemplate(template_data)
+    with _compiled_templates_lock:
+        # Drop older versions of the same template
+        for stale_key in [k for k in _compiled_templates if k[0] == template_id]:
+            del _compiled_templates[stale_key]
+        _compiled_templates[key] = compiled
+    return compiled
+
+
+def get_compiled_template(template_id, db_path=DEFAULT_DB_PATH):
+    """Return the compiled template for an ID, only reloading it when last_modified changed
+
+    Returns:
+        CompiledTemplate or None if the template does not exist
+    """
+    row = get_connection(db_path).execute(
+        "SELECT COALESCE(last_modified, creation_date) FROM templates WHERE id = ?", (template_id,)
+    ).fetchone()
+
+    if row is None:
+        return None
+
+    with _compiled_templates_lock:
+        compiled = _compiled_templates.get((template_id, row[0]))
+    if compiled is not None:
+        return compiled
+
+    template_data = load_template_from_database(template_id, db_path)
+    return compile_template(template_data) if template_data else None
+
+
+def new_results():
+    """Create an empty results dictionary"""
+    return {
+        "header_tables": [],
+        "items_tables": [],
+        "summary_tables": [],
+        "no_tables_found": [],
+        "extraction_status": {
+            "header": "not_processed",
+            "items": "not_processed",
+            "summary": "not_processed",
+            "overall": "not_processed",
+        },
+    }
+
+
+def rollup_status(extraction_status):
+    """Compute the overall extraction status from the per-section statuses"""
+    if extraction_status["items"] == "success":
+        # Items are the most important section
+        return "success"
+    if (
+        extraction_status["items"] == "partial"
+        or extraction_status["header"] == "success"
+        or extraction_status["summary"] == "success"
+    ):
+        return "partial"
+    return "failed"
+
+
+def process_pages_chunk(pdf_path, template, page_indices, pdf_page_count, per_page=True, should_stop=None):
+    """Extract all sections for a chunk of pages
+
+    Args:
+        pdf_path: Path, bytes buffer or DocumentContext; a DocumentContext
+            lets every read of a page share one parse of its text
+        template: CompiledTemplate or template data dict
+        per_page: Parse each page once for all regions that share extraction
+            parameters instead of calling read_pdf once per region
+        should_stop: Optional callable checked before every read_pdf call;
+            ExtractionCancelled is raised when it returns True
+
+    Returns:
+        dict: Partial results in the same shape as new_results(), without the overall status
+    """
+    results = new_results()
+    template = compile_template(template)
+    metrics = get_metrics()
+
+    for page_index in page_indices:
+        _check_stop(should_stop)
+        with span("page", "page", page=page_index + 1):
+            try:
+                # Every region of the page is collected before any of them is read
+                jobs = template.page_jobs(page_index, pdf_page_count)
+                if jobs is None:
+                    logger.warning("No template data for page %s", page_index + 1)
+                    continue
+
+                frames = _read_page_jobs(pdf_path, page_index + 1, jobs, per_page, should_stop)
+                metrics.inc("pages_total")
+                metrics.inc("regions_total", len(jobs))
+
+                for (section, table_area, columns, params, regex_patterns), table_df in zip(jobs, frames):
+                    try:
+                        if isinstance(table_df, Exception):
+                            raise table_df
+                        if table_df is None or table_df.empty:
+                            results["no_tables_found"].append(
+                                {"page": page_index + 1, "section": section, "table_area": table_area}
+                            )
+                            continue
+
+                        table_df["pdf_page"] = page_index + 1
+                        table_df = basic_clean(table_df)
+
+                        table_status = "success"
+                        if regex_patterns:
+                            with metrics.time("regex_filter_seconds"):
+                                table_df, regex_status = apply_regex_to_dataframe(table_df, regex_patterns)
+                            table_status = regex_status["status"]
+
+                        if table_df.empty:
+                            continue
+
+                        metrics.inc("rows_total", len(table_df))
+
+                        results[f"{section}_tables"].append(table_df)
+                        results["extraction_status"][section] = table_status
+                    except Exception as e:
+                        logger.error(
+                            "Error extracting %s table on page %s: %s",
+                            section, page_index + 1, e, exc_info=True
+                        )
+
+            except ExtractionCancelled:
+                raise
+            except Exception as e:
+                logger.error("Error processing page %s: %s", page_index + 1, e, exc_info=True)
+
+    return results
+
+
+def _read_page_jobs(pdf_path, page_number, jobs, per_page, should_stop=None):
+    """Read the tables for a page's (section, area, columns, params, patterns) jobs
+
+    Returns:
+        list: One DataFrame, None or Exception per job, in job order
+    """
+    frames = [None] * len(jobs)
+
+    if not per_page:
+        for i, (_, table_area, columns, params, _) in enumerate(jobs):
+            _check_stop(should_stop)
+            try:
+                frames[i] = read_region_table(pdf_path, page_number, table_area, columns, params)
+            except Exception as e:
+                frames[i] = e
+        return frames
+
+    groups = {}
+    for i, job in enumerate(jobs):
+        groups.setdefault(_params_key(job[3]), []).append(i)
+
+    for indices in groups.values():
+        _check_stop(should_stop)
+        try:
+            group_frames = read_page_tables(
+                pdf_path,
+                page_number,
+                [jobs[i][1] for i in indices],
+                [jobs[i][2] for i in indices],
+                jobs[indices[0]][3],
+            )
+        except Exception as e:
+            group_frames = [e] * len(indices)
+
+        if len(indices) > 1 and isinstance(group_frames[0], Exception):
+            # The parser fails the whole call when any one area has no text,
+            # so read the group's areas one by one as per-region mode does
+            logger.debug("Shared parse of page %s failed (%s); reading its areas one by one", page_number, group_frames[0])
+            group_frames = []
+            for i in indices:
+                _check_stop(should_stop)
+                try:
+                    group_frames.append(read_region_table(pdf_path, page_number, *jobs[i][1:4]))
+                except Exception as e:
+                    group_frames.append(e)
+        for i, table_df in zip(indices, group_frames):
+            frames[i] = table_df
+
+    return frames
+
+
+def merge_results(results, chunk_results):
+    """Merge the results of one page chunk into the accumulated results in place"""
+    for key in ("header_tables", "items_tables", "summary_tables", "no_tables_found"):
+        results[key].extend(chunk_results.get(key, []))
+    for section in SECTIONS:
+        status = chunk_results["extraction_status"][section]
+        if status != "not_processed":
+            results["extraction_status"][section] = status
+    return results
+
+
+def finish_results(results, pdf_page_count, pdf_name):
+    """Set the overall status and page count of a document's merged results and report them"""
+    results["extraction_status"]["overall"] = rollup_status(results["extraction_status"])
+    results["pdf_page_count"] = pdf_page_count
+    get_metrics().inc("files_total")
+
+    status = results["extraction_status"]
+    logger.info(
+        "Extracted %s: header=%s, items=%s, summary=%s, overall=%s",
+        pdf_name, status["header"], status["items"], status["summary"], status["overall"],
+    )
+    return results
+
+
+def get_pdf_page_count(pdf_path):
+    """Return the number of pages of a PDF file or in-memory PDF"""
+    if isinstance(pdf_path, DocumentContext):
+        return pdf_path.page_count
+    with open_pdf(pdf_path) as pdf_document:
+        return len(pdf_document)
+
+
+def extract_invoice_tables(pdf_path, template_id=None, template_data=None, chunk_size=None, db_path=DEFAULT_DB_PATH,
+                           per_page=True, should_stop=None, cache=None, refresh_cache=False):
+    """Extract header, items and summary tables from a PDF using a template
+
+    Args:
+        pdf_path: Path to the PDF file, the PDF itself as bytes, bytearray,
+            memoryview or a binary file-like object (never written to disk), or
+            a DocumentContext owned by the caller. Paths and buffers get a
+            DocumentContext of their own, so the file is read and opened once.
+        template_id: ID of the template, used when template_data is not given
+        template_data: CompiledTemplate (preferred for batches) or template data dict
+        chunk_size: Number of pages handled per chunk (default: 50)
+        db_path: Path to the templates database
+        per_page: Parse each page once for all of its regions (False reads
+            every region with its own read_pdf call)
+        should_stop: Optional callable polled between pages and read_pdf calls;
+            when it returns True ExtractionCancelled is raised to the caller
+        cache: Optional result_cache.ResultCache; a hit is returned without
+            extracting and fresh results are stored in it
+        refresh_cache: Ignore cached results but still store the new ones
+
+    Returns:
+        dict: Results with header_tables, items_tables, summary_tables,
+        no_tables_found, extraction_status and pdf_page_count, or None on error.
+        Results served from the cache have "cached" set to True.
+    """
+    own_document = not isinstance(pdf_path, DocumentContext)
+    document = DocumentContext(pdf_path) if own_document else pdf_path
+    try:
+        pdf_name = document.name
+
+        if template_data is None:
+            template = get_compiled_template(template_id, db_path)
+            if template is None:
+                raise Exception(f"Template with ID {template_id} not found")
+        else:
+            template = compile_template(template_data)
+
+        cache_key = None
+        if cache is not None:
+            cache_key = cache.key_for(document.source, template, per_page)
+            if not refresh_cache:
+                cached = cache.get(cache_key)
+                if cached is not None:
+                    get_metrics().inc("files_total")
+                    logger.info(
+                        "Extracted %s: cached, overall=%s",
+                        pdf_name, cached['extraction_status'].get('overall')
+                    )
+                    return cached
+
+        pdf_page_count = document.page_count
+        pages_to_process = template.plan_pages(pdf_page_count)
+        chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
+
+        results = new_results()
+        for start in range(0, len(pages_to_process), chunk_size):
+            chunk = pages_to_process[start:start + chunk_size]
+            merge_results(
+                results,
+                process_pages_chunk(document, template, chunk, pdf_page_count, per_page, should_stop),
+            )
+
+        finish_results(results, pdf_page_count, pdf_name)
+
+        if cache_key is not None:
+            cache.put(cache_key, results)
+        return results
+
+    except ExtractionCancelled:
+        raise
+    except Exception as e:
+        logger.error("Error in extract_invoice_tables: %s", e, exc_info=True)
+        return None
+    finally:
+        if own_document:
+            document.close()
@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""
+Local HTTP extraction service
+
+Runs the extraction engine behind a small asyncio HTTP/1.1 server so other
+programs can extract a document per request without paying for imports, the
+database connection and template compilation every time. Extraction runs in
+a process pool that is started and warmed (every template compiled) before
+the server accepts connections.
+
+Endpoints:
+    GET  /health            Service status, workers and loaded templates
+    POST /extract           Extract a PDF and return its tables (synchronous)
+    POST /jobs              Queue an extraction and return a job ID (202)
+    GET  /jobs/<job_id>     Status of a queued extraction, with its result once done
+
+A PDF is sent as one of:
+    - the request body with Content-Type: application/pdf and ?template=<name>
+    - a multipart/form-data upload with a "file" part and a "template" field
+    - a JSON body {"template": "<name>", "path": "/path/to/file.pdf"}
+
+Usage:
+    python extraction_service.py [--host 127.0.0.1] [--port 8765] [--workers 4] [--db invoice_templates.db] [--log-level INFO]
+"""
+
+import logging
+import os
+import sys
+import json
+import time
+import uuid
+import asyncio
+import argparse
+import functools
+import concurrent.futures
+from collections import OrderedDict
+from email.parser import BytesParser
+from email import policy
+from http import HTTPStatus
+from urllib.parse import urlsplit, parse_qs
+
+from extraction_engine import DEFAULT_DB_PATH, SECTIONS, extract_invoice_tables, get_compiled_template
+from db_connections import get_connection
+from execution_policy import plan_execution
+from logging_setup import LOG_LEVELS, configure_logging
+from result_sink import section_tables, table_to_json
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Largest request body accepted (uploaded PDFs)
+MAX_BODY_BYTES = 100 * 1024 * 1024
+
+# Finished async jobs kept for polling; the oldest are dropped first
+MAX_FINISHED_JOBS = 1000
+
+
+class HTTPError(Exception):
+    """Error returned to the client with an HTTP status"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+# ---------------------------------------------------------------------------
+# Worker side: runs inside the process pool
+
+# Per-process state filled in once by _init_service_worker
+_service_state = {}
+
+
+def _template_ids(db_path):
+    """Map template names to IDs"""
+    return dict(get_connection(db_path).execute("SELECT name, id FROM templates").fetchall())
+
+
+def _init_service_worker(db_path, policy=None):
+    """Initialize a pool worker: compile every template once so requests start extracting immediately"""
+    configure_logging()
+    if policy is not None:
+        policy.apply()
+    _service_state["db_path"] = db_path
+    _service_state["template_ids"] = _template_ids(db_path)
+    for template_id in _service_state["template_ids"].values():
+        get_compiled_template(template_id, db_path)
+
+
+def _ping(hold=0.2):
+    """Return the worker's PID; used to start and warm up every worker
+
+    The pool only starts another process when no worker is idle, so each ping
+    keeps its worker busy briefly to make the pings land on different processes.
+    """
+    time.sleep(hold)
+    return os.getpid()
+
+
+def _get_template(template_name):
+    """Return the compiled template for a name, reloading names when one is unknown"""
+    db_path = _service_state["db_path"]
+    template_id = _service_state["template_ids"].get(template_name)
+    if template_id is None:
+        # Created after the worker started
+        _service_state["template_ids"] = _template_ids(db_path)
+        template_id = _service_state["template_ids"].get(template_name)
+    # get_compiled_template only recompiles when the template was modified
+    template = get_compiled_template(template_id, db_path) if template_id is not None else None
+    if template is None:
+        raise LookupError(f"Template not found: '{template_name}'")
+    return template
+
+
+def results_to_json(results):
+    """Convert extraction results to a JSON-serializable dict (tables in pandas split orientation)"""
+    return {
+        "pdf_page_count": results.get("pdf_page_count"),
+        "extraction_status": results.get("extraction_status", {}),
+        "no_tables_found": results.get("no_tables_found", []),
+        "cached": bool(results.get("cached")),
+        "tables": {
+            section: [json.loads(table_to_json(df)) for df in section_tables(results, section)]
+            for section in SECTIONS
+        },
+    }
+
+
+def _extract_in_worker(template_name, pdf_path=None, pdf_bytes=None):
+    """Extract one PDF, given as a path or as uploaded bytes, inside a pool worker"""
+    start = time.perf_counter()
+    template = _get_template(template_name)
+
+    # Uploads are extracted straight from memory
+    results = extract_invoice_tables(pdf_bytes if pdf_bytes is not None else pdf_path, template.id, template)
+
+    if results is None:
+        raise RuntimeError("Extraction failed")
+    response = results_to_json(results)
+    response["template"] = template_name
+    response["duration_seconds"] = round(time.perf_counter() - start, 3)
+    return response
+
+
+# ---------------------------------------------------------------------------
+# Server side: asyncio HTTP handling in the main process
+
+def parse_extract_request(query, headers, body):
+    """Read the template name and the PDF (path or bytes) from a request
+
+    Returns:
+        dict: Keyword arguments for _extract_in_worker
+    """
+    content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+    template_name = query.get("template", [None])[0]
+    pdf_path = None
+    pdf_bytes = None
+
+    if content_type == "application/json":
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError:
+            raise HTTPError(400, "Request body is not valid JSON")
+        template_name = payload.get("template", template_name)
+        pdf_path = payload.get("path")
+        if not pdf_path:
+            raise HTTPError(400, "JSON requests need a \"path\"")
+        if not os.path.isfile(pdf_path):
+            raise HTTPError(404, f"File not found: '{pdf_path}'")
+    elif content_type == "multipart/form-data":
+        message = BytesParser(policy=policy.HTTP).parsebytes(
+            f"Content-Type: {headers['content-type']}\r\n\r\n".encode("latin-1") + body
+        )
+        for part in message.iter_parts():
+            name = part.get_param("name", header="content-disposition")
+            if name == "file":
+                pdf_bytes = part.get_payload(decode=True)
+            elif name == "template":
+                template_name = part.get_payload(decode=True).decode("utf-8").strip()
+        if not pdf_bytes:
+            raise HTTPError(400, "Multipart uploads need a \"file\" part")
+    elif content_type in ("application/pdf", "application/octet-stream"):
+        if not body:
+            raise HTTPError(400, "Request body is empty")
+        pdf_bytes = body
+    else:
+        raise HTTPError(415, "Send application/pdf, multipart/form-data or application/json")
+
+    if not template_name:
+        raise HTTPError(400, "No template given")
+    return {"template_name": template_name, "pdf_path": pdf_path, "pdf_bytes": pdf_bytes}
+
+
+async def read_request(reader):
+    """Read one HTTP request; returns (method, target, headers, body) or None at end of stream
+
+    An HTTPError raised here leaves the rest of the request unread, so the
+    caller has to close the connection after answering it.
+    """
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    try:
+        method, target, __ = request_line.decode("latin-1").split()
+    except ValueError:
+        raise HTTPError(400, "Malformed request line")
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, __, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        length = -1
+    if length < 0:
+        raise HTTPError(400, "Invalid Content-Length")
+    if length > MAX_BODY_BYTES:
+        raise HTTPError(413, f"Request body larger than {MAX_BODY_BYTES} bytes")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target, headers, body
+
+
+async def send_response(writer, status, payload, keep_alive=True):
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    head = (
+        f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+        f"Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+        f"\r\n"
+    )
+    writer.write(head.encode("latin-1") + body)
+    await writer.drain()
+
+
+class ExtractionService:
+    """asyncio HTTP front end for a warm extraction process pool
+
+    Args:
+        host, port: Address to listen on (localhost by default)
+        workers: Number of extraction processes (default: CPU count)
+        db_path: Path to the templates database
+    """
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, workers=None, db_path=DEFAULT_DB_PATH):
+        self.host = host
+        self.port = port
+        self.policy = plan_execution(workers, "process")
+        self.workers = self.policy.workers
+        self.db_path = db_path
+        self.pool = None
+        self.server = None
+        self.jobs = OrderedDict()  # job_id -> {"status", "result", "error", "submitted_at", "finished_at"}
+        self.started_at = None
+
+    async def start(self):
+        """Start and warm the process pool, then start listening"""
+        loop = asyncio.get_running_loop()
+        self.pool = concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_service_worker,
+            initargs=(self.db_path, self.policy),
+        )
+        # Submitting one task per worker at once starts every process and runs its initializer
+        pids = await asyncio.gather(*(loop.run_in_executor(self.pool, _ping) for __ in range(self.workers)))
+        logger.info("Started %s extraction workers (%s)", len(set(pids)), self.policy.describe())
+
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        self.started_at = time.time()
+        logger.info("Extraction service listening on http://%s:%s", self.host, self.port)
+
+    async def serve_forever(self):
+        await self.start()
+        try:
+            async with self.server:
+                await self.server.serve_forever()
+        finally:
+            self.pool.shutdown(cancel_futures=True)
+
+    async def handle_connection(self, reader, writer):
+        """Serve requests on one connection until the client closes it"""
+        try:
+            while True:
+                keep_alive = True
+                request = None
+                try:
+                    request = await read_request(reader)
+                    if request is None:
+                        break
+                    method, target, headers, body = request
+                    keep_alive = headers.get("connection", "").lower() != "close"
+                    status, payload = await self.dispatch(method, target, headers, body)
+                except HTTPError as e:
+                    status, payload = e.status, {"error": e.message}
+                except asyncio.IncompleteReadError:
+                    break
+                except Exception as e:
+                    logger.error("Error handling request: %s", e)
+                    status, payload = 500, {"error": str(e)}
+                if request is None:
+                    # The request could not be read completely, so the stream is out of step
+                    keep_alive = False
+                await send_response(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, method, target, headers, body):
+        """Route a request; returns (status, JSON payload)"""
+        url = urlsplit(target)
+        path = url.path.rstrip("/") or "/"
+        query = parse_qs(url.query)
+
+        if path == "/health" and method == "GET":
+            return 200, self.health()
+        if path == "/extract" and method == "POST":
+            return 200, await self.extract(parse_extract_request(query, headers, body))
+        if path == "/jobs" and method == "POST":
+            job_id = self.submit_job(parse_extract_request(query, headers, body))
+            return 202, {"job_id": job_id, "status": "queued", "url": f"/jobs/{job_id}"}
+        if path.startswith("/jobs/") and method == "GET":
+            job = self.jobs.get(path[len("/jobs/"):])
+            if job is None:
+                raise HTTPError(404, "Job not found")
+            return 200, job
+        raise HTTPError(404 if method in ("GET", "POST") else 405, f"No route for {method} {url.path}")
+
+    async def extract(self, request):
+        """Run one extraction in the pool and return its JSON result"""
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self.pool, functools.partial(_extract_in_worker, **request))
+        except LookupError as e:
+            raise HTTPError(404, str(e))
+        except concurrent.futures.process.BrokenProcessPool:
+            raise HTTPError(503, "Extraction workers stopped unexpectedly; restart the service")
+        except RuntimeError as e:
+            raise HTTPError(422, str(e))
+
+    def submit_job(self, request):
+        """Queue an extraction and return its job ID"""
+        job_id = uuid.uuid4().hex
+        self.jobs[job_id] = {"job_id": job_id, "status": "queued", "submitted_at": time.time()}
+        asyncio.get_running_loop().create_task(self._run_job(job_id, request))
+        return job_id
+
+    async def _run_job(self, job_id, request):
+        job = self.jobs[job_id]
+        job["status"] = "running"
+        try:
+            job["result"] = await self.extract(request)
+            job["status"] = "done"
+        except HTTPError as e:
+            job["status"] = "failed"
+            job["error"] = e.message
+        except Exception as e:
+            job["status"] = "failed"
+            job["error"] = str(e)
+        job["finished_at"] = time.time()
+        self._trim_jobs()
+
+    def _trim_jobs(self):
+        finished = [job_id for job_id, job in self.jobs.items() if "finished_at" in job]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job_id]
+
+    def health(self):
+        statuses = [job["status"] for job in self.jobs.values()]
+        return {
+            "status": "ok",
+            "workers": self.workers,
+            "templates": sorted(_template_ids(self.db_path)),
+            "uptime_seconds": round(time.time() - self.started_at, 1) if self.started_at else 0,
+            "jobs": {status: statuses.count(status) for status in ("queued", "running", "done", "failed")},
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local HTTP service for template-based PDF extraction')
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f'Address to listen on (default: {DEFAULT_HOST})')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'Port to listen on (default: {DEFAULT_PORT})')
+    parser.add_argument('--workers', type=int, help='Number of extraction processes (default: CPU count)')
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help=f'Templates database (default: {DEFAULT_DB_PATH})')
+    parser.add_argument('--log-level', type=str.upper, choices=LOG_LEVELS,
+                        help='Messages to show (default: INFO, or PDF_HARVEST_LOG_LEVEL)')
+    parser.add_argument('--log-json', metavar='PATH', help='Also write every log record to PATH as JSON lines')
+    args = parser.parse_args()
+    configure_logging(args.log_level, json_path=args.log_json)
+
+    service = ExtractionService(args.host, args.port, args.workers, args.db)
+    try:
+        asyncio.run(service.serve_forever())
+    except KeyboardInterrupt:
+        logger.info("Extraction service stopped")
+    sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""
+Incremental folder watching for the command-line extractor
+
+ProcessedManifest remembers every PDF that was extracted (path, size, mtime,
+content hash and status) in a JSON file, and FolderWatcher reports only the
+PDFs that are new or changed since then. A file is reported once its size and
+mtime have been stable for the debounce period, so files that are still being
+copied into the folder are not picked up half-written.
+
+The folder is polled; when the optional watchdog package is installed its
+filesystem events (inotify on Linux) wake the poll loop early instead.
+"""
+
+import logging
+import os
+import json
+import time
+import threading
+from datetime import datetime
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILENAME = ".extraction_manifest.json"
+
+
+class ProcessedManifest:
+    """JSON manifest of processed files, saved after every update"""
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.entries = json.load(f)
+                logger.info("Loaded manifest with %s processed files: %s", len(self.entries), path)
+            except Exception as e:
+                logger.warning("Could not read manifest %s, starting a new one: %s", path, e)
+
+    def is_current(self, pdf_path, size, mtime):
+        """Check whether a file was processed with this exact size and mtime"""
+        entry = self.entries.get(pdf_path)
+        return entry is not None and entry["size"] == size and entry["mtime"] == mtime
+
+    def has_content(self, pdf_path, sha256):
+        """Check whether a file was processed with this exact content"""
+        entry = self.entries.get(pdf_path)
+        return entry is not None and entry.get("sha256") == sha256
+
+    def record(self, pdf_path, size, mtime, sha256, status):
+        self.entries[pdf_path] = {
+            "size": size,
+            "mtime": mtime,
+            "sha256": sha256,
+            "status": status,
+            "processed_at": datetime.now().isoformat(),
+        }
+        self.save()
+
+    def save(self):
+        # Write to a temporary file and swap it in so a crash never leaves a truncated manifest
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=2)
+        os.replace(temp_path, self.path)
+
+
+class _WakeHandler(FileSystemEventHandler):
+    def __init__(self, wake_event):
+        super().__init__()
+        self.wake_event = wake_event
+
+    def on_any_event(self, event):
+        self.wake_event.set()
+
+
+class FolderWatcher:
+    """Report new or changed PDFs in a folder once they have stopped changing
+
+    Args:
+        folder_path: Folder to watch (not recursive)
+        manifest: ProcessedManifest of files already handled
+        poll_interval: Seconds between scans
+        debounce: Seconds a file's size and mtime must stay unchanged
+    """
+
+    def __init__(self, folder_path, manifest, poll_interval=2.0, debounce=2.0):
+        self.folder_path = folder_path
+        self.manifest = manifest
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self._pending = {}  # path -> (size, mtime, first seen with that size and mtime)
+        self._wake = threading.Event()
+        self._observer = None
+
+    def start(self):
+        """Start filesystem notifications when watchdog is available"""
+        if Observer is None:
+            logger.info("Polling %s every %ss", self.folder_path, self.poll_interval)
+            return
+        self._observer = Observer()
+        self._observer.schedule(_WakeHandler(self._wake), self.folder_path, recursive=False)
+        self._observer.start()
+        logger.info("Watching %s for filesystem events", self.folder_path)
+
+    def stop(self):
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+
+    def wait(self, timeout=None):
+        """Sleep until the next poll, or until a filesystem event arrives"""
+        self._wake.wait(self.poll_interval if timeout is None else timeout)
+        self._wake.clear()
+
+    def scan(self, exclude=()):
+        """Return (path, size, mtime) for every new or changed PDF that is ready to process
+
+        Args:
+            exclude: Paths to ignore, such as files currently being extracted
+        """
+        now = time.monotonic()
+        ready = []
+        seen = set()
+
+        with os.scandir(self.folder_path) as entries:
+            for entry in entries:
+                if not entry.name.lower().endswith(".pdf") or not entry.is_file():
+                    continue
+                pdf_path = entry.path
+                seen.add(pdf_path)
+                if pdf_path in exclude:
+                    continue
+
+                stat = entry.stat()
+                size, mtime = stat.st_size, stat.st_mtime
+                if self.manifest.is_current(pdf_path, size, mtime):
+                    self._pending.pop(pdf_path, None)
+                    continue
+
+                pending = self._pending.get(pdf_path)
+                if pending is None or pending[:2] != (size, mtime):
+                    # New or still changing: restart its debounce period
+                    self._pending[pdf_path] = (size, mtime, now)
+                elif now - pending[2] >= self.debounce:
+                    del self._pending[pdf_path]
+                    ready.append((pdf_path, size, mtime))
+
+        # Forget files that were removed before they settled
+        for pdf_path in [path for path in self._pending if path not in seen]:
+            del self._pending[pdf_path]
+
+        return ready
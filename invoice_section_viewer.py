@@ -1,19 +1,23 @@
+import logging
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton, 
                              QLabel, QScrollArea, QFrame, QStackedWidget, QTableWidget,
                              QTableWidgetItem, QHeaderView, QDialog, QFormLayout, 
                              QSpinBox, QCheckBox, QLineEdit, QMessageBox, QDialogButtonBox, QSpacerItem,
                              QComboBox, QGroupBox, QFileDialog)
 from PySide6.QtCore import Qt, Signal, QPoint, QRect
-from PySide6.QtGui import (QFont, QImage, QPixmap, QCursor, QPainter, 
+from PySide6.QtGui import (QFont, QCursor, QPainter, 
                           QPen, QColor)
-import fitz
-from PIL import Image
-import io
 import pandas as pd
 import re
-import pypdf_table_extraction
 import json
 import os
+from regex_filter import compile_pattern, first_match, row_texts, skip_mask
+from document_context import DocumentContext
+from page_text_cache import MAX_CACHED_PAGES
+from page_renderer import render_page
+from page_geometry import get_page_transform
+
+logger = logging.getLogger(__name__)
 
 class PDFLabel(QLabel):
     def __init__(self, parent=None):
@@ -109,6 +113,10 @@ class InvoiceSectionViewer(QWidget):
         self.column_lines = column_lines
         self.is_multi_page = is_multi_page
         
+        # The PDF is opened once; its parsed page text is kept between
+        # re-extractions while parameters are tuned
+        self.document_context = None
+        
         # Initialize section areas
         self.header_areas = []
         self.item_areas = []
@@ -355,23 +363,15 @@ class InvoiceSectionViewer(QWidget):
         if not self.pdf_path:
             return
             
-        # Open the PDF
-        self.pdf_document = fitz.open(self.pdf_path)
-        
-        # Get the first page
-        page = self.pdf_document[0]
-            
-        # Render the page
-        pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))
-        
-        # Convert PyMuPDF pixmap to PIL Image
-        img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+        # Open the PDF once; reloading the same file reuses the open document
+        if self.document_context is None or self.document_context.path != self.pdf_path:
+            if self.document_context is not None:
+                self.document_context.close()
+            self.document_context = DocumentContext(self.pdf_path, MAX_CACHED_PAGES)
+        self.pdf_document = self.document_context.document
         
-        # Convert PIL Image to QPixmap
-        bytes_io = io.BytesIO()
-        img.save(bytes_io, format='PNG')
-        qimg = QImage.fromData(bytes_io.getvalue())
-        self.original_pixmap = QPixmap.fromImage(qimg)
+        # Render the first page through the shared render service
+        self.original_pixmap = render_page(self.pdf_document, 0)
         
         # Create a copy for drawing
         self.drawing_pixmap = self.original_pixmap.copy()
@@ -388,9 +388,9 @@ class InvoiceSectionViewer(QWidget):
     def draw_sections(self):
         """Draw the sections on the PDF view"""
         try:
-            print("\n=== Drawing sections ===")
+            logger.debug("=== Drawing sections ===")
             if not hasattr(self, 'drawing_pixmap') or self.drawing_pixmap is None:
-                print("No drawing pixmap available")
+                logger.warning("No drawing pixmap available")
                 return
                 
             # Create a copy of the original pixmap for drawing
@@ -408,7 +408,7 @@ class InvoiceSectionViewer(QWidget):
             # Draw each section
             for section in sections:
                 if section in self.regions and self.regions[section]:
-                    print(f"Drawing {section} section")
+                    logger.debug("Drawing %s section", section)
                     color = colors[section]
                     pen = QPen(color, 2, Qt.SolidLine)
                     painter.setPen(pen)
@@ -428,12 +428,10 @@ class InvoiceSectionViewer(QWidget):
             # End painting and update the PDF label
             painter.end()
             self.pdf_label.setPixmap(self.drawing_pixmap)
-            print("Sections drawn successfully")
+            logger.debug("Sections drawn successfully")
             
         except Exception as e:
-            print(f"\nError in draw_sections: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.error("Error in draw_sections: %s", e, exc_info=True)
 
     def extract_and_update_section_data(self):
         sections = ['header', 'items', 'summary']
@@ -446,18 +444,18 @@ class InvoiceSectionViewer(QWidget):
                     # Get actual page dimensions in points (1/72 inch)
                     page_width = page.mediabox.width
                     page_height = page.mediabox.height
-                    print(f"Actual PDF dimensions: width={page_width} points, height={page_height} points")
+                    logger.debug("Actual PDF dimensions: width=%s points, height=%s points", page_width, page_height)
                     
-                    # Get the rendered dimensions
-                    pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))
-                    rendered_width = pix.width
-                    rendered_height = pix.height
-                    print(f"Rendered dimensions: width={rendered_width}, height={rendered_height}")
+                    # Get the rendered dimensions from the page geometry (no rendering needed)
+                    transform = get_page_transform(self.document_context, page.number)
+                    rendered_width = transform.rendered_width
+                    rendered_height = transform.rendered_height
+                    logger.debug("Rendered dimensions: width=%s, height=%s", rendered_width, rendered_height)
                     
                     # Calculate scaling factors
                     scale_x = page_width / rendered_width
                     scale_y = page_height / rendered_height
-                    print(f"Scaling factors: x={scale_x}, y={scale_y}")
+                    logger.debug("Scaling factors: x=%s, y=%s", scale_x, scale_y)
                     
                     # Prepare table areas and column lines based on section
                     table_areas = []
@@ -466,19 +464,27 @@ class InvoiceSectionViewer(QWidget):
                     # Handle multiple tables for header section
                     if section == 'header':
                         # Print a separator for clarity
-                        print("\n" + "="*50)
-                        print("EXTRACTING HEADER TABLES")
-                        print("="*50)
+                        logger.debug("%s", "\n" + "="*50)
+                        logger.debug("EXTRACTING HEADER TABLES")
+                        logger.debug("%s", "="*50)
                         
                         # Process all header regions in their original order
-                        print(f"\nHeader regions in original drawing order:")
+                        logger.debug("Header regions in original drawing order:")
                         for idx, rect in enumerate(self.regions[section]):
-                            print(f"  Header {idx}: top={rect.top()}, left={rect.left()}, width={rect.width()}, height={rect.height()}")
+                            if logger.isEnabledFor(logging.DEBUG):
+                                logger.debug(
+                                    "Header %s: top=%s, left=%s, width=%s, height=%s",
+                                    idx, rect.top(), rect.left(), rect.width(), rect.height()
+                                )
                         
                         # Process each header region in the original order it was drawn
                         for idx, rect in enumerate(self.regions[section]):
-                            print(f"\nProcessing header region {idx}:")
-                            print(f"  Position: top={rect.top()}, left={rect.left()}, width={rect.width()}, height={rect.height()}")
+                            logger.debug("Processing header region %s:", idx)
+                            if logger.isEnabledFor(logging.DEBUG):
+                                logger.debug(
+                                    "Position: top=%s, left=%s, width=%s, height=%s",
+                                    rect.top(), rect.left(), rect.width(), rect.height()
+                                )
                             
                             # Convert rectangle coordinates to PDF space with proper scaling
                             x1 = rect.x() * scale_x
@@ -488,34 +494,37 @@ class InvoiceSectionViewer(QWidget):
                             
                             table_area = f"{x1},{y1},{x2},{y2}"
                             table_areas.append(table_area)
-                            print(f"  Table area: {table_area}")
+                            logger.debug("Table area: %s", table_area)
                             
                             # Find column lines specific to this region
                             region_columns = []
                             if section in self.column_lines and self.column_lines[section]:
-                                print(f"  Looking for column lines for region {idx}:")
+                                logger.debug("Looking for column lines for region %s:", idx)
                                 for line in self.column_lines[section]:
                                     # Check if the line has a region index and matches current region
                                     if len(line) == 3 and line[2] == idx:
                                         region_columns.append(line[0].x() * scale_x)
-                                        print(f"    Found line at x={line[0].x()} with rect_index={line[2]}")
+                                        logger.debug("Found line at x=%s with rect_index=%s", line[0].x(), line[2])
                                     # Handle old format without region index - associate with first region
                                     elif len(line) == 2 and idx == 0:
                                         region_columns.append(line[0].x() * scale_x)
-                                        print(f"    Found line at x={line[0].x()} (old format, associated with first table)")
+                                        logger.debug(
+                                            "Found line at x=%s (old format, associated with first table)",
+                                            line[0].x()
+                                        )
                             
                             if region_columns:
                                 # Sort column lines by x-coordinate and join as comma-separated string
                                 col_str = ','.join([str(x) for x in sorted(region_columns)])
                                 column_lines.append(col_str)
-                                print(f"  Final column lines: {col_str}")
+                                logger.debug("Final column lines: %s", col_str)
                             else:
                                 # Empty string for regions with no column lines
                                 column_lines.append('')
                         
-                        print(f"\nHeader table areas: {table_areas}")
-                        print(f"Header column lines: {column_lines}")
-                        print("="*50)
+                        logger.debug("Header table areas: %s", table_areas)
+                        logger.debug("Header column lines: %s", column_lines)
+                        logger.debug("%s", "="*50)
                         
                         # Define extraction parameters - set header row_tol to 5
                         extraction_params = {
@@ -538,7 +547,7 @@ class InvoiceSectionViewer(QWidget):
                         processed_tables = []
                         
                         for idx, (table_area, col_line) in enumerate(zip(table_areas, column_lines)):
-                            print(f"\nExtracting Header Table {idx + 1} individually:")
+                            logger.debug("Extracting Header Table %s individually:", idx + 1)
                             try:
                                 # Parameters for this single table
                                 single_table_params = {
@@ -552,7 +561,7 @@ class InvoiceSectionViewer(QWidget):
                                 }
                                 
                                 # Extract just this table
-                                table_result = pypdf_table_extraction.read_pdf(self.pdf_path, **single_table_params)
+                                table_result = self.document_context.read_pdf(**single_table_params)
                                 
                                 if table_result and len(table_result) > 0 and table_result[0].df is not None:
                                     table_df = table_result[0].df
@@ -563,42 +572,56 @@ class InvoiceSectionViewer(QWidget):
                                     table_df = table_df.dropna(axis=1, how='all')
                                     
                                     if not table_df.empty:
-                                        print(f"  Successfully extracted table with {len(table_df)} rows and {len(table_df.columns)} columns")
+                                        logger.debug(
+                                            "Successfully extracted table with %s rows and %s columns",
+                                            len(table_df), len(table_df.columns)
+                                        )
                                         processed_tables.append(table_df)
                                     else:
-                                        print(f"  No valid data found after cleaning")
+                                        logger.warning("No valid data found after cleaning")
                                 else:
-                                    print(f"  No data extracted from table area")
+                                    logger.warning("No data extracted from table area")
                             except Exception as e:
-                                print(f"  Error extracting table: {str(e)}")
+                                logger.error("Error extracting table: %s", e)
                         
                         # Update the display with tables in the correct order
                         if processed_tables:
-                            print(f"\nSuccessfully processed {len(processed_tables)} header tables in original drawing order")
+                            logger.debug(
+                                "Successfully processed %s header tables in original drawing order",
+                                len(processed_tables)
+                            )
                             self.header_df = processed_tables
                             self.update_data_table_for_header(processed_tables, section_type=section)
                         else:
-                            print("No valid header tables found")
+                            logger.warning("No valid header tables found")
                             self.update_data_table(None, section)
                     else:
                         # For items and summary sections
                         # Print a separator for clarity
-                        print(f"\n{'='*50}")
-                        print(f"EXTRACTING {section.upper()} TABLES")
-                        print(f"{'='*50}")
+                        logger.debug("%s", '='*50)
+                        logger.debug("EXTRACTING %s TABLES", section.upper())
+                        logger.debug("%s", '='*50)
                         
                         # Process all regions in their original order
-                        print(f"\n{section.title()} regions in original drawing order:")
+                        logger.debug("%s regions in original drawing order:", section.title())
                         for idx, rect in enumerate(self.regions[section]):
-                            print(f"  {section.title()} {idx}: top={rect.top()}, left={rect.left()}, width={rect.width()}, height={rect.height()}")
+                            if logger.isEnabledFor(logging.DEBUG):
+                                logger.debug(
+                                    "%s %s: top=%s, left=%s, width=%s, height=%s",
+                                    section.title(), idx, rect.top(), rect.left(), rect.width(), rect.height()
+                                )
                         
                         # Process each region in the original order
                         table_areas = []
                         column_lines = []
                         
                         for idx, rect in enumerate(self.regions[section]):
-                            print(f"\nProcessing {section} region {idx}:")
-                            print(f"  Position: top={rect.top()}, left={rect.left()}, width={rect.width()}, height={rect.height()}")
+                            logger.debug("Processing %s region %s:", section, idx)
+                            if logger.isEnabledFor(logging.DEBUG):
+                                logger.debug(
+                                    "Position: top=%s, left=%s, width=%s, height=%s",
+                                    rect.top(), rect.left(), rect.width(), rect.height()
+                                )
                             
                             # Convert rectangle coordinates to PDF space with proper scaling
                             x1 = rect.x() * scale_x
@@ -608,34 +631,37 @@ class InvoiceSectionViewer(QWidget):
                             
                             table_area = f"{x1},{y1},{x2},{y2}"
                             table_areas.append(table_area)
-                            print(f"  Table area: {table_area}")
+                            logger.debug("Table area: %s", table_area)
                             
                             # Find column lines specific to this region
                             region_columns = []
                             if section in self.column_lines and self.column_lines[section]:
-                                print(f"  Looking for column lines for region {idx}:")
+                                logger.debug("Looking for column lines for region %s:", idx)
                                 for line in self.column_lines[section]:
                                     # Check if the line has a region index and matches current region
                                     if len(line) == 3 and line[2] == idx:
                                         region_columns.append(line[0].x() * scale_x)
-                                        print(f"    Found line at x={line[0].x()} with rect_index={line[2]}")
+                                        logger.debug("Found line at x=%s with rect_index=%s", line[0].x(), line[2])
                                     # Handle old format without region index - associate with first region
                                     elif len(line) == 2 and idx == 0:
                                         region_columns.append(line[0].x() * scale_x)
-                                        print(f"    Found line at x={line[0].x()} (old format, associated with first table)")
+                                        logger.debug(
+                                            "Found line at x=%s (old format, associated with first table)",
+                                            line[0].x()
+                                        )
                             
                             if region_columns:
                                 # Sort column lines by x-coordinate and join as comma-separated string
                                 col_str = ','.join([str(x) for x in sorted(region_columns)])
                                 column_lines.append(col_str)
-                                print(f"  Final column lines: {col_str}")
+                                logger.debug("Final column lines: %s", col_str)
                             else:
                                 # Empty string for regions with no column lines
                                 column_lines.append('')
                         
-                        print(f"\n{section.title()} table areas: {table_areas}")
-                        print(f"{section.title()} column lines: {column_lines}")
-                        print("="*50)
+                        logger.debug("%s table areas: %s", section.title(), table_areas)
+                        logger.debug("%s column lines: %s", section.title(), column_lines)
+                        logger.debug("%s", "="*50)
                         
                         # Set specific extraction parameters based on section
                         extraction_params = {
@@ -669,7 +695,7 @@ class InvoiceSectionViewer(QWidget):
                             processed_tables = []
                             
                             for idx, (table_area, col_line) in enumerate(zip(table_areas, column_lines)):
-                                print(f"\nExtracting {section.title()} Table {idx + 1} individually:")
+                                logger.debug("Extracting %s Table %s individually:", section.title(), idx + 1)
                                 try:
                                     # Parameters for this single table
                                     single_table_params = {
@@ -683,13 +709,13 @@ class InvoiceSectionViewer(QWidget):
                                     }
                                     
                                     # Extract just this table
-                                    table_result = pypdf_table_extraction.read_pdf(self.pdf_path, **single_table_params)
+                                    table_result = self.document_context.read_pdf(**single_table_params)
                                     
                                     if table_result and len(table_result) > 0 and table_result[0].df is not None:
                                         table_df = table_result[0].df
                                         
-                                        print(f"  Raw data extracted for {section.title()} Table {idx + 1}:")
-                                        print(table_df)
+                                        logger.debug("Raw data extracted for %s Table %s:", section.title(), idx + 1)
+                                        logger.debug("%s", table_df)
                                         
                                         # Clean up the DataFrame
                                         table_df = table_df.replace(r'^\s*$', pd.NA, regex=True)
@@ -705,21 +731,27 @@ class InvoiceSectionViewer(QWidget):
                                                     'Value': table_df[1].values
                                                 })
                                                 table_df = new_df
-                                                print(f"  Reformatted table with named columns")
+                                                logger.debug("Reformatted table with named columns")
                                         
                                         if not table_df.empty:
-                                            print(f"  Successfully extracted table with {len(table_df)} rows and {len(table_df.columns)} columns")
+                                            logger.debug(
+                                                "Successfully extracted table with %s rows and %s columns",
+                                                len(table_df), len(table_df.columns)
+                                            )
                                             processed_tables.append(table_df)
                                         else:
-                                            print(f"  No valid data found after cleaning")
+                                            logger.warning("No valid data found after cleaning")
                                     else:
-                                        print(f"  No data extracted from table area")
+                                        logger.warning("No data extracted from table area")
                                 except Exception as e:
-                                    print(f"  Error extracting table: {str(e)}")
+                                    logger.error("Error extracting table: %s", e)
                             
                             # Update the display with tables in the correct order
                             if processed_tables:
-                                print(f"\nSuccessfully processed {len(processed_tables)} {section} tables in original drawing order")
+                                logger.debug(
+                                    "Successfully processed %s %s tables in original drawing order",
+                                    len(processed_tables), section
+                                )
                                 
                                 # Update the appropriate dataframe attribute and display
                                 if section == 'items':
@@ -729,7 +761,7 @@ class InvoiceSectionViewer(QWidget):
                                     self.summary_df = processed_tables
                                     self.update_data_table_for_header(processed_tables, section_type=section)
                             else:
-                                print(f"No valid {section} tables found")
+                                logger.warning("No valid %s tables found", section)
                                 # Update the display with empty data
                                 self.update_data_table(None, section)
                         else:
@@ -744,23 +776,24 @@ class InvoiceSectionViewer(QWidget):
                                 'row_tol': extraction_params['row_tol']
                             }
                             
-                            print(f"\nExtracting single {section} table:")
-                            print(f"  Parameters: {single_table_params}")
+                            logger.debug("Extracting single %s table:", section)
+                            logger.debug("Parameters: %s", single_table_params)
                             
                             # Extract data
-                            tables = pypdf_table_extraction.read_pdf(self.pdf_path, **single_table_params)
+                            tables = self.document_context.read_pdf(**single_table_params)
                             
                             if tables and len(tables) > 0 and tables[0].df is not None:
                                 df = tables[0].df
                                 
                                 # Special logging for summary section
                                 if section == 'summary':
-                                    print("\n=== SUMMARY SECTION SPECIAL DEBUG ===")
-                                    print(f"Summary table column names: {df.columns.tolist()}")
-                                    print(f"Summary table shape: {df.shape}")
+                                    logger.debug("=== SUMMARY SECTION SPECIAL DEBUG ===")
+                                    if logger.isEnabledFor(logging.DEBUG):
+                                        logger.debug("Summary table column names: %s", df.columns.tolist())
+                                    logger.debug("Summary table shape: %s", df.shape)
                                 
-                                print(f"\nRaw extracted data for {section}:")
-                                print(df)
+                                logger.debug("Raw extracted data for %s:", section)
+                                logger.debug("%s", df)
                                 
                                 # Format columns if needed
                                 if all(isinstance(col, int) for col in df.columns):
@@ -771,8 +804,8 @@ class InvoiceSectionViewer(QWidget):
                                             'Value': df[1].values
                                         })
                                         df = new_df
-                                        print("\nDataFrame reformatted with named columns:")
-                                        print(df)
+                                        logger.debug("DataFrame reformatted with named columns:")
+                                        logger.debug("%s", df)
                                 
                                 # Clean up the DataFrame
                                 df = df.replace(r'^\s*$', pd.NA, regex=True)  # Replace empty strings with NA
@@ -780,8 +813,8 @@ class InvoiceSectionViewer(QWidget):
                                 df = df.dropna(axis=1, how='all')  # Drop columns that are all NA
                                 
                                 if not df.empty:
-                                    print(f"\nSuccessfully extracted {section} data")
-                                    print(f"Final DataFrame shape: {df.shape}")
+                                    logger.debug("Successfully extracted %s data", section)
+                                    logger.debug("Final DataFrame shape: %s", df.shape)
                                     
                                     # Update the appropriate dataframe attribute and display
                                     if section == 'items':
@@ -792,15 +825,13 @@ class InvoiceSectionViewer(QWidget):
                                     # Update display
                                     self.update_data_table(df, section)
                                 else:
-                                    print(f"\nNo valid data found in {section} section after cleaning")
+                                    logger.warning("No valid data found in %s section after cleaning", section)
                                     self.update_data_table(None, section)
                             else:
-                                print(f"\nNo data found in {section} section")
+                                logger.warning("No data found in %s section", section)
                                 self.update_data_table(None, section)
                 except Exception as e:
-                    print(f"\nError extracting {section} data: {str(e)}")
-                    import traceback
-                    traceback.print_exc()
+                    logger.error("Error extracting %s data: %s", section, e, exc_info=True)
                     self.update_data_table(None, section)
             else:
                 # If we're on the header section and we have a pre-loaded header_df (passed from main),
@@ -808,26 +839,26 @@ class InvoiceSectionViewer(QWidget):
                 if section == 'header' and self.header_df is not None:
                     # Check if header_df is a list of DataFrames (new format) or a single DataFrame (old format)
                     if isinstance(self.header_df, list):
-                        print("Using pre-loaded header tables (list format)")
+                        logger.debug("Using pre-loaded header tables (list format)")
                         self.update_data_table_for_header(self.header_df, section_type=section)
                     else:
-                        print("Using pre-loaded header table (single DataFrame format)")
+                        logger.debug("Using pre-loaded header table (single DataFrame format)")
                         self.update_data_table(self.header_df, section)
                 elif section == 'items' and self.item_details_df is not None:
                     # Check if item_details_df is a list of DataFrames (new format) or a single DataFrame (old format)
                     if isinstance(self.item_details_df, list):
-                        print("Using pre-loaded items tables (list format)")
+                        logger.debug("Using pre-loaded items tables (list format)")
                         self.update_data_table_for_header(self.item_details_df, section_type=section)
                     else:
-                        print("Using pre-loaded items table (single DataFrame format)")
+                        logger.debug("Using pre-loaded items table (single DataFrame format)")
                         self.update_data_table(self.item_details_df, section)
                 elif section == 'summary' and self.summary_df is not None:
                     # Check if summary_df is a list of DataFrames (new format) or a single DataFrame (old format)
                     if isinstance(self.summary_df, list):
-                        print("Using pre-loaded summary tables (list format)")
+                        logger.debug("Using pre-loaded summary tables (list format)")
                         self.update_data_table_for_header(self.summary_df, section_type=section)
                     else:
-                        print("Using pre-loaded summary table (single DataFrame format)")
+                        logger.debug("Using pre-loaded summary table (single DataFrame format)")
                         self.update_data_table(self.summary_df, section)
                 else:
                     self.update_data_table(None, section)
@@ -847,10 +878,10 @@ class InvoiceSectionViewer(QWidget):
                     'summary': {}
                 }
             }
-            print("\nInitialized default extraction parameters:")
-            print(f"  Header row_tol: {self.extraction_params['header']['row_tol']}")
-            print(f"  Items row_tol: {self.extraction_params['items']['row_tol']}")
-            print(f"  Summary row_tol: {self.extraction_params['summary']['row_tol']}")
+            logger.debug("Initialized default extraction parameters:")
+            logger.debug("Header row_tol: %s", self.extraction_params['header']['row_tol'])
+            logger.debug("Items row_tol: %s", self.extraction_params['items']['row_tol'])
+            logger.debug("Summary row_tol: %s", self.extraction_params['summary']['row_tol'])
         else:
             # Make sure all section parameters exist with proper defaults
             if 'header' not in self.extraction_params:
@@ -892,8 +923,8 @@ class InvoiceSectionViewer(QWidget):
     def update_data_table_for_header(self, table_list, section_type='header'):
         """Method to display multiple tables of a section type (header or summary)"""
         try:
-            print(f"\n=== Updating data table for {section_type} ===")
-            print(f"Input type: {type(table_list)}")
+            logger.debug("=== Updating data table for %s ===", section_type)
+            logger.debug("Input type: %s", type(table_list))
             
             # Clear existing table
             self.data_table.setRowCount(0)
@@ -901,32 +932,32 @@ class InvoiceSectionViewer(QWidget):
             
             # Handle empty input
             if table_list is None:
-                print("Table list is None")
+                logger.debug("Table list is None")
                 return
                 
             if isinstance(table_list, pd.DataFrame):
-                print("Single DataFrame provided")
+                logger.debug("Single DataFrame provided")
                 if table_list.empty:
-                    print("DataFrame is empty")
+                    logger.debug("DataFrame is empty")
                     return
                 table_list = [table_list]
             elif not isinstance(table_list, list):
-                print(f"Unexpected input type: {type(table_list)}")
+                logger.debug("Unexpected input type: %s", type(table_list))
                 return
                 
             if len(table_list) == 0:
-                print("Table list is empty")
+                logger.debug("Table list is empty")
                 return
             
-            print(f"Processing {len(table_list)} tables")
+            logger.debug("Processing %s tables", len(table_list))
             
             # Process each table
             for i, df in enumerate(table_list):
                 if df is None or df.empty:
-                    print(f"Table {i + 1} is None or empty, skipping")
+                    logger.debug("Table %s is None or empty, skipping", i + 1)
                     continue
                     
-                print(f"Processing table {i + 1} with shape {df.shape}")
+                logger.debug("Processing table %s with shape %s", i + 1, df.shape)
                 
                 # Add table number as header if multiple tables
                 if len(table_list) > 1:
@@ -966,12 +997,10 @@ class InvoiceSectionViewer(QWidget):
                     self.data_table.setItem(spacer_row, 0, spacer_item)
                     self.data_table.setSpan(spacer_row, 0, 1, df.shape[1])
             
-            print("Data table update completed successfully")
+            logger.debug("Data table update completed successfully")
             
         except Exception as e:
-            print(f"\nError in update_data_table_for_header: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.error("Error in update_data_table_for_header: %s", e, exc_info=True)
             # Clear the table in case of error
             self.data_table.setRowCount(0)
             self.data_table.setColumnCount(0)
@@ -1133,41 +1162,41 @@ class InvoiceSectionViewer(QWidget):
 
     def go_back(self):
         """Return to the main screen instead of the previous screen to maintain proper navigation flow"""
-        print("[DEBUG] go_back method called in InvoiceSectionViewer")
+        logger.debug("go_back method called in InvoiceSectionViewer")
         
         # Get the main window
         main_window = self.window()
         if main_window:
-            print("[DEBUG] Found main window")
+            logger.debug("Found main window")
             stacked_widget = main_window.findChild(QStackedWidget)
             if stacked_widget:
-                print("[DEBUG] Found stacked widget")
+                logger.debug("Found stacked widget")
                 # Instead of returning to the previous screen, always return to the main screen
                 # This avoids issues with destroyed screens and maintains signal connections
                 try:
                     # Try to access the main screen (should be at index 0)
                     main_screen = stacked_widget.widget(0)
                     if main_screen:
-                        print("[DEBUG] Setting current widget to main screen")
+                        logger.debug("Setting current widget to main screen")
                         stacked_widget.setCurrentWidget(main_screen)
                     else:
                         # If we can't access the main screen directly, go to the first available screen
-                        print("[DEBUG] Main screen not found, going to first screen")
+                        logger.debug("Main screen not found, going to first screen")
                         stacked_widget.setCurrentIndex(0)
                 except Exception as e:
-                    print(f"[ERROR] Error navigating back: {str(e)}")
+                    logger.error("[ERROR] Error navigating back: %s", e)
                     # Fall back to previous behavior if the above fails
                     current_index = stacked_widget.currentIndex()
                     if current_index > 0:  # Make sure we're not at the first screen
                         stacked_widget.setCurrentIndex(current_index - 1)
             else:
-                print("[ERROR] Could not find stacked widget")
+                logger.error("[ERROR] Could not find stacked widget")
         else:
-            print("[ERROR] Could not find main window")
+            logger.error("[ERROR] Could not find main window")
 
     def save_template(self):
         """Signal to the main application to show the template saving screen"""
-        print("\n[DEBUG] save_template method called in InvoiceSectionViewer")
+        logger.debug("save_template method called in InvoiceSectionViewer")
         
         try:
             # Import necessary modules
@@ -1301,9 +1330,7 @@ class InvoiceSectionViewer(QWidget):
                 self.save_template_directly(template_name, template_description)
             
         except Exception as e:
-            print(f"[ERROR] Failed in save_template method: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.error("[ERROR] Failed in save_template method: %s", e, exc_info=True)
             
             # Show error message to user if signal emission fails
             msg = QMessageBox()
@@ -1339,10 +1366,10 @@ class InvoiceSectionViewer(QWidget):
                     page_width = page.mediabox.width
                     page_height = page.mediabox.height
                     
-                    # Get rendered dimensions
-                    pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))
-                    rendered_width = pix.width
-                    rendered_height = pix.height
+                    # Get the rendered dimensions from the page geometry (no rendering needed)
+                    transform = get_page_transform(self.document_context, page.number)
+                    rendered_width = transform.rendered_width
+                    rendered_height = transform.rendered_height
                     
                     # Calculate scaling factors
                     scale_x = page_width / rendered_width
@@ -1383,7 +1410,7 @@ class InvoiceSectionViewer(QWidget):
                             line_data.append(line[2])  # Add region index if present
                         serializable_column_lines[section].append(line_data)
                     except Exception as e:
-                        print(f"Warning: Error converting column line in section {section}: {str(e)}")
+                        logger.warning("Error converting column line in section %s: %s", section, e)
                         continue
                 
             # Create the configuration object
@@ -1393,7 +1420,7 @@ class InvoiceSectionViewer(QWidget):
             
             # Ensure we have extraction_params with proper default values if not set elsewhere
             if not hasattr(self, 'extraction_params'):
-                print("\nInitializing default extraction parameters for template saving:")
+                logger.debug("Initializing default extraction parameters for template saving:")
                 self.extraction_params = {
                     'header': {'row_tol': 5},    # Default for header
                     'items': {'row_tol': 15},    # Default for items
@@ -1407,25 +1434,27 @@ class InvoiceSectionViewer(QWidget):
                         'summary': {}
                     }
                 }
-                print(f"  Header row_tol: {self.extraction_params['header']['row_tol']}")
-                print(f"  Items row_tol: {self.extraction_params['items']['row_tol']}")
-                print(f"  Summary row_tol: {self.extraction_params['summary']['row_tol']}")
+                logger.debug("Header row_tol: %s", self.extraction_params['header']['row_tol'])
+                logger.debug("Items row_tol: %s", self.extraction_params['items']['row_tol'])
+                logger.debug("Summary row_tol: %s", self.extraction_params['summary']['row_tol'])
                 
                 # Try to get extraction params from main window as a fallback
                 try:
-                    from PySide6.QtWidgets import QApplication
                     from main import PDFHarvest
                     
                     for widget in QApplication.topLevelWidgets():
                         if isinstance(widget, PDFHarvest) and hasattr(widget, 'latest_extraction_params'):
                             latest_params = widget.latest_extraction_params
-                            print("Found latest extraction parameters in main window, incorporating them")
+                            logger.debug("Found latest extraction parameters in main window, incorporating them")
                             
                             # Update section-specific parameters if they exist
                             for section in ['header', 'items', 'summary']:
                                 if section in latest_params and 'row_tol' in latest_params[section]:
                                     self.extraction_params[section]['row_tol'] = latest_params[section]['row_tol']
-                                    print(f"  Updated {section} row_tol to {latest_params[section]['row_tol']}")
+                                    logger.debug(
+                                        "Updated %s row_tol to %s",
+                                        section, latest_params[section]['row_tol']
+                                    )
                             
                             # Update global parameters if they exist
                             if 'split_text' in latest_params:
@@ -1435,16 +1464,16 @@ class InvoiceSectionViewer(QWidget):
                             
                             # Merge regex patterns if they exist
                             if 'regex_patterns' in latest_params:
-                                print("  Found regex patterns in main window:")
+                                logger.debug("Found regex patterns in main window:")
                                 for section, patterns in latest_params['regex_patterns'].items():
                                     if section in self.extraction_params['regex_patterns'] and patterns:
                                         for p_type, pattern in patterns.items():
                                             self.extraction_params['regex_patterns'][section][p_type] = pattern
-                                            print(f"    Added {section} {p_type} pattern: {pattern}")
+                                            logger.debug("Added %s %s pattern: %s", section, p_type, pattern)
                             
                             break
                 except Exception as e:
-                    print(f"Could not get latest extraction params from main window: {str(e)}")
+                    logger.warning("Could not get latest extraction params from main window: %s", e)
             else:
                 # Make sure all section parameters exist with proper defaults
                 if 'header' not in self.extraction_params:
@@ -1489,16 +1518,16 @@ class InvoiceSectionViewer(QWidget):
                                 
                                 # Merge regex patterns if they exist
                                 if 'regex_patterns' in latest_params:
-                                    print("Found regex patterns in main window, incorporating them:")
+                                    logger.debug("Found regex patterns in main window, incorporating them:")
                                     for section, patterns in latest_params['regex_patterns'].items():
                                         if patterns:
                                             for p_type, pattern in patterns.items():
                                                 self.extraction_params['regex_patterns'][section][p_type] = pattern
-                                                print(f"  Added {section} {p_type} pattern: {pattern}")
+                                                logger.debug("Added %s %s pattern: %s", section, p_type, pattern)
                                 
                                 break
                     except Exception as e:
-                        print(f"Could not get regex patterns from main window: {str(e)}")
+                        logger.warning("Could not get regex patterns from main window: %s", e)
                 else:
                     # Ensure all section keys exist in regex_patterns
                     for section in ['header', 'items', 'summary']:
@@ -1508,22 +1537,22 @@ class InvoiceSectionViewer(QWidget):
             # Add extraction parameters to config
             config['extraction_params'] = self.extraction_params
             
-            print(f"\nFinal extraction parameters being saved to template:")
+            logger.debug("Final extraction parameters being saved to template:")
             for section in ['header', 'items', 'summary']:
-                print(f"  {section.title()} row_tol: {self.extraction_params[section]['row_tol']}")
+                logger.debug("%s row_tol: %s", section.title(), self.extraction_params[section]['row_tol'])
             
-            print(f"  split_text: {self.extraction_params['split_text']}")
-            print(f"  strip_text: {repr(self.extraction_params['strip_text'])}")
-            print(f"  flavor: {self.extraction_params['flavor']}")
+            logger.debug("split_text: %s", self.extraction_params['split_text'])
+            logger.debug("strip_text: %s", repr(self.extraction_params['strip_text']))
+            logger.debug("flavor: %s", self.extraction_params['flavor'])
             
             # Print regex patterns if they exist
             if 'regex_patterns' in self.extraction_params:
-                print("\nRegex patterns being saved to template:")
+                logger.debug("Regex patterns being saved to template:")
                 for section, patterns in self.extraction_params['regex_patterns'].items():
                     if patterns:
-                        print(f"  {section.title()} patterns:")
+                        logger.debug("%s patterns:", section.title())
                         for pattern_type, pattern in patterns.items():
-                            print(f"    {pattern_type}: {pattern}")
+                            logger.debug("%s: %s", pattern_type, pattern)
             
             # Save template to the database
             template_id = db.save_template(
@@ -1549,7 +1578,7 @@ class InvoiceSectionViewer(QWidget):
                         widget.current_template_id = template_id
                         break
             except Exception as e:
-                print(f"Could not set template ID in main window: {str(e)}")
+                logger.warning("Could not set template ID in main window: %s", e)
             
             # Show a brief success message
             brief_msg = QMessageBox(self)
@@ -1568,9 +1597,7 @@ class InvoiceSectionViewer(QWidget):
             self.navigate_to_template_manager()
             
         except Exception as e:
-            print(f"[ERROR] Failed to save template directly: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.error("[ERROR] Failed to save template directly: %s", e, exc_info=True)
             
             # Show error message
             msg_box = QMessageBox(self)
@@ -1587,12 +1614,12 @@ class InvoiceSectionViewer(QWidget):
             from PySide6.QtWidgets import QApplication, QStackedWidget
             import logging
             
-            print("\n[DEBUG] Attempting to navigate to template manager")
+            logger.debug("Attempting to navigate to template manager")
             
             # Method 1: Try to find main window via direct parent hierarchy
             main_window = self.window()
             if main_window:
-                print("[DEBUG] Found main window via window() method")
+                logger.debug("Found main window via window() method")
             else:
                 # Method 2: Try searching among top-level widgets
                 for widget in QApplication.topLevelWidgets():
@@ -1600,7 +1627,7 @@ class InvoiceSectionViewer(QWidget):
                     stacked_widget = widget.findChild(QStackedWidget)
                     if stacked_widget:
                         main_window = widget
-                        print("[DEBUG] Found main window by searching top-level widgets")
+                        logger.debug("Found main window by searching top-level widgets")
                         break
             
             if not main_window:
@@ -1610,17 +1637,17 @@ class InvoiceSectionViewer(QWidget):
                     main_window = main_window.parent()
                 
                 if main_window:
-                    print("[DEBUG] Found main window by walking up parent hierarchy")
+                    logger.debug("Found main window by walking up parent hierarchy")
                 else:
-                    print("[ERROR] Could not find main window - using workaround")
+                    logger.error("[ERROR] Could not find main window - using workaround")
                     # Fallback method: Look for our own widget in the stack
                     self_parent = self.parent()
                     if isinstance(self_parent, QStackedWidget):
                         # We're directly in a stacked widget
                         stacked_widget = self_parent
-                        print("[DEBUG] We're directly in a stacked widget - using that")
+                        logger.debug("We're directly in a stacked widget - using that")
                     else:
-                        print("[ERROR] No viable parent found, cannot navigate")
+                        logger.error("[ERROR] No viable parent found, cannot navigate")
                         return
             
             # Find the stacked widget if we found the main window
@@ -1628,9 +1655,9 @@ class InvoiceSectionViewer(QWidget):
             if main_window:
                 stacked_widget = main_window.findChild(QStackedWidget)
                 if stacked_widget:
-                    print(f"[DEBUG] Found stacked widget with {stacked_widget.count()} screens")
+                    logger.debug("Found stacked widget with %s screens", stacked_widget.count())
                 else:
-                    print("[ERROR] No stacked widget found in main window")
+                    logger.error("[ERROR] No stacked widget found in main window")
                     return
             
             if stacked_widget:
@@ -1640,7 +1667,7 @@ class InvoiceSectionViewer(QWidget):
                     widget = stacked_widget.widget(i)
                     if hasattr(widget, 'load_templates'):  # A method unique to TemplateManager
                         template_manager_index = i
-                        print(f"[DEBUG] Found template manager at index {i}")
+                        logger.debug("Found template manager at index %s", i)
                         break
                 
                 # Approach 2: If method 1 fails, look for widget with the right class name
@@ -1650,7 +1677,7 @@ class InvoiceSectionViewer(QWidget):
                         class_name = widget.__class__.__name__
                         if class_name == "TemplateManager" or "template_manager" in class_name.lower():
                             template_manager_index = i
-                            print(f"[DEBUG] Found template manager by class name at index {i}")
+                            logger.debug("Found template manager by class name at index %s", i)
                             break
                 
                 # Navigate if we found the template manager
@@ -1660,24 +1687,25 @@ class InvoiceSectionViewer(QWidget):
                     try:
                         if hasattr(template_manager, 'load_templates'):
                             template_manager.load_templates()
-                            print("[DEBUG] Successfully refreshed template list")
+                            logger.debug("Successfully refreshed template list")
                         else:
-                            print("[WARNING] Template manager doesn't have load_templates method")
+                            logger.warning("[WARNING] Template manager doesn't have load_templates method")
                     except Exception as refresh_error:
-                        print(f"[WARNING] Error refreshing template list: {str(refresh_error)}")
+                        logger.warning("[WARNING] Error refreshing template list: %s", str(refresh_error))
                     
                     # Navigate to the template manager screen
                     stacked_widget.setCurrentIndex(template_manager_index)
-                    print(f"[DEBUG] Successfully navigated to template manager at index {template_manager_index}")
+                    logger.debug(
+                        "Successfully navigated to template manager at index %s",
+                        template_manager_index
+                    )
                 else:
-                    print("[ERROR] Could not find template manager in the stacked widget")
+                    logger.error("[ERROR] Could not find template manager in the stacked widget")
             else:
-                print("[ERROR] No stacked widget available")
+                logger.error("[ERROR] No stacked widget available")
                 
         except Exception as e:
-            print(f"[ERROR] Failed to navigate to template manager: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.error("[ERROR] Failed to navigate to template manager: %s", e, exc_info=True)
 
     def create_styled_messagebox(self, title, text, informative_text, detailed_text=None):
         """Create a styled QMessageBox with white text on dark background"""
@@ -1823,7 +1851,7 @@ class InvoiceSectionViewer(QWidget):
         if hasattr(self, 'extraction_params') and section in self.extraction_params:
             if 'row_tol' in self.extraction_params[section]:
                 current_row_tol = self.extraction_params[section]['row_tol']
-                print(f"Using existing row_tol={current_row_tol} for {section} section")
+                logger.debug("Using existing row_tol=%s for %s section", current_row_tol, section)
         
         # If no existing value, use the recommended defaults
         if current_row_tol is None:
@@ -1833,7 +1861,7 @@ class InvoiceSectionViewer(QWidget):
                 current_row_tol = 15     # Default for items
             else:  # summary
                 current_row_tol = 10     # Default for summary
-            print(f"Using default row_tol={current_row_tol} for {section} section")
+            logger.debug("Using default row_tol=%s for %s section", current_row_tol, section)
         
         # Row tolerance parameter
         row_tol_input = QSpinBox()
@@ -1925,7 +1953,7 @@ class InvoiceSectionViewer(QWidget):
                 'flavor': 'stream'  # Keep this fixed
             }
             
-            print(f"\nRetrying extraction with new parameters: {new_params}")
+            logger.debug("Retrying extraction with new parameters: %s", new_params)
             
             # Create or update extraction_params with ACTUAL values, not defaults
             # This uses a more direct approach without initializing with defaults
@@ -1960,18 +1988,18 @@ class InvoiceSectionViewer(QWidget):
                         self.extraction_params['regex_patterns'][sec] = {}
             
             # Print current extraction parameters for debugging
-            print(f"\nUpdated extraction parameters:")
-            print(f"  {section.title()} row_tol: {self.extraction_params[section]['row_tol']}")
-            print(f"  split_text: {self.extraction_params['split_text']}")
-            print(f"  strip_text: {repr(self.extraction_params['strip_text'])}")
+            logger.debug("Updated extraction parameters:")
+            logger.debug("%s row_tol: %s", section.title(), self.extraction_params[section]['row_tol'])
+            logger.debug("split_text: %s", self.extraction_params['split_text'])
+            logger.debug("strip_text: %s", repr(self.extraction_params['strip_text']))
             
             # Print regex patterns if they exist
-            print("\nRegex patterns in extraction parameters:")
+            logger.debug("Regex patterns in extraction parameters:")
             for sec, patterns in self.extraction_params['regex_patterns'].items():
                 if patterns:
-                    print(f"  {sec.title()} patterns:")
+                    logger.debug("%s patterns:", sec.title())
                     for pattern_type, pattern in patterns.items():
-                        print(f"    {pattern_type}: {pattern}")
+                        logger.debug("%s: %s", pattern_type, pattern)
             
             # Also store in main window for reference during template saves
             try:
@@ -2016,19 +2044,17 @@ class InvoiceSectionViewer(QWidget):
                                 for p_type, pattern in patterns.items():
                                     widget.latest_extraction_params['regex_patterns'][sec][p_type] = pattern
                         
-                        print("\nStored extraction parameters in main window for template saving")
+                        logger.debug("Stored extraction parameters in main window for template saving")
                         break
             except Exception as e:
-                print(f"Error storing extraction parameters in main window: {str(e)}")
-                import traceback
-                traceback.print_exc()
+                logger.error("Error storing extraction parameters in main window: %s", e, exc_info=True)
             
             # Process for multiple tables
             if len(table_areas) > 1:
                 processed_tables = []
                 
                 for idx, (table_area, col_line) in enumerate(zip(table_areas, column_lines)):
-                    print(f"\nRetrying extraction for {section.title()} Table {idx + 1}:")
+                    logger.debug("Retrying extraction for %s Table %s:", section.title(), idx + 1)
                     try:
                         # Parameters for this single table with new values
                         single_table_params = {
@@ -2046,7 +2072,7 @@ class InvoiceSectionViewer(QWidget):
                             if section in self.extraction_params['regex_patterns']:
                                 regex_patterns = self.extraction_params['regex_patterns'][section]
                                 if regex_patterns:
-                                    print(f"  Applying regex patterns: {regex_patterns}")
+                                    logger.debug("Applying regex patterns: %s", regex_patterns)
                                     
                                     # Apply start pattern if defined
                                     if 'start' in regex_patterns and regex_patterns['start']:
@@ -2060,16 +2086,16 @@ class InvoiceSectionViewer(QWidget):
                                     if 'skip' in regex_patterns and regex_patterns['skip']:
                                         single_table_params['skip_regex'] = regex_patterns['skip']
                         
-                        print(f"  Using parameters: {single_table_params}")
+                        logger.debug("Using parameters: %s", single_table_params)
                         
                         # Extract just this table
-                        table_result = pypdf_table_extraction.read_pdf(self.pdf_path, **single_table_params)
+                        table_result = self.document_context.read_pdf(**single_table_params)
                         
                         if table_result and len(table_result) > 0 and table_result[0].df is not None:
                             table_df = table_result[0].df
                             
-                            print(f"  Raw data extracted:")
-                            print(table_df)
+                            logger.debug("Raw data extracted:")
+                            logger.debug("%s", table_df)
                             
                             # Clean up the DataFrame
                             table_df = table_df.replace(r'^\s*$', pd.NA, regex=True)
@@ -2080,18 +2106,24 @@ class InvoiceSectionViewer(QWidget):
                             table_df = self.apply_regex_patterns_to_df(table_df, section)
                             
                             if not table_df.empty:
-                                print(f"  Successfully extracted table with {len(table_df)} rows and {len(table_df.columns)} columns")
+                                logger.debug(
+                                    "Successfully extracted table with %s rows and %s columns",
+                                    len(table_df), len(table_df.columns)
+                                )
                                 processed_tables.append(table_df)
                             else:
-                                print(f"  No valid data found after cleaning and applying regex patterns")
+                                logger.warning("No valid data found after cleaning and applying regex patterns")
                         else:
-                            print(f"  No data extracted from table area")
+                            logger.warning("No data extracted from table area")
                     except Exception as e:
-                        print(f"  Error extracting table: {str(e)}")
+                        logger.error("Error extracting table: %s", e)
                 
                 # Update the display with tables in the correct order
                 if processed_tables:
-                    print(f"\nSuccessfully processed {len(processed_tables)} {section} tables with new parameters")
+                    logger.debug(
+                        "Successfully processed %s %s tables with new parameters",
+                        len(processed_tables), section
+                    )
                     
                     # Store the newly extracted data for later use (including JSON download)
                     if section == 'header':
@@ -2105,7 +2137,7 @@ class InvoiceSectionViewer(QWidget):
                         self.summary_df = processed_tables
                         self.update_data_table_for_header(processed_tables, section_type=section)
                 else:
-                    print(f"No valid {section} tables found with new parameters")
+                    logger.warning("No valid %s tables found with new parameters", section)
                     # Clear any existing data for this section
                     if section == 'header':
                         self.header_df = None
@@ -2131,7 +2163,7 @@ class InvoiceSectionViewer(QWidget):
                     if section in self.extraction_params['regex_patterns']:
                         regex_patterns = self.extraction_params['regex_patterns'][section]
                         if regex_patterns:
-                            print(f"Applying regex patterns: {regex_patterns}")
+                            logger.debug("Applying regex patterns: %s", regex_patterns)
                             
                             # Apply start pattern if defined
                             if 'start' in regex_patterns and regex_patterns['start']:
@@ -2145,17 +2177,17 @@ class InvoiceSectionViewer(QWidget):
                             if 'skip' in regex_patterns and regex_patterns['skip']:
                                 single_table_params['skip_regex'] = regex_patterns['skip']
                 
-                print(f"\nRetrying single table extraction with new parameters: {single_table_params}")
+                logger.debug("Retrying single table extraction with new parameters: %s", single_table_params)
                 
                 try:
                     # Extract table with new parameters
-                    table_result = pypdf_table_extraction.read_pdf(self.pdf_path, **single_table_params)
+                    table_result = self.document_context.read_pdf(**single_table_params)
                     
                     if table_result and len(table_result) > 0 and table_result[0].df is not None:
                         table_df = table_result[0].df
                         
-                        print(f"Raw data extracted:")
-                        print(table_df)
+                        logger.debug("Raw data extracted:")
+                        logger.debug("%s", table_df)
                         
                         # Clean up the DataFrame
                         table_df = table_df.replace(r'^\s*$', pd.NA, regex=True)
@@ -2163,7 +2195,10 @@ class InvoiceSectionViewer(QWidget):
                         table_df = table_df.dropna(axis=1, how='all')
                         
                         if not table_df.empty:
-                            print(f"Successfully extracted table with {len(table_df)} rows and {len(table_df.columns)} columns")
+                            logger.debug(
+                                "Successfully extracted table with %s rows and %s columns",
+                                len(table_df), len(table_df.columns)
+                            )
                             
                             # Store the newly extracted data
                             if section == 'header':
@@ -2176,7 +2211,7 @@ class InvoiceSectionViewer(QWidget):
                             # Update the data table
                             self.update_data_table(table_df, section)
                         else:
-                            print(f"No valid data found after cleaning")
+                            logger.warning("No valid data found after cleaning")
                             # Clear any existing data for this section
                             if section == 'header':
                                 self.header_df = None
@@ -2186,10 +2221,10 @@ class InvoiceSectionViewer(QWidget):
                                 self.summary_df = None
                             self.update_data_table(None, section)
                     else:
-                        print(f"No data extracted from table area")
+                        logger.warning("No data extracted from table area")
                         
                 except Exception as e:
-                    print(f"Error extracting table: {str(e)}")
+                    logger.error("Error extracting table: %s", e)
             
         return param_dialog.result() == QDialog.Accepted
 
@@ -2208,10 +2243,9 @@ class InvoiceSectionViewer(QWidget):
             # This is similar to what's done in extract_and_update_section_data
             
             # Get the first page of the PDF to calculate scaling
-            doc = fitz.open(self.pdf_path)
-            page = doc[0]
-            page_width = page.rect.width
-            page_height = page.rect.height
+            transform = get_page_transform(self.document_context, 0)
+            page_width = transform.page_width
+            page_height = transform.page_height
             
             # Calculate scaling factors between display and PDF coordinates
             scale_x = page_width / self.pdf_label.pixmap().width()
@@ -2332,8 +2366,7 @@ class InvoiceSectionViewer(QWidget):
         """Show dialog for testing regex patterns on current section data"""
         from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, 
                                       QPushButton, QLineEdit, QTableWidget, QTableWidgetItem,
-                                      QHeaderView, QFormLayout, QComboBox, 
-                                      QCheckBox, QGroupBox)
+                                      QHeaderView, QFormLayout, QCheckBox)
         from PySide6.QtGui import QColor, QFont
         from PySide6.QtCore import Qt
         
@@ -2526,20 +2559,20 @@ class InvoiceSectionViewer(QWidget):
         # Function to update PDF highlights
         def update_pdf_highlights(matches, non_matches, section):
             try:
-                print(f"\n=== Starting PDF highlight update ===")
-                print(f"Section: {section}")
-                print(f"Number of matches: {len(matches)}")
-                print(f"Number of non-matches: {len(non_matches)}")
+                logger.debug("=== Starting PDF highlight update ===")
+                logger.debug("Section: %s", section)
+                logger.debug("Number of matches: %s", len(matches))
+                logger.debug("Number of non-matches: %s", len(non_matches))
                 
                 if not hasattr(self, 'drawing_pixmap') or self.drawing_pixmap is None:
-                    print("Error: No drawing pixmap available")
+                    logger.error("No drawing pixmap available")
                     return
                     
-                print("Creating copy of drawing pixmap")
+                logger.debug("Creating copy of drawing pixmap")
                 highlighted_pixmap = self.drawing_pixmap.copy()
                 painter = QPainter(highlighted_pixmap)
                 
-                print("Drawing base sections")
+                logger.debug("Drawing base sections")
                 self.draw_sections()
                 
                 # Set up colors for highlighting
@@ -2547,7 +2580,7 @@ class InvoiceSectionViewer(QWidget):
                 first_match_color = QColor(200, 230, 201, 150)  # Slightly darker green with transparency
                 non_match_color = QColor(255, 235, 238, 100)  # Light red with transparency
                 
-                print("Processing matches")
+                logger.debug("Processing matches")
                 # Draw highlights for matches
                 for table_idx, row_idx, _, is_first in matches:
                     try:
@@ -2561,7 +2594,7 @@ class InvoiceSectionViewer(QWidget):
                             table_area = self.summary_areas[table_idx] if self.summary_areas else None
                         
                         if table_area:
-                            print(f"Processing match in table {table_idx + 1}, row {row_idx}")
+                            logger.debug("Processing match in table %s, row %s", table_idx + 1, row_idx)
                             # Calculate the y position for this row
                             df = None
                             if section == 'header':
@@ -2575,7 +2608,7 @@ class InvoiceSectionViewer(QWidget):
                                 row_height = table_area['height'] / df.shape[0]
                                 y = table_area['y'] + (row_idx * row_height)
                                 
-                                print(f"Drawing highlight at y={y}, height={row_height}")
+                                logger.debug("Drawing highlight at y=%s, height=%s", y, row_height)
                                 # Draw highlight rectangle
                                 painter.fillRect(
                                     table_area['x'],
@@ -2585,14 +2618,17 @@ class InvoiceSectionViewer(QWidget):
                                     first_match_color if is_first else match_color
                                 )
                             else:
-                                print(f"Warning: No data available for table {table_idx + 1}")
+                                logger.warning("No data available for table %s", table_idx + 1)
                         else:
-                            print(f"Warning: No table area found for table {table_idx + 1}")
+                            logger.warning("No table area found for table %s", table_idx + 1)
                     except Exception as match_e:
-                        print(f"Error processing match in table {table_idx + 1}, row {row_idx}: {str(match_e)}")
+                        logger.error(
+                            "Error processing match in table %s, row %s: %s",
+                            table_idx + 1, row_idx, str(match_e)
+                        )
                         continue
                 
-                print("Processing non-matches")
+                logger.debug("Processing non-matches")
                 # Draw highlights for non-matches
                 for table_idx, row_idx, _, _ in non_matches:
                     try:
@@ -2606,7 +2642,7 @@ class InvoiceSectionViewer(QWidget):
                             table_area = self.summary_areas[table_idx] if self.summary_areas else None
                         
                         if table_area:
-                            print(f"Processing non-match in table {table_idx + 1}, row {row_idx}")
+                            logger.debug("Processing non-match in table %s, row %s", table_idx + 1, row_idx)
                             # Calculate the y position for this row
                             df = None
                             if section == 'header':
@@ -2620,7 +2656,7 @@ class InvoiceSectionViewer(QWidget):
                                 row_height = table_area['height'] / df.shape[0]
                                 y = table_area['y'] + (row_idx * row_height)
                                 
-                                print(f"Drawing highlight at y={y}, height={row_height}")
+                                logger.debug("Drawing highlight at y=%s, height=%s", y, row_height)
                                 # Draw highlight rectangle
                                 painter.fillRect(
                                     table_area['x'],
@@ -2630,22 +2666,23 @@ class InvoiceSectionViewer(QWidget):
                                     non_match_color
                                 )
                             else:
-                                print(f"Warning: No data available for table {table_idx + 1}")
+                                logger.warning("No data available for table %s", table_idx + 1)
                         else:
-                            print(f"Warning: No table area found for table {table_idx + 1}")
+                            logger.warning("No table area found for table %s", table_idx + 1)
                     except Exception as non_match_e:
-                        print(f"Error processing non-match in table {table_idx + 1}, row {row_idx}: {str(non_match_e)}")
+                        logger.error(
+                            "Error processing non-match in table %s, row %s: %s",
+                            table_idx + 1, row_idx, str(non_match_e)
+                        )
                         continue
                 
-                print("Ending painter and updating pixmap")
+                logger.debug("Ending painter and updating pixmap")
                 painter.end()
                 self.pdf_label.setPixmap(highlighted_pixmap)
-                print("PDF highlight update completed successfully")
+                logger.debug("PDF highlight update completed successfully")
                 
             except Exception as e:
-                print(f"\nError in update_pdf_highlights: {str(e)}")
-                import traceback
-                traceback.print_exc()
+                logger.error("Error in update_pdf_highlights: %s", e, exc_info=True)
                 # Ensure we always end the painter and restore the original view
                 if painter:
                     painter.end()
@@ -2735,8 +2772,8 @@ class InvoiceSectionViewer(QWidget):
                         widget.latest_extraction_params['regex_patterns'][section][p_type] = pattern
                         
                         # Print info about what we've stored
-                        print(f"\nStored regex pattern in main window:")
-                        print(f"  Section: {section}, Type: {p_type}, Pattern: {pattern}")
+                        logger.debug("Stored regex pattern in main window:")
+                        logger.debug("Section: %s, Type: %s, Pattern: %s", section, p_type, pattern)
                         
                         # Make sure we preserve existing extraction parameters too
                         if not hasattr(self, 'extraction_params'):
@@ -2759,9 +2796,7 @@ class InvoiceSectionViewer(QWidget):
                                 
                         break
             except Exception as e:
-                print(f"Could not store regex pattern in main window: {str(e)}")
-                import traceback
-                traceback.print_exc()
+                logger.warning("Could not store regex pattern in main window: %s", e, exc_info=True)
         
         # Connect button signals
         test_button.clicked.connect(on_test_clicked)
@@ -2892,9 +2927,7 @@ class InvoiceSectionViewer(QWidget):
                     row_label
                 )
         except Exception as e:
-            print(f"Error highlighting matches: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.error("Error highlighting matches: %s", e, exc_info=True)
         
         painter.end()
         return highlighted_pixmap
@@ -2902,76 +2935,56 @@ class InvoiceSectionViewer(QWidget):
     def apply_regex_patterns_to_df(self, df, section):
         """Apply regex patterns to filter DataFrame content"""
         try:
-            print(f"\n=== Applying regex patterns to {section} DataFrame ===")
+            logger.debug("=== Applying regex patterns to %s DataFrame ===", section)
             if df is None or df.empty:
-                print("DataFrame is None or empty")
+                logger.debug("DataFrame is None or empty")
                 return df
                 
-            print(f"Input DataFrame shape: {df.shape}")
+            logger.debug("Input DataFrame shape: %s", df.shape)
             
             # Get patterns for this section
             patterns = {}
             if hasattr(self, 'extraction_params') and 'regex_patterns' in self.extraction_params:
                 if section in self.extraction_params['regex_patterns']:
                     patterns = self.extraction_params['regex_patterns'][section]
-                    print(f"Found patterns for {section}: {patterns}")
+                    logger.debug("Found patterns for %s: %s", section, patterns)
             
             if not patterns:
-                print("No patterns found for this section")
+                logger.warning("No patterns found for this section")
                 return df
             
+            # Join each row's text once; all patterns are matched against it
+            texts = row_texts(df, skip_na=True)
+            
             # Apply start pattern
-            if 'start' in patterns:
-                start_pattern = patterns['start']
-                print(f"Applying start pattern: {start_pattern}")
-                start_match_idx = None
-                for idx, row in df.iterrows():
-                    row_text = " ".join([str(val) for val in row if pd.notna(val)])
-                    if re.search(start_pattern, row_text, re.IGNORECASE):
-                        start_match_idx = idx
-                        print(f"Found start row at index {idx}")
-                        break
-                
-                if start_match_idx is not None:
-                    df = df.loc[start_match_idx:]
-                    print(f"DataFrame after start pattern: {df.shape}")
+            if compile_pattern(patterns.get('start')) is not None:
+                logger.debug("Applying start pattern: %s", patterns['start'])
+                start_pos = first_match(texts, patterns['start'])
+                if start_pos is not None:
+                    df = df.iloc[start_pos:]
+                    texts = texts.iloc[start_pos:]
+                    logger.debug("DataFrame after start pattern: %s", df.shape)
             
             # Apply end pattern
-            if 'end' in patterns:
-                end_pattern = patterns['end']
-                print(f"Applying end pattern: {end_pattern}")
-                end_match_idx = None
-                for idx, row in df.iterrows():
-                    row_text = " ".join([str(val) for val in row if pd.notna(val)])
-                    if re.search(end_pattern, row_text, re.IGNORECASE):
-                        end_match_idx = idx
-                        print(f"Found end row at index {idx}")
-                        break
-                
-                if end_match_idx is not None:
-                    df = df.loc[:end_match_idx]
-                    print(f"DataFrame after end pattern: {df.shape}")
+            if compile_pattern(patterns.get('end')) is not None:
+                logger.debug("Applying end pattern: %s", patterns['end'])
+                end_pos = first_match(texts, patterns['end'])
+                if end_pos is not None:
+                    df = df.iloc[:end_pos + 1]
+                    texts = texts.iloc[:end_pos + 1]
+                    logger.debug("DataFrame after end pattern: %s", df.shape)
             
             # Apply skip pattern
-            if 'skip' in patterns:
-                skip_pattern = patterns['skip']
-                print(f"Applying skip pattern: {skip_pattern}")
-                rows_to_keep = []
-                for idx, row in df.iterrows():
-                    row_text = " ".join([str(val) for val in row if pd.notna(val)])
-                    if not re.search(skip_pattern, row_text, re.IGNORECASE):
-                        rows_to_keep.append(idx)
-                
-                df = df.loc[rows_to_keep]
-                print(f"DataFrame after skip pattern: {df.shape}")
+            if compile_pattern(patterns.get('skip')) is not None:
+                logger.debug("Applying skip pattern: %s", patterns['skip'])
+                df = df[~skip_mask(df, patterns['skip'], texts=texts)]
+                logger.debug("DataFrame after skip pattern: %s", df.shape)
             
-            print(f"Final DataFrame shape: {df.shape}")
+            logger.debug("Final DataFrame shape: %s", df.shape)
             return df
             
         except Exception as e:
-            print(f"\nError in apply_regex_patterns_to_df: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.error("Error in apply_regex_patterns_to_df: %s", e, exc_info=True)
             return df
 
     def test_regex_pattern(self, pattern, section, pattern_type):
@@ -2981,55 +2994,55 @@ class InvoiceSectionViewer(QWidget):
         error = None
         
         try:
-            print(f"\n=== Starting regex pattern test ===")
-            print(f"Pattern: {pattern}")
-            print(f"Section: {section}")
-            print(f"Pattern Type: {pattern_type}")
+            logger.debug("=== Starting regex pattern test ===")
+            logger.debug("Pattern: %s", pattern)
+            logger.debug("Section: %s", section)
+            logger.debug("Pattern Type: %s", pattern_type)
             
             # Validate the regex pattern
             try:
                 re.compile(pattern)
-                print("Regex pattern validation successful")
+                logger.debug("Regex pattern validation successful")
             except re.error as e:
-                print(f"Regex pattern validation failed: {str(e)}")
+                logger.debug("Regex pattern validation failed: %s", e)
                 return [], [], f"Invalid regex pattern: {str(e)}"
             
             # Get the data for this section
             section_data = None
             if section == 'header':
                 section_data = self.header_df
-                print("Using header_df data")
+                logger.debug("Using header_df data")
             elif section == 'items':
                 section_data = self.item_details_df
-                print("Using item_details_df data")
+                logger.debug("Using item_details_df data")
             elif section == 'summary':
                 section_data = self.summary_df
-                print("Using summary_df data")
+                logger.debug("Using summary_df data")
             
             if section_data is None:
-                print("No data available for this section")
+                logger.warning("No data available for this section")
                 return [], [], "No data available for this section"
             
-            print(f"Section data type: {type(section_data)}")
+            logger.debug("Section data type: %s", type(section_data))
             if isinstance(section_data, list):
-                print(f"Number of tables in section: {len(section_data)}")
+                logger.debug("Number of tables in section: %s", len(section_data))
             else:
-                print(f"Single table with shape: {section_data.shape}")
+                logger.debug("Single table with shape: %s", section_data.shape)
             
             # Process the data for matching
             if isinstance(section_data, list):
                 # Multiple tables
                 for table_idx, df in enumerate(section_data):
-                    print(f"\nProcessing table {table_idx + 1}")
+                    logger.debug("Processing table %s", table_idx + 1)
                     if df is None or df.empty:
-                        print(f"Table {table_idx + 1} is empty or None, skipping")
+                        logger.debug("Table %s is empty or None, skipping", table_idx + 1)
                         continue
                     
-                    print(f"Table {table_idx + 1} shape: {df.shape}")
+                    logger.debug("Table %s shape: %s", table_idx + 1, df.shape)
                     
                     # For each table, process according to the pattern type
                     if pattern_type == 'start':
-                        print("Processing as start pattern")
+                        logger.debug("Processing as start pattern")
                         # Find the first match in this table
                         first_match_idx = None
                         for row_idx, row in df.iterrows():
@@ -3038,19 +3051,19 @@ class InvoiceSectionViewer(QWidget):
                                 if re.search(pattern, row_text, re.IGNORECASE):
                                     if first_match_idx is None:
                                         first_match_idx = row_idx
-                                        print(f"Found first match at row {row_idx}")
+                                        logger.debug("Found first match at row %s", row_idx)
                                     matches.append((table_idx, row_idx, row_text, row_idx == first_match_idx))
                                 else:
                                     non_matches.append((table_idx, row_idx, row_text, False))
                             except Exception as row_e:
-                                print(f"Error processing row {row_idx}: {str(row_e)}")
+                                logger.error("Error processing row %s: %s", row_idx, str(row_e))
                                 continue
                     
                     elif pattern_type == 'end':
-                        print("Processing as end pattern")
+                        logger.debug("Processing as end pattern")
                         # First find a simulated 'start' - either first row or first matching row
                         start_idx = df.index[0] if len(df.index) > 0 else None
-                        print(f"Start index: {start_idx}")
+                        logger.debug("Start index: %s", start_idx)
                         
                         # Then find first match after start
                         first_match_after_start = None
@@ -3062,16 +3075,16 @@ class InvoiceSectionViewer(QWidget):
                                     if re.search(pattern, row_text, re.IGNORECASE):
                                         if first_match_after_start is None:
                                             first_match_after_start = row_idx
-                                            print(f"Found first match after start at row {row_idx}")
+                                            logger.debug("Found first match after start at row %s", row_idx)
                                         matches.append((table_idx, row_idx, row_text, row_idx == first_match_after_start))
                                     else:
                                         non_matches.append((table_idx, row_idx, row_text, False))
                             except Exception as row_e:
-                                print(f"Error processing row {row_idx}: {str(row_e)}")
+                                logger.error("Error processing row %s: %s", row_idx, str(row_e))
                                 continue
                     
                     elif pattern_type == 'skip':
-                        print("Processing as skip pattern")
+                        logger.debug("Processing as skip pattern")
                         # All matches should be excluded
                         for row_idx, row in df.iterrows():
                             try:
@@ -3081,11 +3094,11 @@ class InvoiceSectionViewer(QWidget):
                                 else:
                                     non_matches.append((table_idx, row_idx, row_text, False))
                             except Exception as row_e:
-                                print(f"Error processing row {row_idx}: {str(row_e)}")
+                                logger.error("Error processing row %s: %s", row_idx, str(row_e))
                                 continue
                     
                     else:  # Default case - just match all
-                        print("Processing as default pattern")
+                        logger.debug("Processing as default pattern")
                         for row_idx, row in df.iterrows():
                             try:
                                 row_text = " ".join([str(val) for val in row if pd.notna(val)])
@@ -3094,15 +3107,15 @@ class InvoiceSectionViewer(QWidget):
                                 else:
                                     non_matches.append((table_idx, row_idx, row_text, False))
                             except Exception as row_e:
-                                print(f"Error processing row {row_idx}: {str(row_e)}")
+                                logger.error("Error processing row %s: %s", row_idx, str(row_e))
                                 continue
             else:
-                print("\nProcessing single table")
+                logger.debug("Processing single table")
                 # Single table - similar logic as above but for a single table
                 if not section_data.empty:
-                    print(f"Table shape: {section_data.shape}")
+                    logger.debug("Table shape: %s", section_data.shape)
                     if pattern_type == 'start':
-                        print("Processing as start pattern")
+                        logger.debug("Processing as start pattern")
                         # Find the first match
                         first_match_idx = None
                         for row_idx, row in section_data.iterrows():
@@ -3111,19 +3124,19 @@ class InvoiceSectionViewer(QWidget):
                                 if re.search(pattern, row_text, re.IGNORECASE):
                                     if first_match_idx is None:
                                         first_match_idx = row_idx
-                                        print(f"Found first match at row {row_idx}")
+                                        logger.debug("Found first match at row %s", row_idx)
                                     matches.append((0, row_idx, row_text, row_idx == first_match_idx))
                                 else:
                                     non_matches.append((0, row_idx, row_text, False))
                             except Exception as row_e:
-                                print(f"Error processing row {row_idx}: {str(row_e)}")
+                                logger.error("Error processing row %s: %s", row_idx, str(row_e))
                                 continue
                     
                     elif pattern_type == 'end':
-                        print("Processing as end pattern")
+                        logger.debug("Processing as end pattern")
                         # First find a simulated 'start' - either first row or first matching row
                         start_idx = section_data.index[0] if len(section_data.index) > 0 else None
-                        print(f"Start index: {start_idx}")
+                        logger.debug("Start index: %s", start_idx)
                         
                         # Then find first match after start
                         first_match_after_start = None
@@ -3135,16 +3148,16 @@ class InvoiceSectionViewer(QWidget):
                                     if re.search(pattern, row_text, re.IGNORECASE):
                                         if first_match_after_start is None:
                                             first_match_after_start = row_idx
-                                            print(f"Found first match after start at row {row_idx}")
+                                            logger.debug("Found first match after start at row %s", row_idx)
                                         matches.append((0, row_idx, row_text, row_idx == first_match_after_start))
                                     else:
                                         non_matches.append((0, row_idx, row_text, False))
                             except Exception as row_e:
-                                print(f"Error processing row {row_idx}: {str(row_e)}")
+                                logger.error("Error processing row %s: %s", row_idx, str(row_e))
                                 continue
                     
                     elif pattern_type == 'skip':
-                        print("Processing as skip pattern")
+                        logger.debug("Processing as skip pattern")
                         # All matches should be excluded
                         for row_idx, row in section_data.iterrows():
                             try:
@@ -3154,11 +3167,11 @@ class InvoiceSectionViewer(QWidget):
                                 else:
                                     non_matches.append((0, row_idx, row_text, False))
                             except Exception as row_e:
-                                print(f"Error processing row {row_idx}: {str(row_e)}")
+                                logger.error("Error processing row %s: %s", row_idx, str(row_e))
                                 continue
                     
                     else:  # Default case - just match all
-                        print("Processing as default pattern")
+                        logger.debug("Processing as default pattern")
                         for row_idx, row in section_data.iterrows():
                             try:
                                 row_text = " ".join([str(val) for val in row if pd.notna(val)])
@@ -3167,20 +3180,18 @@ class InvoiceSectionViewer(QWidget):
                                 else:
                                     non_matches.append((0, row_idx, row_text, False))
                             except Exception as row_e:
-                                print(f"Error processing row {row_idx}: {str(row_e)}")
+                                logger.error("Error processing row %s: %s", row_idx, str(row_e))
                                 continue
                 else:
-                    print("Single table is empty")
+                    logger.debug("Single table is empty")
             
-            print(f"\nTest results:")
-            print(f"Total matches found: {len(matches)}")
-            print(f"Total non-matches: {len(non_matches)}")
+            logger.debug("Test results:")
+            logger.debug("Total matches found: %s", len(matches))
+            logger.debug("Total non-matches: %s", len(non_matches))
             
         except Exception as e:
             error = f"Error testing pattern: {str(e)}"
-            print(f"\nError in test_regex_pattern: {error}")
-            import traceback
-            traceback.print_exc()
+            logger.error("Error in test_regex_pattern: %s", error, exc_info=True)
         
         return matches, non_matches, error
 
@@ -3257,23 +3268,21 @@ class InvoiceSectionViewer(QWidget):
                         "Download Error",
                         f"Error saving data: {str(e)}"
                     )
-                    print(f"Error downloading JSON: {str(e)}")
-                    import traceback
-                    traceback.print_exc()
+                    logger.error("Error downloading JSON: %s", e, exc_info=True)
 
     def update_pdf_highlights(self, matches, non_matches, section):
         """Update the PDF view with regex pattern highlights"""
         try:
-            print(f"\n=== Starting PDF highlight update ===")
-            print(f"Section: {section}")
-            print(f"Number of matches: {len(matches)}")
-            print(f"Number of non-matches: {len(non_matches)}")
+            logger.debug("=== Starting PDF highlight update ===")
+            logger.debug("Section: %s", section)
+            logger.debug("Number of matches: %s", len(matches))
+            logger.debug("Number of non-matches: %s", len(non_matches))
             
             if not hasattr(self, 'drawing_pixmap') or self.drawing_pixmap is None:
-                print("Error: No drawing pixmap available")
+                logger.error("No drawing pixmap available")
                 return
                 
-            print("Creating copy of drawing pixmap")
+            logger.debug("Creating copy of drawing pixmap")
             highlighted_pixmap = self.drawing_pixmap.copy()
             painter = QPainter(highlighted_pixmap)
             
@@ -3282,7 +3291,7 @@ class InvoiceSectionViewer(QWidget):
             first_match_color = QColor(200, 230, 201, 150)  # Slightly darker green with transparency
             non_match_color = QColor(255, 235, 238, 100)  # Light red with transparency
             
-            print("Processing matches")
+            logger.debug("Processing matches")
             # Draw highlights for matches
             for table_idx, row_idx, _, is_first in matches:
                 try:
@@ -3296,7 +3305,7 @@ class InvoiceSectionViewer(QWidget):
                         table_area = self.summary_areas[table_idx] if self.summary_areas else None
                     
                     if table_area:
-                        print(f"Processing match in table {table_idx + 1}, row {row_idx}")
+                        logger.debug("Processing match in table %s, row %s", table_idx + 1, row_idx)
                         # Calculate the y position for this row
                         df = None
                         if section == 'header':
@@ -3310,7 +3319,7 @@ class InvoiceSectionViewer(QWidget):
                             row_height = table_area['height'] / df.shape[0]
                             y = table_area['y'] + (row_idx * row_height)
                             
-                            print(f"Drawing highlight at y={y}, height={row_height}")
+                            logger.debug("Drawing highlight at y=%s, height=%s", y, row_height)
                             # Draw highlight rectangle
                             painter.fillRect(
                                 table_area['x'],
@@ -3320,14 +3329,14 @@ class InvoiceSectionViewer(QWidget):
                                 first_match_color if is_first else match_color
                             )
                         else:
-                            print(f"Warning: No data available for table {table_idx + 1}")
+                            logger.warning("No data available for table %s", table_idx + 1)
                     else:
-                        print(f"Warning: No table area found for table {table_idx + 1}")
+                        logger.warning("No table area found for table %s", table_idx + 1)
                 except Exception as match_e:
-                    print(f"Error processing match in table {table_idx + 1}, row {row_idx}: {str(match_e)}")
+                    logger.error("Error processing match in table %s, row %s: %s", table_idx + 1, row_idx, str(match_e))
                     continue
             
-            print("Processing non-matches")
+            logger.debug("Processing non-matches")
             # Draw highlights for non-matches
             for table_idx, row_idx, _, _ in non_matches:
                 try:
@@ -3341,7 +3350,7 @@ class InvoiceSectionViewer(QWidget):
                         table_area = self.summary_areas[table_idx] if self.summary_areas else None
                     
                     if table_area:
-                        print(f"Processing non-match in table {table_idx + 1}, row {row_idx}")
+                        logger.debug("Processing non-match in table %s, row %s", table_idx + 1, row_idx)
                         # Calculate the y position for this row
                         df = None
                         if section == 'header':
@@ -3355,7 +3364,7 @@ class InvoiceSectionViewer(QWidget):
                             row_height = table_area['height'] / df.shape[0]
                             y = table_area['y'] + (row_idx * row_height)
                             
-                            print(f"Drawing highlight at y={y}, height={row_height}")
+                            logger.debug("Drawing highlight at y=%s, height=%s", y, row_height)
                             # Draw highlight rectangle
                             painter.fillRect(
                                 table_area['x'],
@@ -3365,22 +3374,23 @@ class InvoiceSectionViewer(QWidget):
                                 non_match_color
                             )
                         else:
-                            print(f"Warning: No data available for table {table_idx + 1}")
+                            logger.warning("No data available for table %s", table_idx + 1)
                     else:
-                        print(f"Warning: No table area found for table {table_idx + 1}")
+                        logger.warning("No table area found for table %s", table_idx + 1)
                 except Exception as non_match_e:
-                    print(f"Error processing non-match in table {table_idx + 1}, row {row_idx}: {str(non_match_e)}")
+                    logger.error(
+                        "Error processing non-match in table %s, row %s: %s",
+                        table_idx + 1, row_idx, str(non_match_e)
+                    )
                     continue
             
-            print("Ending painter and updating pixmap")
+            logger.debug("Ending painter and updating pixmap")
             painter.end()
             self.pdf_label.setPixmap(highlighted_pixmap)
-            print("PDF highlight update completed successfully")
+            logger.debug("PDF highlight update completed successfully")
             
         except Exception as e:
-            print(f"\nError in update_pdf_highlights: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.error("Error in update_pdf_highlights: %s", e, exc_info=True)
             # Ensure we always end the painter and restore the original view
             if painter:
                 painter.end()
@@ -0,0 +1,113 @@
+"""
+Logging configuration for PDF Harvest
+
+Every module logs through its own logger (logging.getLogger(__name__)) with
+%-style arguments, so a message below the configured level is dropped before
+any formatting happens. configure_logging() is called once by each entry point
+(GUI, CLI, HTTP service) and installs:
+
+    - a console handler printing info and debug messages as plain lines, like
+      the print() output it replaces, and warnings and errors with their level
+      ("WARNING: ..."), so messages never repeat their level themselves
+    - optionally a JSON-lines file handler with one object per record
+      (time, level, logger, thread, message, exception and any extra fields)
+
+The level comes from the argument, else from the PDF_HARVEST_LOG_LEVEL
+environment variable, else INFO. Both settings are written back to the
+environment, so pool workers started by the run call configure_logging()
+without arguments and log the same way.
+"""
+
+import os
+import sys
+import json
+import logging
+from datetime import datetime, timezone
+
+LOG_LEVEL_ENV = "PDF_HARVEST_LOG_LEVEL"
+LOG_JSON_ENV = "PDF_HARVEST_LOG_JSON"
+LOG_LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")
+
+# LogRecord attributes that are not extra fields passed by the caller
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class ConsoleFormatter(logging.Formatter):
+    """Plain messages, prefixed with the level name from WARNING up"""
+
+    def __init__(self):
+        super().__init__("%(message)s")
+        self._leveled = logging.Formatter("%(levelname)s: %(message)s")
+
+    def format(self, record):
+        if record.levelno >= logging.WARNING:
+            return self._leveled.format(record)
+        return super().format(record)
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Format each record as one JSON object"""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def resolve_level(level=None, quiet=False):
+    """Return the numeric log level for an argument, the environment or the default"""
+    if quiet:
+        return logging.WARNING
+    name = (level or os.environ.get(LOG_LEVEL_ENV) or "INFO").upper()
+    if name not in LOG_LEVELS:
+        raise ValueError(f"Unknown log level: {name} (expected one of {', '.join(LOG_LEVELS)})")
+    return getattr(logging, name)
+
+
+def configure_logging(level=None, quiet=False, json_path=None, stream=None):
+    """Configure the root logger for an entry point
+
+    Args:
+        level: Level name (DEBUG, INFO, WARNING, ERROR, CRITICAL)
+        quiet: Only show warnings and errors
+        json_path: Optional file receiving every record as a JSON line
+            (default: PDF_HARVEST_LOG_JSON, if set); appended to, so the
+            workers of a run can share it
+        stream: Console stream (default: stdout)
+
+    Returns:
+        int: The level in effect
+    """
+    numeric_level = resolve_level(level, quiet)
+    json_path = json_path or os.environ.get(LOG_JSON_ENV)
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+
+    console = logging.StreamHandler(stream or sys.stdout)
+    console.setFormatter(ConsoleFormatter())
+    root.addHandler(console)
+
+    if json_path:
+        json_handler = logging.FileHandler(json_path, encoding="utf-8")
+        json_handler.setFormatter(JsonLinesFormatter())
+        root.addHandler(json_handler)
+
+    root.setLevel(numeric_level)
+
+    # Inherited by worker processes started from here on
+    os.environ[LOG_LEVEL_ENV] = logging.getLevelName(numeric_level)
+    if json_path:
+        os.environ[LOG_JSON_ENV] = os.path.abspath(json_path)
+    return numeric_level
@@ -1,4 +1,6 @@
+import logging
 import sys
+import argparse
 import os
 import re
 import json
@@ -26,8 +28,13 @@ from role_based_ui import (
 from user_management_ui import UserManagementDialog, RoleManagementDialog
 from validation_screen import ValidationScreen
 import pandas as pd
-import fitz
-import pypdf_table_extraction
+import extraction_engine
+from page_geometry import get_page_transform
+from logging_setup import configure_logging
+from metrics import start_metrics_file
+from tracing import TRACE_ENV
+
+logger = logging.getLogger(__name__)
 
 class PDFHarvest(QMainWindow):
     def __init__(self):
@@ -276,7 +283,7 @@ class PDFHarvest(QMainWindow):
         )
         
         # Connect the save_template_signal to show the template manager
-        print("\n[DEBUG] Connecting save_template_signal in process_invoice")
+        logger.debug("Connecting save_template_signal in process_invoice")
         # Disconnect any previous connections to avoid duplicate signals
         try:
             self.invoice_viewer.save_template_signal.disconnect()
@@ -298,26 +305,30 @@ class PDFHarvest(QMainWindow):
         
         try:
             if not os.path.exists(pdf_path):
-                print(f"PDF file not found: {pdf_path}")
+                logger.warning("PDF file not found: %s", pdf_path)
                 return header_df, item_details_df, summary_df
             
-            print(f"\n{'='*80}")
-            print(f"STARTING TABLE EXTRACTION FROM: {pdf_path}")
-            print(f"{'='*80}")
+            logger.debug("%s", '='*80)
+            logger.debug("STARTING TABLE EXTRACTION FROM: %s", pdf_path)
+            logger.debug("%s", '='*80)
             
             # Print regions information at the start
             if hasattr(self.pdf_processor, 'regions'):
-                print("\nRegions in original drawing order:")
+                logger.debug("Regions in original drawing order:")
                 for region_type, rects in self.pdf_processor.regions.items():
-                    print(f"\n{region_type.upper()} REGIONS ({len(rects)}):")
+                    logger.debug("%s REGIONS (%s):", region_type.upper(), len(rects))
                     for i, rect in enumerate(rects):
-                        print(f"  {region_type} {i}: top={rect.top()}, left={rect.left()}, width={rect.width()}, height={rect.height()}")
+                        if logger.isEnabledFor(logging.DEBUG):
+                            logger.debug(
+                                "%s %s: top=%s, left=%s, width=%s, height=%s",
+                                region_type, i, rect.top(), rect.left(), rect.width(), rect.height()
+                            )
             
             # Print column lines information at the start
             if hasattr(self.pdf_processor, 'column_lines'):
-                print("\nColumn lines by region:")
+                logger.debug("Column lines by region:")
                 for region_type, lines in self.pdf_processor.column_lines.items():
-                    print(f"\n{region_type.upper()} COLUMN LINES ({len(lines)}):")
+                    logger.debug("%s COLUMN LINES (%s):", region_type.upper(), len(lines))
                     # Group by rect_index
                     lines_by_rect = {}
                     for line in lines:
@@ -329,45 +340,48 @@ class PDFHarvest(QMainWindow):
                     
                     # Print organized by rect_index
                     for rect_idx, x_positions in sorted(lines_by_rect.items()):
-                        print(f"  Table {rect_idx} column x positions: {sorted(x_positions)}")
+                        logger.debug("Table %s column x positions: %s", rect_idx, sorted(x_positions))
             
             # Print table_areas information at the start
             if hasattr(self.pdf_processor, 'table_areas'):
-                print("\ntable_areas details:")
+                logger.debug("table_areas details:")
                 for label, info in self.pdf_processor.table_areas.items():
                     rect = info['rect']
-                    print(f"  {label}: type={info['type']}, index={info['index']}, " +
-                          f"position=[{rect.top()},{rect.left()},{rect.width()},{rect.height()}], " +
-                          f"columns={info.get('columns', [])}")
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug(
+                            "%s: type=%s, index=%s, position=[%s,%s,%s,%s], columns=%s",
+                            label, info['type'], info['index'], rect.top(), rect.left(), rect.width(), rect.height(),
+                            info.get('columns', []),
+                        )
             
-            # Get PDF dimensions for scaling
-            import fitz
-            pdf_document = fitz.open(pdf_path)
-            page = pdf_document[0]
-            page_width = page.rect.width
-            page_height = page.rect.height
-            pdf_document.close()
+            # Get PDF dimensions for scaling from the cached page geometry; the
+            # document the processor already has open is reused when available
+            transform = get_page_transform(getattr(self.pdf_processor, 'pdf_document', None) or pdf_path, 0)
+            page_width = transform.page_width
+            page_height = transform.page_height
             
             # Calculate scale factors (pdf_processor uses a scaled pixmap)
             pix_scale = 2  # The pixmap scaling used in display_current_page
-            print(f"\nScaling Information:")
-            print(f"  PDF Size: {page_width} x {page_height}")
-            print(f"  Pixmap Scale Factor: {pix_scale}")
+            logger.debug("Scaling Information:")
+            logger.debug("PDF Size: %s x %s", page_width, page_height)
+            logger.debug("Pixmap Scale Factor: %s", pix_scale)
             scale_x = page_width / (self.pdf_processor.pdf_label.pixmap().width() / pix_scale)
             scale_y = page_height / (self.pdf_processor.pdf_label.pixmap().height() / pix_scale)
-            print(f"  Scale X: {scale_x:.4f}, Scale Y: {scale_y:.4f}")
+            logger.debug("Scale X: %.4f, Scale Y: %.4f", scale_x, scale_y)
             
-            import pypdf_table_extraction
             header_dfs = []
             
             # Check if we have table_areas for more structured processing
             if hasattr(self.pdf_processor, 'table_areas') and self.pdf_processor.table_areas:
-                print("\nUsing structured table_areas for extraction")
+                logger.debug("Using structured table_areas for extraction")
                 
                 # Debug output of all table_areas for reference
-                print("\nAll table_areas entries:")
+                logger.debug("All table_areas entries:")
                 for label, info in self.pdf_processor.table_areas.items():
-                    print(f"  {label}: type={info['type']}, index={info['index']}, columns={len(info.get('columns', []))} columns")
+                    logger.debug(
+                        "%s: type=%s, index=%s, columns=%s columns",
+                        label, info['type'], info['index'], len(info.get('columns', []))
+                    )
                 
                 # Extract header tables using table_areas
                 # Instead of sorting by index, maintain the original order they were drawn
@@ -384,13 +398,19 @@ class PDFHarvest(QMainWindow):
                             header_tables.append((label, info))
                             break
                 
-                print(f"\nProcessing {len(header_tables)} header tables in original drawing order:")
+                logger.debug("Processing %s header tables in original drawing order:", len(header_tables))
                 for table_index, (label, table_info) in enumerate(header_tables):
-                    print(f"\nProcessing header table {table_index} ({label}) with index {table_info['index']}:")
+                    logger.debug(
+                        "Processing header table %s (%s) with index %s:",
+                        table_index, label, table_info['index']
+                    )
                     rect = table_info['rect']
                     
                     # Raw rectangle coordinates
-                    print(f"  Raw rectangle: x={rect.x()}, y={rect.y()}, width={rect.width()}, height={rect.height()}")
+                    logger.debug(
+                        "Raw rectangle: x=%s, y=%s, width=%s, height=%s",
+                        rect.x(), rect.y(), rect.width(), rect.height()
+                    )
                     
                     # Convert rectangle to table area format
                     x1 = rect.x() * scale_x
@@ -398,50 +418,46 @@ class PDFHarvest(QMainWindow):
                     x2 = (rect.x() + rect.width()) * scale_x
                     y2 = page_height - ((rect.y() + rect.height()) * scale_y)
                     table_area = f"{x1},{y1},{x2},{y2}"
-                    print(f"  Scaled table area: {table_area}")
+                    logger.debug("Scaled table area: %s", table_area)
                     
                     # Get column lines for this table
                     columns = table_info.get('columns', [])
                     region_columns = None
                     
                     if columns:
-                        print(f"  Raw column x-coordinates: {columns}")
+                        logger.debug("Raw column x-coordinates: %s", columns)
                         # Scale column lines by scale_x (they are raw coordinates)
                         scaled_columns = [x * scale_x for x in columns]
-                        print(f"  Scaled column x-coordinates: {scaled_columns}")
+                        logger.debug("Scaled column x-coordinates: %s", scaled_columns)
                         region_columns = ','.join([str(x) for x in sorted(scaled_columns)])
-                        print(f"  Formatted column coordinates: {region_columns}")
+                        logger.debug("Formatted column coordinates: %s", region_columns)
                     else:
-                        print("  No column lines defined for this table")
+                        logger.warning("No column lines defined for this table")
                     
                     # Extract this header table
                     try:
-                        print(f"  Extracting table with area {table_area} and columns: {region_columns}")
-                        tables = pypdf_table_extraction.read_pdf(
-                            pdf_path,
-                            flavor='stream',
-                            pages='1',
-                            table_areas=[table_area],
-                            columns=[region_columns] if region_columns else None,
-                            split_text=True,
-                            strip_text='\n',
-                            row_tol=10
+                        logger.debug("Extracting table with area %s and columns: %s", table_area, region_columns)
+                        table_df = extraction_engine.read_region_table(
+                            pdf_path, 1, table_area, region_columns, {"row_tol": 10}
                         )
                         
-                        if tables and tables[0].df is not None and not tables[0].df.empty:
-                            print(f"  Successfully extracted table data with {len(tables[0].df)} rows and {len(tables[0].df.columns)} columns")
-                            header_dfs.append(tables[0].df)
+                        if table_df is not None and not table_df.empty:
+                            logger.debug(
+                                "Successfully extracted table data with %s rows and %s columns",
+                                len(table_df), len(table_df.columns)
+                            )
+                            header_dfs.append(table_df)
                         else:
-                            print(f"  No data found in table")
+                            logger.warning("No data found in table")
                     except Exception as e:
-                        print(f"  Error extracting table: {str(e)}")
+                        logger.error("Error extracting table: %s", e)
                 
                 # Keep header_df as a list of DataFrames to preserve the order
                 if header_dfs:
                     header_df = header_dfs[0] if len(header_dfs) == 1 else header_dfs
-                    print(f"\nSuccessfully processed {len(header_dfs)} header tables in original drawing order")
+                    logger.debug("Successfully processed %s header tables in original drawing order", len(header_dfs))
                 else:
-                    print("\nNo valid header tables found")
+                    logger.warning("No valid header tables found")
                 
                 # Process items table
                 # Preserve original drawing order for items tables too
@@ -459,12 +475,15 @@ class PDFHarvest(QMainWindow):
                                 break
                 
                 if items_tables:
-                    print("\nProcessing items table:")
+                    logger.debug("Processing items table:")
                     label, table_info = items_tables[0]  # Usually just one items table
                     rect = table_info['rect']
                     
                     # Raw rectangle coordinates
-                    print(f"  Raw rectangle: x={rect.x()}, y={rect.y()}, width={rect.width()}, height={rect.height()}")
+                    logger.debug(
+                        "Raw rectangle: x=%s, y=%s, width=%s, height=%s",
+                        rect.x(), rect.y(), rect.width(), rect.height()
+                    )
                     
                     # Convert rectangle to table area format
                     x1 = rect.x() * scale_x
@@ -472,39 +491,32 @@ class PDFHarvest(QMainWindow):
                     x2 = (rect.x() + rect.width()) * scale_x
                     y2 = page_height - ((rect.y() + rect.height()) * scale_y)
                     table_area = f"{x1},{y1},{x2},{y2}"
-                    print(f"  Scaled table area: {table_area}")
+                    logger.debug("Scaled table area: %s", table_area)
                     
                     # Get column lines for this table
                     columns = table_info.get('columns', [])
                     region_columns = None
                     
                     if columns:
-                        print(f"  Raw column x-coordinates: {columns}")
+                        logger.debug("Raw column x-coordinates: %s", columns)
                         # Scale column lines by scale_x (they are raw coordinates)
                         scaled_columns = [x * scale_x for x in columns]
-                        print(f"  Scaled column x-coordinates: {scaled_columns}")
+                        logger.debug("Scaled column x-coordinates: %s", scaled_columns)
                         region_columns = ','.join([str(x) for x in sorted(scaled_columns)])
-                        print(f"  Formatted column coordinates: {region_columns}")
+                        logger.debug("Formatted column coordinates: %s", region_columns)
                     else:
-                        print("  No column lines defined for this table")
+                        logger.warning("No column lines defined for this table")
                     
                     # Extract this items table
                     try:
-                        tables = pypdf_table_extraction.read_pdf(
-                            pdf_path,
-                            flavor='stream',
-                            pages='1',
-                            table_areas=[table_area],
-                            columns=[region_columns] if region_columns else None,
-                            split_text=True,
-                            strip_text='\n',
-                            row_tol=25
+                        table_df = extraction_engine.read_region_table(
+                            pdf_path, 1, table_area, region_columns, {"row_tol": 25}
                         )
                         
-                        if tables and tables[0].df is not None:
-                            item_details_df = tables[0].df
+                        if table_df is not None:
+                            item_details_df = table_df
                     except Exception as e:
-                        print(f"  Error extracting items table: {str(e)}")
+                        logger.error("Error extracting items table: %s", e)
                 
                 # Process summary table
                 # Preserve original drawing order for summary tables too
@@ -522,12 +534,15 @@ class PDFHarvest(QMainWindow):
                                 break
                 
                 if summary_tables:
-                    print("\nProcessing summary table:")
+                    logger.debug("Processing summary table:")
                     label, table_info = summary_tables[0]  # Usually just one summary table
                     rect = table_info['rect']
                     
                     # Raw rectangle coordinates
-                    print(f"  Raw rectangle: x={rect.x()}, y={rect.y()}, width={rect.width()}, height={rect.height()}")
+                    logger.debug(
+                        "Raw rectangle: x=%s, y=%s, width=%s, height=%s",
+                        rect.x(), rect.y(), rect.width(), rect.height()
+                    )
                     
                     # Convert rectangle to table area format
                     x1 = rect.x() * scale_x
@@ -535,39 +550,32 @@ class PDFHarvest(QMainWindow):
                     x2 = (rect.x() + rect.width()) * scale_x
                     y2 = page_height - ((rect.y() + rect.height()) * scale_y)
                     table_area = f"{x1},{y1},{x2},{y2}"
-                    print(f"  Scaled table area: {table_area}")
+                    logger.debug("Scaled table area: %s", table_area)
                     
                     # Get column lines for this table
                     columns = table_info.get('columns', [])
                     region_columns = None
                     
                     if columns:
-                        print(f"  Raw column x-coordinates: {columns}")
+                        logger.debug("Raw column x-coordinates: %s", columns)
                         # Scale column lines by scale_x (they are raw coordinates)
                         scaled_columns = [x * scale_x for x in columns]
-                        print(f"  Scaled column x-coordinates: {scaled_columns}")
+                        logger.debug("Scaled column x-coordinates: %s", scaled_columns)
                         region_columns = ','.join([str(x) for x in sorted(scaled_columns)])
-                        print(f"  Formatted column coordinates: {region_columns}")
+                        logger.debug("Formatted column coordinates: %s", region_columns)
                     else:
-                        print("  No column lines defined for this table")
+                        logger.warning("No column lines defined for this table")
                     
                     # Extract this summary table
                     try:
-                        tables = pypdf_table_extraction.read_pdf(
-                            pdf_path,
-                            flavor='stream',
-                            pages='1',
-                            table_areas=[table_area],
-                            columns=[region_columns] if region_columns else None,
-                            split_text=True,
-                            strip_text='\n',
-                            row_tol=10
+                        table_df = extraction_engine.read_region_table(
+                            pdf_path, 1, table_area, region_columns, {"row_tol": 10}
                         )
                         
-                        if tables and tables[0].df is not None:
-                            summary_df = tables[0].df
+                        if table_df is not None:
+                            summary_df = table_df
                     except Exception as e:
-                        print(f"  Error extracting summary table: {str(e)}")
+                        logger.error("Error extracting summary table: %s", e)
             
             # Handle traditional regions format
             else:
@@ -598,36 +606,32 @@ class PDFHarvest(QMainWindow):
                         
                         # Extract table
                         try:
-                            tables = pypdf_table_extraction.read_pdf(
-                                pdf_path,
-                                flavor='stream',
-                                pages='1',
-                                table_areas=[table_area],
-                                columns=[region_columns] if region_columns else None,
-                                split_text=True,
-                                strip_text='\n',
-                                row_tol=10
+                            table_df = extraction_engine.read_region_table(
+                                pdf_path, 1, table_area, region_columns, {"row_tol": 10}
                             )
                             
-                            if tables and tables[0].df is not None and not tables[0].df.empty:
-                                header_dfs.append(tables[0].df)
+                            if table_df is not None and not table_df.empty:
+                                header_dfs.append(table_df)
                         except Exception as e:
-                            print(f"  Error extracting header table: {str(e)}")
+                            logger.error("Error extracting header table: %s", e)
                 
                 # Keep header_df as a list of DataFrames to preserve the order
                 if header_dfs:
                     header_df = header_dfs[0] if len(header_dfs) == 1 else header_dfs
-                    print(f"Successfully processed {len(header_dfs)} header tables")
+                    logger.debug("Successfully processed %s header tables", len(header_dfs))
 
                 # Extract items
                 items_region = regions.get('items', [])
                 if items_region and len(items_region) > 0:
                     # Process each items region (typically just one)
                     for idx, region in enumerate(items_region):
-                        print(f"\nProcessing Items Table {idx}:")
+                        logger.debug("Processing Items Table %s:", idx)
                         
                         # Raw rectangle coordinates
-                        print(f"  Raw rectangle: x={region.x()}, y={region.y()}, width={region.width()}, height={region.height()}")
+                        logger.debug(
+                            "Raw rectangle: x=%s, y=%s, width=%s, height=%s",
+                            region.x(), region.y(), region.width(), region.height()
+                        )
                         
                         # Convert region to table area format
                         x1 = region.x() * scale_x
@@ -635,7 +639,7 @@ class PDFHarvest(QMainWindow):
                         x2 = (region.x() + region.width()) * scale_x
                         y2 = page_height - ((region.y() + region.height()) * scale_y)
                         table_area = f"{x1},{y1},{x2},{y2}"
-                        print(f"  Scaled table area: {table_area}")
+                        logger.debug("Scaled table area: %s", table_area)
                         
                         # Find column lines specifically for this region
                         region_columns = None
@@ -649,53 +653,61 @@ class PDFHarvest(QMainWindow):
                                     raw_x = line[0].x()
                                     scaled_x = raw_x * scale_x
                                     column_x_coords.append(scaled_x)
-                                    print(f"    Found column line at x={raw_x} (scaled to {scaled_x}) with rect_index={line[2]}")
+                                    logger.debug(
+                                        "Found column line at x=%s (scaled to %s) with rect_index=%s",
+                                        raw_x, scaled_x, line[2]
+                                    )
                                 # Handle old format lines without rect_index (for backward compatibility)
                                 elif len(line) == 2 and idx == 0:
                                     # Store the x-coordinate, scaling appropriately
                                     raw_x = line[0].x()
                                     scaled_x = raw_x * scale_x
                                     column_x_coords.append(scaled_x)
-                                    print(f"    Found column line at x={raw_x} (scaled to {scaled_x}) (legacy format)")
+                                    logger.debug(
+                                        "Found column line at x=%s (scaled to %s) (legacy format)",
+                                        raw_x, scaled_x
+                                    )
                             
                             if column_x_coords:
                                 # Sort column lines by x-coordinate and format as a comma-separated string
-                                print(f"    Raw scaled column x-coordinates: {column_x_coords}")
+                                logger.debug("Raw scaled column x-coordinates: %s", column_x_coords)
                                 region_columns = ','.join([str(x) for x in sorted(column_x_coords)])
-                                print(f"    Formatted column coordinates: {region_columns}")
+                                logger.debug("Formatted column coordinates: %s", region_columns)
                             else:
-                                print("    No column lines found for this table")
+                                logger.warning("No column lines found for this table")
                         
                         # Extract this items table
                         try:
-                            print(f"  Extracting items table at area {table_area} with columns: {region_columns}")
-                            tables = pypdf_table_extraction.read_pdf(
-                                pdf_path,
-                                flavor='stream',
-                                pages='1',
-                                table_areas=[table_area],
-                                columns=[region_columns] if region_columns else None,
-                                split_text=True,
-                                strip_text='\n',
-                                row_tol=25
+                            logger.debug(
+                                "Extracting items table at area %s with columns: %s",
+                                table_area, region_columns
+                            )
+                            table_df = extraction_engine.read_region_table(
+                                pdf_path, 1, table_area, region_columns, {"row_tol": 25}
                             )
-                            if tables and tables[0].df is not None:
-                                item_details_df = tables[0].df
-                                print(f"  Successfully extracted items table with {len(item_details_df)} rows and {len(item_details_df.columns)} columns")
+                            if table_df is not None:
+                                item_details_df = table_df
+                                logger.debug(
+                                    "Successfully extracted items table with %s rows and %s columns",
+                                    len(item_details_df), len(item_details_df.columns)
+                                )
                             else:
-                                print(f"  No data found in items table")
+                                logger.warning("No data found in items table")
                         except Exception as e:
-                            print(f"  Error extracting items table: {str(e)}")
+                            logger.error("Error extracting items table: %s", e)
 
                 # Extract summary
                 summary_region = regions.get('summary', [])
                 if summary_region and len(summary_region) > 0:
                     # Process each summary region (typically just one)
                     for idx, region in enumerate(summary_region):
-                        print(f"\nProcessing Summary Table {idx}:")
+                        logger.debug("Processing Summary Table %s:", idx)
                         
                         # Raw rectangle coordinates
-                        print(f"  Raw rectangle: x={region.x()}, y={region.y()}, width={region.width()}, height={region.height()}")
+                        logger.debug(
+                            "Raw rectangle: x=%s, y=%s, width=%s, height=%s",
+                            region.x(), region.y(), region.width(), region.height()
+                        )
                         
                         # Convert region to table area format
                         x1 = region.x() * scale_x
@@ -703,7 +715,7 @@ class PDFHarvest(QMainWindow):
                         x2 = (region.x() + region.width()) * scale_x
                         y2 = page_height - ((region.y() + region.height()) * scale_y)
                         table_area = f"{x1},{y1},{x2},{y2}"
-                        print(f"  Scaled table area: {table_area}")
+                        logger.debug("Scaled table area: %s", table_area)
                         
                         # Find column lines specifically for this region
                         region_columns = None
@@ -717,50 +729,53 @@ class PDFHarvest(QMainWindow):
                                     raw_x = line[0].x()
                                     scaled_x = raw_x * scale_x
                                     column_x_coords.append(scaled_x)
-                                    print(f"    Found column line at x={raw_x} (scaled to {scaled_x}) with rect_index={line[2]}")
+                                    logger.debug(
+                                        "Found column line at x=%s (scaled to %s) with rect_index=%s",
+                                        raw_x, scaled_x, line[2]
+                                    )
                                 # Handle old format lines without rect_index (for backward compatibility)
                                 elif len(line) == 2 and idx == 0:
                                     # Store the x-coordinate, scaling appropriately
                                     raw_x = line[0].x()
                                     scaled_x = raw_x * scale_x
                                     column_x_coords.append(scaled_x)
-                                    print(f"    Found column line at x={raw_x} (scaled to {scaled_x}) (legacy format)")
+                                    logger.debug(
+                                        "Found column line at x=%s (scaled to %s) (legacy format)",
+                                        raw_x, scaled_x
+                                    )
                             
                             if column_x_coords:
                                 # Sort column lines by x-coordinate and format as a comma-separated string
-                                print(f"    Raw scaled column x-coordinates: {column_x_coords}")
+                                logger.debug("Raw scaled column x-coordinates: %s", column_x_coords)
                                 region_columns = ','.join([str(x) for x in sorted(column_x_coords)])
-                                print(f"    Formatted column coordinates: {region_columns}")
+                                logger.debug("Formatted column coordinates: %s", region_columns)
                             else:
-                                print("    No column lines found for this table")
+                                logger.warning("No column lines found for this table")
                         
                         # Extract this summary table
                         try:
-                            print(f"  Extracting summary table at area {table_area} with columns: {region_columns}")
-                            tables = pypdf_table_extraction.read_pdf(
-                                pdf_path,
-                                flavor='stream',
-                                pages='1',
-                                table_areas=[table_area],
-                                columns=[region_columns] if region_columns else None,
-                                split_text=True,
-                                strip_text='\n',
-                                row_tol=10
+                            logger.debug(
+                                "Extracting summary table at area %s with columns: %s",
+                                table_area, region_columns
+                            )
+                            table_df = extraction_engine.read_region_table(
+                                pdf_path, 1, table_area, region_columns, {"row_tol": 10}
                             )
-                            if tables and tables[0].df is not None:
-                                summary_df = tables[0].df
-                                print(f"  Successfully extracted summary table with {len(summary_df)} rows and {len(summary_df.columns)} columns")
+                            if table_df is not None:
+                                summary_df = table_df
+                                logger.debug(
+                                    "Successfully extracted summary table with %s rows and %s columns",
+                                    len(summary_df), len(summary_df.columns)
+                                )
                             else:
-                                print(f"  No data found in summary table")
+                                logger.warning("No data found in summary table")
                         except Exception as e:
-                            print(f"  Error extracting summary table: {str(e)}")
+                            logger.error("Error extracting summary table: %s", e)
             
             return header_df, item_details_df, summary_df
             
         except Exception as e:
-            print(f"Error extracting tables: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.error("Error extracting tables: %s", e, exc_info=True)
             return header_df, item_details_df, summary_df
 
     def upload_invoice(self):
@@ -889,11 +904,11 @@ class PDFHarvest(QMainWindow):
 
     def show_template_manager_from_viewer(self):
         """Show the template manager from the invoice viewer, preserving all data for template creation"""
-        print("\n[DEBUG] show_template_manager_from_viewer called")
+        logger.debug("show_template_manager_from_viewer called")
         
         # Check if we have a valid template manager
         if not hasattr(self, 'template_manager') or self.template_manager is None:
-            print("[ERROR] Template manager is not available")
+            logger.error("[ERROR] Template manager is not available")
             QMessageBox.critical(
                 self,
                 "Error",
@@ -918,7 +933,7 @@ class PDFHarvest(QMainWindow):
                 "for reuse with similar invoices."
             )
         except Exception as e:
-            print(f"[ERROR] Failed to switch to template manager: {str(e)}")
+            logger.error("[ERROR] Failed to switch to template manager: %s", e)
             QMessageBox.critical(
                 self,
                 "Error",
@@ -1004,7 +1019,16 @@ class PDFHarvest(QMainWindow):
         self.stacked_widget.setCurrentWidget(self.main_dashboard)
 
 if __name__ == '__main__':
-    app = QApplication(sys.argv)
+    # --trace PATH records a timeline of every bulk batch (same as PDF_HARVEST_TRACE); Qt gets the other arguments
+    arg_parser = argparse.ArgumentParser(add_help=False)
+    arg_parser.add_argument('--trace', metavar='PATH')
+    args, qt_args = arg_parser.parse_known_args()
+    if args.trace:
+        os.environ[TRACE_ENV] = args.trace
+    configure_logging()
+    # Prometheus text file for the GUI's batches when PDF_HARVEST_METRICS_FILE is set
+    start_metrics_file()
+    app = QApplication(sys.argv[:1] + qt_args)
     app.setStyle('Fusion')
     window = PDFHarvest()
     window.show()
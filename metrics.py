@@ -0,0 +1,267 @@
+"""
+Stage-level metrics for PDF Harvest
+
+One MetricsRegistry per process collects what a batch spends its time on. The
+engine, the result cache, the CLI and the GUI report into it:
+
+    - counters: files, pages, regions, read_pdf calls, extracted rows and
+      result cache hits/misses
+    - latency histograms: template load, PDF open, table parsing (one
+      observation per read_pdf call), regex filtering and export writes
+
+snapshot() returns a JSON-serializable copy, which the CLI stores in its
+summary report; process-pool workers send theirs back with every file and the
+parent merge()s them. MetricsFileWriter rewrites a Prometheus text-format file
+every few seconds so a node_exporter textfile collector (or anything else that
+reads the format) can scrape a running batch.
+"""
+
+import os
+import time
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+METRICS_FILE_ENV = "PDF_HARVEST_METRICS_FILE"
+METRIC_PREFIX = "pdf_harvest_"
+DEFAULT_WRITE_INTERVAL = 15.0
+
+# Upper bounds (seconds) of the latency histogram buckets
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+COUNTERS = {
+    "files_total": "Documents extracted or served from the result cache",
+    "pages_total": "Pages extracted",
+    "regions_total": "Table regions extracted",
+    "read_pdf_calls_total": "pypdf_table_extraction.read_pdf calls",
+    "rows_total": "Table rows extracted after regex filtering",
+    "cache_hits_total": "Result cache hits",
+    "cache_misses_total": "Result cache misses",
+}
+
+HISTOGRAMS = {
+    "template_load_seconds": "Loading a template from the database",
+    "pdf_open_seconds": "Opening a PDF with PyMuPDF",
+    "region_parse_seconds": "One read_pdf call (a region, or all regions of a page sharing parameters)",
+    "regex_filter_seconds": "Applying a section's regex patterns to a table",
+    "export_write_seconds": "Writing a file's results to the output or result store",
+}
+
+
+class Histogram:
+    """Latency distribution with fixed bucket bounds"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.bounds = tuple(buckets)
+        self.counts = [0] * (len(self.bounds) + 1)  # last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def quantile(self, q):
+        """Estimate a quantile by interpolating inside its bucket"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = self.bounds[index - 1] if index > 0 else 0.0
+                upper = self.bounds[index] if index < len(self.bounds) else self.max
+                estimate = lower + (upper - lower) * (rank - seen) / bucket_count
+                return min(max(estimate, self.min), self.max)
+            seen += bucket_count
+        return self.max
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else None,
+            "min": self.min,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "buckets": self.counts[:],
+        }
+
+    def merge(self, data):
+        """Add the observations of a to_dict() snapshot with the same bounds"""
+        for index, bucket_count in enumerate(data["buckets"]):
+            self.counts[index] += bucket_count
+        self.count += data["count"]
+        self.sum += data["sum"]
+        for attribute, pick in (("min", min), ("max", max)):
+            theirs = data.get(attribute)
+            if theirs is not None:
+                ours = getattr(self, attribute)
+                setattr(self, attribute, theirs if ours is None else pick(ours, theirs))
+
+
+class MetricsRegistry:
+    """Counters and histograms of one process; safe to update from any thread"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Drop every value, e.g. at the start of a new batch"""
+        with self._lock:
+            self._counters = {name: 0 for name in COUNTERS}
+            self._histograms = {name: Histogram(self.buckets) for name in HISTOGRAMS}
+            self.started = time.time()
+
+    def inc(self, name, amount=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def observe(self, name, seconds):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    @contextmanager
+    def time(self, name):
+        """Observe the duration of a with block in a histogram"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def snapshot(self, reset=False):
+        """Return the current values as a JSON-serializable dict
+
+        Args:
+            reset: Start from zero afterwards, so the next snapshot only holds
+                what happened since this one (used by process-pool workers)
+        """
+        with self._lock:
+            data = {
+                "started": self.started,
+                "elapsed_seconds": round(time.time() - self.started, 3),
+                "bucket_bounds": list(self.buckets),
+                "counters": dict(self._counters),
+                "histograms": {name: histogram.to_dict() for name, histogram in self._histograms.items()},
+            }
+        if reset:
+            self.reset()
+        return data
+
+    def merge(self, data):
+        """Add a snapshot taken in another process"""
+        if not data:
+            return
+        with self._lock:
+            for name, value in data.get("counters", {}).items():
+                self._counters[name] = self._counters.get(name, 0) + value
+            for name, histogram_data in data.get("histograms", {}).items():
+                histogram = self._histograms.get(name)
+                if histogram is None:
+                    histogram = self._histograms[name] = Histogram(self.buckets)
+                histogram.merge(histogram_data)
+
+    def to_prometheus(self):
+        """Render the metrics in the Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        lines = []
+        for name, value in snapshot["counters"].items():
+            metric = METRIC_PREFIX + name
+            lines.append(f"# HELP {metric} {COUNTERS.get(name, name)}")
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+        for name, histogram in snapshot["histograms"].items():
+            metric = METRIC_PREFIX + name
+            lines.append(f"# HELP {metric} {HISTOGRAMS.get(name, name)}")
+            lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, histogram["buckets"]):
+                cumulative += bucket_count
+                lines.append(f'{metric}_bucket{{le="{bound:g}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{le="+Inf"}} {histogram["count"]}')
+            lines.append(f"{metric}_sum {histogram['sum']}")
+            lines.append(f"{metric}_count {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+
+def stage_summary(snapshot):
+    """Return one line per histogram with observations: total time, calls and p95, slowest stage first"""
+    stages = [(name, h) for name, h in snapshot["histograms"].items() if h["count"]]
+    stages.sort(key=lambda item: item[1]["sum"], reverse=True)
+    return [
+        f"{name.replace('_seconds', '')}: {h['sum']:.2f}s over {h['count']} calls "
+        f"(mean {h['mean'] * 1000:.1f} ms, p95 {h['p95'] * 1000:.1f} ms)"
+        for name, h in stages
+    ]
+
+
+class MetricsFileWriter:
+    """Rewrite a Prometheus text file from a registry every interval seconds
+
+    The file is replaced atomically, so a reader never sees a partial write.
+    """
+
+    def __init__(self, path, registry=None, interval=DEFAULT_WRITE_INTERVAL):
+        self.path = path
+        self.registry = registry or get_metrics()
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="metrics-writer", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the thread and write the final values"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.write()
+
+    def write(self):
+        temp_path = f"{self.path}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                f.write(self.registry.to_prometheus())
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            logger.warning("Could not write metrics file %s: %s", self.path, e)
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self.write()
+
+
+def start_metrics_file(path=None, interval=DEFAULT_WRITE_INTERVAL):
+    """Start a MetricsFileWriter for path (default: PDF_HARVEST_METRICS_FILE); None if neither is set"""
+    path = path or os.environ.get(METRICS_FILE_ENV)
+    if not path:
+        return None
+    logger.info("Writing metrics to %s every %ss", path, interval)
+    return MetricsFileWriter(path, interval=interval).start()
+
+
+_registry = MetricsRegistry()
+
+
+def get_metrics():
+    """Return the process-wide metrics registry"""
+    return _registry
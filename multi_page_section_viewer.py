@@ -1,3 +1,4 @@
+import logging
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton, 
                              QLabel, QScrollArea, QFrame, QStackedWidget, QMessageBox,
                              QTableWidget, QTableWidgetItem, QHeaderView, QSplitter,
@@ -5,17 +6,23 @@ from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
                              QSpinBox, QDoubleSpinBox, QTextEdit, QGroupBox, QFileDialog,
                              QDialogButtonBox, QSpacerItem, QSizePolicy)
 from PySide6.QtCore import Qt, Signal, QPoint, QRect, QSize
-from PySide6.QtGui import (QFont, QImage, QPixmap, QCursor, QPainter, 
+from PySide6.QtGui import (QFont, QPixmap, QCursor, QPainter, 
                           QPen, QColor)
 import pandas as pd
 import fitz
-import pypdf_table_extraction
 import json
 import os
 import re
 import sqlite3
+from regex_filter import first_match, row_texts, skip_mask
+from document_context import DocumentContext
+from page_text_cache import MAX_CACHED_PAGES
+from page_renderer import render_page
+from page_geometry import get_page_transform
 from database import InvoiceDatabase  # Import the InvoiceDatabase class
 
+logger = logging.getLogger(__name__)
+
 # Create a global database instance with the correct database path
 db = InvoiceDatabase("invoice_templates.db")  # Initialize with the correct database path
 
@@ -162,18 +169,20 @@ class MultiPageSectionViewer(QWidget):
 
     def __init__(self, pdf_path, all_pages_data, regions, column_lines):
         super().__init__()
-        print("\nInitializing MultiPageSectionViewer...")
-        print(f"PDF Path: {pdf_path}")
-        print(f"Number of pages: {len(all_pages_data)}")
+        logger.debug("Initializing MultiPageSectionViewer...")
+        logger.debug("PDF Path: %s", pdf_path)
+        logger.debug("Number of pages: %s", len(all_pages_data))
         
         self.pdf_path = pdf_path
         self.all_pages_data = all_pages_data  # List of dictionaries containing data for each page
         self.regions = regions
         self.column_lines = column_lines
         
-        # Initialize PDF document first
-        self.pdf_document = fitz.open(pdf_path)
-        print(f"PDF document opened successfully with {len(self.pdf_document)} pages")
+        # Initialize PDF document first; it is opened once and its parsed
+        # page text is kept between re-extractions while parameters are tuned
+        self.document_context = DocumentContext(pdf_path, MAX_CACHED_PAGES)
+        self.pdf_document = self.document_context.document
+        logger.debug("PDF document opened successfully with %s pages", len(self.pdf_document))
         
         # Initialize page numbers after PDF document is loaded
         self.total_pages = len(self.pdf_document)  # Use actual PDF document length
@@ -195,8 +204,9 @@ class MultiPageSectionViewer(QWidget):
             }
         }
         
-        print("\nExtraction parameters initialized:")
-        print(json.dumps(self.extraction_params, indent=2))
+        logger.debug("Extraction parameters initialized:")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("%s", json.dumps(self.extraction_params, indent=2))
         
         self.initUI()
         self.load_pdf()
@@ -424,32 +434,26 @@ class MultiPageSectionViewer(QWidget):
         self.setLayout(layout)
 
     def load_pdf(self):
-        print(f"\nLoading PDF for page {self.current_page}")
+        logger.debug("Loading PDF for page %s", self.current_page)
         try:
             # Basic validation checks
             if not hasattr(self, 'pdf_document') or self.pdf_document is None:
-                print("PDF document not initialized")
+                logger.debug("PDF document not initialized")
                 return
                 
             if not hasattr(self, 'current_page') or self.current_page < 1 or self.current_page > self.total_pages:
-                print(f"Invalid page number: {self.current_page} (valid range: 1-{self.total_pages})")
+                logger.debug("Invalid page number: %s (valid range: 1-%s)", self.current_page, self.total_pages)
                 return
                 
             if not hasattr(self, 'pdf_path') or not self.pdf_path:
-                print("PDF path not set")
+                logger.debug("PDF path not set")
                 return
             
-            # Get the page
-            page = self.pdf_document[self.current_page - 1]
-            print(f"Successfully loaded page {self.current_page}")
-            
-            # Create a new pixmap for the page
-            pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))
-            print(f"Page rendered with dimensions: {pix.width}x{pix.height}")
+            logger.debug("Loading page %s", self.current_page)
             
-            # Convert PyMuPDF pixmap to QPixmap
-            img = QImage(pix.samples, pix.width, pix.height, pix.stride, QImage.Format_RGB888)
-            pixmap = QPixmap.fromImage(img)
+            # Render the page through the shared render service
+            pixmap = render_page(self.pdf_document, self.current_page - 1)
+            logger.debug("Page rendered with dimensions: %sx%s", pixmap.width(), pixmap.height())
             
             if hasattr(self, 'pdf_label') and self.pdf_label.isValid():
                 # Create a new pixmap for drawing
@@ -507,7 +511,7 @@ class MultiPageSectionViewer(QWidget):
                 # Set the combined pixmap to the label
                 self.pdf_label.setPixmap(drawing_pixmap)
                 self.pdf_label.adjustPixmap()
-                print("PDF label updated with new pixmap and drawings")
+                logger.debug("PDF label updated with new pixmap and drawings")
             
             # Update page label
             if hasattr(self, 'page_label'):
@@ -520,36 +524,34 @@ class MultiPageSectionViewer(QWidget):
                 self.next_btn.setEnabled(self.current_page < self.total_pages)
             
             # Extract and update data for the current page
-            print("\nExtracting data for current page...")
+            logger.debug("Extracting data for current page...")
             self.extract_and_update_section_data()
             
             # Update tables with extracted data
             self.update_tables()
-            print("Tables updated with extracted data")
+            logger.debug("Tables updated with extracted data")
             
         except Exception as e:
-            print(f"Error loading PDF: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.error("Error loading PDF: %s", e, exc_info=True)
 
     def extract_and_update_section_data(self):
         """Extract and update data for all sections of the current page"""
-        print("\n=== Starting Section Data Extraction ===")
-        print(f"Current page: {self.current_page}")
+        logger.debug("=== Starting Section Data Extraction ===")
+        logger.debug("Current page: %s", self.current_page)
         
         try:
             # Get current page
             page = self.pdf_document[self.current_page - 1]
-            print(f"\nProcessing page {self.current_page}")
+            logger.debug("Processing page %s", self.current_page)
             
             # Get actual page dimensions in points (1/72 inch)
             page_width = page.mediabox.width
             page_height = page.mediabox.height
             
-            # Get the rendered dimensions
-            pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))
-            rendered_width = pix.width
-            rendered_height = pix.height
+            # Get the rendered dimensions from the page geometry (no rendering needed)
+            transform = get_page_transform(self.document_context, page.number)
+            rendered_width = transform.rendered_width
+            rendered_height = transform.rendered_height
             
             # Calculate scaling factors
             scale_x = page_width / rendered_width
@@ -566,7 +568,7 @@ class MultiPageSectionViewer(QWidget):
             
             # Process each section
             for section in ['header', 'items', 'summary']:
-                print(f"\n=== Processing {section.upper()} Section ===")
+                logger.debug("=== Processing %s Section ===", section.upper())
                 if section in current_regions and current_regions[section]:
                     section_regions = current_regions[section]
                     section_column_lines = current_column_lines.get(section, [])
@@ -605,7 +607,7 @@ class MultiPageSectionViewer(QWidget):
                         
                         try:
                             # Extract table
-                            table_result = pypdf_table_extraction.read_pdf(self.pdf_path, **params)
+                            table_result = self.document_context.read_pdf(**params)
                             
                             if table_result and len(table_result) > 0 and table_result[0].df is not None:
                                 table_df = table_result[0].df
@@ -644,7 +646,7 @@ class MultiPageSectionViewer(QWidget):
                                         processed_tables.append(table_df)
                                 
                         except Exception as e:
-                            print(f"Error extracting table: {str(e)}")
+                            logger.error("Error extracting table: %s", e)
                     
                     # Update the data for the current page
                     current_page_data = self.all_pages_data[self.current_page - 1]
@@ -656,22 +658,20 @@ class MultiPageSectionViewer(QWidget):
                     else:
                         current_page_data[section] = None
                 else:
-                    print(f"No regions defined for {section} section")
+                    logger.warning("No regions defined for %s section", section)
             
             # Update the display
             self.update_tables()
             
         except Exception as e:
-            print(f"Error in extract_and_update_section_data: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.error("Error in extract_and_update_section_data: %s", e, exc_info=True)
 
     def update_tables(self):
-        print(f"\nUpdating tables for page {self.current_page}")
+        logger.debug("Updating tables for page %s", self.current_page)
         try:
             # Get data for current page (0-based index)
             current_page_data = self.all_pages_data[self.current_page - 1]
-            print(f"Current page data structure: {list(current_page_data.keys())}")
+            logger.debug("Current page data structure: %s", list(current_page_data.keys()))
             
             # Update the data table based on current section
             if self.current_section in current_page_data:
@@ -710,22 +710,20 @@ class MultiPageSectionViewer(QWidget):
                 self.section_label.setText(f"Section: {self.current_section.title()}")
             
         except Exception as e:
-            print(f"Error updating tables: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.error("Error updating tables: %s", e, exc_info=True)
 
     def next_page(self):
-        print(f"\nMoving to next page from {self.current_page}")
+        logger.debug("Moving to next page from %s", self.current_page)
         if self.current_page < self.total_pages:
             self.current_page += 1
-            print(f"New page number: {self.current_page}")
+            logger.debug("New page number: %s", self.current_page)
             self.load_pdf()
 
     def prev_page(self):
-        print(f"\nMoving to previous page from {self.current_page}")
+        logger.debug("Moving to previous page from %s", self.current_page)
         if self.current_page > 1:
             self.current_page -= 1
-            print(f"New page number: {self.current_page}")
+            logger.debug("New page number: %s", self.current_page)
             self.load_pdf()
 
     def go_back(self):
@@ -842,7 +840,7 @@ class MultiPageSectionViewer(QWidget):
     def save_template_directly(self, name, description, use_middle_page=False, fixed_page_count=False):
         """Save the multi-page template directly to the database with actual parameters"""
         try:
-            print("\nStarting template save process...")
+            logger.debug("Starting template save process...")
             
             # Validate input parameters
             if not name or not isinstance(name, str):
@@ -860,16 +858,16 @@ class MultiPageSectionViewer(QWidget):
             
             # Validate regions and column lines data structures
             if not hasattr(self, 'regions') or not isinstance(self.regions, dict):
-                print("Warning: No regions data found, initializing empty regions dictionary")
+                logger.warning("No regions data found, initializing empty regions dictionary")
                 self.regions = {}
             
             if not hasattr(self, 'column_lines') or not isinstance(self.column_lines, dict):
-                print("Warning: No column lines data found, initializing empty column lines dictionary")
+                logger.warning("No column lines data found, initializing empty column lines dictionary")
                 self.column_lines = {}
             
             # Validate all_pages_data
             if not hasattr(self, 'all_pages_data') or not isinstance(self.all_pages_data, list):
-                print("Warning: No page data found, initializing empty page data list")
+                logger.warning("No page data found, initializing empty page data list")
                 self.all_pages_data = []
             
             # Calculate total pages and page indices to save
@@ -888,7 +886,7 @@ class MultiPageSectionViewer(QWidget):
             page_regions = []
             page_column_lines = []
             
-            print(f"\nProcessing {total_pages} pages for template saving...")
+            logger.debug("Processing %s pages for template saving...", total_pages)
             
             # For each page, convert regions and column lines to serializable format
             for page_idx, page_num in enumerate(range(total_pages)):
@@ -897,7 +895,7 @@ class MultiPageSectionViewer(QWidget):
                     if page_idx < len(page_indices_to_save):
                         continue
 
-                print(f"\nProcessing page {page_num + 1}/{total_pages}")
+                logger.debug("Processing page %s/%s", page_num + 1, total_pages)
 
                 # Get the regions and column lines for this page
                 regions = self.regions.get(page_num, {})
@@ -905,12 +903,18 @@ class MultiPageSectionViewer(QWidget):
                 
                 # Validate regions structure
                 if not isinstance(regions, dict):
-                    print(f"Warning: Invalid regions structure for page {page_num + 1}, initializing empty dict")
+                    logger.warning(
+                        "Warning: Invalid regions structure for page %s, initializing empty dict",
+                        page_num + 1
+                    )
                     regions = {}
                     
                 # Validate column lines structure
                 if not isinstance(column_lines, dict):
-                    print(f"Warning: Invalid column lines structure for page {page_num + 1}, initializing empty dict")
+                    logger.warning(
+                        "Warning: Invalid column lines structure for page %s, initializing empty dict",
+                        page_num + 1
+                    )
                     column_lines = {}
                 
                 # Get page dimensions for coordinate conversion
@@ -918,10 +922,10 @@ class MultiPageSectionViewer(QWidget):
                 page_width = page.mediabox.width
                 page_height = page.mediabox.height
                 
-                # Get rendered dimensions
-                pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))
-                rendered_width = pix.width
-                rendered_height = pix.height
+                # Get the rendered dimensions from the page geometry (no rendering needed)
+                transform = get_page_transform(self.document_context, page.number)
+                rendered_width = transform.rendered_width
+                rendered_height = transform.rendered_height
                 
                 # Calculate scaling factors
                 scale_x = page_width / rendered_width
@@ -951,14 +955,20 @@ class MultiPageSectionViewer(QWidget):
                 serializable_column_lines = {}
                 for section, lines in column_lines.items():
                     if not isinstance(lines, list):
-                        print(f"Warning: Invalid column lines structure for section {section} on page {page_num + 1}, skipping")
+                        logger.warning(
+                            "Warning: Invalid column lines structure for section %s on page %s, skipping",
+                            section, page_num + 1
+                        )
                         continue
                     
                     serializable_column_lines[section] = []
                     for line in lines:
                         try:
                             if not isinstance(line, (list, tuple)) or len(line) < 2:
-                                print(f"Warning: Invalid column line in section {section} on page {page_num + 1}, skipping")
+                                logger.warning(
+                                    "Warning: Invalid column line in section %s on page %s, skipping",
+                                    section, page_num + 1
+                                )
                                 continue
                             
                             # Convert line to serializable format with scaled coordinates
@@ -977,14 +987,17 @@ class MultiPageSectionViewer(QWidget):
                                 line_data.append(line[2])  # Add region index if present
                             serializable_column_lines[section].append(line_data)
                         except Exception as e:
-                            print(f"Warning: Error converting column line in section {section} on page {page_num + 1}: {str(e)}")
+                            logger.warning(
+                                "Warning: Error converting column line in section %s on page %s: %s",
+                                section, page_num + 1, e
+                            )
                             continue
                 
                 # Add the serialized data for this page
                 page_regions.append(serializable_regions)
                 page_column_lines.append(serializable_column_lines)
             
-                print(f"Successfully processed page {page_num + 1}")
+                logger.debug("Successfully processed page %s", page_num + 1)
             
             # Initialize page_column_lines if not already initialized
             if not page_column_lines:
@@ -994,7 +1007,7 @@ class MultiPageSectionViewer(QWidget):
             
             # Ensure we have extraction_params with proper default values if not set elsewhere
             if not hasattr(self, 'extraction_params'):
-                print("\nInitializing default extraction parameters for template saving:")
+                logger.debug("Initializing default extraction parameters for template saving:")
                 self.extraction_params = {
                     'header': {'row_tol': 5},    # Default for header
                     'items': {'row_tol': 15},    # Default for items
@@ -1008,9 +1021,9 @@ class MultiPageSectionViewer(QWidget):
                         'summary': {}
                     }
                 }
-                print(f"  Header row_tol: {self.extraction_params['header']['row_tol']}")
-                print(f"  Items row_tol: {self.extraction_params['items']['row_tol']}")
-                print(f"  Summary row_tol: {self.extraction_params['summary']['row_tol']}")
+                logger.debug("Header row_tol: %s", self.extraction_params['header']['row_tol'])
+                logger.debug("Items row_tol: %s", self.extraction_params['items']['row_tol'])
+                logger.debug("Summary row_tol: %s", self.extraction_params['summary']['row_tol'])
             
             # Try to get latest extraction parameters from main window
             try:
@@ -1023,61 +1036,61 @@ class MultiPageSectionViewer(QWidget):
                         # Get the latest extraction parameters from main window
                         if hasattr(widget, 'latest_extraction_params'):
                             latest_params = widget.latest_extraction_params
-                            print("\nFound latest extraction parameters in main window:")
+                            logger.debug("Found latest extraction parameters in main window:")
                             
                             # Update section-specific parameters
                             for section in ['header', 'items', 'summary']:
                                 if section in latest_params and 'row_tol' in latest_params[section]:
                                     self.extraction_params[section]['row_tol'] = latest_params[section]['row_tol']
-                                    print(f"  Updated {section} row_tol: {latest_params[section]['row_tol']}")
+                                    logger.debug("Updated %s row_tol: %s", section, latest_params[section]['row_tol'])
                             
                             # Update global parameters
                             if 'split_text' in latest_params:
                                 self.extraction_params['split_text'] = latest_params['split_text']
-                                print(f"  Updated split_text: {latest_params['split_text']}")
+                                logger.debug("Updated split_text: %s", latest_params['split_text'])
                             if 'strip_text' in latest_params:
                                 self.extraction_params['strip_text'] = latest_params['strip_text']
-                                print(f"  Updated strip_text: {repr(latest_params['strip_text'])}")
+                                logger.debug("Updated strip_text: %s", repr(latest_params['strip_text']))
                             if 'flavor' in latest_params:
                                 self.extraction_params['flavor'] = latest_params['flavor']
-                                print(f"  Updated flavor: {latest_params['flavor']}")
+                                logger.debug("Updated flavor: %s", latest_params['flavor'])
                             
                             # Merge regex patterns if they exist
                             if 'regex_patterns' in latest_params:
-                                print("  Found regex patterns in main window:")
+                                logger.debug("Found regex patterns in main window:")
                                 for section, patterns in latest_params['regex_patterns'].items():
                                     if section in self.extraction_params['regex_patterns'] and patterns:
                                         for p_type, pattern in patterns.items():
                                             self.extraction_params['regex_patterns'][section][p_type] = pattern
-                                            print(f"    Added {section} {p_type} pattern: {pattern}")
+                                            logger.debug("Added %s %s pattern: %s", section, p_type, pattern)
                             
                             break
             except Exception as e:
-                print(f"Could not get latest extraction params from main window: {str(e)}")
+                logger.warning("Could not get latest extraction params from main window: %s", e)
             
             # Add extraction parameters to config
             config['extraction_params'] = self.extraction_params
             
-            print(f"\nFinal extraction parameters being saved to template:")
+            logger.debug("Final extraction parameters being saved to template:")
             for section in ['header', 'items', 'summary']:
-                print(f"  {section.title()} row_tol: {self.extraction_params[section]['row_tol']}")
+                logger.debug("%s row_tol: %s", section.title(), self.extraction_params[section]['row_tol'])
             
-            print(f"  split_text: {self.extraction_params['split_text']}")
-            print(f"  strip_text: {repr(self.extraction_params['strip_text'])}")
-            print(f"  flavor: {self.extraction_params['flavor']}")
+            logger.debug("split_text: %s", self.extraction_params['split_text'])
+            logger.debug("strip_text: %s", repr(self.extraction_params['strip_text']))
+            logger.debug("flavor: %s", self.extraction_params['flavor'])
             
             # Print regex patterns if they exist
             if 'regex_patterns' in self.extraction_params:
-                print("\nRegex patterns being saved to template:")
+                logger.debug("Regex patterns being saved to template:")
                 for section, patterns in self.extraction_params['regex_patterns'].items():
                     if patterns:
-                        print(f"  {section.title()} patterns:")
+                        logger.debug("%s patterns:", section.title())
                         for pattern_type, pattern in patterns.items():
-                            print(f"    {pattern_type}: {pattern}")
+                            logger.debug("%s: %s", pattern_type, pattern)
             
-            print(f"\nSaving multi-page template '{name}' with {len(page_regions)} pages")
-            print(f"Page regions count: {len(page_regions)}")
-            print(f"Page column lines count: {len(page_column_lines)}")
+            logger.debug("Saving multi-page template '%s' with %s pages", name, len(page_regions))
+            logger.debug("Page regions count: %s", len(page_regions))
+            logger.debug("Page column lines count: %s", len(page_column_lines))
             
             # Save template to the database
             template_id = db.save_template(
@@ -1100,7 +1113,7 @@ class MultiPageSectionViewer(QWidget):
                     f"Multi-page template '{name}' has been saved successfully.Navigating to Template Manager...",
                     QMessageBox.Ok
                 )
-                print(f"Template saved successfully with ID: {template_id}")               
+                logger.debug("Template saved successfully with ID: %s", template_id)               
                 # Navigate to template manager screen
                 self.navigate_to_template_manager()
             else:
@@ -1109,9 +1122,7 @@ class MultiPageSectionViewer(QWidget):
             return template_id
                 
         except Exception as e:
-            print(f"\nError saving template: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.error("Error saving template: %s", e, exc_info=True)
             
             msg = QMessageBox()
             msg.setIcon(QMessageBox.Critical)
@@ -1281,18 +1292,18 @@ class MultiPageSectionViewer(QWidget):
                 }
             
             # Print current extraction parameters for debugging
-            print(f"\nUpdated extraction parameters:")
-            print(f"  {section.title()} row_tol: {self.extraction_params[section]['row_tol']}")
-            print(f"  split_text: {self.extraction_params['split_text']}")
-            print(f"  strip_text: {repr(self.extraction_params['strip_text'])}")
+            logger.debug("Updated extraction parameters:")
+            logger.debug("%s row_tol: %s", section.title(), self.extraction_params[section]['row_tol'])
+            logger.debug("split_text: %s", self.extraction_params['split_text'])
+            logger.debug("strip_text: %s", repr(self.extraction_params['strip_text']))
             
             # Print regex patterns if they exist
-            print("\nRegex patterns in extraction parameters:")
+            logger.debug("Regex patterns in extraction parameters:")
             for sec, patterns in self.extraction_params['regex_patterns'].items():
                 if patterns:
-                    print(f"  {sec.title()} patterns:")
+                    logger.debug("%s patterns:", sec.title())
                     for pattern_type, pattern in patterns.items():
-                        print(f"    {pattern_type}: {pattern}")
+                        logger.debug("%s: %s", pattern_type, pattern)
             
             # Also store in main window for reference during template saves
             try:
@@ -1337,12 +1348,10 @@ class MultiPageSectionViewer(QWidget):
                                 for p_type, pattern in patterns.items():
                                     widget.latest_extraction_params['regex_patterns'][sec][p_type] = pattern
                         
-                        print("\nStored extraction parameters in main window for template saving")
+                        logger.debug("Stored extraction parameters in main window for template saving")
                         break
             except Exception as e:
-                print(f"Error storing extraction parameters in main window: {str(e)}")
-                import traceback
-                traceback.print_exc()
+                logger.error("Error storing extraction parameters in main window: %s", e, exc_info=True)
             
             # Process for multiple tables
             if len(table_areas) > 1:
@@ -1366,7 +1375,7 @@ class MultiPageSectionViewer(QWidget):
                             if section in self.extraction_params['regex_patterns']:
                                 regex_patterns = self.extraction_params['regex_patterns'][section]
                                 if regex_patterns:
-                                    print(f"  Applying regex patterns: {regex_patterns}")
+                                    logger.debug("Applying regex patterns: %s", regex_patterns)
                                     
                                     # Apply start pattern if defined
                                     if 'start' in regex_patterns and regex_patterns['start']:
@@ -1380,10 +1389,10 @@ class MultiPageSectionViewer(QWidget):
                                     if 'skip' in regex_patterns and regex_patterns['skip']:
                                         single_table_params['skip_regex'] = regex_patterns['skip']
                         
-                        print(f"  Using parameters: {single_table_params}")
+                        logger.debug("Using parameters: %s", single_table_params)
                         
                         # Extract just this table
-                        table_result = pypdf_table_extraction.read_pdf(self.pdf_path, **single_table_params)
+                        table_result = self.document_context.read_pdf(**single_table_params)
                         
                         if table_result and len(table_result) > 0 and table_result[0].df is not None:
                             table_df = table_result[0].df
@@ -1397,7 +1406,7 @@ class MultiPageSectionViewer(QWidget):
                                 processed_tables.append(table_df)
                             
                     except Exception as e:
-                        print(f"Error extracting table {idx + 1}: {str(e)}")
+                        logger.error("Error extracting table %s: %s", idx + 1, e)
                 
                 # Update the display with tables in the correct order
                 if processed_tables:
@@ -1426,7 +1435,7 @@ class MultiPageSectionViewer(QWidget):
                     if section in self.extraction_params['regex_patterns']:
                         regex_patterns = self.extraction_params['regex_patterns'][section]
                         if regex_patterns:
-                            print(f"Applying regex patterns: {regex_patterns}")
+                            logger.debug("Applying regex patterns: %s", regex_patterns)
                             
                             # Apply start pattern if defined
                             if 'start' in regex_patterns and regex_patterns['start']:
@@ -1440,11 +1449,11 @@ class MultiPageSectionViewer(QWidget):
                             if 'skip' in regex_patterns and regex_patterns['skip']:
                                 single_table_params['skip_regex'] = regex_patterns['skip']
                 
-                print(f"\nRetrying single table extraction with new parameters: {single_table_params}")
+                logger.debug("Retrying single table extraction with new parameters: %s", single_table_params)
                 
                 try:
                     # Extract table with new parameters
-                    table_result = pypdf_table_extraction.read_pdf(self.pdf_path, **single_table_params)
+                    table_result = self.document_context.read_pdf(**single_table_params)
                     
                     if table_result and len(table_result) > 0 and table_result[0].df is not None:
                         table_df = table_result[0].df
@@ -1469,7 +1478,7 @@ class MultiPageSectionViewer(QWidget):
                         self.update_data_table(None, section)
                     
                 except Exception as e:
-                    print(f"Error extracting table: {str(e)}")
+                    logger.error("Error extracting table: %s", e)
                     current_page_data = self.all_pages_data[self.current_page - 1]
                     current_page_data[section] = None
                     self.update_data_table(None, section)
@@ -1479,8 +1488,8 @@ class MultiPageSectionViewer(QWidget):
     def update_data_table_for_header(self, table_list, section_type='header'):
         """Method to display multiple tables of a section type (header or summary)"""
         try:
-            print(f"\n=== Updating data table for {section_type} ===")
-            print(f"Input type: {type(table_list)}")
+            logger.debug("=== Updating data table for %s ===", section_type)
+            logger.debug("Input type: %s", type(table_list))
             
             # Clear existing table
             self.data_table.setRowCount(0)
@@ -1488,32 +1497,32 @@ class MultiPageSectionViewer(QWidget):
             
             # Handle empty input
             if table_list is None:
-                print("Table list is None")
+                logger.debug("Table list is None")
                 return
                 
             if isinstance(table_list, pd.DataFrame):
-                print("Single DataFrame provided")
+                logger.debug("Single DataFrame provided")
                 if table_list.empty:
-                    print("DataFrame is empty")
+                    logger.debug("DataFrame is empty")
                     return
                 table_list = [table_list]
             elif not isinstance(table_list, list):
-                print(f"Unexpected input type: {type(table_list)}")
+                logger.debug("Unexpected input type: %s", type(table_list))
                 return
                 
             if len(table_list) == 0:
-                print("Table list is empty")
+                logger.debug("Table list is empty")
                 return
             
-            print(f"Processing {len(table_list)} tables")
+            logger.debug("Processing %s tables", len(table_list))
             
             # Process each table
             for i, df in enumerate(table_list):
                 if df is None or df.empty:
-                    print(f"Table {i + 1} is None or empty, skipping")
+                    logger.debug("Table %s is None or empty, skipping", i + 1)
                     continue
                     
-                print(f"Processing table {i + 1} with shape {df.shape}")
+                logger.debug("Processing table %s with shape %s", i + 1, df.shape)
                 
                 # Add table number as header if multiple tables
                 if len(table_list) > 1:
@@ -1553,12 +1562,10 @@ class MultiPageSectionViewer(QWidget):
                     self.data_table.setItem(spacer_row, 0, spacer_item)
                     self.data_table.setSpan(spacer_row, 0, 1, df.shape[1])
             
-            print("Data table update completed successfully")
+            logger.debug("Data table update completed successfully")
             
         except Exception as e:
-            print(f"\nError in update_data_table_for_header: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.error("Error in update_data_table_for_header: %s", e, exc_info=True)
             # Clear the table in case of error
             self.data_table.setRowCount(0)
             self.data_table.setColumnCount(0)
@@ -1566,7 +1573,7 @@ class MultiPageSectionViewer(QWidget):
     def update_data_table(self, df, section):
         """Update the data table with the provided DataFrame and section type"""
         try:
-            print(f"\n=== Updating data table for {section} ===")
+            logger.debug("=== Updating data table for %s ===", section)
             
             # Clear existing table
             self.data_table.clear()
@@ -1724,9 +1731,7 @@ class MultiPageSectionViewer(QWidget):
                 self.data_table.setSpan(0, 0, 1, 2)  # Span across both columns
                 
         except Exception as e:
-            print(f"\nError in update_data_table: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.error("Error in update_data_table: %s", e, exc_info=True)
             # Clear the table in case of error
             self.data_table.setRowCount(0)
             self.data_table.setColumnCount(0)
@@ -1773,10 +1778,10 @@ class MultiPageSectionViewer(QWidget):
             page_width = page.mediabox.width
             page_height = page.mediabox.height
             
-            # Get the rendered dimensions
-            pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))
-            rendered_width = pix.width
-            rendered_height = pix.height
+            # Get the rendered dimensions from the page geometry (no rendering needed)
+            transform = get_page_transform(self.document_context, page.number)
+            rendered_width = transform.rendered_width
+            rendered_height = transform.rendered_height
             
             # Calculate scaling factors
             scale_x = page_width / rendered_width
@@ -2053,7 +2058,7 @@ class MultiPageSectionViewer(QWidget):
             
             def on_close():
                 try:
-                    print("\nApplying all patterns and closing dialog...")
+                    logger.debug("Applying all patterns and closing dialog...")
                     
                     # Apply patterns to current page data
                     current_page_data = self.all_pages_data[self.current_page - 1]
@@ -2100,13 +2105,11 @@ class MultiPageSectionViewer(QWidget):
                                     processed_df = self.apply_regex_patterns_to_df(section_data, section)
                                     page_data['items'] = processed_df if processed_df is not None and not processed_df.empty else None
                     
-                    print("All patterns applied successfully")
+                    logger.debug("All patterns applied successfully")
                     dialog.accept()
                     
                 except Exception as e:
-                    print(f"Error in on_close: {str(e)}")
-                    import traceback
-                    traceback.print_exc()
+                    logger.error("Error in on_close: %s", e, exc_info=True)
                     results_text.setText(f"Error applying patterns: {str(e)}")
                     # Don't close the dialog on error
                     return False
@@ -2180,9 +2183,7 @@ class MultiPageSectionViewer(QWidget):
                         
                 except Exception as e:
                     results_text.setText(f"Error testing pattern: {str(e)}")
-                    print(f"Error in on_test_clicked: {str(e)}")
-                    import traceback
-                    traceback.print_exc()
+                    logger.error("Error in on_test_clicked: %s", e, exc_info=True)
             
             def on_highlight_toggled(checked):
                 if checked and current_matches:
@@ -2193,14 +2194,14 @@ class MultiPageSectionViewer(QWidget):
             
             def on_apply_to_template():
                 try:
-                    print("\nApplying pattern to template...")
+                    logger.debug("Applying pattern to template...")
                     pattern = pattern_input.text().strip()
                     p_type = pattern_type_combo.currentText().lower()
                     include_matches = include_matches_check.isChecked()
                     
-                    print(f"Pattern: {pattern}")
-                    print(f"Type: {p_type}")
-                    print(f"Include matches: {include_matches}")
+                    logger.debug("Pattern: %s", pattern)
+                    logger.debug("Type: %s", p_type)
+                    logger.debug("Include matches: %s", include_matches)
                     
                     # Make sure extraction_params and regex_patterns exist
                     if not hasattr(self, 'extraction_params'):
@@ -2216,7 +2217,7 @@ class MultiPageSectionViewer(QWidget):
                     self.extraction_params['regex_patterns'][section][p_type] = pattern
                     self.extraction_params['regex_patterns'][section]['include_matches'] = include_matches
                     
-                    print("Extraction parameters updated")
+                    logger.debug("Extraction parameters updated")
                     
                     # Update the results text to show the pattern was saved
                     results_text.append(f"\nPattern saved as {p_type} pattern!")
@@ -2228,9 +2229,7 @@ class MultiPageSectionViewer(QWidget):
                     # Don't close the dialog - let user set more patterns
                     
                 except Exception as e:
-                    print(f"Error in on_apply_to_template: {str(e)}")
-                    import traceback
-                    traceback.print_exc()
+                    logger.error("Error in on_apply_to_template: %s", e, exc_info=True)
                     results_text.setText(f"Error applying pattern: {str(e)}")
                     # Don't close the dialog on error
                     return False
@@ -2248,9 +2247,7 @@ class MultiPageSectionViewer(QWidget):
             dialog.exec()
             
         except Exception as e:
-            print(f"Error showing regex test dialog: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.error("Error showing regex test dialog: %s", e, exc_info=True)
 
     def test_regex_pattern(self, pattern, section, pattern_type):
         """Test a regex pattern against the current section data"""
@@ -2259,17 +2256,17 @@ class MultiPageSectionViewer(QWidget):
         error = None
         
         try:
-            print(f"\n=== Starting regex pattern test ===")
-            print(f"Pattern: {pattern}")
-            print(f"Section: {section}")
-            print(f"Pattern Type: {pattern_type}")
+            logger.debug("=== Starting regex pattern test ===")
+            logger.debug("Pattern: %s", pattern)
+            logger.debug("Section: %s", section)
+            logger.debug("Pattern Type: %s", pattern_type)
             
             # Validate the regex pattern
             try:
                 re.compile(pattern)
-                print("Regex pattern validation successful")
+                logger.debug("Regex pattern validation successful")
             except re.error as e:
-                print(f"Regex pattern validation failed: {str(e)}")
+                logger.debug("Regex pattern validation failed: %s", e)
                 return [], [], f"Invalid regex pattern: {str(e)}"
             
             # Get the data for this section
@@ -2277,29 +2274,29 @@ class MultiPageSectionViewer(QWidget):
             section_data = current_page_data[section]
             
             if section_data is None:
-                print("No data available for this section")
+                logger.warning("No data available for this section")
                 return [], [], "No data available for this section"
             
-            print(f"Section data type: {type(section_data)}")
+            logger.debug("Section data type: %s", type(section_data))
             if isinstance(section_data, list):
-                print(f"Number of tables in section: {len(section_data)}")
+                logger.debug("Number of tables in section: %s", len(section_data))
             else:
-                print(f"Single table with shape: {section_data.shape}")
+                logger.debug("Single table with shape: %s", section_data.shape)
             
             # Process the data for matching
             if isinstance(section_data, list):
                 # Multiple tables
                 for table_idx, df in enumerate(section_data):
-                    print(f"\nProcessing table {table_idx + 1}")
+                    logger.debug("Processing table %s", table_idx + 1)
                     if df is None or df.empty:
-                        print(f"Table {table_idx + 1} is empty or None, skipping")
+                        logger.debug("Table %s is empty or None, skipping", table_idx + 1)
                         continue
                     
-                    print(f"Table {table_idx + 1} shape: {df.shape}")
+                    logger.debug("Table %s shape: %s", table_idx + 1, df.shape)
                     
                     # For each table, process according to the pattern type
                     if pattern_type == 'start':
-                        print("Processing as start pattern")
+                        logger.debug("Processing as start pattern")
                         # Find the first match in this table
                         first_match_idx = None
                         for row_idx, row in df.iterrows():
@@ -2308,19 +2305,19 @@ class MultiPageSectionViewer(QWidget):
                                 if re.search(pattern, row_text, re.IGNORECASE):
                                     if first_match_idx is None:
                                         first_match_idx = row_idx
-                                        print(f"Found first match at row {row_idx}")
+                                        logger.debug("Found first match at row %s", row_idx)
                                     matches.append((table_idx, row_idx, row_text, row_idx == first_match_idx))
                                 else:
                                     non_matches.append((table_idx, row_idx, row_text, False))
                             except Exception as row_e:
-                                print(f"Error processing row {row_idx}: {str(row_e)}")
+                                logger.error("Error processing row %s: %s", row_idx, str(row_e))
                                 continue
                     
                     elif pattern_type == 'end':
-                        print("Processing as end pattern")
+                        logger.debug("Processing as end pattern")
                         # First find a simulated 'start' - either first row or first matching row
                         start_idx = df.index[0] if len(df.index) > 0 else None
-                        print(f"Start index: {start_idx}")
+                        logger.debug("Start index: %s", start_idx)
                         
                         # Then find first match after start
                         first_match_after_start = None
@@ -2332,16 +2329,16 @@ class MultiPageSectionViewer(QWidget):
                                     if re.search(pattern, row_text, re.IGNORECASE):
                                         if first_match_after_start is None:
                                             first_match_after_start = row_idx
-                                            print(f"Found first match after start at row {row_idx}")
+                                            logger.debug("Found first match after start at row %s", row_idx)
                                         matches.append((table_idx, row_idx, row_text, row_idx == first_match_after_start))
                                     else:
                                         non_matches.append((table_idx, row_idx, row_text, False))
                             except Exception as row_e:
-                                print(f"Error processing row {row_idx}: {str(row_e)}")
+                                logger.error("Error processing row %s: %s", row_idx, str(row_e))
                                 continue
                     
                     elif pattern_type == 'skip':
-                        print("Processing as skip pattern")
+                        logger.debug("Processing as skip pattern")
                         # All matches should be excluded
                         for row_idx, row in df.iterrows():
                             try:
@@ -2351,11 +2348,11 @@ class MultiPageSectionViewer(QWidget):
                                 else:
                                     non_matches.append((table_idx, row_idx, row_text, False))
                             except Exception as row_e:
-                                print(f"Error processing row {row_idx}: {str(row_e)}")
+                                logger.error("Error processing row %s: %s", row_idx, str(row_e))
                                 continue
                     
                     else:  # Default case - just match all
-                        print("Processing as default pattern")
+                        logger.debug("Processing as default pattern")
                         for row_idx, row in df.iterrows():
                             try:
                                 row_text = " ".join([str(val) for val in row if pd.notna(val)])
@@ -2364,15 +2361,15 @@ class MultiPageSectionViewer(QWidget):
                                 else:
                                     non_matches.append((table_idx, row_idx, row_text, False))
                             except Exception as row_e:
-                                print(f"Error processing row {row_idx}: {str(row_e)}")
+                                logger.error("Error processing row %s: %s", row_idx, str(row_e))
                                 continue
             else:
-                print("\nProcessing single table")
+                logger.debug("Processing single table")
                 # Single table - similar logic as above but for a single table
                 if not section_data.empty:
-                    print(f"Table shape: {section_data.shape}")
+                    logger.debug("Table shape: %s", section_data.shape)
                     if pattern_type == 'start':
-                        print("Processing as start pattern")
+                        logger.debug("Processing as start pattern")
                         # Find the first match
                         first_match_idx = None
                         for row_idx, row in section_data.iterrows():
@@ -2381,19 +2378,19 @@ class MultiPageSectionViewer(QWidget):
                                 if re.search(pattern, row_text, re.IGNORECASE):
                                     if first_match_idx is None:
                                         first_match_idx = row_idx
-                                        print(f"Found first match at row {row_idx}")
+                                        logger.debug("Found first match at row %s", row_idx)
                                     matches.append((0, row_idx, row_text, row_idx == first_match_idx))
                                 else:
                                     non_matches.append((0, row_idx, row_text, False))
                             except Exception as row_e:
-                                print(f"Error processing row {row_idx}: {str(row_e)}")
+                                logger.error("Error processing row %s: %s", row_idx, str(row_e))
                                 continue
                     
                     elif pattern_type == 'end':
-                        print("Processing as end pattern")
+                        logger.debug("Processing as end pattern")
                         # First find a simulated 'start' - either first row or first matching row
                         start_idx = section_data.index[0] if len(section_data.index) > 0 else None
-                        print(f"Start index: {start_idx}")
+                        logger.debug("Start index: %s", start_idx)
                         
                         # Then find first match after start
                         first_match_after_start = None
@@ -2405,16 +2402,16 @@ class MultiPageSectionViewer(QWidget):
                                     if re.search(pattern, row_text, re.IGNORECASE):
                                         if first_match_after_start is None:
                                             first_match_after_start = row_idx
-                                            print(f"Found first match after start at row {row_idx}")
+                                            logger.debug("Found first match after start at row %s", row_idx)
                                         matches.append((0, row_idx, row_text, row_idx == first_match_after_start))
                                     else:
                                         non_matches.append((0, row_idx, row_text, False))
                             except Exception as row_e:
-                                print(f"Error processing row {row_idx}: {str(row_e)}")
+                                logger.error("Error processing row %s: %s", row_idx, str(row_e))
                                 continue
                     
                     elif pattern_type == 'skip':
-                        print("Processing as skip pattern")
+                        logger.debug("Processing as skip pattern")
                         # All matches should be excluded
                         for row_idx, row in section_data.iterrows():
                             try:
@@ -2424,11 +2421,11 @@ class MultiPageSectionViewer(QWidget):
                                 else:
                                     non_matches.append((0, row_idx, row_text, False))
                             except Exception as row_e:
-                                print(f"Error processing row {row_idx}: {str(row_e)}")
+                                logger.error("Error processing row %s: %s", row_idx, str(row_e))
                                 continue
                     
                     else:  # Default case - just match all
-                        print("Processing as default pattern")
+                        logger.debug("Processing as default pattern")
                         for row_idx, row in section_data.iterrows():
                             try:
                                 row_text = " ".join([str(val) for val in row if pd.notna(val)])
@@ -2437,29 +2434,27 @@ class MultiPageSectionViewer(QWidget):
                                 else:
                                     non_matches.append((0, row_idx, row_text, False))
                             except Exception as row_e:
-                                print(f"Error processing row {row_idx}: {str(row_e)}")
+                                logger.error("Error processing row %s: %s", row_idx, str(row_e))
                                 continue
                 else:
-                    print("Single table is empty")
+                    logger.debug("Single table is empty")
             
-            print(f"\nTest results:")
-            print(f"Total matches found: {len(matches)}")
-            print(f"Total non-matches: {len(non_matches)}")
+            logger.debug("Test results:")
+            logger.debug("Total matches found: %s", len(matches))
+            logger.debug("Total non-matches: %s", len(non_matches))
             
             return matches, non_matches, error
             
         except Exception as e:
-            print(f"Error in test_regex_pattern: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.error("Error in test_regex_pattern: %s", e, exc_info=True)
             return [], [], f"Error testing pattern: {str(e)}"
 
     def update_pdf_highlights(self, matches, non_matches, section, include_matches=True):
         """Update the PDF display with highlights for regex matches and non-matches"""
         try:
-            print(f"\nUpdating PDF highlights for {section} section")
-            print(f"Matches: {len(matches)}, Non-matches: {len(non_matches)}")
-            print(f"Include matches: {include_matches}")
+            logger.debug("Updating PDF highlights for %s section", section)
+            logger.debug("Matches: %s, Non-matches: %s", len(matches), len(non_matches))
+            logger.debug("Include matches: %s", include_matches)
             
             # Get current page
             page = self.pdf_document[self.current_page - 1]
@@ -2468,10 +2463,10 @@ class MultiPageSectionViewer(QWidget):
             page_width = page.mediabox.width
             page_height = page.mediabox.height
             
-            # Get the rendered dimensions
-            pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))
-            rendered_width = pix.width
-            rendered_height = pix.height
+            # Get the rendered dimensions from the page geometry (no rendering needed)
+            transform = get_page_transform(self.document_context, page.number)
+            rendered_width = transform.rendered_width
+            rendered_height = transform.rendered_height
             
             # Calculate scaling factors
             scale_x = page_width / rendered_width
@@ -2488,7 +2483,7 @@ class MultiPageSectionViewer(QWidget):
                 
                 # Process each region
                 for i, region in enumerate(section_regions):
-                    print(f"\nProcessing region {i+1} of {section}")
+                    logger.debug("Processing region %s of %s", i+1, section)
                     
                     # Convert region coordinates to PDF space
                     x1 = region.x() * scale_x
@@ -2497,7 +2492,7 @@ class MultiPageSectionViewer(QWidget):
                     y2 = page_height - ((region.y() + region.height()) * scale_y)
                     
                     # Get text blocks in this region
-                    blocks = page.get_text("dict")["blocks"]
+                    blocks = self.document_context.page_text(page.number, "dict")["blocks"]
                     for block in blocks:
                         if "lines" not in block:
                             continue
@@ -2559,12 +2554,10 @@ class MultiPageSectionViewer(QWidget):
             
             # Update the PDF display
             self.load_pdf()
-            print("PDF highlights updated")
+            logger.debug("PDF highlights updated")
             
         except Exception as e:
-            print(f"Error updating PDF highlights: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.error("Error updating PDF highlights: %s", e, exc_info=True)
 
     def show_json_view(self):
         """Show the extracted data in JSON format"""
@@ -2614,9 +2607,7 @@ class MultiPageSectionViewer(QWidget):
             dialog.exec()
             
         except Exception as e:
-            print(f"Error showing JSON view: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.error("Error showing JSON view: %s", e, exc_info=True)
 
     def download_json(self):
         """Download the extracted data as JSON file"""
@@ -2656,9 +2647,7 @@ class MultiPageSectionViewer(QWidget):
                 "Download Error",
                 f"Error saving data: {str(e)}"
             )
-            print(f"Error downloading JSON: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.error("Error downloading JSON: %s", e, exc_info=True)
 
     def apply_regex_patterns_to_df(self, df, section):
         """Apply regex patterns to filter DataFrame content"""
@@ -2680,56 +2669,24 @@ class MultiPageSectionViewer(QWidget):
             # Create a copy of the DataFrame to work with
             result_df = df.copy()
             
-            # Create a mask for each pattern type
-            start_mask = pd.Series(False, index=result_df.index)
-            end_mask = pd.Series(False, index=result_df.index)
-            skip_mask = pd.Series(False, index=result_df.index)
-            
-            # Function to get text from row
-            def get_row_text(row):
-                return " ".join([str(val) for val in row if pd.notna(val)])
-            
-            # Process start pattern
-            if 'start' in patterns and patterns['start']:
-                pattern = patterns['start']
-                first_match_found = False
-                for idx, row in result_df.iterrows():
-                    row_text = get_row_text(row)
-                    if re.search(pattern, row_text, re.IGNORECASE):
-                        if not first_match_found:
-                            first_match_found = True
-                            start_mask.loc[idx:] = True
-                        
-            # Process end pattern
-            if 'end' in patterns and patterns['end']:
-                pattern = patterns['end']
-                first_match_found = False
-                for idx, row in result_df.iterrows():
-                    row_text = get_row_text(row)
-                    if re.search(pattern, row_text, re.IGNORECASE):
-                        if not first_match_found:
-                            first_match_found = True
-                            end_mask.loc[:idx] = True
-            
-            # Process skip pattern
-            if 'skip' in patterns and patterns['skip']:
-                pattern = patterns['skip']
-                for idx, row in result_df.iterrows():
-                    row_text = get_row_text(row)
-                    if re.search(pattern, row_text, re.IGNORECASE):
-                        skip_mask.loc[idx] = True
-            
-            # Combine masks based on pattern types present
+            # Join each row's text once; all patterns are matched against it
+            texts = row_texts(result_df, skip_na=True)
+            positions = pd.Series(range(len(result_df)), index=result_df.index)
             final_mask = pd.Series(True, index=result_df.index)
             
-            if 'start' in patterns and patterns['start']:
-                final_mask &= start_mask
+            # Rows from the first start match onwards
+            if patterns.get('start'):
+                start_pos = first_match(texts, patterns['start'])
+                final_mask &= positions >= (start_pos if start_pos is not None else len(result_df))
             
-            if 'end' in patterns and patterns['end']:
-                final_mask &= end_mask
+            # Rows up to and including the first end match
+            if patterns.get('end'):
+                end_pos = first_match(texts, patterns['end'])
+                final_mask &= positions <= (end_pos if end_pos is not None else -1)
             
-            if 'skip' in patterns and patterns['skip']:
-                final_mask &= ~skip_mask
+            # Rows that do not match the skip pattern
+            if patterns.get('skip'):
+                final_mask &= ~skip_mask(result_df, patterns['skip'], texts=texts)
             
             # Apply the mask based on include/exclude preference
             if include_matches:
@@ -2740,7 +2697,5 @@ class MultiPageSectionViewer(QWidget):
             return result_df
             
         except Exception as e:
-            print(f"Error applying regex patterns to DataFrame: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.error("Error applying regex patterns to DataFrame: %s", e, exc_info=True)
             return df
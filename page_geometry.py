@@ -0,0 +1,123 @@
+"""
+Screen <-> PDF coordinate transforms for rendered pages
+
+The views render pages with a zoom matrix and draw regions in pixmap pixels
+(top-left origin), while extraction needs PDF points (bottom-left origin).
+PageTransform derives the scale factors from the page geometry and the render
+matrix alone, so nothing has to be rendered to learn the pixmap size, and
+get_page_transform() caches one transform per (document, page, zoom).
+
+This module does not import PySide6; rectangles are passed as plain numbers.
+"""
+
+import os
+import threading
+
+import fitz  # PyMuPDF
+
+# Zoom the views render pages with
+DEFAULT_ZOOM = 2.0
+
+# The transform cache is emptied when it reaches this many pages
+MAX_CACHED_TRANSFORMS = 4096
+
+
+def document_key(document):
+    """Identify a document (or PDF path) by its file and modification time, falling back to the object itself"""
+    name = document if isinstance(document, str) else getattr(document, "name", None)
+    if name and os.path.exists(name):
+        return (os.path.abspath(name), os.path.getmtime(name))
+    return id(document)
+
+
+class PageTransform:
+    """Geometry of one page rendered at a zoom factor
+
+    Attributes:
+        page_width, page_height: Page size in points (page.rect)
+        mediabox_width, mediabox_height: Media box size in points
+        rendered_width, rendered_height: Size of the pixmap get_pixmap would
+            produce with the same zoom matrix
+        scale_x, scale_y: Media box points per rendered pixel
+    """
+
+    def __init__(self, page, zoom=DEFAULT_ZOOM):
+        self.zoom = zoom
+        self.page_width = page.rect.width
+        self.page_height = page.rect.height
+        self.mediabox_width = page.mediabox.width
+        self.mediabox_height = page.mediabox.height
+
+        # get_pixmap renders page.rect through the matrix and rounds it out to whole pixels
+        rendered = (page.rect * fitz.Matrix(zoom, zoom)).irect
+        self.rendered_width = rendered.width
+        self.rendered_height = rendered.height
+
+        self.scale_x = self.mediabox_width / self.rendered_width
+        self.scale_y = self.mediabox_height / self.rendered_height
+
+    def screen_to_pdf_x(self, x):
+        """Convert a rendered-pixel x coordinate to PDF points"""
+        return x * self.scale_x
+
+    def screen_to_pdf_rect(self, x, y, width, height):
+        """Convert a rendered-pixel rectangle (top-left origin) to (x1, y1, x2, y2) PDF points (bottom-left origin)"""
+        x1 = x * self.scale_x
+        y1 = self.mediabox_height - (y * self.scale_y)
+        x2 = (x + width) * self.scale_x
+        y2 = self.mediabox_height - ((y + height) * self.scale_y)
+        return x1, y1, x2, y2
+
+    def pdf_to_screen_rect(self, x1, y1, x2, y2):
+        """Convert (x1, y1, x2, y2) PDF points (bottom-left origin) to a rendered-pixel (x, y, width, height)"""
+        left, right = min(x1, x2), max(x1, x2)
+        top, bottom = max(y1, y2), min(y1, y2)
+        x = left / self.scale_x
+        y = (self.mediabox_height - top) / self.scale_y
+        return x, y, (right - left) / self.scale_x, (top - bottom) / self.scale_y
+
+
+def flip_y(y, height, total_height):
+    """Move a top edge between top-left and bottom-left origin within total_height"""
+    return total_height - y - height
+
+
+_transforms = {}
+_transforms_lock = threading.Lock()
+
+
+def get_page_transform(document, page_index, zoom=DEFAULT_ZOOM):
+    """Return the cached PageTransform of a page
+
+    Args:
+        document: Open fitz.Document, a DocumentContext (which keeps the
+            transforms of its own pages), or a PDF path (opened once, on a
+            cache miss)
+        page_index: 0-based page index
+        zoom: Render zoom the view uses
+    """
+    if hasattr(document, "page_transform"):
+        return document.page_transform(page_index, zoom)
+
+    key = (document_key(document), page_index, zoom)
+    with _transforms_lock:
+        transform = _transforms.get(key)
+    if transform is not None:
+        return transform
+
+    if isinstance(document, str):
+        with fitz.open(document) as pdf:
+            transform = PageTransform(pdf[page_index], zoom)
+    else:
+        transform = PageTransform(document[page_index], zoom)
+
+    with _transforms_lock:
+        if len(_transforms) >= MAX_CACHED_TRANSFORMS:
+            _transforms.clear()
+        _transforms[key] = transform
+    return transform
+
+
+def clear_page_transforms():
+    with _transforms_lock:
+        _transforms.clear()
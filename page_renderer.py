@@ -0,0 +1,96 @@
+"""
+Shared page rendering for the PDF views
+
+Pages are rendered with PyMuPDF and the pixmap's samples are wrapped directly
+in a QImage (no PIL or PNG round trip). Rendered pages are kept in an LRU cache
+keyed by (document, page, zoom) with a memory cap, so flipping back and forth
+between pages of a document does not render them again.
+
+Use render_page(); it goes through a service shared by every view.
+"""
+
+import threading
+from collections import OrderedDict
+
+import fitz  # PyMuPDF
+from PySide6.QtGui import QImage, QPixmap
+
+from page_geometry import document_key
+
+# Zoom used by every view to render pages
+DEFAULT_ZOOM = 2.0
+
+# Memory cap for cached pages (a 2x A4 page is about 6 MB)
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def pixmap_to_qimage(pix):
+    """Wrap a PyMuPDF pixmap's samples in a QImage that owns a copy of the pixels"""
+    image_format = QImage.Format_RGBA8888 if pix.alpha else QImage.Format_RGB888
+    # The QImage only references pix.samples, so copy it before pix goes away
+    return QImage(pix.samples, pix.width, pix.height, pix.stride, image_format).copy()
+
+
+class PageRenderService:
+    """Render PDF pages to QPixmaps and cache them up to max_bytes"""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._pixmaps = OrderedDict()  # key -> (QPixmap, size in bytes)
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def render(self, document, page_index, zoom=DEFAULT_ZOOM):
+        """Return the QPixmap of a page of an open fitz document
+
+        Args:
+            document: Open fitz.Document
+            page_index: 0-based page index
+            zoom: Render scale (2.0 renders at 144 dpi)
+        """
+        key = (document_key(document), page_index, zoom)
+        with self._lock:
+            cached = self._pixmaps.get(key)
+            if cached is not None:
+                self._pixmaps.move_to_end(key)
+                # Implicitly shared copy: painting on it detaches instead of touching the cached page
+                return QPixmap(cached[0])
+
+        pix = document[page_index].get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+        pixmap = QPixmap.fromImage(pixmap_to_qimage(pix))
+        size = pix.stride * pix.height
+
+        with self._lock:
+            if key not in self._pixmaps:
+                self._pixmaps[key] = (pixmap, size)
+                self._size += size
+                # Evict least recently shown pages, always keeping the one just rendered
+                while self._size > self.max_bytes and len(self._pixmaps) > 1:
+                    __, (__, evicted_size) = self._pixmaps.popitem(last=False)
+                    self._size -= evicted_size
+        return QPixmap(pixmap)
+
+    def invalidate(self, document=None):
+        """Drop cached pages of one document, or of every document"""
+        with self._lock:
+            if document is None:
+                self._pixmaps.clear()
+                self._size = 0
+                return
+            doc_key = document_key(document)
+            for key in [key for key in self._pixmaps if key[0] == doc_key]:
+                __, size = self._pixmaps.pop(key)
+                self._size -= size
+
+
+_render_service = PageRenderService()
+
+
+def get_render_service():
+    """Return the render service shared by all views"""
+    return _render_service
+
+
+def render_page(document, page_index, zoom=DEFAULT_ZOOM):
+    """Render a page through the shared, cached render service"""
+    return _render_service.render(document, page_index, zoom)
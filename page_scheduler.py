@@ -0,0 +1,321 @@
+"""
+Page-range scheduling across the files of a batch
+
+Submitting whole files to a pool leaves one worker grinding through a long
+document while the others go idle at the end of the batch. PageRangeScheduler
+instead splits every document into tasks of a few pages and runs the tasks of
+all submitted documents on one shared set of worker threads:
+
+    - submit(source) returns a Future for the whole document, like
+      Executor.submit, so callers keep their per-file bookkeeping
+    - a document is opened and planned on a worker when it reaches the front
+      of the queue, then its page ranges are queued
+    - tasks are taken in submission order (earlier documents first, pages in
+      order), so any idle worker picks up the next range of whatever document
+      is still running, and the pages of a long document spread over every
+      worker
+    - once a document's last range finishes, its parts are merged in page
+      order, which gives the same results as extracting it in one call
+
+Page roles only depend on the page index and the document's page count, so
+the ranges of a document can be extracted independently. With run_range the
+ranges are extracted elsewhere, e.g. in a process pool whose workers hold the
+compiled template; the scheduler's threads then plan documents, hand their
+ranges to the pool, wait for them and merge the parts.
+"""
+
+import logging
+import queue
+import itertools
+import threading
+import concurrent.futures
+from functools import partial
+
+from db_connections import close_thread_connections
+from document_context import DocumentContext
+from metrics import get_metrics
+from pdf_source import source_name
+from tracing import async_begin, async_end, span
+from extraction_engine import (
+    ExtractionCancelled, compile_template, finish_results, merge_results, new_results, process_pages_chunk,
+)
+
+logger = logging.getLogger(__name__)
+
+# Pages per scheduled task; small enough to spread a long document over all workers
+DEFAULT_PAGES_PER_TASK = 8
+
+# Queue priority of the stop markers, after every real task
+_STOP_PRIORITY = (float("inf"), 0)
+
+
+class _DocumentJob:
+    """Scheduling state of one submitted document"""
+
+    def __init__(self, seq, source, finalize):
+        self.seq = seq
+        self.source = source
+        self.finalize = finalize
+        self.future = concurrent.futures.Future()
+        self.document = None
+        self.pdf = None  # the document's path or buffer, shared by its range tasks
+        self.page_count = 0
+        self.cache_key = None
+        self.parts = []
+        self.remaining = 0
+        self.done = False
+        self.lock = threading.Lock()
+
+
+class PageRangeScheduler:
+    """Extract documents as page-range tasks on a shared pool of worker threads
+
+    Args:
+        template: CompiledTemplate (or template data) used for every document
+        max_workers: Number of worker threads
+        pages_per_task: Pages extracted by one task
+        per_page: Parse each page once for all of its regions
+        cache: Optional result_cache.ResultCache checked before a document is split
+        refresh_cache: Ignore cached results but still store the new ones
+        should_stop: Optional callable; when it returns True running tasks
+            raise ExtractionCancelled and their documents fail with it
+        profiler: Optional profiling.FileProfiler; documents it selects are
+            not split but run start to finish on one worker under its profile
+        run_range: Optional callable(source, page_indices, page_count, profile)
+            returning the partial results of a page range extracted elsewhere;
+            source is the document's path when it has one. profile is True for
+            a document the profiler selected, which then arrives as one range.
+        range_pool: Optional executor run_range submits to; it is shut down
+            with the scheduler
+    """
+
+    def __init__(self, template, max_workers, pages_per_task=DEFAULT_PAGES_PER_TASK, per_page=True,
+                 cache=None, refresh_cache=False, should_stop=None, profiler=None, run_range=None, range_pool=None):
+        self.template = compile_template(template)
+        self.max_workers = max(1, max_workers)
+        self.pages_per_task = max(1, pages_per_task)
+        self.per_page = per_page
+        self.cache = cache
+        self.refresh_cache = refresh_cache
+        self.should_stop = should_stop
+        self.profiler = profiler
+        self.run_range = run_range
+        self.range_pool = range_pool
+        self._queue = queue.PriorityQueue()
+        self._order = itertools.count()  # tie-breaker so equal priorities never compare tasks
+        self._seq = itertools.count()
+        self._pending = set()
+        self._pending_lock = threading.Lock()
+        self._threads = [
+            threading.Thread(target=self._work, name=f"page-scheduler-{i}", daemon=True)
+            for i in range(self.max_workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, source, finalize=None):
+        """Queue a document (path, bytes or file-like object)
+
+        Args:
+            finalize: Optional callable(source, results, page_count) run on a
+                worker when the document is done; its return value becomes
+                the Future's result. results is None if extraction failed.
+
+        Returns:
+            Future: Resolves to the results dict (or None on error), or to the
+            value returned by finalize
+        """
+        job = _DocumentJob(next(self._seq), source, finalize)
+        with self._pending_lock:
+            self._pending.add(job.future)
+        self._put((job.seq, -1), partial(self._plan, job))
+        return job.future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        """Stop the workers once every submitted document is done"""
+        with self._pending_lock:
+            pending = list(self._pending)
+        if cancel_futures:
+            for future in pending:
+                future.cancel()
+        if wait:
+            concurrent.futures.wait(pending)
+        for __ in self._threads:
+            self._put(_STOP_PRIORITY, None)
+        if wait:
+            for thread in self._threads:
+                thread.join()
+        if self.range_pool is not None:
+            self.range_pool.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown(wait=True)
+        return False
+
+    def _put(self, priority, task):
+        self._queue.put((priority, next(self._order), task))
+
+    def _work(self):
+        try:
+            while True:
+                __, __, task = self._queue.get()
+                if task is None:
+                    return
+                try:
+                    task()
+                except Exception as e:
+                    # Tasks report their own errors; this only keeps the worker alive
+                    logger.error("Page scheduler task error: %s", e, exc_info=True)
+        finally:
+            # Templates and results may have been read or written on this thread
+            close_thread_connections()
+
+    def _plan(self, job):
+        """Start a document that reached the front of the queue, under a profile if it is sampled"""
+        if not job.future.set_running_or_notify_cancel():
+            self._forget(job)
+            return
+        async_begin(source_name(job.source), "file", job.seq)
+        if self.profiler is not None and self.profiler.selects(job.source):
+            if self.run_range is not None:
+                # One range, profiled where it is extracted
+                self._start(job, inline=True, profile=True)
+                return
+            # One range run on this thread, so the profile covers the whole document and nothing else
+            with self.profiler.profile(job.source):
+                self._start(job, inline=True)
+        else:
+            self._start(job)
+
+    def _start(self, job, inline=False, profile=False):
+        """Open a document, serve it from the cache or queue its page ranges (or run them here if inline)"""
+        try:
+            job.document = DocumentContext(job.source)
+            cached = None
+            with span("open", "file", file=job.document.name):
+                if self.cache is not None:
+                    job.cache_key = self.cache.key_for(job.document.source, self.template, self.per_page)
+                    if not self.refresh_cache:
+                        cached = self.cache.get(job.cache_key)
+                if cached is None:
+                    job.pdf = job.document.source
+                    job.page_count = job.document.page_count
+            if cached is not None:
+                get_metrics().inc("files_total")
+                logger.info(
+                    "Extracted %s: cached, overall=%s",
+                    job.document.name, cached['extraction_status'].get('overall')
+                )
+                self._complete(job, cached)
+                return
+
+            pages = self.template.plan_pages(job.page_count)
+            pages_per_task = max(len(pages), 1) if inline else self.pages_per_task
+            ranges = [pages[start:start + pages_per_task] for start in range(0, len(pages), pages_per_task)]
+            if not ranges:
+                self._complete(job, finish_results(new_results(), job.page_count, job.document.name))
+                return
+
+            job.parts = [None] * len(ranges)
+            job.remaining = len(ranges)
+            if inline:
+                self._run_range(job, 0, ranges[0], profile)
+                return
+            for index, page_indices in enumerate(ranges):
+                self._put((job.seq, index), partial(self._run_range, job, index, page_indices))
+        except Exception as e:
+            self._fail(job, e)
+
+    def _run_range(self, job, index, page_indices, profile=False):
+        """Extract one page range and merge the document when it was the last one"""
+        if job.done:
+            return
+        try:
+            with span("pages", "range", file=job.document.name, first=page_indices[0] + 1, last=page_indices[-1] + 1):
+                part = self._extract_range(job, page_indices, profile)
+        except Exception as e:
+            self._fail(job, e)
+            return
+
+        with job.lock:
+            if job.done:
+                # Another range of the document failed meanwhile
+                return
+            job.parts[index] = part
+            job.remaining -= 1
+            last = job.remaining == 0
+        if not last:
+            return
+
+        try:
+            with span("merge", "file", file=job.document.name):
+                results = new_results()
+                for part in job.parts:
+                    merge_results(results, part)
+                finish_results(results, job.page_count, job.document.name)
+                if job.cache_key is not None:
+                    self.cache.put(job.cache_key, results)
+        except Exception as e:
+            self._fail(job, e)
+            return
+        self._complete(job, results)
+
+    def _extract_range(self, job, page_indices, profile=False):
+        if self.run_range is None:
+            # The ranges of a document share its context, and with it each page's parsed text
+            return process_pages_chunk(
+                job.document, self.template, page_indices, job.page_count, self.per_page, self.should_stop
+            )
+        if self.should_stop is not None and self.should_stop():
+            raise ExtractionCancelled("Extraction cancelled")
+        # Workers open files by path themselves instead of receiving a copy of every range's document
+        return self.run_range(job.document.path or job.pdf, page_indices, job.page_count, profile)
+
+    def _fail(self, job, error):
+        """Stop a document's remaining ranges; it completes with None results, or raises if cancelled"""
+        with job.lock:
+            if job.done:
+                return
+            job.done = True
+        if isinstance(error, ExtractionCancelled):
+            self._release(job)
+            job.future.set_exception(error)
+            async_end(source_name(job.source), "file", job.seq, cancelled=True)
+            self._forget(job)
+            return
+        logger.error(
+            "Error extracting %s: %s",
+            job.document.name if job.document else job.source, str(error), exc_info=True
+        )
+        self._finalize(job, None)
+
+    def _complete(self, job, results):
+        with job.lock:
+            job.done = True
+        self._finalize(job, results)
+
+    def _finalize(self, job, results):
+        page_count = job.page_count or (results or {}).get("pdf_page_count", 0)
+        self._release(job)
+        try:
+            value = job.finalize(job.source, results, page_count) if job.finalize else results
+        except Exception as e:
+            job.future.set_exception(e)
+        else:
+            job.future.set_result(value)
+        async_end(source_name(job.source), "file", job.seq)
+        self._forget(job)
+
+    @staticmethod
+    def _release(job):
+        job.parts = []
+        job.pdf = None
+        if job.document is not None:
+            job.document.close()
+
+    def _forget(self, job):
+        with self._pending_lock:
+            self._pending.discard(job.future)
@@ -0,0 +1,186 @@
+"""
+Cache of parsed page text for the viewers and the extraction engine
+
+pypdf_table_extraction.read_pdf splits the page out of the PDF and runs the
+full pdfminer layout analysis on every call, although only row grouping and
+column assignment depend on row_tol, split_text, strip_text, the table areas
+and the column lines. PageTextCache keeps each page's parsed layout (characters,
+words, text lines) and runs only the stream parser's table building when a
+template author changes a parameter, so re-extraction takes milliseconds.
+A DocumentContext owns a PageTextCache of its own, so every read_pdf call
+of one file's extraction shares each page's parse as well.
+
+PageTextCache.read_pdf is a drop-in replacement for
+pypdf_table_extraction.read_pdf. Calls the cache cannot serve (lattice
+flavor, several pages, rotated pages) are passed through to read_pdf
+unchanged. The cache drives the parser the way pypdf_table_extraction 1.x
+(camelot 1.0) does, through Stream.prepare_page_parse and extract_tables;
+with any other parser API it stays off and says so once.
+"""
+
+import logging
+import os
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+
+import fitz  # PyMuPDF
+import pypdf_table_extraction
+
+from pdf_source import is_pdf_buffer, load_pdf_source, open_pdf, parser_input
+
+try:
+    from pypdf_table_extraction.core import TableList
+    from pypdf_table_extraction.parsers import Stream
+    from pypdf_table_extraction.utils import get_image_char_and_text_objects, get_page_layout, get_rotation
+    _parser_api_error = None if hasattr(Stream, "prepare_page_parse") else "Stream.prepare_page_parse is missing"
+except ImportError as e:
+    Stream = None
+    _parser_api_error = str(e)
+
+logger = logging.getLogger(__name__)
+
+# Number of parsed pages kept per cache
+MAX_CACHED_PAGES = 32
+
+# Keyword arguments used by the stream parser; read_pdf drops any others too
+STREAM_PARAMS = ("table_areas", "columns", "split_text", "strip_text", "row_tol", "column_tol", "edge_tol", "flag_size")
+
+
+_cache_off_reported = False
+
+
+def _warn_cache_off():
+    """Report once per process that the parser API is not supported"""
+    global _cache_off_reported
+    if not _cache_off_reported:
+        _cache_off_reported = True
+        logger.warning(
+            "Page text cache is off, every table is re-parsed with read_pdf (unsupported parser API: %s)",
+            _parser_api_error,
+        )
+
+
+class PageTextCache:
+    """LRU cache of parsed page layouts keyed by (pdf path, mtime, page number), or by content hash for in-memory PDFs
+
+    Args:
+        max_pages: Number of parsed pages kept
+        document: Optional DocumentContext the cache serves exclusively; its
+            pages are keyed by number alone and split out of its open document
+    """
+
+    def __init__(self, max_pages=MAX_CACHED_PAGES, document=None):
+        self.max_pages = max_pages
+        self.document = document
+        self.enabled = _parser_api_error is None
+        if not self.enabled:
+            _warn_cache_off()
+        self._layouts = OrderedDict()
+        self._lock = threading.Lock()
+        self._tempdir = None
+
+    def read_pdf(self, pdf_path, **params):
+        """Extract tables like pypdf_table_extraction.read_pdf, reusing the page's parsed text
+
+        pdf_path may also be the PDF's contents (see pdf_source.load_pdf_source).
+        """
+        pdf_path = load_pdf_source(pdf_path)
+        pages = str(params.get("pages", "1"))
+        if not self.enabled or params.get("flavor", "lattice") != "stream" or not pages.isdigit():
+            return pypdf_table_extraction.read_pdf(parser_input(pdf_path), **params)
+
+        try:
+            page_number = int(pages)
+            page_layout, page_file = self.page_layout(pdf_path, page_number)
+            if page_layout is not None:
+                parser_params = {key: params[key] for key in STREAM_PARAMS if key in params and params[key] is not None}
+                parser = Stream(**parser_params)
+                layout, dimensions, images, horizontal_text, vertical_text = page_layout
+                parser.prepare_page_parse(
+                    page_file, layout, dimensions, page_number, images,
+                    list(horizontal_text), list(vertical_text), layout_kwargs={},
+                )
+        except Exception as e:
+            # Never let the cache break extraction: fall back to the library for this session
+            logger.warning("Page text cache disabled, using read_pdf directly: %s", e)
+            self.enabled = False
+            page_layout = None
+        if page_layout is None:
+            # Rotated pages are turned upright by read_pdf before it parses them
+            return pypdf_table_extraction.read_pdf(parser_input(pdf_path), **params)
+
+        # Table building raises what read_pdf raises for the same parameters (e.g. an area without text)
+        return TableList(sorted(parser.extract_tables()))
+
+    def page_layout(self, pdf_path, page_number):
+        """Return ((layout, dimensions, images, horizontal_text, vertical_text), page_file) for a page
+
+        The layout is None for rotated pages, which the cache does not serve.
+        """
+        if self.document is not None:
+            key = (None, None, page_number)
+        elif is_pdf_buffer(pdf_path):
+            key = (hashlib.sha256(pdf_path).hexdigest(), None, page_number)
+        else:
+            key = (os.path.abspath(pdf_path), os.path.getmtime(pdf_path), page_number)
+        with self._lock:
+            cached = self._layouts.get(key)
+            if cached is not None:
+                self._layouts.move_to_end(key)
+                return cached
+
+        # Named per thread, so two threads parsing the same page never share a file
+        page_file = self._save_page(
+            pdf_path, page_number, f"{abs(hash(key))}_{threading.get_ident()}_page-{page_number}.pdf"
+        )
+        layout, dimensions = get_page_layout(page_file)
+        images, chars, horizontal_text, vertical_text = get_image_char_and_text_objects(layout)
+        if get_rotation(chars, horizontal_text, vertical_text):
+            page_layout = None
+        else:
+            page_layout = (layout, dimensions, images, horizontal_text, vertical_text)
+
+        with self._lock:
+            if key in self._layouts:
+                # Another thread parsed the page meanwhile
+                os.remove(page_file)
+                return self._layouts[key]
+            self._layouts[key] = (page_layout, page_file)
+            while len(self._layouts) > self.max_pages:
+                __, (__, stale_file) = self._layouts.popitem(last=False)
+                if os.path.exists(stale_file):
+                    os.remove(stale_file)
+        return page_layout, page_file
+
+    def _save_page(self, pdf_path, page_number, filename):
+        """Write one page to its own PDF, as read_pdf does before parsing it"""
+        with self._lock:
+            if self._tempdir is None:
+                self._tempdir = tempfile.TemporaryDirectory(prefix="pdf_harvest_pages_")
+
+        page_file = os.path.join(self._tempdir.name, filename)
+        if self.document is not None:
+            self.document.save_page(page_number, page_file)
+            return page_file
+        with open_pdf(pdf_path) as source, fitz.open() as page_pdf:
+            page_pdf.insert_pdf(source, from_page=page_number - 1, to_page=page_number - 1)
+            page_pdf.save(page_file)
+        return page_file
+
+    def invalidate(self, pdf_path=None):
+        """Drop the cached pages of one PDF file, or of every PDF"""
+        with self._lock:
+            for key in list(self._layouts):
+                if pdf_path is None or key[0] == os.path.abspath(pdf_path):
+                    __, page_file = self._layouts.pop(key)
+                    if os.path.exists(page_file):
+                        os.remove(page_file)
+
+    def close(self):
+        """Drop every cached page and remove the temporary page files"""
+        self.invalidate()
+        if self._tempdir is not None:
+            self._tempdir.cleanup()
+            self._tempdir = None
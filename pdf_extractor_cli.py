@@ -6,29 +6,45 @@ This script provides a command-line interface to extract data from PDF files
 using templates defined in the PDF Extractor application.
 
 Usage:
-    python pdf_extractor_cli.py --folder <pdf_folder> --template <template_name> --username <username> --password <password> [--output <output_dir>] [--threads 4 <num_threads>] [--chunk 50 <chunk_size>]
+    python pdf_extractor_cli.py --folder <pdf_folder> --template <template_name> --username <username> --password <password> [--output <output_dir>] [--workers <num_workers>] [--executor thread|process] [--chunk <pages_per_task>] [--per-region] [--no-cache] [--refresh] [--cache-path <db>] [--cache-size <MB>] [--watch] [--poll-interval 2] [--debounce 2] [--log-level INFO] [--quiet] [--log-json <log.jsonl>] [--metrics-file <metrics.prom>] [--profile [0.1]] [--profile-dir <dir>] [--trace <trace.json>]
+    python pdf_extractor_cli.py --resume <job_id> --username <username> --password <password> [--workers 4] [--executor thread|process]
 """
 
+import logging
 import os
 import sys
 import json
+import time
+import socket
 import sqlite3
 import argparse
-import multiprocessing
 from pathlib import Path
 from datetime import datetime
+import functools
 import concurrent.futures
 import pandas as pd
-import fitz  # PyMuPDF
 
-# Import necessary functions from bulk_processor
-from bulk_processor import load_template_from_database, extract_invoice_tables, process_pages_chunk, optimized_apply_regex
+# Import the headless extraction engine (does not pull in PySide6)
+from extraction_engine import DEFAULT_DB_PATH, load_template_from_database, process_pages_chunk, compile_template
+from result_cache import ResultCache, DEFAULT_CACHE_PATH, DEFAULT_CACHE_MAX_BYTES, file_sha256
+from folder_watcher import FolderWatcher, ProcessedManifest, MANIFEST_FILENAME
+from database import JobQueue
+from document_context import DocumentContext
+from db_connections import get_connection
+from page_scheduler import PageRangeScheduler, DEFAULT_PAGES_PER_TASK
+from execution_policy import plan_execution
+from logging_setup import LOG_LEVELS, configure_logging
+from metrics import DEFAULT_WRITE_INTERVAL, get_metrics, stage_summary, start_metrics_file
+from profiling import FileProfiler, merge_profiles
+from tracing import get_tracer, span, start_tracing, stop_tracing, write_trace
+
+logger = logging.getLogger(__name__)
 
 # Import user management for authentication
 try:
     from user_management import UserManagement
 except ImportError:
-    print("Warning: Could not import UserManagement. Authentication might not work correctly.")
+    logger.warning("Could not import UserManagement. Authentication might not work correctly.")
     
     # Simple fallback implementation
     class UserManagement:
@@ -37,7 +53,7 @@ except ImportError:
             
         def authenticate_user(self, username, password):
             # Simple authentication fallback
-            print(f"Authenticating user: {username}...")
+            logger.info("Authenticating user: %s...", username)
             try:
                 conn = sqlite3.connect(self.db_path)
                 cursor = conn.cursor()
@@ -45,31 +61,28 @@ except ImportError:
                 user = cursor.fetchone()
                 conn.close()
                 if user:
-                    print(f"Authentication successful for user: {username}")
+                    logger.info("Authentication successful for user: %s", username)
                     return {"id": user[0], "username": user[1], "role_id": user[2]}
-                print(f"Authentication failed: User {username} not found")
+                logger.error("Authentication failed: User %s not found", username)
                 return None
             except Exception as e:
-                print(f"Authentication error: {str(e)}")
+                logger.error("Authentication error: %s", e)
                 return None
 
-def get_template_id_by_name(template_name):
+def get_template_id_by_name(template_name, db_path=DEFAULT_DB_PATH):
     """Get template ID by name"""
     try:
-        conn = sqlite3.connect("invoice_templates.db")
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT id FROM templates WHERE name = ?", (template_name,))
-        result = cursor.fetchone()
-        
-        conn.close()
-        
+        # The thread's persistent connection to the templates database
+        result = get_connection(db_path).execute(
+            "SELECT id FROM templates WHERE name = ?", (template_name,)
+        ).fetchone()
+
         if result:
             return result[0]
         else:
             return None
     except Exception as e:
-        print(f"Database error: {str(e)}")
+        logger.error("Database error: %s", e)
         return None
 
 def authenticate_user(username, password):
@@ -79,72 +92,110 @@ def authenticate_user(username, password):
         user = user_mgmt.authenticate_user(username, password)
         return user is not None
     except Exception as e:
-        print(f"Authentication error: {str(e)}")
+        logger.error("Authentication error: %s", e)
         return False
 
-def process_pdf_file(args):
-    """Process a single PDF file"""
-    pdf_path, template_data, output_dir, chunk_size = args
-    
-    try:
-        print(f"Processing: {os.path.basename(pdf_path)}")
-        results = extract_invoice_tables(pdf_path, template_data["id"], template_data, chunk_size)
+def build_file_result(pdf_path, results, output_dir):
+    """Export a file's extraction results and summarize them for the batch report"""
+    if results:
+        # Check if there are no_tables_found warnings
+        no_tables_warnings = results.get("no_tables_found", [])
         
-        if results:
-            # Check if there are no_tables_found warnings
-            no_tables_warnings = results.get("no_tables_found", [])
-            
-            # Export data if output directory specified
-            if output_dir:
+        # Export data if output directory specified
+        if output_dir:
+            with get_metrics().time("export_write_seconds"), span("export", "export", file=os.path.basename(pdf_path)):
                 export_results(pdf_path, results, output_dir)
-            
-            # Determine extraction status
-            extraction_status = results.get("extraction_status", {})
-            overall_status = extraction_status.get("overall", "failed")
-            
-            if overall_status == "success":
-                status = "success"
-            elif overall_status == "partial":
-                status = "partial"
-            else:
-                status = "failed"
-            
-            # Include information about no_tables_found
-            result = {
-                "path": pdf_path,
-                "filename": os.path.basename(pdf_path),
-                "status": status,
-                "tables": {
-                    "header": len(results.get("header_tables", [])),
-                    "items": len(results.get("items_tables", [])),
-                    "summary": len(results.get("summary_tables", [])),
-                }
-            }
-            
-            # Add warnings if any were found
-            if no_tables_warnings:
-                print(f"⚠️ Warning: {len(no_tables_warnings)} table areas had no tables detected in {os.path.basename(pdf_path)}")
-                result["warnings"] = {
-                    "no_tables_found": no_tables_warnings
-                }
-            
-            return result
+        
+        # Determine extraction status
+        extraction_status = results.get("extraction_status", {})
+        overall_status = extraction_status.get("overall", "failed")
+        
+        if overall_status == "success":
+            status = "success"
+        elif overall_status == "partial":
+            status = "partial"
         else:
-            return {
-                "path": pdf_path,
-                "filename": os.path.basename(pdf_path),
-                "status": "failed",
-                "error": "No results returned"
+            status = "failed"
+        
+        # Include information about no_tables_found
+        result = {
+            "path": pdf_path,
+            "filename": os.path.basename(pdf_path),
+            "status": status,
+            "cached": bool(results.get("cached")),
+            "tables": {
+                "header": len(results.get("header_tables", [])),
+                "items": len(results.get("items_tables", [])),
+                "summary": len(results.get("summary_tables", [])),
             }
-    except Exception as e:
-        print(f"Error processing {os.path.basename(pdf_path)}: {str(e)}")
+        }
+        
+        # Add warnings if any were found
+        if no_tables_warnings:
+            logger.warning(
+                "%s table areas had no tables detected in %s",
+                len(no_tables_warnings), os.path.basename(pdf_path)
+            )
+            result["warnings"] = {
+                "no_tables_found": no_tables_warnings
+            }
+        
+        return result
+    else:
         return {
             "path": pdf_path,
             "filename": os.path.basename(pdf_path),
             "status": "failed",
-            "error": str(e)
+            "error": "No results returned"
         }
 
+# Per-process state filled in once by _init_process_worker
+_worker_state = {}
+
+def _init_process_worker(template_id, per_page, policy=None, profile_settings=None, trace=False,
+                         db_path=DEFAULT_DB_PATH):
+    """Initialize a process-pool worker: load and compile the template once for all its page ranges"""
+    # Log levels and thread caps are per process, so each worker installs them itself
+    configure_logging()
+    if policy is not None:
+        policy.apply()
+    if trace:
+        start_tracing()
+    template_data = load_template_from_database(template_id, db_path)
+    _worker_state["template"] = compile_template(template_data) if template_data else None
+    _worker_state["per_page"] = per_page
+    _worker_state["profiler"] = FileProfiler(*profile_settings) if profile_settings else None
+
+def _extract_pages_in_worker(pdf_path, page_indices, page_count, profile=False):
+    """Extract a page range of a PDF inside a process-pool worker
+
+    Returns:
+        tuple: (partial results, telemetry) where telemetry holds the
+        worker's metrics and trace events since its previous range under
+        "metrics" and "trace" for the parent to merge
+    """
+    template = _worker_state.get("template")
+    if template is None:
+        raise RuntimeError("Worker could not load template")
+    with span("pages", "range", file=os.path.basename(str(pdf_path)), first=page_indices[0] + 1, last=page_indices[-1] + 1), \
+            DocumentContext(pdf_path) as document:
+        if profile and _worker_state["profiler"] is not None:
+            with _worker_state["profiler"].profile(pdf_path):
+                part = process_pages_chunk(document, template, page_indices, page_count, _worker_state["per_page"])
+        else:
+            part = process_pages_chunk(document, template, page_indices, page_count, _worker_state["per_page"])
+    telemetry = {"metrics": get_metrics().snapshot(reset=True)}
+    tracer = get_tracer()
+    if tracer is not None:
+        telemetry["trace"] = tracer.drain()
+    return part, telemetry
+
+def _run_range_in_pool(pool, pdf_path, page_indices, page_count, profile=False):
+    """Extract a page range on a process pool and merge the worker's telemetry here"""
+    part, telemetry = pool.submit(_extract_pages_in_worker, pdf_path, page_indices, page_count, profile).result()
+    merge_worker_telemetry(telemetry)
+    return part
+
 def export_results(pdf_path, results, output_dir):
     """Export extraction results to files"""
     try:
@@ -188,15 +239,95 @@ def export_results(pdf_path, results, output_dir):
         with open(json_path, 'w', encoding='utf-8') as f:
             json.dump(json_data, f, indent=2, ensure_ascii=False)
             
-        print(f"  Exported to {excel_path} and {json_path}")
+        logger.info("Exported to %s and %s", excel_path, json_path)
         return True
     except Exception as e:
-        print(f"  Error exporting results: {str(e)}")
+        logger.error("Error exporting results: %s", e)
         return False
 
+def load_batch_template(template_name, username, password, db_path=DEFAULT_DB_PATH):
+    """Authenticate, then load and compile a template by name from db_path
+
+    Returns:
+        tuple: (template_id, CompiledTemplate), or (None, None) on failure
+    """
+    # Authenticate user
+    if not authenticate_user(username, password):
+        logger.error("Authentication failed: Invalid username or password")
+        return None, None
+
+    # Get template ID from name
+    template_id = get_template_id_by_name(template_name, db_path)
+    if not template_id:
+        logger.error("Template not found: '%s'", template_name)
+        return None, None
+
+    # Load template data
+    template_data = load_template_from_database(template_id, db_path)
+    if not template_data:
+        logger.error("Failed to load template data for template: %s", template_name)
+        return None, None
+    
+    # Resolve regions, columns, parameters and regex patterns once for the whole batch
+    template = compile_template(template_data)
+    
+    # Print template info
+    logger.info("Using template: %s (ID: %s)", template_name, template_id)
+    logger.info("Template type: %s", template_data.get('template_type', 'single'))
+    return template_id, template
+
+def merge_worker_telemetry(result):
+    """Move the metrics and trace events a process worker sent with a range's results into this process"""
+    get_metrics().merge(result.pop("metrics", None))
+    events = result.pop("trace", None)
+    tracer = get_tracer()
+    if events and tracer is not None:
+        tracer.add_events(events)
+
+def create_executor(policy, template, output_dir, chunk_size, per_page, cache=None, refresh_cache=False,
+                    profiler=None, db_path=DEFAULT_DB_PATH):
+    """Create the worker pool and a submit(pdf_path) function returning a future for the file's result
+
+    Both executors split documents into page ranges (chunk_size pages each)
+    with a PageRangeScheduler, so a long document spreads over every worker.
+    Thread workers extract the ranges themselves. With process workers the
+    scheduler's threads plan documents, check the result cache, merge the
+    parts and export them, while the ranges run on a process pool whose
+    workers load the template once (from db_path) in their initializer. Files
+    selected by the optional FileProfiler are profiled inside the worker that
+    extracts them.
+    """
+    run_range = pool = None
+    workers = policy.workers
+    if policy.executor_type == "process":
+        profile_settings = (
+            (profiler.output_dir, profiler.sample_rate, profiler.sample_interval) if profiler else None
+        )
+        pool = concurrent.futures.ProcessPoolExecutor(
+            max_workers=policy.workers,
+            initializer=_init_process_worker,
+            initargs=(template.id, per_page, policy, profile_settings, get_tracer() is not None, db_path),
+        )
+        run_range = functools.partial(_run_range_in_pool, pool)
+        # Twice as many threads as processes, so a range is waiting whenever a worker process finishes one
+        workers = policy.workers * 2
+    executor = PageRangeScheduler(
+        template, workers, chunk_size or DEFAULT_PAGES_PER_TASK, per_page,
+        cache=cache, refresh_cache=refresh_cache, profiler=profiler, run_range=run_range, range_pool=pool,
+    )
+    finalize = lambda pdf_path, results, page_count: build_file_result(pdf_path, results, output_dir)
+    submit = lambda pdf_path: executor.submit(pdf_path, finalize)
+    return executor, submit
+
 def process_pdf_folder(folder_path, template_name, username, password, output_dir=None, 
-                      num_threads=None, chunk_size=None):
+                      num_threads=None, chunk_size=None, per_page=True, executor_type="thread",
+                      use_cache=True, refresh_cache=False, cache_path=DEFAULT_CACHE_PATH,
+                      cache_max_bytes=DEFAULT_CACHE_MAX_BYTES, resume_job_id=None, profiler=None):
     """Process all PDFs in a folder using the specified template
+
+    The batch is stored as a job in the templates database and every finished
+    file is checkpointed there, so an interrupted run can be continued with
+    resume_job_id without extracting any finished file again.
     
     Args:
         folder_path: Path to folder containing PDF files
@@ -204,91 +335,155 @@ def process_pdf_folder(folder_path, template_name, username, password, output_di
         username: Username for authentication
         password: Password for authentication
         output_dir: Optional output directory for extracted data
-        num_threads: Number of parallel threads to use (default: CPU count)
-        chunk_size: Chunk size for large documents (default: 50)
+        num_threads: Number of parallel workers to use (default and maximum: CPU count)
+        chunk_size: Pages per scheduled page-range task (default: 8)
+        per_page: Parse each page once for all of its regions (default: True)
+        executor_type: 'thread' for a thread pool or 'process' for a process pool
+            whose workers load the template once and then take page ranges
+        use_cache: Reuse results of files already extracted with the same
+            template and engine version
+        refresh_cache: Re-extract every file and overwrite its cached results
+        cache_path: Path of the result cache database
+        cache_max_bytes: Size limit of the result cache
+        resume_job_id: ID of an interrupted job to continue; its folder,
+            template and output options are used instead of the arguments
+        profiler: Optional profiling.FileProfiler for a sample of the files
     """
     start_time = datetime.now()
+    jobs = JobQueue()
     
-    # Authenticate user
-    if not authenticate_user(username, password):
-        print("Authentication failed: Invalid username or password")
+    if resume_job_id is not None:
+        # Continue an interrupted job with the folder, template and output options it was started with
+        job = jobs.get_job(resume_job_id)
+        if not job:
+            logger.error("Job not found: %s", resume_job_id)
+            return False
+        folder_path = job["source"]
+        template_name = job["options"].get("template", template_name)
+        output_dir = job["options"].get("output_dir")
+        chunk_size = job["options"].get("chunk_size")
+        per_page = job["options"].get("per_page", True)
+        counts = jobs.job_counts(resume_job_id)
+        logger.info(
+            "Resuming job %s on %s: %s files finished, %s remaining",
+            resume_job_id, folder_path, counts['done'] + counts['failed'], counts['pending'] + counts['running']
+        )
+    
+    template_id, template = load_batch_template(template_name, username, password)
+    if not template:
         return False
+    
+    if resume_job_id is not None:
+        if template_id != job["template_id"]:
+            logger.error("Template '%s' is no longer the template job %s was started with", template_name, resume_job_id)
+            return False
+        job_id = resume_job_id
+    else:
+        # Verify folder exists
+        if not os.path.isdir(folder_path):
+            logger.error("Folder not found: '%s'", folder_path)
+            return False
 
-    # Get template ID from name
-    template_id = get_template_id_by_name(template_name)
-    if not template_id:
-        print(f"Template not found: '{template_name}'")
-        return False
+        # Get all PDF files in the folder
+        pdf_files = [os.path.join(folder_path, f) for f in os.listdir(folder_path) 
+                    if f.lower().endswith('.pdf')]
+        
+        if not pdf_files:
+            logger.warning("No PDF files found in %s", folder_path)
+            return False
 
-    # Load template data
-    template_data = load_template_from_database(template_id)
-    if not template_data:
-        print(f"Failed to load template data for template: {template_name}")
-        return False
-    
-    # Print template info
-    print(f"Using template: {template_name} (ID: {template_id})")
-    print(f"Template type: {template_data.get('template_type', 'single')}")
-    
-    # Verify folder exists
-    if not os.path.isdir(folder_path):
-        print(f"Folder not found: '{folder_path}'")
-        return False
+        logger.info("Found %s PDF files in %s", len(pdf_files), folder_path)
+        
+        # Record the batch as a job so an interrupted run can be resumed
+        job_id = jobs.create_job(template_id, sorted(pdf_files), source=folder_path, options={
+            "template": template_name,
+            "output_dir": output_dir,
+            "chunk_size": chunk_size,
+            "per_page": per_page,
+        })
 
     # Create output directory if specified
     if output_dir and not os.path.exists(output_dir):
         os.makedirs(output_dir)
-        print(f"Created output directory: {output_dir}")
+        logger.info("Created output directory: %s", output_dir)
 
-    # Get all PDF files in the folder
-    pdf_files = [os.path.join(folder_path, f) for f in os.listdir(folder_path) 
-                if f.lower().endswith('.pdf')]
+    counts = jobs.job_counts(job_id)
+    remaining = counts["pending"] + counts["running"]
     
-    if not pdf_files:
-        print(f"No PDF files found in {folder_path}")
-        return False
-
-    print(f"Found {len(pdf_files)} PDF files in {folder_path}")
+    # Pool size, read_pdf parallelism and native thread caps are decided together. Both executors
+    # share page ranges between their workers, so even a single long file can use every worker.
+    policy = plan_execution(num_threads, executor_type).apply()
+    num_threads = policy.workers
+    logger.info("Using %s", policy.describe())
     
-    # Determine number of threads to use
-    if not num_threads:
-        num_threads = min(len(pdf_files), multiprocessing.cpu_count())
-    else:
-        num_threads = min(num_threads, len(pdf_files), multiprocessing.cpu_count())
+    # Result cache shared by all workers
+    cache = ResultCache(cache_path, cache_max_bytes) if use_cache else None
+    if cache:
+        logger.info("Using result cache: %s%s", cache_path, " (refreshing)" if refresh_cache else "")
     
-    print(f"Using {num_threads} threads for processing")
+    # Process files in parallel, claiming them from the job a few at a time
+    executor, submit = create_executor(
+        policy, template, output_dir, chunk_size, per_page, cache, refresh_cache, profiler
+    )
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    renew_interval = jobs.lease_seconds / 4
+    in_flight = {}  # future -> (item_id, pdf_path)
+    completed = 0
+    waiting_reported = False
     
-    # Default chunk size for large documents
-    if not chunk_size:
-        chunk_size = 50
+    try:
+        with executor:
+            while True:
+                # Keep every worker busy, with one file queued behind it
+                free_slots = num_threads * 2 - len(in_flight)
+                if free_slots > 0:
+                    for item_id, pdf_path in jobs.claim_items(job_id, worker_id, free_slots):
+                        in_flight[submit(pdf_path)] = (item_id, pdf_path)
+                
+                if not in_flight:
+                    if not jobs.job_counts(job_id)["running"]:
+                        break
+                    # Files leased by a run that stopped are claimed again when their lease expires
+                    if not waiting_reported:
+                        logger.info("Waiting up to %ss for files leased by an earlier run", jobs.lease_seconds)
+                        waiting_reported = True
+                    time.sleep(1)
+                    continue
+                
+                done, __ = concurrent.futures.wait(
+                    in_flight, timeout=renew_interval, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    item_id, pdf_path = in_flight.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        # The worker itself failed: put the file back for another attempt
+                        logger.error("Error processing %s: %s", os.path.basename(pdf_path), e)
+                        jobs.fail_item(item_id, worker_id, str(e))
+                        continue
+                    jobs.complete_item(item_id, worker_id, result)
+                    
+                    # Update progress
+                    completed += 1
+                    logger.info(
+                        "Completed %s/%s: %s - %s",
+                        completed, remaining, os.path.basename(pdf_path), result['status']
+                    )
+                
+                jobs.renew_leases([item_id for item_id, __ in in_flight.values()], worker_id)
+    except KeyboardInterrupt:
+        for future in in_flight:
+            future.cancel()
+        jobs.release_items(job_id, worker_id)
+        logger.info("Job %s interrupted after %s files. Resume it with: --resume %s", job_id, completed, job_id)
+        return False
     
-    # Process files in parallel
-    args_list = [(pdf_path, template_data, output_dir, chunk_size) for pdf_path in pdf_files]
-    results = []
+    jobs.finish_job(job_id)
     
-    with concurrent.futures.ThreadPoolExecutor(max_workers=num_threads) as executor:
-        future_to_pdf = {executor.submit(process_pdf_file, args): args[0] for args in args_list}
-        
-        # Process results as they complete
-        completed = 0
-        for future in concurrent.futures.as_completed(future_to_pdf):
-            pdf_path = future_to_pdf[future]
-            try:
-                result = future.result()
-                results.append(result)
-                
-                # Update progress
-                completed += 1
-                print(f"Completed {completed}/{len(pdf_files)}: {os.path.basename(pdf_path)} - {result['status']}")
-            except Exception as e:
-                print(f"Error processing {os.path.basename(pdf_path)}: {str(e)}")
-                results.append({
-                    "path": pdf_path,
-                    "filename": os.path.basename(pdf_path),
-                    "status": "failed",
-                    "error": str(e)
-                })
-                completed += 1
+    # Results of every finished file, including those from earlier runs of the job
+    results = jobs.job_results(job_id)
+    pdf_files = [r["path"] for r in results]
     
     # Generate summary
     successful = [r for r in results if r["status"] == "success"]
@@ -297,6 +492,7 @@ def process_pdf_folder(folder_path, template_name, username, password, output_di
     
     # Count files with warnings
     files_with_warnings = [r for r in results if "warnings" in r and "no_tables_found" in r["warnings"]]
+    cache_hits = [r for r in results if r.get("cached")]
     
     # Save summary report
     if output_dir:
@@ -308,64 +504,286 @@ def process_pdf_folder(folder_path, template_name, username, password, output_di
                 "timestamp": datetime.now().isoformat(),
                 "template": template_name,
                 "template_id": template_id,
+                "job_id": job_id,
                 "folder": folder_path,
                 "files_processed": len(pdf_files),
                 "successful": len(successful),
                 "partial": len(partial),
                 "failed": len(failed),
                 "with_warnings": len(files_with_warnings),
+                "cache_hits": len(cache_hits),
                 "duration_seconds": (datetime.now() - start_time).total_seconds()
             },
+            # Counters and stage latencies of this run (files finished by earlier runs of the job are not included)
+            "metrics": get_metrics().snapshot(),
             "results": results
         }
         
         with open(summary_path, 'w', encoding='utf-8') as f:
             json.dump(summary_data, f, indent=2)
         
-        print(f"Summary report saved to: {summary_path}")
+        logger.info("Summary report saved to: %s", summary_path)
     
     # Print final summary
-    print("\n" + "="*50)
-    print("EXTRACTION SUMMARY")
-    print("="*50)
-    print(f"Total files processed: {len(pdf_files)}")
-    print(f"Successful extractions: {len(successful)}")
+    logger.info("=" * 50)
+    logger.info("EXTRACTION SUMMARY")
+    logger.info("=" * 50)
+    logger.info("Total files processed: %s", len(pdf_files))
+    logger.info("Successful extractions: %s", len(successful))
     if partial:
-        print(f"Partial extractions: {len(partial)}")
-    print(f"Failed extractions: {len(failed)}")
+        logger.info("Partial extractions: %s", len(partial))
+    logger.info("Failed extractions: %s", len(failed))
+    if cache:
+        logger.info("Served from cache: %s", len(cache_hits))
     if files_with_warnings:
-        print(f"Files with 'No tables found' warnings: {len(files_with_warnings)}")
+        logger.info("Files with 'No tables found' warnings: %s", len(files_with_warnings))
         for file_with_warning in files_with_warnings:
-            print(f"  - {file_with_warning['filename']}: {len(file_with_warning['warnings']['no_tables_found'])} warnings")
-    print(f"Duration: {datetime.now() - start_time}")
-    print("="*50)
+            logger.info(
+                "  - %s: %s warnings",
+                file_with_warning['filename'], len(file_with_warning['warnings']['no_tables_found'])
+            )
+    logger.info("Duration: %s", datetime.now() - start_time)
+    for line in stage_summary(get_metrics().snapshot()):
+        logger.info("  %s", line)
+    logger.info("=" * 50)
     
     return len(successful) > 0
 
+def watch_pdf_folder(folder_path, template_name, username, password, output_dir=None,
+                     num_threads=None, chunk_size=None, per_page=True, executor_type="thread",
+                     use_cache=True, refresh_cache=False, cache_path=DEFAULT_CACHE_PATH,
+                     cache_max_bytes=DEFAULT_CACHE_MAX_BYTES, poll_interval=2.0, debounce=2.0, profiler=None):
+    """Keep processing new or changed PDFs in a folder until interrupted
+
+    The template is loaded and the worker pool started once. A manifest of
+    processed files (path, size, mtime, hash, status) is kept next to the
+    output, so a restart only picks up files that are new or changed. Each
+    finished file is exported and appended to extraction_results.jsonl as soon
+    as it completes.
+    
+    Args:
+        poll_interval: Seconds between folder scans
+        debounce: Seconds a file must stay unchanged before it is processed
+        Other arguments are the same as for process_pdf_folder
+    """
+    template_id, template = load_batch_template(template_name, username, password)
+    if not template:
+        return False
+
+    if not os.path.isdir(folder_path):
+        logger.error("Folder not found: '%s'", folder_path)
+        return False
+
+    if output_dir and not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+        logger.info("Created output directory: %s", output_dir)
+
+    manifest = ProcessedManifest(os.path.join(output_dir or folder_path, MANIFEST_FILENAME))
+    results_log = os.path.join(output_dir, "extraction_results.jsonl") if output_dir else None
+
+    policy = plan_execution(num_threads, executor_type).apply()
+    cache = ResultCache(cache_path, cache_max_bytes) if use_cache else None
+    executor, submit = create_executor(
+        policy, template, output_dir, chunk_size, per_page, cache, refresh_cache, profiler
+    )
+    logger.info("Using %s", policy.describe())
+
+    watcher = FolderWatcher(folder_path, manifest, poll_interval, debounce)
+    watcher.start()
+    in_flight = {}  # future -> (pdf_path, size, mtime, sha256)
+    counts = {"success": 0, "partial": 0, "failed": 0}
+    logger.info("Press Ctrl+C to stop")
+
+    try:
+        with executor:
+            while True:
+                # Queue files that are new or changed and have stopped changing
+                busy = {entry[0] for entry in in_flight.values()}
+                for pdf_path, size, mtime in watcher.scan(exclude=busy):
+                    try:
+                        sha256 = file_sha256(pdf_path)
+                    except OSError as e:
+                        logger.warning("Could not read %s: %s", os.path.basename(pdf_path), e)
+                        continue
+                    if manifest.has_content(pdf_path, sha256):
+                        # Touched but not changed: keep the earlier result
+                        manifest.record(pdf_path, size, mtime, sha256, manifest.entries[pdf_path]["status"])
+                        continue
+                    logger.info("Queued: %s", os.path.basename(pdf_path))
+                    in_flight[submit(pdf_path)] = (pdf_path, size, mtime, sha256)
+
+                # Record files that finished since the last scan
+                for future in [f for f in in_flight if f.done()]:
+                    pdf_path, size, mtime, sha256 = in_flight.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logger.error("Error processing %s: %s", os.path.basename(pdf_path), e)
+                        result = {
+                            "path": pdf_path,
+                            "filename": os.path.basename(pdf_path),
+                            "status": "failed",
+                            "error": str(e)
+                        }
+                    result["processed_at"] = datetime.now().isoformat()
+
+                    manifest.record(pdf_path, size, mtime, sha256, result["status"])
+                    counts[result["status"]] = counts.get(result["status"], 0) + 1
+                    if results_log:
+                        with open(results_log, "a", encoding="utf-8") as f:
+                            f.write(json.dumps(result) + "\n")
+                    logger.info("Completed: %s - %s", os.path.basename(pdf_path), result['status'])
+
+                watcher.wait(0.2 if in_flight else None)
+    except KeyboardInterrupt:
+        # Files still running are not in the manifest and will be picked up on the next start
+        logger.info("Stopping watch mode...")
+    finally:
+        watcher.stop()
+
+    logger.info(
+        "Processed while watching: %s successful, %s partial, %s failed",
+        counts['success'], counts['partial'], counts['failed']
+    )
+    return True
+
 def main():
     parser = argparse.ArgumentParser(description='Bulk PDF data extraction using templates')
-    parser.add_argument('--folder', required=True, help='Folder containing PDF files to process')
-    parser.add_argument('--template', required=True, help='Template name to use for extraction')
+    parser.add_argument('--folder', help='Folder containing PDF files to process')
+    parser.add_argument('--template', help='Template name to use for extraction')
     parser.add_argument('--username', required=True, help='Username for authentication')
     parser.add_argument('--password', required=True, help='Password for authentication')
     parser.add_argument('--output', help='Output directory for extracted data (optional)')
-    parser.add_argument('--threads', type=int, help='Number of threads to use for parallel processing (default: CPU count)')
-    parser.add_argument('--chunk', type=int, help='Chunk size for large documents (default: 50)')
+    parser.add_argument('--workers', '--threads', dest='workers', type=int,
+                        help='Number of parallel workers to use (default: CPU count)')
+    parser.add_argument('--executor', choices=['thread', 'process'], default='thread',
+                        help='Run workers as threads or as separate processes (default: thread)')
+    parser.add_argument('--chunk', type=int,
+                        help='Pages per page-range task (default: 8)')
+    parser.add_argument('--per-region', action='store_true',
+                        help='Call read_pdf once per region instead of parsing each page once')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Do not read or write the extraction result cache')
+    parser.add_argument('--refresh', action='store_true',
+                        help='Re-extract every file and overwrite its cached results')
+    parser.add_argument('--cache-path', default=DEFAULT_CACHE_PATH,
+                        help=f'Result cache database (default: {DEFAULT_CACHE_PATH})')
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_MAX_BYTES // (1024 * 1024),
+                        help='Maximum result cache size in MB before old entries are evicted (default: 1024)')
+    
+    parser.add_argument('--watch', action='store_true',
+                        help='Keep running and process new or changed PDFs as they arrive')
+    parser.add_argument('--poll-interval', type=float, default=2.0,
+                        help='Seconds between folder scans in watch mode (default: 2)')
+    parser.add_argument('--debounce', type=float, default=2.0,
+                        help='Seconds a file must stay unchanged before it is processed in watch mode (default: 2)')
+    parser.add_argument('--resume', type=int, metavar='JOB_ID',
+                        help='Continue an interrupted job where it stopped (uses the job\'s folder, template and output)')
+    
+    parser.add_argument('--log-level', type=str.upper, choices=LOG_LEVELS,
+                        help='Messages to show (default: INFO, or PDF_HARVEST_LOG_LEVEL)')
+    parser.add_argument('--quiet', '-q', action='store_true',
+                        help='Only show warnings and errors')
+    parser.add_argument('--log-json', metavar='PATH',
+                        help='Also write every log record to PATH as JSON lines')
+    parser.add_argument('--metrics-file', metavar='PATH',
+                        help='Rewrite PATH with Prometheus text-format metrics while running')
+    parser.add_argument('--metrics-interval', type=float, default=DEFAULT_WRITE_INTERVAL,
+                        help=f'Seconds between metrics file updates (default: {DEFAULT_WRITE_INTERVAL:g})')
+    parser.add_argument('--profile', type=float, nargs='?', const=1.0, metavar='SAMPLE_RATE',
+                        help='Profile a sample of the files (fraction 0-1, default: every file) inside the workers')
+    parser.add_argument('--profile-dir', metavar='DIR',
+                        help='Directory for profiles (default: profiles/ in the output directory or current directory)')
+    parser.add_argument('--trace', metavar='PATH',
+                        help='Write a Chrome Trace Event timeline of the workers to PATH (open in chrome://tracing or Perfetto)')
     
     args = parser.parse_args()
+    configure_logging(args.log_level, quiet=args.quiet, json_path=args.log_json)
+    
+    if args.resume is None and not (args.folder and args.template):
+        parser.error("--folder and --template are required unless --resume is given")
+    if args.resume is not None and args.watch:
+        parser.error("--resume cannot be combined with --watch")
+    if args.profile is not None and not 0 < args.profile <= 1:
+        parser.error("--profile sample rate must be greater than 0 and at most 1")
+    
+    metrics_writer = start_metrics_file(args.metrics_file, args.metrics_interval)
+    if args.trace:
+        start_tracing()
+    try:
+        result = run(args)
+    finally:
+        if metrics_writer:
+            metrics_writer.stop()
+        if args.trace:
+            write_trace(args.trace, stop_tracing())
     
-    result = process_pdf_folder(
+    # Return success/failure code
+    sys.exit(0 if result else 1)
+
+def run(args):
+    """Run the batch or watch mode asked for on the command line, profiling a sample of its files if requested"""
+    profiler = None
+    if args.profile is not None:
+        profile_dir = args.profile_dir or os.path.join(args.output or os.getcwd(), "profiles")
+        profiler = FileProfiler(profile_dir, args.profile)
+        logger.info("Profiling %.0f%% of the files into %s", args.profile * 100, profile_dir)
+    try:
+        return run_batch(args, profiler)
+    finally:
+        if profiler is not None:
+            report_profiles(profiler)
+
+def report_profiles(profiler):
+    """Merge the run's per-file profiles and log the time share of each stage"""
+    summary = merge_profiles(profiler.output_dir, profiler.sample_interval)
+    if summary is None:
+        logger.info("No files were profiled")
+        return
+    logger.info("Profiled %s files; merged profile in %s", summary["files"], profiler.output_dir)
+    for stage, data in sorted(summary["stages"].items(), key=lambda item: item[1]["samples"], reverse=True):
+        if data["samples"]:
+            logger.info("  %s: %.1f%% (~%.2fs sampled)", stage, data["share"] * 100, data["seconds"])
+
+def run_batch(args, profiler=None):
+    """Run watch mode or a batch folder run"""
+    if args.watch:
+        return watch_pdf_folder(
+            args.folder,
+            args.template,
+            args.username,
+            args.password,
+            args.output,
+            args.workers,
+            args.chunk,
+            per_page=not args.per_region,
+            executor_type=args.executor,
+            use_cache=not args.no_cache,
+            refresh_cache=args.refresh,
+            cache_path=args.cache_path,
+            cache_max_bytes=args.cache_size * 1024 * 1024,
+            poll_interval=args.poll_interval,
+            debounce=args.debounce,
+            profiler=profiler
+        )
+    
+    return process_pdf_folder(
         args.folder, 
         args.template, 
         args.username, 
         args.password, 
         args.output,
-        args.threads,
-        args.chunk
+        args.workers,
+        args.chunk,
+        per_page=not args.per_region,
+        executor_type=args.executor,
+        use_cache=not args.no_cache,
+        refresh_cache=args.refresh,
+        cache_path=args.cache_path,
+        cache_max_bytes=args.cache_size * 1024 * 1024,
+        resume_job_id=args.resume,
+        profiler=profiler
     )
-    
-    # Return success/failure code
-    sys.exit(0 if result else 1)
 
 if __name__ == '__main__':
     main() 
\ No newline at end of file
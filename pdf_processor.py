@@ -2,10 +2,9 @@ import sys
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton, 
                              QLabel, QFileDialog, QScrollArea, QStackedWidget, QMessageBox, QDialog, QRadioButton, QButtonGroup)
 from PySide6.QtCore import Qt, QRect, QPoint, QSize
-from PySide6.QtGui import QPixmap, QPainter, QPen, QColor, QImage, QFont
+from PySide6.QtGui import QPainter, QPen, QColor, QFont
 import fitz  # PyMuPDF
-from PIL import Image
-import io
+from page_renderer import render_page
 from PySide6.QtCore import Signal
 from invoice_section_viewer import InvoiceSectionViewer
 import pandas as pd
@@ -837,16 +836,8 @@ class PDFProcessor(QWidget):
             page = self.pdf_document[0]
             self.status_label.setText("Single-page mode: Template will be applied to first page only")
             
-        pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))
-        
-        # Convert PyMuPDF pixmap to PIL Image
-        img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-        
-        # Convert PIL Image to QPixmap
-        bytes_io = io.BytesIO()
-        img.save(bytes_io, format='PNG')
-        qimg = QImage.fromData(bytes_io.getvalue())
-        pixmap = QPixmap.fromImage(qimg)
+        # Rendered (or taken from the page cache) by the shared render service
+        pixmap = render_page(self.pdf_document, page.number)
         
         self.pdf_label.setPixmap(pixmap)
         self.pdf_label.adjustPixmap()  # Make sure to call adjustPixmap after setting the pixmap
@@ -1397,8 +1388,6 @@ class PDFProcessor(QWidget):
                         main_window.stacked_widget.setCurrentWidget(viewer)
                 else:
                     # Use single page viewer
-                    from invoice_section_viewer import InvoiceSectionViewer
-                    
                     # Extract data from first page (index 0)
                     header_df, item_details_df, summary_df = self.extract_page_data(0, 'first_page')
                     
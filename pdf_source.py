@@ -0,0 +1,68 @@
+"""
+PDF inputs held in memory or on disk
+
+The extraction engine accepts a PDF as a filesystem path or as its contents:
+bytes, bytearray, memoryview or a binary file-like object. load_pdf_source()
+turns any of these into either a path or one immutable bytes buffer, and the
+helpers below open that buffer with PyMuPDF and hand it to the table parser
+without writing it to disk.
+"""
+
+import io
+import os
+
+import fitz  # PyMuPDF
+
+PDF_BUFFER_TYPES = (bytes, bytearray, memoryview)
+
+# Name used in messages for PDFs that have no file name
+MEMORY_SOURCE_NAME = "<memory>"
+
+
+def is_pdf_buffer(source):
+    """Check whether a PDF source is held in memory rather than named by a path"""
+    return isinstance(source, PDF_BUFFER_TYPES)
+
+
+def load_pdf_source(source):
+    """Normalize a PDF input to a path (str) or a bytes buffer
+
+    Paths (str or os.PathLike) are returned as str and bytes are returned
+    unchanged. bytearray and memoryview are copied once into bytes so the
+    buffer cannot change during extraction, and file-like objects are read
+    from the start.
+    """
+    if isinstance(source, bytes):
+        return source
+    if isinstance(source, (bytearray, memoryview)):
+        return bytes(source)
+    if isinstance(source, (str, os.PathLike)):
+        return os.fspath(source)
+    if hasattr(source, "read"):
+        if hasattr(source, "seek"):
+            source.seek(0)
+        return source.read()
+    raise TypeError(f"Unsupported PDF source: {type(source).__name__}")
+
+
+def source_name(source):
+    """Short name of a PDF source for messages"""
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.basename(os.fspath(source))
+    name = getattr(source, "name", None)
+    return os.path.basename(name) if isinstance(name, str) else MEMORY_SOURCE_NAME
+
+
+def open_pdf(source):
+    """Open a path or bytes buffer (see load_pdf_source) with PyMuPDF"""
+    if is_pdf_buffer(source):
+        return fitz.open(stream=source, filetype="pdf")
+    return fitz.open(source)
+
+
+def parser_input(source):
+    """Input for pypdf_table_extraction.read_pdf: the path, or a fresh stream over the buffer"""
+    if is_pdf_buffer(source):
+        # BytesIO over bytes shares the buffer until written to, so this does not copy
+        return io.BytesIO(source)
+    return source
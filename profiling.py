@@ -0,0 +1,236 @@
+"""
+Per-file profiling for batch runs
+
+FileProfiler profiles a sampled subset of a batch's files inside the workers
+that extract them, so a slow production run can be diagnosed from its own
+output. For every selected file it writes to the profile directory:
+
+    - <file>-<hash>.pstats: a cProfile of the whole extraction (template,
+      open, parse, regex filtering and export)
+    - <file>-<hash>.collapsed: stacks sampled from the worker thread every
+      few milliseconds, in collapsed-stack format ("frame;frame;... count")
+      with the pipeline stage of the sample as the root frame
+
+merge_profiles() then combines the per-file outputs of the run into
+merged.pstats (plus a readable merged.txt), merged.collapsed for flame graph
+tools and stages.json with the share of samples spent in each stage.
+
+A profiled file runs start to finish on one worker thread, and only one file
+is profiled at a time per process: cProfile only sees the thread it was
+enabled on, and newer Python versions allow a single active profiler.
+"""
+
+import os
+import sys
+import json
+import glob
+import pstats
+import hashlib
+import cProfile
+import logging
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+from pdf_source import source_name
+
+logger = logging.getLogger(__name__)
+
+# Seconds between stack samples of a profiled worker thread
+DEFAULT_SAMPLE_INTERVAL = 0.005
+
+MERGED_NAME = "merged"
+
+# Pipeline stage of a stack: the innermost frame found here decides it
+STAGE_FUNCTIONS = {
+    ("extraction_engine", "load_template_from_database"): "template",
+    ("extraction_engine", "get_compiled_template"): "template",
+    ("extraction_engine", "compile_template"): "template",
+    ("pdf_source", "load_pdf_source"): "open",
+    ("pdf_source", "open_pdf"): "open",
+    ("document_context", "source"): "open",
+    ("document_context", "document"): "open",
+    ("extraction_engine", "read_region_table"): "parse",
+    ("extraction_engine", "read_page_tables"): "parse",
+    # The table parser turns the text it found in an area into a table here
+    (None, "_generate_table"): "build_table",
+    ("extraction_engine", "basic_clean"): "build_table",
+    ("extraction_engine", "merge_results"): "build_table",
+    ("extraction_engine", "finish_results"): "build_table",
+    ("extraction_engine", "apply_regex_to_dataframe"): "regex",
+    ("extraction_engine", "clean_dataframe"): "regex",
+    ("regex_filter", None): "regex",
+    ("pdf_extractor_cli", "export_results"): "export",
+    ("result_sink", None): "export",
+}
+
+STAGES = ("template", "open", "parse", "build_table", "regex", "export", "other")
+
+# One active profiler per process
+_profile_lock = threading.Lock()
+
+
+def _frame_stage(module, function):
+    return (
+        STAGE_FUNCTIONS.get((module, function))
+        or STAGE_FUNCTIONS.get((None, function))
+        or STAGE_FUNCTIONS.get((module, None))
+    )
+
+
+def collapse_stack(frame):
+    """Return the collapsed-stack key of a frame: 'stage;outermost;...;innermost'"""
+    names = []
+    stage = None
+    while frame is not None:
+        code = frame.f_code
+        module = os.path.splitext(os.path.basename(code.co_filename))[0]
+        function = getattr(code, "co_qualname", code.co_name)
+        names.append(f"{module}:{function}")
+        if stage is None:
+            stage = _frame_stage(module, code.co_name)
+        frame = frame.f_back
+    names.reverse()
+    return ";".join([stage or "other"] + names)
+
+
+class StackSampler:
+    """Count the collapsed stacks of one thread, sampled from a background thread"""
+
+    def __init__(self, thread_id, interval=DEFAULT_SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[collapse_stack(frame)] += 1
+
+
+class FileProfiler:
+    """Profile a deterministic sample of files into a directory
+
+    Args:
+        output_dir: Directory receiving the per-file and merged outputs
+        sample_rate: Fraction of files to profile (1.0 profiles every file);
+            the choice depends on the file path only, so every worker and
+            every rerun picks the same files
+        sample_interval: Seconds between stack samples
+    """
+
+    def __init__(self, output_dir, sample_rate=1.0, sample_interval=DEFAULT_SAMPLE_INTERVAL):
+        self.output_dir = output_dir
+        self.sample_rate = sample_rate
+        self.sample_interval = sample_interval
+        os.makedirs(output_dir, exist_ok=True)
+
+    @staticmethod
+    def _source_hash(source):
+        return hashlib.sha1(source_name(source).encode("utf-8", "replace")).hexdigest()
+
+    def selects(self, source):
+        """Whether a file (path or buffer) belongs to the profiled sample"""
+        if self.sample_rate >= 1:
+            return True
+        if self.sample_rate <= 0:
+            return False
+        return int(self._source_hash(source)[:8], 16) / 0x100000000 < self.sample_rate
+
+    def base_path(self, source):
+        stem = os.path.splitext(os.path.basename(source_name(source)))[0]
+        return os.path.join(self.output_dir, f"{stem}-{self._source_hash(source)[:8]}")
+
+    @contextmanager
+    def profile(self, source):
+        """Profile the with block as the extraction of source, waiting for any other profiled file first"""
+        with _profile_lock:
+            sampler = StackSampler(threading.get_ident(), self.sample_interval).start()
+            profile = cProfile.Profile()
+            profile.enable()
+            try:
+                yield
+            finally:
+                profile.disable()
+                sampler.stop()
+                base = self.base_path(source)
+                try:
+                    profile.dump_stats(base + ".pstats")
+                    write_collapsed(base + ".collapsed", sampler.stacks)
+                except OSError as e:
+                    logger.warning("Could not write profile for %s: %s", source_name(source), e)
+
+
+def write_collapsed(path, stacks):
+    """Write stack counts in collapsed-stack format, most frequent first"""
+    with open(path, "w", encoding="utf-8") as f:
+        for stack, count in stacks.most_common():
+            f.write(f"{stack} {count}\n")
+
+
+def read_collapsed(path):
+    stacks = Counter()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            stack, _, count = line.rstrip("\n").rpartition(" ")
+            if stack:
+                stacks[stack] += int(count)
+    return stacks
+
+
+def merge_profiles(output_dir, sample_interval=DEFAULT_SAMPLE_INTERVAL):
+    """Merge the per-file profiles in output_dir
+
+    Writes merged.pstats, merged.txt (top functions by cumulative time),
+    merged.collapsed and stages.json.
+
+    Returns:
+        dict: The stages.json contents, or None if no file was profiled
+    """
+    merged_base = os.path.join(output_dir, MERGED_NAME)
+    stats_files = sorted(p for p in glob.glob(os.path.join(output_dir, "*.pstats")) if p != merged_base + ".pstats")
+    if not stats_files:
+        return None
+
+    stats = pstats.Stats(*stats_files)
+    stats.dump_stats(merged_base + ".pstats")
+    with open(merged_base + ".txt", "w", encoding="utf-8") as f:
+        pstats.Stats(merged_base + ".pstats", stream=f).sort_stats("cumulative").print_stats(60)
+
+    stacks = Counter()
+    for path in glob.glob(os.path.join(output_dir, "*.collapsed")):
+        if path != merged_base + ".collapsed":
+            stacks.update(read_collapsed(path))
+    write_collapsed(merged_base + ".collapsed", stacks)
+
+    stage_samples = Counter()
+    for stack, count in stacks.items():
+        stage_samples[stack.split(";", 1)[0]] += count
+    total = sum(stage_samples.values())
+    summary = {
+        "files": len(stats_files),
+        "sample_interval": sample_interval,
+        "samples": total,
+        "stages": {
+            stage: {
+                "samples": stage_samples[stage],
+                "seconds": round(stage_samples[stage] * sample_interval, 3),
+                "share": round(stage_samples[stage] / total, 4) if total else 0.0,
+            }
+            for stage in STAGES
+        },
+    }
+    with open(os.path.join(output_dir, "stages.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    return summary
@@ -0,0 +1,148 @@
+"""
+Vectorized regex row filtering for extracted tables
+
+Each table row is joined into one string once, as a pandas Series, and the
+start, end and skip patterns are then matched with Series.str.contains on
+precompiled, case-insensitive patterns. The extraction engine, clean_dataframe
+and the section viewers all use these helpers instead of looping over rows
+with iterrows().
+"""
+
+import re
+import logging
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+_pattern_cache = {}
+
+
+def compile_pattern(pattern):
+    """Compile a case-insensitive regex pattern once and reuse it
+
+    Returns None for empty or invalid patterns; already compiled patterns are
+    returned unchanged.
+    """
+    if not pattern:
+        return None
+    if isinstance(pattern, re.Pattern):
+        return pattern
+
+    if pattern not in _pattern_cache:
+        try:
+            _pattern_cache[pattern] = re.compile(pattern, re.IGNORECASE)
+        except re.error as e:
+            logger.warning("Invalid regex pattern '%s': %s", pattern, e)
+            _pattern_cache[pattern] = None
+    return _pattern_cache[pattern]
+
+
+def has_valid_pattern(regex_patterns):
+    """Check whether a regex pattern dict defines at least one non-empty pattern"""
+    if not regex_patterns:
+        return False
+    return any(regex_patterns.get(pattern_type) for pattern_type in ("start", "end", "skip"))
+
+
+def compile_patterns(regex_patterns):
+    """Compile a {start, end, skip} pattern dict; None when no pattern is set"""
+    if not has_valid_pattern(regex_patterns):
+        return None
+    return {pattern_type: compile_pattern(regex_patterns.get(pattern_type)) for pattern_type in ("start", "end", "skip")}
+
+
+def row_texts(df, skip_na=False):
+    """Join the cells of every row into one string
+
+    Args:
+        df: DataFrame to join
+        skip_na: Leave missing cells out of the joined text instead of
+            joining their string form ("<NA>", "nan")
+
+    Returns:
+        Series of strings with the same index as df
+    """
+    if df.shape[1] == 0:
+        return pd.Series("", index=df.index, dtype=object)
+
+    if not skip_na:
+        str_df = df.astype(str)
+        texts = str_df.iloc[:, 0]
+        if str_df.shape[1] > 1:
+            texts = texts.str.cat(str_df.iloc[:, 1:], sep=" ")
+        return texts
+
+    texts = pd.Series("", index=df.index, dtype=object)
+    has_text = pd.Series(False, index=df.index)
+    for position in range(df.shape[1]):
+        column = df.iloc[:, position]
+        present = column.notna()
+        separator = has_text.map({True: " ", False: ""})
+        texts = texts.where(~present, texts + separator + column.astype(str))
+        has_text |= present
+    return texts
+
+
+def match_rows(texts, pattern):
+    """Return a boolean Series marking the rows whose text matches a pattern"""
+    compiled = compile_pattern(pattern)
+    if compiled is None:
+        return pd.Series(False, index=texts.index)
+    return texts.str.contains(compiled, na=False)
+
+
+def first_match(texts, pattern, start=0):
+    """Return the position of the first row at or after start that matches, or None"""
+    mask = match_rows(texts.iloc[start:], pattern)
+    if not mask.any():
+        return None
+    return start + int(mask.to_numpy().argmax())
+
+
+def find_boundaries(texts, start_pattern=None, end_pattern=None):
+    """Find the inclusive (start, end) row positions delimited by the patterns
+
+    Without a start pattern the table starts at the first row; without an end
+    pattern, or when it does not match after the start row, it ends at the
+    last row.
+
+    Returns:
+        tuple: (start_pos, end_pos), or None when a start pattern is given but
+        never matches
+    """
+    start_pos = 0
+    if compile_pattern(start_pattern) is not None:
+        start_pos = first_match(texts, start_pattern)
+        if start_pos is None:
+            return None
+
+    end_pos = len(texts) - 1
+    if compile_pattern(end_pattern) is not None:
+        match = first_match(texts, end_pattern, start_pos)
+        if match is not None:
+            end_pos = match
+
+    return start_pos, end_pos
+
+
+def skip_mask(df, pattern, per_cell=False, texts=None):
+    """Return a boolean Series marking rows to skip
+
+    Args:
+        df: DataFrame being filtered
+        pattern: Skip pattern (string or compiled)
+        per_cell: Match each cell on its own instead of the joined row text
+        texts: Precomputed row_texts(df), reused when matching joined rows
+    """
+    pattern = compile_pattern(pattern)
+    if pattern is None or df.empty:
+        return pd.Series(False, index=df.index)
+
+    if per_cell:
+        str_df = df.astype(str)
+        return str_df.apply(lambda column: column.str.contains(pattern, na=False)).any(axis=1)
+
+    if texts is None:
+        texts = row_texts(df)
+    return match_rows(texts, pattern)
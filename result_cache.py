@@ -0,0 +1,212 @@
+"""
+Content-addressed cache of extraction results
+
+Results are keyed by the SHA-256 of the PDF bytes, the compiled template's
+fingerprint, the engine version and the extraction mode (per page or per
+region), so a file that was already extracted with
+the same template and engine is served from the cache even if it was renamed
+or resent. Entries are stored zlib-compressed in a SQLite database and the
+least recently used ones are evicted once the cache grows past max_bytes.
+
+The cache is safe to share between threads and between processes: every call
+opens its own short-lived connection.
+"""
+
+import logging
+import os
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+
+from extraction_engine import ENGINE_VERSION, SECTIONS
+from result_sink import table_to_json, table_from_json
+from metrics import get_metrics
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = "extraction_cache.db"
+DEFAULT_CACHE_MAX_BYTES = 1024 * 1024 * 1024  # 1 GB
+
+# Eviction trims the cache to this fraction of max_bytes so it does not run on every put
+EVICTION_TARGET = 0.9
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def file_sha256(pdf_path):
+    """Hash a file's contents in blocks"""
+    digest = hashlib.sha256()
+    with open(pdf_path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_sha256(pdf_source):
+    """Hash a PDF given as a path or as an in-memory buffer"""
+    if isinstance(pdf_source, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(pdf_source).hexdigest()
+    return file_sha256(pdf_source)
+
+
+def extraction_mode(per_page):
+    """Name of the extraction mode in cache keys; the modes may split a page's tables differently"""
+    return "per_page" if per_page else "per_region"
+
+
+def serialize_results(results):
+    """Encode extraction results (DataFrames included) as compressed JSON"""
+    payload = {key: value for key, value in results.items() if not key.endswith("_tables")}
+    payload.pop("cached", None)
+    payload["tables"] = {
+        section: [table_to_json(df) for df in results.get(f"{section}_tables", []) if df is not None]
+        for section in SECTIONS
+    }
+    return zlib.compress(json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8"))
+
+
+def deserialize_results(data):
+    """Inverse of serialize_results"""
+    payload = json.loads(zlib.decompress(data).decode("utf-8"))
+    tables = payload.pop("tables", {})
+    for section in SECTIONS:
+        payload[f"{section}_tables"] = [table_from_json(text) for text in tables.get(section, [])]
+    return payload
+
+
+class ResultCache:
+    """Persistent, size-bounded cache of extraction results"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    cache_key TEXT PRIMARY KEY,
+                    pdf_hash TEXT,
+                    template_hash TEXT,
+                    engine_version TEXT,
+                    size INTEGER,
+                    created REAL,
+                    last_used REAL,
+                    data BLOB
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_last_used ON cache_entries (last_used)")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    @staticmethod
+    def make_key(pdf_hash, template_hash, engine_version=ENGINE_VERSION, mode="per_page"):
+        return f"{pdf_hash}:{template_hash}:{engine_version}:{mode}"
+
+    def key_for(self, pdf_path, template, per_page=True):
+        """Cache key for a PDF (path or bytes) extracted with a CompiledTemplate in per-page or per-region mode"""
+        return self.make_key(source_sha256(pdf_path), template.fingerprint, mode=extraction_mode(per_page))
+
+    def get(self, cache_key):
+        """Return cached results for a key, or None on a miss"""
+        with span("cache_get", "db"):
+            conn = self._connect()
+            try:
+                row = conn.execute("SELECT data FROM cache_entries WHERE cache_key = ?", (cache_key,)).fetchone()
+                if row is None:
+                    self.misses += 1
+                    get_metrics().inc("cache_misses_total")
+                    return None
+                conn.execute("UPDATE cache_entries SET last_used = ? WHERE cache_key = ?", (time.time(), cache_key))
+                conn.commit()
+            finally:
+                conn.close()
+
+        try:
+            results = deserialize_results(row[0])
+        except Exception as e:
+            logger.warning("Discarding unreadable cache entry: %s", e)
+            self.delete(cache_key)
+            self.misses += 1
+            get_metrics().inc("cache_misses_total")
+            return None
+
+        self.hits += 1
+        get_metrics().inc("cache_hits_total")
+        results["cached"] = True
+        return results
+
+    def put(self, cache_key, results):
+        """Store results for a key and evict old entries if the cache is over its size limit"""
+        if not results:
+            return
+        try:
+            data = serialize_results(results)
+        except Exception as e:
+            logger.warning("Could not cache extraction results: %s", e)
+            return
+
+        pdf_hash, template_hash, engine_version = cache_key.split(":")[:3]
+        now = time.time()
+        with span("cache_put", "db", size=len(data)):
+            conn = self._connect()
+            try:
+                conn.execute(
+                    """
+                    INSERT OR REPLACE INTO cache_entries
+                        (cache_key, pdf_hash, template_hash, engine_version, size, created, last_used, data)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (cache_key, pdf_hash, template_hash, engine_version, len(data), now, now, data),
+                )
+                conn.commit()
+                self._evict(conn)
+            finally:
+                conn.close()
+
+    def delete(self, cache_key):
+        conn = self._connect()
+        try:
+            conn.execute("DELETE FROM cache_entries WHERE cache_key = ?", (cache_key,))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _evict(self, conn):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache_entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        target = self.max_bytes * EVICTION_TARGET
+        evicted = []
+        for cache_key, size in conn.execute("SELECT cache_key, size FROM cache_entries ORDER BY last_used"):
+            if total <= target:
+                break
+            evicted.append((cache_key,))
+            total -= size
+
+        conn.executemany("DELETE FROM cache_entries WHERE cache_key = ?", evicted)
+        conn.commit()
+        logger.info("Result cache: evicted %s entries", len(evicted))
+
+    def clear(self):
+        conn = self._connect()
+        try:
+            conn.execute("DELETE FROM cache_entries")
+            conn.commit()
+        finally:
+            conn.close()
@@ -0,0 +1,311 @@
+"""
+Streaming result sinks for bulk extraction
+
+A sink receives each file's extracted tables as soon as the file is done and
+keeps them on disk, so a batch never holds every DataFrame in memory. Callers
+keep only the small per-file summaries and load a file's tables back with
+read() when they are needed (opening a result row, exporting, validating).
+
+Three formats are available:
+    jsonl   - one JSON line per file, read back by byte offset
+    parquet - one Parquet file per table plus a JSONL index (needs pyarrow)
+    sqlite  - one row per file and one row per table in a SQLite database
+
+Every sink returns records in the same shape:
+    {
+        "pdf_path": ..., "pdf_page_count": ..., "template_type": ...,
+        "extraction_status": {...}, "no_tables_found": [...],
+        "file_summary": {...},
+        "header": [DataFrame, ...], "items": [...], "summary": [...]
+    }
+"""
+
+import logging
+import io
+import os
+import json
+import sqlite3
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+SECTIONS = ("header", "items", "summary")
+SINK_FORMATS = ("jsonl", "parquet", "sqlite")
+DEFAULT_RESULTS_DIR = "bulk_results"
+
+
+def table_to_json(df):
+    """Serialize a table, keeping its index, column labels and cell text"""
+    return df.to_json(orient="split", force_ascii=False)
+
+
+def table_from_json(text):
+    """Inverse of table_to_json; cell values are not re-typed"""
+    return pd.read_json(io.StringIO(text), orient="split", dtype=False)
+
+
+def build_metadata(pdf_path, results, summary=None):
+    """Per-file metadata stored alongside the tables"""
+    return {
+        "pdf_path": pdf_path,
+        "pdf_page_count": results.get("pdf_page_count", (summary or {}).get("page_count", 1)),
+        "template_type": (summary or {}).get("template_type", "single"),
+        "extraction_status": results.get("extraction_status", {}),
+        "no_tables_found": results.get("no_tables_found", []),
+        "file_summary": summary or {},
+    }
+
+
+def section_tables(results, section):
+    """Non-empty tables of one section of an extraction result"""
+    return [df for df in results.get(f"{section}_tables", []) if df is not None and not df.empty]
+
+
+class ResultSink:
+    """Base class for result sinks
+
+    Subclasses implement _write(metadata, tables) and _read(pdf_path), where
+    tables is {section: [DataFrame, ...]}. write() may be called from several
+    extraction threads at once; the sink serializes access to its storage.
+    """
+
+    format_name = None
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._paths = {}  # written files as an insertion-ordered set, in completion order
+
+    def write(self, pdf_path, results, summary=None):
+        """Store one file's extraction results"""
+        if not results:
+            return
+        metadata = build_metadata(pdf_path, results, summary)
+        tables = {section: section_tables(results, section) for section in SECTIONS}
+        with self._lock:
+            self._write(metadata, tables)
+            self._paths.setdefault(pdf_path, None)
+
+    def read(self, pdf_path):
+        """Load one file's record, or None if it was never written"""
+        with self._lock:
+            if pdf_path not in self._paths:
+                return None
+            return self._read(pdf_path)
+
+    def iter_records(self):
+        """Yield (pdf_path, record) one file at a time"""
+        for pdf_path in list(self._paths):
+            record = self.read(pdf_path)
+            if record is not None:
+                yield pdf_path, record
+
+    def paths(self):
+        return list(self._paths)
+
+    def __len__(self):
+        return len(self._paths)
+
+    def __contains__(self, pdf_path):
+        return pdf_path in self._paths
+
+    def close(self):
+        """Release the underlying storage; stored results stay on disk"""
+
+    def _write(self, metadata, tables):
+        raise NotImplementedError
+
+    def _read(self, pdf_path):
+        raise NotImplementedError
+
+
+class JsonlResultSink(ResultSink):
+    """One JSON line per file; an in-memory offset index makes reads O(1)"""
+
+    format_name = "jsonl"
+
+    def __init__(self, path):
+        super().__init__(path)
+        self._offsets = {}
+        self._file = open(path, "ab+")
+
+    def _write(self, metadata, tables):
+        record = dict(metadata)
+        record["tables"] = {
+            section: [table_to_json(df) for df in section_list]
+            for section, section_list in tables.items()
+        }
+        line = (json.dumps(record, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+
+        self._file.seek(0, os.SEEK_END)
+        self._offsets[metadata["pdf_path"]] = self._file.tell()
+        self._file.write(line)
+        self._file.flush()
+
+    def _read(self, pdf_path):
+        self._file.seek(self._offsets[pdf_path])
+        record = json.loads(self._file.readline().decode("utf-8"))
+        tables = record.pop("tables", {})
+        for section in SECTIONS:
+            record[section] = [table_from_json(text) for text in tables.get(section, [])]
+        return record
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+class ParquetResultSink(ResultSink):
+    """A directory with one Parquet file per table and an index.jsonl of metadata
+
+    Parquet needs string column labels, so the original labels are kept in the
+    index and restored on read.
+    """
+
+    format_name = "parquet"
+
+    def __init__(self, path):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ImportError("The parquet result sink requires pyarrow (pip install pyarrow)")
+        super().__init__(path)
+        os.makedirs(path, exist_ok=True)
+        self._records = {}
+        self._file_count = 0  # never reused, so a rewritten file cannot clobber another's tables
+        self._index = open(os.path.join(path, "index.jsonl"), "a", encoding="utf-8")
+
+    def _write(self, metadata, tables):
+        file_number = self._file_count
+        self._file_count += 1
+        record = dict(metadata)
+        record["tables"] = {}
+        for section, section_list in tables.items():
+            entries = []
+            for table_index, df in enumerate(section_list):
+                filename = f"{file_number:06d}_{section}_{table_index}.parquet"
+                stored = df.copy()
+                stored.columns = [str(column) for column in df.columns]
+                stored.to_parquet(os.path.join(self.path, filename))
+                columns = [column.item() if hasattr(column, "item") else column for column in df.columns]
+                entries.append({"file": filename, "columns": columns})
+            record["tables"][section] = entries
+
+        self._records[metadata["pdf_path"]] = record
+        self._index.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        self._index.flush()
+
+    def _read(self, pdf_path):
+        record = dict(self._records[pdf_path])
+        tables = record.pop("tables", {})
+        for section in SECTIONS:
+            section_list = []
+            for entry in tables.get(section, []):
+                df = pd.read_parquet(os.path.join(self.path, entry["file"]))
+                df.columns = entry["columns"]
+                section_list.append(df)
+            record[section] = section_list
+        return record
+
+    def close(self):
+        if not self._index.closed:
+            self._index.close()
+
+
+class SqliteResultSink(ResultSink):
+    """Files and tables stored in a SQLite database"""
+
+    format_name = "sqlite"
+
+    def __init__(self, path):
+        super().__init__(path)
+        # Written from extraction threads; access is serialized by self._lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results (pdf_path TEXT PRIMARY KEY, metadata TEXT)"
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS result_tables (
+                pdf_path TEXT,
+                section TEXT,
+                table_index INTEGER,
+                data TEXT,
+                PRIMARY KEY (pdf_path, section, table_index)
+            )
+            """
+        )
+        self._conn.commit()
+
+    def _write(self, metadata, tables):
+        pdf_path = metadata["pdf_path"]
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (pdf_path, metadata) VALUES (?, ?)",
+                (pdf_path, json.dumps(metadata, ensure_ascii=False, default=str)),
+            )
+            self._conn.execute("DELETE FROM result_tables WHERE pdf_path = ?", (pdf_path,))
+            self._conn.executemany(
+                "INSERT INTO result_tables (pdf_path, section, table_index, data) VALUES (?, ?, ?, ?)",
+                [
+                    (pdf_path, section, table_index, table_to_json(df))
+                    for section, section_list in tables.items()
+                    for table_index, df in enumerate(section_list)
+                ],
+            )
+
+    def _read(self, pdf_path):
+        row = self._conn.execute(
+            "SELECT metadata FROM results WHERE pdf_path = ?", (pdf_path,)
+        ).fetchone()
+        if row is None:
+            return None
+        record = json.loads(row[0])
+        for section in SECTIONS:
+            record[section] = []
+
+        cursor = self._conn.execute(
+            "SELECT section, data FROM result_tables WHERE pdf_path = ? ORDER BY section, table_index",
+            (pdf_path,),
+        )
+        for section, data in cursor:
+            record[section].append(table_from_json(data))
+        return record
+
+    def close(self):
+        self._conn.close()
+
+
+_SINK_CLASSES = {
+    "jsonl": (JsonlResultSink, ".jsonl"),
+    "parquet": (ParquetResultSink, ""),
+    "sqlite": (SqliteResultSink, ".db"),
+}
+
+
+def open_result_sink(sink_format="jsonl", path=None, results_dir=DEFAULT_RESULTS_DIR):
+    """Create a result sink
+
+    Args:
+        sink_format: One of SINK_FORMATS
+        path: File (or directory for parquet) to write to; a timestamped
+            path under results_dir is used when omitted
+        results_dir: Directory for generated paths
+
+    Returns:
+        ResultSink: The opened sink
+    """
+    if sink_format not in _SINK_CLASSES:
+        raise ValueError(f"Unknown result sink format '{sink_format}', expected one of {', '.join(SINK_FORMATS)}")
+
+    sink_class, extension = _SINK_CLASSES[sink_format]
+    if path is None:
+        os.makedirs(results_dir, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        path = os.path.join(results_dir, f"bulk_results_{timestamp}{extension}")
+
+    logger.info("Writing bulk results to %s (%s)", path, sink_format)
+    return sink_class(path)
@@ -8,6 +8,7 @@ from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
 from PySide6.QtCore import Qt, Signal, QRect, QPoint
 from PySide6.QtGui import QFont, QIcon
 from database import InvoiceDatabase
+from page_geometry import flip_y, get_page_transform
 import os
 import datetime
 import json
@@ -1571,7 +1572,6 @@ class EditTemplateDialog(QDialog):
     def show_raw_config(self, config):
         """Show the raw configuration in a dialog for debugging"""
         try:
-            import json
             config_text = json.dumps(config, indent=2)
             
             dialog = QDialog(self)
@@ -2514,7 +2514,7 @@ class TemplateManager(QWidget):
                                 # Flip y-coordinates (subtract from pdf_height)
                                 # Note: This depends on the exact coordinate system used in your database
                                 # For a standard PDF, (0,0) is usually bottom-left, but for display we need top-left
-                                new_y1 = pdf_height - y2  # Convert bottom-left to top-left
+                                new_y1 = flip_y(y1, height, pdf_height)  # Convert bottom-left to top-left
                                 return QRect(int(x1), int(new_y1), int(width), int(height))
                             else:
                                 # For cases where we don't have the PDF height yet
@@ -2528,7 +2528,7 @@ class TemplateManager(QWidget):
                             
                             if pdf_height is not None and template.get('uses_bottom_left', True):
                                 # Flip y-coordinate if needed
-                                y = pdf_height - y - height
+                                y = int(flip_y(y, height, pdf_height))
                             
                             return QRect(x, y, width, height)
                         else:
@@ -2538,16 +2538,19 @@ class TemplateManager(QWidget):
                         # Already a QRect, but might still need coordinate conversion
                         if pdf_height is not None and template.get('uses_bottom_left', True):
                             x = rect_data.x()
-                            y = pdf_height - rect_data.y() - rect_data.height()
+                            y = int(flip_y(rect_data.y(), rect_data.height(), pdf_height))
                             return QRect(x, y, rect_data.width(), rect_data.height())
                         return rect_data
                     else:
                         print(f"Warning: Unknown rect type in template: {type(rect_data)}")
                         return QRect()
                 
-                # Get PDF dimensions if available
+                # Get the rendered page height, from the cached page geometry when a PDF is open
                 pdf_height = None
-                if self.pdf_processor and hasattr(self.pdf_processor, 'pdf_label') and self.pdf_processor.pdf_label.pixmap():
+                if self.pdf_processor and getattr(self.pdf_processor, 'pdf_document', None):
+                    pdf_height = get_page_transform(self.pdf_processor.pdf_document, 0).rendered_height
+                    print(f"Using PDF height for coordinate conversion: {pdf_height}")
+                elif self.pdf_processor and hasattr(self.pdf_processor, 'pdf_label') and self.pdf_processor.pdf_label.pixmap():
                     pdf_height = self.pdf_processor.pdf_label.pixmap().height()
                     print(f"Using PDF height for coordinate conversion: {pdf_height}")
                 else:
@@ -0,0 +1,150 @@
+"""
+Timeline traces of batch runs in Chrome Trace Event format
+
+While tracing is on, the extraction path records what every worker thread is
+doing and when:
+
+    - file: a document from the moment a worker opens it until its results
+      are stored (an async event, since its page ranges run on several
+      workers), plus the open/plan and merge steps
+    - range / page / region: page-range tasks, pages and read_pdf calls
+    - export: writing a file's results to the output or the result store
+    - db: SQLite work that can wait on locks (job queue, result cache,
+      template loads)
+
+write_trace() saves the events as JSON that chrome://tracing, Perfetto or
+speedscope open directly, which shows idle workers, stragglers, lock waits and
+export stalls on one timeline. Process-pool workers record their own events
+and send them back with every file; the parent adds them with add_events().
+
+When tracing is off span() returns a shared no-op context manager, so the
+instrumentation costs one function call.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager, nullcontext
+
+logger = logging.getLogger(__name__)
+
+TRACE_ENV = "PDF_HARVEST_TRACE"
+
+_NO_SPAN = nullcontext()
+
+
+def _now_us():
+    # Wall clock, so events recorded by different processes share a time base
+    return time.time_ns() // 1000
+
+
+class TraceRecorder:
+    """Collects trace events of the current process"""
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self.events = []
+        self._named_threads = set()
+        self._lock = threading.Lock()
+        self._metadata("process_name", 0, {"name": f"pdf-harvest {self.pid}"})
+
+    def _metadata(self, name, tid, args):
+        self.events.append({"name": name, "ph": "M", "pid": self.pid, "tid": tid, "args": args})
+
+    def _tid(self):
+        tid = threading.get_ident()
+        if tid not in self._named_threads:
+            with self._lock:
+                if tid not in self._named_threads:
+                    self._named_threads.add(tid)
+                    self._metadata("thread_name", tid, {"name": threading.current_thread().name})
+        return tid
+
+    @contextmanager
+    def span(self, name, category, **args):
+        """Record the with block as a complete event on the current thread"""
+        tid = self._tid()
+        start = _now_us()
+        try:
+            yield
+        finally:
+            event = {"name": name, "cat": category, "ph": "X", "ts": start, "dur": _now_us() - start,
+                     "pid": self.pid, "tid": tid}
+            if args:
+                event["args"] = args
+            self.events.append(event)
+
+    def async_event(self, phase, name, category, event_id, **args):
+        """Record the begin ('b') or end ('e') of an event that may cross threads"""
+        event = {"name": name, "cat": category, "ph": phase, "ts": _now_us(), "pid": self.pid,
+                 "tid": self._tid(), "id": str(event_id)}
+        if args:
+            event["args"] = args
+        self.events.append(event)
+
+    def drain(self):
+        """Return and forget the events recorded so far"""
+        with self._lock:
+            events, self.events = self.events, []
+            # Thread names are sent again with the next batch of events
+            self._named_threads.clear()
+        return events
+
+    def add_events(self, events):
+        """Add events recorded by another process"""
+        if events:
+            self.events.extend(events)
+
+
+_recorder = None
+
+
+def start_tracing():
+    """Start recording in this process and return the recorder"""
+    global _recorder
+    _recorder = TraceRecorder()
+    return _recorder
+
+
+def stop_tracing():
+    """Stop recording and return the recorder, or None if tracing was off"""
+    global _recorder
+    recorder, _recorder = _recorder, None
+    return recorder
+
+
+def get_tracer():
+    """Return the active TraceRecorder, or None when tracing is off"""
+    return _recorder
+
+
+def span(name, category, **args):
+    """Context manager recording a complete event while tracing, a no-op otherwise"""
+    recorder = _recorder
+    if recorder is None:
+        return _NO_SPAN
+    return recorder.span(name, category, **args)
+
+
+def async_begin(name, category, event_id, **args):
+    if _recorder is not None:
+        _recorder.async_event("b", name, category, event_id, **args)
+
+
+def async_end(name, category, event_id, **args):
+    if _recorder is not None:
+        _recorder.async_event("e", name, category, event_id, **args)
+
+
+def write_trace(path, recorder=None):
+    """Write the events of a recorder (default: the active one) as a Chrome trace file"""
+    recorder = recorder or _recorder
+    if recorder is None:
+        return False
+    events = sorted(recorder.events, key=lambda event: event.get("ts", 0))
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    logger.info("Trace with %s events written to %s", len(events), path)
+    return True